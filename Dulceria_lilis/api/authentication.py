@@ -0,0 +1,45 @@
+# api/authentication.py
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+def token_cache_key(key):
+    # No se guarda el token en claro como clave de caché
+    return "api:token:" + hashlib.sha256(key.encode()).hexdigest()
+
+
+def invalidar_token(key):
+    cache.delete(token_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication con caché de (usuario, token) por un TTL corto
+    (API_TOKEN_CACHE_TTL, en segundos), para no consultar Token + Usuario en cada request.
+
+    Mismo header ("Authorization: Token <key>") y mismos tokens que entrega api/login/.
+    Un acierto de caché no toca la base. La caché se invalida al eliminar el token y
+    al guardar el usuario (cambio de is_active, estado, permisos...), ver api/signals.py.
+    Compromiso: esa invalidación no llega a la caché local de otros procesos ni cubre
+    un queryset.update(); ahí un token revocado o un usuario bloqueado siguen
+    autenticando hasta que vence el TTL. Por eso el TTL es de segundos, no de horas.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        user, token = super().authenticate_credentials(key)
+
+        if getattr(user, 'estado', 'ACTIVO') != 'ACTIVO':
+            raise exceptions.AuthenticationFailed('Usuario bloqueado.')
+
+        ttl = getattr(settings, 'API_TOKEN_CACHE_TTL', 60)
+        cache.set(cache_key, (user, token), ttl)
+        return (user, token)
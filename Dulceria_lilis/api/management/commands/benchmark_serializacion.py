@@ -0,0 +1,58 @@
+# api/management/commands/benchmark_serializacion.py
+"""
+Microbenchmark: filas por segundo de ProductoSerializer vs SerializadorRapido.
+Usa los productos que ya existen en la base de datos.
+Ejecutar:
+python manage.py benchmark_serializacion --filas 10000 --repeticiones 3
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from api.serializers import ProductoSerializer, SerializadorRapido
+from productos.models import Producto
+
+
+class Command(BaseCommand):
+    help = 'Compara filas/segundo del serializador DRF y la lectura rápida de productos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=10000)
+        parser.add_argument('--repeticiones', type=int, default=3)
+
+    def handle(self, *args, **options):
+        filas = options['filas']
+        repeticiones = max(1, options['repeticiones'])
+
+        ids = list(Producto.objects.order_by('id').values_list('id', flat=True)[:filas])
+        if not ids:
+            self.stdout.write(self.style.WARNING('No hay productos. Ejecuta generar_datos_prueba primero.'))
+            return
+        qs = Producto.objects.filter(id__in=ids).order_by('id')
+        n = len(ids)
+
+        def drf():
+            return JSONRenderer().render(ProductoSerializer(qs.all(), many=True).data)
+
+        rapido = SerializadorRapido(Producto)
+
+        def lectura_rapida():
+            return rapido.render(qs.all())
+
+        resultados = {}
+        for nombre, fn in (('ProductoSerializer', drf), ('SerializadorRapido', lectura_rapida)):
+            mejor = None
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                fn()
+                dur = time.perf_counter() - inicio
+                mejor = dur if mejor is None else min(mejor, dur)
+            resultados[nombre] = n / mejor if mejor else 0
+            self.stdout.write(f'  {nombre:<20} {n} filas en {mejor:.3f}s → {resultados[nombre]:,.0f} filas/s')
+
+        base = resultados['ProductoSerializer']
+        if base:
+            self.stdout.write(self.style.SUCCESS(
+                f'Aceleración: x{resultados["SerializadorRapido"] / base:.1f}'
+            ))
@@ -0,0 +1,72 @@
+# api/management/commands/benchmark_token_auth.py
+"""
+Benchmark: requests/segundo de TokenAuthentication vs CachedTokenAuthentication.
+Pasa cada request por el ciclo completo de DRF con una vista mínima, para medir
+solo el costo de autenticación + framework.
+Ejecutar:
+python manage.py benchmark_token_auth --requests 2000
+"""
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from api.authentication import CachedTokenAuthentication, token_cache_key
+from usuarios.models import Usuario
+
+
+def _vista(auth_class):
+    class Ping(APIView):
+        authentication_classes = [auth_class]
+        permission_classes = [IsAuthenticated]
+
+        def get(self, request):
+            return Response({"ok": True})
+    return Ping.as_view()
+
+
+class Command(BaseCommand):
+    help = 'Compara requests/segundo de la autenticación por token con y sin caché'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--usuario', type=str, default=None)
+
+    def handle(self, *args, **options):
+        n = max(1, options['requests'])
+
+        if options['usuario']:
+            user = Usuario.objects.filter(username=options['usuario']).first()
+        else:
+            user = Usuario.objects.filter(is_active=True).order_by('id').first()
+        if user is None:
+            raise CommandError('No hay usuarios activos para el benchmark.')
+
+        token, _ = Token.objects.get_or_create(user=user)
+        cache.delete(token_cache_key(token.key))
+        factory = APIRequestFactory()
+
+        for nombre, auth_class in (
+            ('TokenAuthentication', TokenAuthentication),
+            ('CachedTokenAuthentication', CachedTokenAuthentication),
+        ):
+            vista = _vista(auth_class)
+            with CaptureQueriesContext(connection) as ctx:
+                inicio = time.perf_counter()
+                for _ in range(n):
+                    request = factory.get('/api/ping/', HTTP_AUTHORIZATION=f'Token {token.key}')
+                    response = vista(request)
+                    if response.status_code != 200:
+                        raise CommandError(f'{nombre}: respuesta {response.status_code}')
+                dur = time.perf_counter() - inicio
+            self.stdout.write(
+                f'  {nombre:<26} {n / dur:,.0f} req/s  ({len(ctx.captured_queries)} consultas en {n} requests)'
+            )
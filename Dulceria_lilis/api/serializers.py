@@ -1,5 +1,12 @@
 # api/serializers.py
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models
+from django.http import HttpResponse
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.fields import get_error_detail
 from productos.models import Producto
 
 class ProductoSerializer(serializers.ModelSerializer):
@@ -25,3 +32,144 @@ class ProductoSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("El IVA debe estar entre 0% y 30%")
 
         return data
+
+
+class ProductoBulkSerializer(ProductoSerializer):
+    """
+    Validación por fila para la carga masiva (/api/productos/bulk/).
+    Sin UniqueValidator: la unicidad de SKU y EAN se resuelve en bloque
+    (ver productos.carga_masiva).
+    """
+    class Meta(ProductoSerializer.Meta):
+        extra_kwargs = {
+            'sku': {'validators': []},
+            'ean_upc': {'validators': []},
+        }
+
+    def validar_fila(self, fila):
+        """
+        Igual que run_validation(), pero recorre solo las claves presentes en la fila:
+        con decenas de miles de filas, evitar pasar por los 25 campos en cada una
+        es lo que más pesa. Devuelve (datos, errores).
+        """
+        campos = self._campos_carga()
+        datos, errores = {}, {}
+        for nombre, valor in fila.items():
+            field = campos.get(nombre)
+            if field is None:
+                continue  # igual que DRF: se ignoran claves desconocidas o de solo lectura
+            try:
+                datos[nombre] = field.run_validation(valor)
+            except serializers.ValidationError as e:
+                errores[nombre] = e.detail
+            except DjangoValidationError as e:
+                errores[nombre] = get_error_detail(e)
+
+        if not self.partial:
+            for nombre in self._requeridos - fila.keys():
+                errores[nombre] = [campos[nombre].error_messages['required']]
+
+        if errores:
+            return None, errores
+        try:
+            return self.validate(datos), None
+        except serializers.ValidationError as e:
+            return None, serializers.as_serializer_error(e)
+
+    def _campos_carga(self):
+        if not hasattr(self, '_campos_escritura'):
+            self._campos_escritura = {f.field_name: f for f in self._writable_fields}
+            self._requeridos = {n for n, f in self._campos_escritura.items() if f.required}
+        return self._campos_escritura
+
+
+# ------------------------------------------------------------
+# LECTURA RÁPIDA (solo GET): values_list + conversores por columna
+# ------------------------------------------------------------
+def _decimal_a_texto(valor):
+    # Igual que DecimalField de DRF (COERCE_DECIMAL_TO_STRING): texto sin notación científica
+    return format(valor, 'f')
+
+
+def _fecha_a_texto(valor):
+    return valor.isoformat()
+
+
+def _fecha_hora_a_texto(valor):
+    # Igual que DateTimeField de DRF: zona horaria actual e ISO 8601 ('Z' para UTC)
+    if timezone.is_aware(valor):
+        valor = timezone.localtime(valor)
+    texto = valor.isoformat()
+    if texto.endswith('+00:00'):
+        texto = texto[:-6] + 'Z'
+    return texto
+
+
+class SerializadorRapido:
+    """
+    Serializador de solo lectura para listados y sincronización.
+
+    Lee tuplas con values_list() y aplica conversores precalculados por columna,
+    sin instanciar campos DRF por fila. Produce el mismo JSON que un
+    ModelSerializer con fields='__all__'. Las escrituras siguen pasando por el
+    serializador con validaciones (ProductoSerializer).
+    """
+
+    def __init__(self, model, campos=None):
+        fields = [
+            f for f in model._meta.concrete_fields
+            if campos is None or f.name in campos
+        ]
+        self.model = model
+        self.nombres = tuple(f.name for f in fields)
+        self.columnas = tuple(f.attname for f in fields)
+
+        # (posición, conversor) solo para columnas que requieren conversión
+        conversores = []
+        for idx, f in enumerate(fields):
+            if isinstance(f, models.DecimalField):
+                conversores.append((idx, _decimal_a_texto))
+            elif isinstance(f, models.DateTimeField):
+                conversores.append((idx, _fecha_hora_a_texto))
+            elif isinstance(f, (models.DateField, models.TimeField)):
+                conversores.append((idx, _fecha_a_texto))
+        self.conversores = tuple(conversores)
+
+    def filas(self, queryset, chunk_size=2000):
+        """Genera un dict por fila, listo para json.dumps."""
+        nombres = self.nombres
+        conversores = self.conversores
+        for tupla in queryset.values_list(*self.columnas).iterator(chunk_size=chunk_size):
+            if conversores:
+                tupla = list(tupla)
+                for idx, conv in conversores:
+                    if tupla[idx] is not None:
+                        tupla[idx] = conv(tupla[idx])
+            yield dict(zip(nombres, tupla))
+
+    def render(self, queryset):
+        """Devuelve el JSON (bytes) de todas las filas del queryset."""
+        return json.dumps(
+            list(self.filas(queryset)),
+            ensure_ascii=False,
+            separators=(',', ':'),
+        ).encode('utf-8')
+
+    def respuesta(self, queryset, status=200):
+        return HttpResponse(self.render(queryset), content_type='application/json', status=status)
+
+    def ndjson(self, queryset, desde_id=0, lote=2000):
+        """
+        Genera una línea JSON por fila, en orden de id y por bloques keyset
+        (id > último id del bloque anterior). Memoria constante en cualquier motor
+        (el driver MySQL trae completo el resultado de un SELECT sin LIMIT) y
+        permite reanudar con el último id recibido.
+        """
+        ultimo = desde_id or 0
+        while True:
+            filas = list(self.filas(queryset.filter(pk__gt=ultimo).order_by('pk')[:lote]))
+            for fila in filas:
+                yield json.dumps(fila, ensure_ascii=False, separators=(',', ':')) + '\n'
+            if len(filas) < lote:
+                return
+            ultimo = filas[-1]['id']
@@ -0,0 +1,19 @@
+# api/signals.py
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidar_token
+
+
+@receiver(post_delete, sender=Token)
+def invalidar_token_eliminado(sender, instance, **kwargs):
+    invalidar_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidar_tokens_usuario(sender, instance, **kwargs):
+    """Desactivación (is_active / estado) o cambio de permisos: se descarta la caché."""
+    for key in Token.objects.filter(user_id=instance.pk).values_list('key', flat=True):
+        invalidar_token(key)
@@ -1,3 +1,625 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache_key
+from api.serializers import ProductoSerializer, SerializadorRapido
+from api.views import MOVIMIENTOS_RAPIDO
+from inventario.models import Lote, MovimientoInventario
+from productos.carga_masiva import upsert_productos
+from productos.indice_codigos import indice
+from productos.models import Producto
+from proveedores.models import Proveedor
+from usuarios.models import Usuario
+from utils.pruebas import PresupuestoConsultasMixin, crear_datos_semilla
+
+
+@override_settings(INDICE_CODIGOS_REVISION_SEGUNDOS=3600)
+class PresupuestoApiTests(PresupuestoConsultasMixin, TestCase):
+    """Consultas y filas máximas de cada acción de la API sobre los datos semilla."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.token = Token.objects.create(user=cls.datos['admin'])
+        cls.bodega = cls.datos['bodegas'][0]
+        cls.producto = cls.datos['sin_lote'][0]
+
+    def setUp(self):
+        super().setUp()
+        # El índice de códigos es por proceso: se carga fuera del bloque medido
+        indice.cargar()
+        self.cabeceras = {'HTTP_AUTHORIZATION': f"Token {self.token.key}"}
+
+    def get(self, url, datos=None):
+        respuesta = self.client.get(url, datos, **self.cabeceras)
+        self.assertLess(respuesta.status_code, 400, getattr(respuesta, 'data', None))
+        if respuesta.streaming:
+            b''.join(respuesta.streaming_content)
+        return respuesta
+
+    def enviar(self, metodo, url, datos, esperado):
+        respuesta = getattr(self.client, metodo)(url, datos, content_type='application/json', **self.cabeceras)
+        self.assertEqual(respuesta.status_code, esperado, getattr(respuesta, 'data', None))
+        return respuesta
+
+    # ---- Lectura ----
+    def test_info(self):
+        with self.assertPresupuesto(consultas=0, filas=0):
+            self.get('/api/info/')
+
+    def test_productos_lista(self):
+        with self.assertPresupuesto(consultas=2, filas=31):
+            self.get('/api/productos/')
+
+    def test_productos_detalle(self):
+        with self.assertPresupuesto(consultas=2, filas=2):
+            self.get(f'/api/productos/{self.producto.pk}/')
+
+    def test_cambios(self):
+        with self.assertPresupuesto(consultas=5, filas=57):
+            self.get('/api/changes/', {'limite': 100})
+
+    def test_movimientos_ndjson(self):
+        with self.assertPresupuesto(consultas=2, filas=91):
+            self.get('/api/movimientos/ndjson/')
+
+    def test_lotes_ndjson(self):
+        with self.assertPresupuesto(consultas=2, filas=21):
+            self.get('/api/lotes/ndjson/')
+
+    def test_stock_ndjson(self):
+        with self.assertPresupuesto(consultas=2, filas=11):
+            self.get('/api/stock/ndjson/', {'bodega': self.bodega.pk})
+
+    def test_kardex(self):
+        with self.assertPresupuesto(consultas=4, filas=12):
+            self.get('/api/kardex/', {'producto': self.producto.pk})
+
+    def test_stock_al(self):
+        with self.assertPresupuesto(consultas=7, filas=7):
+            self.get('/api/stock/al/', {'fecha': timezone.localdate().isoformat(), 'sku': self.producto.sku})
+
+    def test_escaneos_consulta(self):
+        codigos = [p.ean_upc for p in self.datos['productos'][:5]]
+        with self.assertPresupuesto(consultas=2, filas=6):
+            self.get('/api/escaneos/', {'codigo': codigos})
+
+    # ---- Escritura ----
+    def test_productos_crear(self):
+        with self.assertPresupuesto(consultas=3, filas=2):
+            self.enviar('post', '/api/productos/', {
+                'sku': 'SKU9001', 'nombre': 'Torta Tres Leches', 'categoria': 'TORTAS',
+            }, 201)
+
+    def test_productos_actualizar(self):
+        with self.assertPresupuesto(consultas=3, filas=2):
+            self.enviar('patch', f'/api/productos/{self.producto.pk}/', {'precio_venta': '4990'}, 200)
+
+    def test_productos_eliminar(self):
+        producto = Producto.objects.create(sku='SKU9002', nombre='Producto sin uso', categoria='TORTAS')
+        with self.assertPresupuesto(consultas=12, filas=3):
+            self.enviar('delete', f'/api/productos/{producto.pk}/', None, 204)
+
+    def test_productos_bulk(self):
+        filas = [{'sku': f'SKU95{i:02d}', 'nombre': f'Bombón {i}', 'categoria': 'TORTAS'} for i in range(20)]
+        filas.append({'sku': self.producto.sku, 'precio_venta': '5100'})
+        with self.assertPresupuesto(consultas=7, filas=23):
+            self.enviar('post', '/api/productos/bulk/', filas, 200)
+
+    def test_documentos(self):
+        lineas = [{'producto_id': p.pk, 'cantidad': '3'} for p in self.datos['sin_lote'][:10]]
+        with self.assertPresupuesto(consultas=13, filas=47):
+            self.enviar('post', '/api/documentos/', {
+                'tipo': 'INGRESO', 'proveedor': self.datos['proveedores'][0].pk,
+                'bodega_destino': self.bodega.codigo, 'lineas': lineas,
+            }, 201)
+
+    def test_transferencias(self):
+        lineas = [{'sku': p.sku, 'cantidad': '1'} for p in self.datos['sin_lote'][:5]]
+        # Las líneas sin lote se validan contra el saldo de origen: cierre + cuatro consultas agrupadas (fijas)
+        with self.assertPresupuesto(consultas=19, filas=40):
+            self.enviar('post', '/api/transferencias/', {
+                'bodega_origen': self.bodega.codigo, 'bodega_destino': self.datos['bodegas'][1].codigo,
+                'lineas': lineas,
+            }, 201)
+
+    def test_reservas(self):
+        with self.assertPresupuesto(consultas=8, filas=5):
+            self.enviar('post', '/api/reservas/', {
+                'referencia': 'PED-2', 'lineas': [{'lote_id': self.datos['lote'].pk, 'cantidad': '1'}],
+            }, 201)
+
+    def test_reservas_liberar(self):
+        with self.assertPresupuesto(consultas=2, filas=1):
+            self.enviar('delete', '/api/reservas/?referencia=PED-1', None, 200)
+
+    def test_escaneos_publicar(self):
+        codigos = [p.ean_upc for p in self.datos['sin_lote'][:6] for _ in range(3)]
+        with self.assertPresupuesto(consultas=11, filas=28):
+            self.enviar('post', '/api/escaneos/', {'bodega': self.bodega.codigo, 'codigos': codigos}, 201)
+
+    def test_conteo_escaneos(self):
+        codigos = [p.ean_upc for p in self.datos['sin_lote'][:6] for _ in range(2)]
+        with self.assertPresupuesto(consultas=7, filas=33):
+            self.enviar('post', f"/api/conteos/{self.datos['conteo'].pk}/escaneos/", {'codigos': codigos}, 200)
+
+
+class DocumentosApiTests(TestCase):
+    """Publicación de documentos y transferencias por la API: todo o nada, errores por línea."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.token = Token.objects.create(user=cls.datos['admin'])
+        cls.bodegas = cls.datos['bodegas']
+        cls.producto = cls.datos['sin_lote'][0]
+
+    def setUp(self):
+        self.producto.refresh_from_db()
+
+    def post(self, url, datos, **cabeceras):
+        return self.client.post(
+            url, datos, content_type='application/json', HTTP_AUTHORIZATION=f"Token {self.token.key}", **cabeceras
+        )
+
+    def test_ids_no_numericos_son_errores_de_linea(self):
+        stock = self.producto.stock_actual
+        for url, encabezado in (
+            ('/api/documentos/', {'tipo': 'INGRESO', 'bodega_destino': self.bodegas[0].codigo}),
+            ('/api/transferencias/', {'bodega_origen': self.bodegas[0].codigo, 'bodega_destino': self.bodegas[1].codigo}),
+        ):
+            for linea in (
+                {'producto_id': 'abc', 'cantidad': '1'},
+                {'producto_id': self.producto.pk, 'lote_id': 'x1', 'cantidad': '1'},
+                {'producto_id': [self.producto.pk], 'cantidad': '1'},
+                {'sku': [self.producto.sku], 'cantidad': '1'},
+                {'producto_id': self.producto.pk, 'cantidad': '1', 'fecha_vencimiento': {'dia': 1}},
+                {'producto_id': self.producto.pk, 'cantidad': '1', 'fecha_vencimiento': '2024-02-30'},
+            ):
+                with self.subTest(url=url, linea=linea):
+                    respuesta = self.post(url, {**encabezado, 'lineas': [linea]})
+                    self.assertEqual(respuesta.status_code, 400)
+                    self.assertIn('lineas', respuesta.json())
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock_actual, stock)
+
+    def test_documento_todo_o_nada(self):
+        otro = Producto.objects.get(pk=self.datos['sin_lote'][1].pk)
+        stock = otro.stock_actual
+        respuesta = self.post('/api/documentos/', {
+            'tipo': 'SALIDA', 'bodega_origen': self.bodegas[0].pk,
+            'lineas': [{'producto_id': otro.pk, 'cantidad': '1'}, {'sku': 'NO-EXISTE', 'cantidad': '1'}],
+        })
+        self.assertEqual(respuesta.status_code, 400)
+        otro.refresh_from_db()
+        self.assertEqual(otro.stock_actual, stock)
+
+
+@override_settings(INDICE_CODIGOS_REVISION_SEGUNDOS=3600)
+class EscaneosApiTests(TestCase):
+    """Lecturas de códigos resueltas con el índice en memoria."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.token = Token.objects.create(user=cls.datos['admin'])
+        cls.bodega = cls.datos['bodegas'][0]
+        cls.producto = cls.datos['sin_lote'][0]
+
+    def setUp(self):
+        indice.cargar()
+        self.cabeceras = {'HTTP_AUTHORIZATION': f"Token {self.token.key}"}
+
+    def post(self, datos):
+        return self.client.post('/api/escaneos/', datos, content_type='application/json', **self.cabeceras)
+
+    def test_consulta_por_ean_y_sku(self):
+        respuesta = self.client.get(
+            '/api/escaneos/', {'codigo': [self.producto.ean_upc, self.producto.sku, 'NO-EXISTE']}, **self.cabeceras
+        )
+        resultados = respuesta.json()['resultados']
+        self.assertEqual([r['producto_id'] for r in resultados], [self.producto.pk, self.producto.pk, None])
+
+    def test_producto_eliminado_despues_de_cargar_el_indice(self):
+        fantasma = Producto.objects.create(sku='FANTASMA', ean_upc='7809999999990', nombre='Fantasma')
+        indice.cargar()
+        Producto.objects.filter(pk=fantasma.pk).delete()
+        respuesta = self.client.get('/api/escaneos/', {'codigo': ['FANTASMA', self.producto.sku]}, **self.cabeceras)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([r['producto_id'] for r in respuesta.json()['resultados']], [None, self.producto.pk])
+
+    def test_lecturas_repetidas_se_suman(self):
+        stock = Producto.objects.get(pk=self.producto.pk).stock_actual
+        respuesta = self.post({
+            'bodega': self.bodega.pk, 'codigos': [self.producto.ean_upc] * 3 + [self.producto.sku],
+        })
+        self.assertEqual(respuesta.status_code, 201, respuesta.content)
+        self.assertEqual(respuesta.json()['lecturas'], 4)
+        self.assertEqual(Producto.objects.get(pk=self.producto.pk).stock_actual, stock + 4)
+
+    def test_valores_no_simples_se_rechazan(self):
+        for campo, valor in (('lote', ['L1']), ('lote', {'codigo': 'L1'}), ('fecha_vencimiento', [2030, 1, 1]),
+                             ('cantidad', {'n': 1}), ('cantidad', True)):
+            with self.subTest(campo=campo, valor=valor):
+                respuesta = self.post({
+                    'bodega': self.bodega.pk, 'lecturas': [{'codigo': self.producto.sku, campo: valor}],
+                })
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertIn('lecturas', respuesta.json())
+
+
+class TokenCacheTests(TestCase):
+    """La caché de tokens evita la consulta por request y se invalida con las señales."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(username='api', password='x', is_staff=True)
+        cls.token = Token.objects.create(user=cls.usuario)
+        cls.producto = Producto.objects.create(sku='TOKEN-1', nombre='Producto', categoria='TORTAS')
+
+    def setUp(self):
+        cache.delete(token_cache_key(self.token.key))
+
+    def get(self):
+        return self.client.get(f'/api/productos/{self.producto.pk}/', HTTP_AUTHORIZATION=f"Token {self.token.key}").status_code
+
+    def test_acierto_de_cache_no_consulta_el_token(self):
+        self.assertEqual(self.get(), 200)
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.get(), 200)
+        self.assertFalse([q for q in consultas.captured_queries if 'authtoken_token' in q['sql']])
+
+    def test_guardar_usuario_invalida(self):
+        for campo, valor in (('is_active', False), ('estado', 'BLOQUEADO')):
+            with self.subTest(campo=campo):
+                usuario = Usuario.objects.get(pk=self.usuario.pk)
+                usuario.is_active, usuario.estado = True, 'ACTIVO'
+                usuario.save()
+                self.assertEqual(self.get(), 200)
+                setattr(usuario, campo, valor)
+                usuario.save()
+                self.assertEqual(self.get(), 401)
+
+    def test_token_eliminado_invalida(self):
+        self.assertEqual(self.get(), 200)
+        Token.objects.get(pk=self.token.pk).delete()
+        self.assertEqual(self.get(), 401)
+
+    @override_settings(API_TOKEN_CACHE_TTL=0)
+    def test_sin_senales_manda_el_ttl(self):
+        # Un update() no dispara señales: el bloqueo se ve cuando vence el TTL (aquí, de inmediato)
+        self.assertEqual(self.get(), 200)
+        Usuario.objects.filter(pk=self.usuario.pk).update(estado='BLOQUEADO')
+        self.assertEqual(self.get(), 401)
+
+
+class ProductosBulkApiTests(TestCase):
+    """Alta/actualización masiva por SKU con un resultado por fila."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.token = Token.objects.create(user=cls.datos['admin'])
+        cls.existente = cls.datos['productos'][0]
+
+    def post(self, datos):
+        return self.client.post(
+            '/api/productos/bulk/', datos, content_type='application/json',
+            HTTP_AUTHORIZATION=f"Token {self.token.key}",
+        )
+
+    def test_crea_actualiza_y_reporta_errores_por_fila(self):
+        respuesta = self.post({'productos': [
+            {'sku': 'BULK-1', 'nombre': 'Torta Bulk', 'categoria': 'TORTAS', 'stock_minimo': '4'},
+            {'sku': self.existente.sku, 'nombre': 'Nombre Nuevo'},
+            {'sku': 'BULK-1', 'nombre': 'Repetida', 'categoria': 'TORTAS'},
+            {'sku': 'BULK-2', 'nombre': 'Sin Categoria'},
+            {'sku': 'BULK-3', 'nombre': 'Ean Ajeno', 'categoria': 'TORTAS', 'ean_upc': self.existente.ean_upc},
+            'no es un objeto',
+        ]})
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        resumen = respuesta.json()
+        self.assertEqual((resumen['creados'], resumen['actualizados'], resumen['errores']), (1, 1, 4))
+        self.assertEqual(
+            [r['estado'] for r in resumen['resultados']],
+            ['creado', 'actualizado', 'error', 'error', 'error', 'error'],
+        )
+        nuevo = Producto.objects.get(sku='BULK-1')
+        # Igual que Producto.save(): punto_reorden por defecto = stock_minimo
+        self.assertEqual(nuevo.punto_reorden, 4)
+        self.existente.refresh_from_db()
+        self.assertEqual(self.existente.nombre, 'Nombre Nuevo')
+        self.assertFalse(Producto.objects.filter(sku__in=['BULK-2', 'BULK-3']).exists())
+
+    def test_sku_con_espacios_o_minusculas_es_el_existente(self):
+        resumen = self.post([
+            {'sku': f' {self.existente.sku.lower()} ', 'nombre': 'Con Espacios'},
+            {'sku': 'BULK-5', 'nombre': 'Torta Nueva', 'categoria': 'TORTAS'},
+            {'sku': self.existente.sku, 'nombre': 'Repetida'},
+        ]).json()
+        self.assertEqual([r['estado'] for r in resumen['resultados']], ['actualizado', 'creado', 'error'])
+        self.existente.refresh_from_db()
+        self.assertEqual(self.existente.nombre, 'Con Espacios')
+
+    def test_choque_en_la_base_solo_marca_esa_fila(self):
+        # Un validador que devuelve el SKU de otro producto provoca un IntegrityError en el bloque
+        def validar(fila, existente):
+            return {'sku': fila.get('choca', fila['sku']), 'nombre': fila['nombre'], 'categoria': 'TORTAS'}, None
+
+        resumen = upsert_productos([
+            {'sku': 'BULK-6', 'nombre': 'Valida'},
+            {'sku': 'BULK-7', 'nombre': 'Choca', 'choca': self.existente.sku},
+        ], validar)
+        self.assertEqual([r['estado'] for r in resumen['resultados']], ['creado', 'error'])
+        self.assertEqual((resumen['creados'], resumen['errores']), (1, 1))
+        self.assertTrue(Producto.objects.filter(sku='BULK-6').exists())
+
+    def test_reenvio_sin_cambios(self):
+        fila = {'sku': 'BULK-9', 'nombre': 'Torta Repetida', 'categoria': 'TORTAS'}
+        self.post([fila])
+        resumen = self.post([fila]).json()
+        self.assertEqual(resumen['resultados'][0]['estado'], 'sin_cambios')
+        self.assertEqual(Producto.objects.filter(sku='BULK-9').count(), 1)
+
+    def test_cuerpo_invalido(self):
+        self.assertEqual(self.post({'productos': 'x'}).status_code, 400)
+
+
+class IdempotenciaApiTests(TestCase):
+    """Un reenvío con la misma Idempotency-Key devuelve el documento original sin tocar el stock."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.token = Token.objects.create(user=cls.datos['admin'])
+        cls.bodega = cls.datos['bodegas'][0]
+        cls.producto = cls.datos['sin_lote'][0]
+
+    def post(self, clave, url='/api/documentos/', datos=None):
+        datos = datos or {
+            'tipo': 'INGRESO', 'bodega_destino': self.bodega.pk,
+            'lineas': [{'producto_id': self.producto.pk, 'cantidad': '2'}],
+        }
+        return self.client.post(
+            url, datos, content_type='application/json',
+            HTTP_AUTHORIZATION=f"Token {self.token.key}", HTTP_IDEMPOTENCY_KEY=clave,
+        )
+
+    def stock(self):
+        return Producto.objects.get(pk=self.producto.pk).stock_actual
+
+    def test_reenvio_devuelve_el_original(self):
+        stock = self.stock()
+        primera = self.post('pedido-123')
+        segunda = self.post('pedido-123')
+        self.assertEqual((primera.status_code, segunda.status_code), (201, 201))
+        self.assertEqual(primera.json()['documento'], segunda.json()['documento'])
+        self.assertNotIn('Idempotent-Replayed', primera)
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertEqual(self.stock(), stock + 2)
+
+    def test_claves_distintas_publican_dos_veces(self):
+        stock = self.stock()
+        self.post('a-1')
+        self.post('a-2')
+        self.assertEqual(self.stock(), stock + 4)
+
+    def test_escaneos_con_clave(self):
+        stock = self.stock()
+        datos = {'bodega': self.bodega.pk, 'codigos': [self.producto.sku] * 3}
+        for _ in range(2):
+            self.assertEqual(self.post('escaneo-1', '/api/escaneos/', datos).status_code, 201)
+        self.assertEqual(self.stock(), stock + 3)
+
+    def test_clave_de_otro_documento_es_conflicto(self):
+        self.assertEqual(self.post('pedido-9').status_code, 201)
+        stock = self.stock()
+        otros = (
+            {'tipo': 'SALIDA', 'bodega_origen': self.bodega.pk},
+            {'tipo': 'INGRESO', 'bodega_destino': self.datos['bodegas'][1].pk},
+        )
+        for encabezado in otros:
+            with self.subTest(encabezado=encabezado):
+                respuesta = self.post('pedido-9', datos={
+                    **encabezado, 'lineas': [{'producto_id': self.producto.pk, 'cantidad': '1'}],
+                })
+                self.assertEqual(respuesta.status_code, 409)
+                self.assertIn('clave_idempotencia', respuesta.json())
+        self.assertEqual(self.stock(), stock)
+
+    def test_clave_invalida(self):
+        respuesta = self.post('con espacios')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('clave_idempotencia', respuesta.json())
+
+
+class ReservasApiTests(TestCase):
+    """Reservas de lotes por referencia: todo o nada, errores por línea."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.token = Token.objects.create(user=cls.datos['admin'])
+        cls.lote = cls.datos['lote']
+
+    def enviar(self, metodo, datos, url='/api/reservas/'):
+        return getattr(self.client, metodo)(
+            url, datos, content_type='application/json', HTTP_AUTHORIZATION=f"Token {self.token.key}",
+        )
+
+    def test_lote_no_simple_es_error_de_linea(self):
+        for lote in (['L1'], {'codigo': 'L1'}):
+            with self.subTest(lote=lote):
+                respuesta = self.enviar('post', {'referencia': 'P-1', 'lineas': [{'lote': lote, 'cantidad': '1'}]})
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertIn('lineas', respuesta.json())
+
+    def test_reservar_y_liberar(self):
+        respuesta = self.enviar('post', {
+            'referencia': 'P-2', 'minutos': 10, 'lineas': [{'lote': self.lote.codigo, 'cantidad': '1'}],
+        })
+        self.assertEqual(respuesta.status_code, 201, respuesta.content)
+        self.assertEqual(respuesta.json()['reservas'][0]['lote_id'], self.lote.pk)
+        respuesta = self.enviar('delete', None, '/api/reservas/?referencia=P-2')
+        self.assertEqual(respuesta.json()['liberadas'], 1)
+
+    def test_sin_stock_libre(self):
+        respuesta = self.enviar('post', {
+            'referencia': 'P-3', 'lineas': [{'lote_id': self.lote.pk, 'cantidad': '999999'}],
+        })
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('No hay stock suficiente', respuesta.json()['lineas'][0])
+
+
+class LecturaRapidaTests(TestCase):
+    """El listado por values_list produce el mismo JSON que ProductoSerializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.token = Token.objects.create(user=cls.datos['admin'])
+        Producto.objects.filter(pk=cls.datos['productos'][0].pk).update(
+            costo_estandar=Decimal('1E+3'), precio_venta=None, fecha_vencimiento=timezone.localdate(),
+        )
+
+    def test_listado_igual_a_drf(self):
+        respuesta = self.client.get('/api/productos/', HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.assertEqual(respuesta.status_code, 200)
+        esperado = json.loads(json.dumps(ProductoSerializer(Producto.objects.all(), many=True).data))
+        self.assertEqual(respuesta.json(), esperado)
+
+    def test_subconjunto_de_campos(self):
+        rapido = SerializadorRapido(Producto, campos=('id', 'sku', 'stock_minimo'))
+        producto = Producto.objects.get(pk=self.datos['productos'][0].pk)
+        fila = next(rapido.filas(Producto.objects.filter(pk=producto.pk)))
+        self.assertEqual(fila, {'id': producto.pk, 'sku': producto.sku, 'stock_minimo': format(producto.stock_minimo, 'f')})
+
+
+class CambiosApiTests(TestCase):
+    """Sincronización incremental: solo lo modificado o eliminado desde el cursor, por páginas keyset."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.token = Token.objects.create(user=cls.datos['admin'])
+
+    def get(self, **parametros):
+        respuesta = self.client.get('/api/changes/', parametros, HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        return respuesta.json()
+
+    def sincronizar(self, cursor=None, limite=500):
+        """Repite la llamada hasta hay_mas = false; devuelve (entidades acumuladas, cursor final)."""
+        acumulado = {'productos': [], 'proveedores': [], 'lotes': [], 'eliminados': []}
+        while True:
+            parametros = {'limite': limite}
+            if cursor:
+                parametros['since'] = cursor
+            pagina = self.get(**parametros)
+            for nombre, filas in acumulado.items():
+                filas.extend(pagina[nombre])
+            cursor = pagina['cursor']
+            if not pagina['hay_mas']:
+                return acumulado, cursor
+
+    def escalonar(self):
+        """updated_at separados por 2 minutos (más que el MARGEN): el solape de una pasada nueva es acotado."""
+        inicio = timezone.now() - timedelta(days=1)
+        for modelo in (Producto, Proveedor, Lote):
+            for i, pk in enumerate(modelo.objects.order_by('id').values_list('id', flat=True)):
+                modelo.objects.filter(pk=pk).update(updated_at=inicio + i * timedelta(minutes=2))
+
+    def test_completa_paginada_y_luego_solo_deltas(self):
+        self.escalonar()
+        completo, cursor = self.sincronizar(limite=3)
+        self.assertEqual(sorted(p['id'] for p in completo['productos']), sorted(Producto.objects.values_list('id', flat=True)))
+        # Dentro de una pasada las páginas no se solapan
+        self.assertEqual(len({p['id'] for p in completo['productos']}), len(completo['productos']))
+
+        # Sin cambios, una pasada nueva solo relee lo que cae en el MARGEN (aquí, la última fila)
+        ultimo = Producto.objects.order_by('updated_at', 'id').last()
+        sin_cambios, cursor = self.sincronizar(cursor)
+        self.assertEqual([p['id'] for p in sin_cambios['productos']], [ultimo.pk])
+        self.assertEqual(sin_cambios['eliminados'], [])
+
+        modificado = Producto.objects.get(pk=self.datos['productos'][0].pk)
+        modificado.nombre = 'Renombrado'
+        modificado.save()
+        borrado = Producto.objects.create(sku='SYNC-1', nombre='Temporal', categoria='TORTAS')
+        borrado_id = borrado.pk
+        borrado.delete()
+
+        delta, _ = self.sincronizar(cursor)
+        # El cliente deduplica por id; la última versión manda
+        productos = {p['id']: p['nombre'] for p in delta['productos']}
+        self.assertEqual(productos.pop(modificado.pk), 'Renombrado')
+        self.assertLessEqual(set(productos), {ultimo.pk})
+        self.assertEqual([(e['modelo'], e['id']) for e in delta['eliminados']], [('producto', borrado_id)])
+
+    def test_pasada_nueva_recupera_confirmaciones_tardias(self):
+        self.escalonar()
+        _, cursor = self.sincronizar()
+        ultimo = Producto.objects.order_by('updated_at', 'id').last()
+        tardio, antiguo = Producto.objects.exclude(pk=ultimo.pk).order_by('id')[:2]
+        # Confirmó después de la pasada con un updated_at anterior a la posición del cursor
+        Producto.objects.filter(pk=tardio.pk).update(nombre='Tardio', updated_at=ultimo.updated_at - timedelta(seconds=30))
+        # Fuera del MARGEN: no se relee
+        Producto.objects.filter(pk=antiguo.pk).update(nombre='Antiguo', updated_at=ultimo.updated_at - timedelta(minutes=5))
+
+        delta, _ = self.sincronizar(cursor)
+        self.assertEqual({p['id']: p['nombre'] for p in delta['productos']}.get(tardio.pk), 'Tardio')
+        self.assertNotIn(antiguo.pk, {p['id'] for p in delta['productos']})
+
+    def test_cursor_invalido(self):
+        respuesta = self.client.get('/api/changes/', {'since': 'no-es-base64!'}, HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class NdjsonApiTests(TestCase):
+    """Extracción línea a línea: filtros, orden por id y reanudación con desde_id."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.token = Token.objects.create(user=cls.datos['admin'])
+
+    def lineas(self, url, **parametros):
+        respuesta = self.client.get(url, parametros, HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], 'application/x-ndjson')
+        return [json.loads(linea) for linea in b''.join(respuesta.streaming_content).decode().splitlines()]
+
+    def test_movimientos_por_bloques_y_reanudacion(self):
+        ids = list(MovimientoInventario.objects.order_by('id').values_list('id', flat=True))
+        # Bloques de 2: el keyset no repite ni salta filas entre bloques
+        por_bloques = [json.loads(l)['id'] for l in MOVIMIENTOS_RAPIDO.ndjson(MovimientoInventario.objects.all(), lote=2)]
+        self.assertEqual(por_bloques, ids)
+        self.assertEqual([m['id'] for m in self.lineas('/api/movimientos/ndjson/')], ids)
+        self.assertEqual([m['id'] for m in self.lineas('/api/movimientos/ndjson/', desde_id=ids[2])], ids[3:])
+        salidas = self.lineas('/api/movimientos/ndjson/', tipo='SALIDA')
+        self.assertTrue(salidas)
+        self.assertEqual({m['tipo'] for m in salidas}, {'SALIDA'})
+
+    def test_stock_y_lotes_por_bodega(self):
+        lote = self.datos['lote']
+        bodega = lote.bodega
+        lotes = self.lineas('/api/lotes/ndjson/', bodega=bodega.codigo)
+        self.assertEqual({l['bodega'] for l in lotes}, {bodega.pk})
+        stock = {f['id']: f['disponible'] for f in self.lineas('/api/stock/ndjson/', bodega=bodega.pk)}
+        self.assertEqual(stock[lote.producto_id], format(
+            Lote.objects.filter(bodega=bodega, producto_id=lote.producto_id).aggregate(s=Sum('cantidad_disponible'))['s'], 'f',
+        ))
+
+    def test_parametros_invalidos(self):
+        cabeceras = {'HTTP_AUTHORIZATION': f"Token {self.token.key}"}
+        self.assertEqual(self.client.get('/api/movimientos/ndjson/', {'desde': '2024-13-40'}, **cabeceras).status_code, 400)
+        self.assertEqual(self.client.get('/api/lotes/ndjson/', {'bodega': 'NO-EXISTE'}, **cabeceras).status_code, 404)
@@ -1,11 +1,22 @@
 from django.urls import path, include
 from rest_framework import routers
-from .views import info, ProductoViewSet
+from .views import info, cambios, kardex, stock_al, documentos, transferencias, reservas, escaneos, conteo_escaneos, movimientos_ndjson, lotes_ndjson, stock_ndjson, ProductoViewSet
 
 router = routers.DefaultRouter()
 router.register(r'productos', ProductoViewSet)
 
 urlpatterns = [
     path('info/', info, name='info'),
+    path('changes/', cambios, name='cambios'),
+    path('movimientos/ndjson/', movimientos_ndjson, name='movimientos_ndjson'),
+    path('lotes/ndjson/', lotes_ndjson, name='lotes_ndjson'),
+    path('stock/ndjson/', stock_ndjson, name='stock_ndjson'),
+    path('kardex/', kardex, name='kardex'),
+    path('stock/al/', stock_al, name='stock_al'),
+    path('documentos/', documentos, name='documentos'),
+    path('transferencias/', transferencias, name='transferencias'),
+    path('reservas/', reservas, name='reservas'),
+    path('escaneos/', escaneos, name='escaneos'),
+    path('conteos/<int:pk>/escaneos/', conteo_escaneos, name='conteo_escaneos'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
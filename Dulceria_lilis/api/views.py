@@ -1,11 +1,32 @@
 # api/views.py
-from rest_framework.exceptions import NotFound
+import base64
+import json
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from rest_framework import status, viewsets
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
-from django.http import Http404, JsonResponse
-from .serializers import ProductoSerializer
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q, Sum
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .serializers import ProductoSerializer, ProductoBulkSerializer, SerializadorRapido
 from productos.models import Producto
+from productos.carga_masiva import upsert_productos
+from proveedores.models import Proveedor
+from inventario.models import TIPO_MOVIMIENTO, Bodega, ConteoInventario, DocumentoMovimiento, Lote, MovimientoInventario
+from inventario.conteos import cargar_conteo, lecturas_de_codigos, lecturas_de_filas
+from inventario.kardex import LIMITE, LIMITE_MAX, codificar_posicion, decodificar_posicion, pagina_kardex
+from inventario.saldos import saldos_al
+from inventario.documentos import conflicto_de_clave, registrar_documento_una_vez, resolver_lineas
+from inventario.idempotencia import ClaveEnConflicto, buscar_por_clave, normalizar_clave
+from inventario.reservas import liberar, reservar
+from productos.indice_codigos import MARGEN, indice as indice_codigos
+from sistema.models import RegistroActividad, RegistroEliminacion
 
 def info(request):
     return JsonResponse({
@@ -19,12 +40,52 @@ class ProductoViewSet(viewsets.ModelViewSet):
     serializer_class = ProductoSerializer
     permission_classes = [IsAuthenticated, IsAdminUser]
 
+    # Lectura rápida para el listado (mismo JSON que ProductoSerializer)
+    lectura_rapida = SerializadorRapido(Producto)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.lectura_rapida.respuesta(queryset)
+
     def get_object(self):
         try:
             return super().get_object()
         except Http404:
             raise NotFound("Producto no encontrado en Dulcería Lilis")
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Alta/actualización masiva por SKU: recibe una lista de productos y devuelve
+        un resultado por fila. Los SKU existentes se actualizan parcialmente.
+        """
+        filas = request.data
+        if isinstance(filas, dict):
+            filas = filas.get('productos')
+        if not isinstance(filas, list):
+            raise ValidationError("Se espera una lista de productos (o {\"productos\": [...]}).")
+
+        # Una instancia por modo: los campos DRF se construyen una sola vez
+        ser_nuevo = ProductoBulkSerializer()
+        ser_existente = ProductoBulkSerializer(partial=True)
+
+        def validar(fila, existente):
+            return (ser_existente if existente else ser_nuevo).validar_fila(fila)
+
+        resumen = upsert_productos(filas, validar)
+
+        # bulk_create/bulk_update no disparan la auditoría por fila: un registro por carga
+        if resumen["creados"] or resumen["actualizados"]:
+            RegistroActividad.objects.create(
+                usuario=request.user,
+                descripcion=(
+                    f"Carga masiva de productos (API): {resumen['creados']} creados, "
+                    f"{resumen['actualizados']} actualizados, {resumen['errores']} con error"
+                ),
+                modelo='Producto',
+            )
+        return Response(resumen)
+
     def destroy(self, request, *args, **kwargs):
         try:
             return super().destroy(request, *args, **kwargs)
@@ -33,3 +94,706 @@ class ProductoViewSet(viewsets.ModelViewSet):
                 {"status": 500, "error": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+# ------------------------------------------------------------
+# SINCRONIZACIÓN INCREMENTAL: /api/changes/?since=<cursor>
+# ------------------------------------------------------------
+ENTIDADES_SINCRONIZABLES = {
+    'productos': SerializadorRapido(Producto),
+    'proveedores': SerializadorRapido(Proveedor),
+    'lotes': SerializadorRapido(Lote),
+}
+LIMITE_CAMBIOS = 500
+LIMITE_CAMBIOS_MAX = 5000
+
+
+def _decodificar_cursor(texto):
+    if not texto:
+        return {}
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(texto.encode()).decode())
+    except ValueError:
+        raise ValidationError({"since": "Cursor inválido."})
+    if not isinstance(cursor, dict):
+        raise ValidationError({"since": "Cursor inválido."})
+    return cursor
+
+
+def _codificar_cursor(cursor):
+    return base64.urlsafe_b64encode(json.dumps(cursor, separators=(',', ':')).encode()).decode()
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def cambios(request):
+    """
+    Devuelve solo los registros creados/modificados (por updated_at) y eliminados
+    (tombstones) desde el cursor recibido, en lotes paginados por keyset.
+    Sin `since` se parte desde el inicio (sincronización completa).
+    El cliente repite la llamada con el `cursor` devuelto mientras `hay_mas` sea true.
+
+    Dentro de una pasada las páginas no se solapan. Una pasada nueva (cursor de una
+    respuesta con hay_mas = false) relee además el MARGEN anterior a la posición,
+    igual que el índice de códigos: cubre transacciones que confirmaron tarde con un
+    updated_at menor. Esas filas pueden repetirse; el cliente las deduplica por id.
+    """
+    cursor = _decodificar_cursor(request.GET.get('since', ''))
+    repaso = cursor.get('completo') is True
+    try:
+        limite = int(request.GET.get('limite', LIMITE_CAMBIOS))
+    except (TypeError, ValueError):
+        limite = LIMITE_CAMBIOS
+    limite = max(1, min(limite, LIMITE_CAMBIOS_MAX))
+
+    data = {}
+    hay_mas = False
+
+    for nombre, rapido in ENTIDADES_SINCRONIZABLES.items():
+        qs = rapido.model.objects.order_by('updated_at', 'id')
+        posicion = cursor.get(nombre)
+        if posicion:
+            try:
+                desde, ultimo_id = parse_datetime(posicion[0]), int(posicion[1])
+            except (TypeError, ValueError, IndexError):
+                raise ValidationError({"since": "Cursor inválido."})
+            if desde is None:
+                raise ValidationError({"since": "Cursor inválido."})
+            if repaso:
+                qs = qs.filter(updated_at__gte=desde - MARGEN)
+            else:
+                qs = qs.filter(Q(updated_at__gt=desde) | Q(updated_at=desde, id__gt=ultimo_id))
+
+        filas = list(rapido.filas(qs[:limite]))
+        if filas:
+            cursor[nombre] = [filas[-1]['updated_at'], filas[-1]['id']]
+        hay_mas = hay_mas or len(filas) == limite
+        data[nombre] = filas
+
+    # Tombstones: keyset por id (creciente)
+    try:
+        ultima_eliminacion = int(cursor.get('eliminados', 0))
+    except (TypeError, ValueError):
+        raise ValidationError({"since": "Cursor inválido."})
+    eliminados = list(
+        RegistroEliminacion.objects
+        .filter(id__gt=ultima_eliminacion)
+        .order_by('id')
+        .values_list('id', 'modelo', 'objeto_id', 'fecha')[:limite]
+    )
+    if eliminados:
+        cursor['eliminados'] = eliminados[-1][0]
+    hay_mas = hay_mas or len(eliminados) == limite
+    data['eliminados'] = [
+        {"modelo": modelo, "id": objeto_id, "fecha": fecha}
+        for _, modelo, objeto_id, fecha in eliminados
+    ]
+    cursor['completo'] = not hay_mas
+
+    return Response({
+        "cursor": _codificar_cursor(cursor),
+        "hay_mas": hay_mas,
+        **data,
+    })
+
+
+# ------------------------------------------------------------
+# EXTRACCIÓN NDJSON: movimientos, lotes y stock
+# Una línea JSON por registro, en orden de id. Para reanudar una extracción
+# cortada se repite la llamada con desde_id=<último id recibido>.
+# ------------------------------------------------------------
+TAMANO_BLOQUE_NDJSON = 2000
+
+MOVIMIENTOS_RAPIDO = SerializadorRapido(MovimientoInventario)
+LOTES_RAPIDO = SerializadorRapido(Lote)
+STOCK_RAPIDO = SerializadorRapido(
+    Producto,
+    campos=('id', 'sku', 'nombre', 'categoria', 'stock_actual', 'stock_minimo', 'punto_reorden'),
+)
+
+
+def _respuesta_ndjson(lineas):
+    return StreamingHttpResponse(lineas, content_type='application/x-ndjson')
+
+
+def _param_entero(request, nombre):
+    valor = request.GET.get(nombre)
+    if valor in (None, ''):
+        return None
+    try:
+        return int(valor)
+    except ValueError:
+        raise ValidationError({nombre: "Debe ser un número entero."})
+
+
+def _param_fecha(request, nombre):
+    valor = request.GET.get(nombre)
+    if not valor:
+        return None
+    try:
+        fecha = parse_date(valor)
+    except ValueError:
+        # Bien formada pero inexistente (2024-02-30)
+        fecha = None
+    if fecha is None:
+        raise ValidationError({nombre: "Formato de fecha inválido (AAAA-MM-DD)."})
+    return fecha
+
+
+def _inicio_dia(fecha):
+    # Rango sobre la columna (no fecha__date) para que use el índice
+    return timezone.make_aware(datetime.combine(fecha, time.min))
+
+
+def _param_bodega(request):
+    """Acepta id o código de bodega (BOD-CENTRAL)."""
+    valor = request.GET.get('bodega')
+    if not valor:
+        return None
+    if valor.isdigit():
+        return int(valor)
+    bodega_id = Bodega.objects.filter(codigo=valor).values_list('id', flat=True).first()
+    if bodega_id is None:
+        raise NotFound("Bodega no encontrada.")
+    return bodega_id
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def movimientos_ndjson(request):
+    """Filtros: desde, hasta (AAAA-MM-DD), tipo, bodega (origen o destino), producto, desde_id."""
+    qs = MovimientoInventario.objects.all()
+
+    desde = _param_fecha(request, 'desde')
+    hasta = _param_fecha(request, 'hasta')
+    if desde:
+        qs = qs.filter(fecha__gte=_inicio_dia(desde))
+    if hasta:
+        qs = qs.filter(fecha__lt=_inicio_dia(hasta + timedelta(days=1)))
+
+    tipo = request.GET.get('tipo')
+    if tipo:
+        qs = qs.filter(tipo=tipo)
+
+    bodega_id = _param_bodega(request)
+    if bodega_id:
+        qs = qs.filter(Q(bodega_origen_id=bodega_id) | Q(bodega_destino_id=bodega_id))
+
+    producto_id = _param_entero(request, 'producto')
+    if producto_id:
+        qs = qs.filter(producto_id=producto_id)
+
+    return _respuesta_ndjson(
+        MOVIMIENTOS_RAPIDO.ndjson(qs, _param_entero(request, 'desde_id'), TAMANO_BLOQUE_NDJSON)
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def lotes_ndjson(request):
+    """Filtros: producto, bodega, vence_desde, vence_hasta, disponibles=1, desde_id."""
+    qs = Lote.objects.all()
+
+    producto_id = _param_entero(request, 'producto')
+    if producto_id:
+        qs = qs.filter(producto_id=producto_id)
+
+    bodega_id = _param_bodega(request)
+    if bodega_id:
+        qs = qs.filter(bodega_id=bodega_id)
+
+    vence_desde = _param_fecha(request, 'vence_desde')
+    vence_hasta = _param_fecha(request, 'vence_hasta')
+    if vence_desde:
+        qs = qs.filter(fecha_vencimiento__gte=vence_desde)
+    if vence_hasta:
+        qs = qs.filter(fecha_vencimiento__lte=vence_hasta)
+
+    if request.GET.get('disponibles') == '1':
+        qs = qs.filter(cantidad_disponible__gt=0)
+
+    return _respuesta_ndjson(
+        LOTES_RAPIDO.ndjson(qs, _param_entero(request, 'desde_id'), TAMANO_BLOQUE_NDJSON)
+    )
+
+
+def _stock_por_bodega(bodega_id, desde_id, lote):
+    """Disponible por producto en una bodega (suma de sus lotes), keyset por producto_id."""
+    ultimo = desde_id or 0
+    while True:
+        filas = list(
+            Lote.objects
+            .filter(bodega_id=bodega_id, producto_id__gt=ultimo)
+            .values('producto_id', 'producto__sku')
+            .annotate(disponible=Sum('cantidad_disponible'))
+            .order_by('producto_id')
+            .values_list('producto_id', 'producto__sku', 'disponible')[:lote]
+        )
+        for producto_id, sku, disponible in filas:
+            yield json.dumps({
+                "id": producto_id,
+                "sku": sku,
+                "bodega": bodega_id,
+                "disponible": format(disponible, 'f') if disponible is not None else None,
+            }, separators=(',', ':')) + '\n'
+        if len(filas) < lote:
+            return
+        ultimo = filas[-1][0]
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def stock_ndjson(request):
+    """
+    Sin bodega: stock_actual de cada producto (filtro opcional: categoria).
+    Con bodega: disponible por producto en esa bodega, sumando sus lotes.
+    Reanudación con desde_id (id de producto).
+    """
+    desde_id = _param_entero(request, 'desde_id')
+    bodega_id = _param_bodega(request)
+    if bodega_id:
+        return _respuesta_ndjson(_stock_por_bodega(bodega_id, desde_id, TAMANO_BLOQUE_NDJSON))
+
+    qs = Producto.objects.all()
+    categoria = request.GET.get('categoria')
+    if categoria:
+        qs = qs.filter(categoria=categoria)
+    return _respuesta_ndjson(STOCK_RAPIDO.ndjson(qs, desde_id, TAMANO_BLOQUE_NDJSON))
+
+
+
+# ------------------------------------------------------------
+# KARDEX: /api/kardex/?producto=<id>&bodega=&desde=&hasta=&cursor=&limite=
+# ------------------------------------------------------------
+def _texto(valor):
+    return format(valor, 'f') if valor is not None else None
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def kardex(request):
+    """
+    Movimientos del producto con saldo acumulado (función de ventana en SQL),
+    paginados por keyset: se repite la llamada con el `cursor` devuelto mientras
+    `hay_mas` sea true.
+    """
+    producto_id = _param_entero(request, 'producto')
+    if not producto_id:
+        raise ValidationError({"producto": "Este parámetro es obligatorio."})
+    if not Producto.objects.filter(pk=producto_id).exists():
+        raise NotFound("Producto no encontrado.")
+
+    despues = None
+    if request.GET.get('cursor'):
+        try:
+            despues = decodificar_posicion(request.GET['cursor'])
+        except ValueError:
+            raise ValidationError({"cursor": "Cursor inválido."})
+
+    limite = _param_entero(request, 'limite') or LIMITE
+    limite = max(1, min(limite, LIMITE_MAX))
+    desde = _param_fecha(request, 'desde')
+    hasta = _param_fecha(request, 'hasta')
+    bodega_id = _param_bodega(request)
+
+    pagina = pagina_kardex(
+        producto_id,
+        bodega_id=bodega_id,
+        desde=_inicio_dia(desde) if desde else None,
+        hasta=_inicio_dia(hasta + timedelta(days=1)) if hasta else None,
+        despues=despues,
+        limite=limite,
+    )
+    return Response({
+        "producto": producto_id,
+        "bodega": bodega_id,
+        "apertura": _texto(pagina['apertura']),
+        "movimientos": [
+            {
+                "id": f['id'],
+                "fecha": f['fecha'],
+                "tipo": f['tipo'],
+                "cantidad": _texto(f['cantidad']),
+                "delta": _texto(f['delta']),
+                "saldo": _texto(f['saldo']),
+                "bodega_origen": f['bodega_origen__codigo'],
+                "bodega_destino": f['bodega_destino__codigo'],
+                "lote": f['lote__codigo'],
+                "documento_referencia": f['documento_referencia'],
+                "usuario": f['usuario__username'],
+            }
+            for f in pagina['filas']
+        ],
+        "cursor": codificar_posicion(pagina['siguiente']) if pagina['siguiente'] else None,
+        "hay_mas": pagina['siguiente'] is not None,
+    })
+
+
+# ------------------------------------------------------------
+# STOCK A UNA FECHA: /api/stock/al/?fecha=AAAA-MM-DD&producto=<id>|sku=<sku>&bodega=&lote=
+# ------------------------------------------------------------
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def stock_al(request):
+    """
+    Stock al cierre del día `fecha`: cierre de saldo más cercano anterior más
+    los movimientos posteriores a ese cierre. Detalle por bodega y lote.
+    """
+    fecha = _param_fecha(request, 'fecha')
+    if fecha is None:
+        raise ValidationError({"fecha": "Este parámetro es obligatorio."})
+
+    productos = Producto.objects.all()
+    producto_id = _param_entero(request, 'producto')
+    sku = request.GET.get('sku')
+    if producto_id:
+        productos = productos.filter(pk=producto_id)
+    elif sku:
+        productos = productos.filter(sku=sku)
+    else:
+        raise ValidationError({"producto": "Indique producto (id) o sku."})
+    producto = productos.values('id', 'sku').first()
+    if producto is None:
+        raise NotFound("Producto no encontrado.")
+
+    bodega_id = _param_bodega(request)
+    lote = request.GET.get('lote')
+    lote_id = None
+    if lote:
+        lote_id = int(lote) if lote.isdigit() else Lote.objects.filter(codigo=lote).values_list('id', flat=True).first()
+        if lote_id is None:
+            raise NotFound("Lote no encontrado.")
+
+    cierre, saldos = saldos_al(_inicio_dia(fecha + timedelta(days=1)), producto['id'])
+    filtrados = sorted(
+        (bod or 0, lot or 0, bod, lot, cantidad)
+        for (_, bod, lot), cantidad in saldos.items()
+        if (bodega_id is None or bod == bodega_id) and (lote_id is None or lot == lote_id)
+    )
+    total = sum((f[-1] for f in filtrados), Decimal(0))
+    detalle = [
+        {"bodega": bod, "lote": lot, "cantidad": _texto(cantidad)}
+        for _, _, bod, lot, cantidad in filtrados if cantidad
+    ]
+    return Response({
+        "producto": producto['id'],
+        "sku": producto['sku'],
+        "fecha": fecha,
+        "bodega": bodega_id,
+        "lote": lote_id,
+        "cantidad": _texto(total),
+        "cierre": cierre.corte if cierre else None,
+        "detalle": detalle,
+    })
+
+
+# ------------------------------------------------------------
+# DOCUMENTOS DE VARIAS LÍNEAS: POST /api/documentos/ y /api/transferencias/
+# ------------------------------------------------------------
+
+def _bodega_por_valor(valor, nombre, obligatoria=True):
+    """Bodega por id o código; ValidationError si no existe."""
+    if valor in (None, ''):
+        if not obligatoria:
+            return None
+        raise ValidationError({nombre: "Este campo es obligatorio."})
+    filtro = Q(pk=int(valor)) if str(valor).isdigit() else Q(codigo=valor)
+    bodega = Bodega.objects.filter(filtro).first()
+    if bodega is None:
+        raise ValidationError({nombre: "Bodega no encontrada."})
+    return bodega
+
+
+def _proveedor_por_valor(valor):
+    """Proveedor por id (opcional); ValidationError si no existe."""
+    if valor in (None, ''):
+        return None
+    valor = str(valor)
+    proveedor = Proveedor.objects.filter(pk=int(valor)).first() if valor.isdigit() else None
+    if proveedor is None:
+        raise ValidationError({"proveedor": "Proveedor no encontrado."})
+    return proveedor
+
+
+def _respuesta_documento(documento, creado):
+    respuesta = Response({
+        "documento": documento.pk,
+        "tipo": documento.tipo,
+        "bodega_origen": documento.bodega_origen.codigo if documento.bodega_origen else None,
+        "bodega_destino": documento.bodega_destino.codigo if documento.bodega_destino else None,
+        "documento_referencia": documento.documento_referencia,
+        "clave_idempotencia": documento.clave_idempotencia,
+        "lineas": documento.total_lineas,
+    }, status=status.HTTP_201_CREATED)
+    if not creado:
+        respuesta['Idempotent-Replayed'] = 'true'
+    return respuesta
+
+
+def _publicar_documento(request, documento, filas=None):
+    """
+    Resuelve las líneas (las del cuerpo si no se pasan) y publica el documento (todo o nada).
+    Con clave de idempotencia (cabecera Idempotency-Key o campo clave_idempotencia)
+    un reenvío devuelve la respuesta del documento original sin tocar el stock; la misma
+    clave con otro tipo u otras bodegas no es un reenvío y responde 409.
+    """
+    try:
+        documento.clave_idempotencia = normalizar_clave(
+            request.headers.get('Idempotency-Key') or request.data.get('clave_idempotencia')
+        )
+    except DjangoValidationError as e:
+        raise ValidationError({"clave_idempotencia": e.messages})
+    original = buscar_por_clave(DocumentoMovimiento, documento.clave_idempotencia)
+    if original is not None:
+        conflicto = conflicto_de_clave(original, documento)
+        if conflicto:
+            return Response({"clave_idempotencia": [conflicto]}, status=status.HTTP_409_CONFLICT)
+        return _respuesta_documento(original, creado=False)
+
+    if filas is None:
+        filas = request.data.get('lineas')
+        if not isinstance(filas, list) or not filas:
+            raise ValidationError({"lineas": "Se espera una lista de líneas."})
+        if not all(isinstance(f, dict) for f in filas):
+            raise ValidationError({"lineas": "Cada línea debe ser un objeto."})
+
+    lineas, errores = resolver_lineas(filas, documento.tipo)
+    if not errores:
+        try:
+            documento, creado = registrar_documento_una_vez(documento, lineas)
+        except ClaveEnConflicto as e:
+            return Response({"clave_idempotencia": e.messages}, status=status.HTTP_409_CONFLICT)
+        except DjangoValidationError as e:
+            errores = e.messages
+    if errores:
+        raise ValidationError({"lineas": errores})
+    return _respuesta_documento(documento, creado)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def documentos(request):
+    """
+    Publica un documento de movimiento de varias líneas en una sola transacción.
+    Encabezado: tipo, proveedor (id), bodega_origen / bodega_destino (id o código),
+    documento_referencia, observacion. Líneas por producto_id o sku, lote_id o
+    lote (código), cantidad y fecha_vencimiento. Todo o nada.
+    """
+    datos = request.data
+    tipo = datos.get('tipo')
+    if tipo not in dict(TIPO_MOVIMIENTO):
+        raise ValidationError({"tipo": "Tipo de movimiento inválido."})
+    documento = DocumentoMovimiento(
+        tipo=tipo,
+        proveedor=_proveedor_por_valor(datos.get('proveedor')),
+        bodega_origen=_bodega_por_valor(datos.get('bodega_origen'), 'bodega_origen', obligatoria=tipo == 'TRANSFERENCIA'),
+        bodega_destino=_bodega_por_valor(datos.get('bodega_destino'), 'bodega_destino', obligatoria=tipo == 'TRANSFERENCIA'),
+        usuario=request.user,
+        documento_referencia=datos.get('documento_referencia') or None,
+        observacion=datos.get('observacion') or None,
+    )
+    return _publicar_documento(request, documento)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def transferencias(request):
+    """
+    Publica una transferencia entre bodegas en una sola transacción.
+    Líneas por producto_id o sku y lote_id o lote (código). Todo o nada.
+    """
+    datos = request.data
+    documento = DocumentoMovimiento(
+        tipo='TRANSFERENCIA',
+        bodega_origen=_bodega_por_valor(datos.get('bodega_origen'), 'bodega_origen'),
+        bodega_destino=_bodega_por_valor(datos.get('bodega_destino'), 'bodega_destino'),
+        usuario=request.user,
+        documento_referencia=datos.get('documento_referencia') or None,
+        observacion=datos.get('observacion') or None,
+    )
+    return _publicar_documento(request, documento)
+
+
+# ------------------------------------------------------------
+# RESERVAS DE STOCK: POST / DELETE /api/reservas/
+# ------------------------------------------------------------
+
+@api_view(['POST', 'DELETE'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def reservas(request):
+    """
+    POST: reserva stock de lotes para una referencia (pedido en picking).
+      {"referencia", "minutos"?, "lineas": [{"lote_id" | "lote", "cantidad"}]}. Todo o nada.
+    DELETE ?referencia=...: libera las reservas de la referencia.
+    La SALIDA con documento_referencia = referencia consume lo reservado.
+    """
+    if request.method == 'DELETE':
+        referencia = request.query_params.get('referencia') or request.data.get('referencia')
+        if not referencia:
+            raise ValidationError({"referencia": "Este campo es obligatorio."})
+        return Response({"referencia": referencia, "liberadas": liberar(referencia)})
+
+    datos = request.data
+    referencia = datos.get('referencia')
+    filas = datos.get('lineas')
+    if not isinstance(filas, list) or not filas or not all(isinstance(f, dict) for f in filas):
+        raise ValidationError({"lineas": "Se espera una lista de líneas."})
+    minutos = datos.get('minutos')
+    if minutos is not None and (not str(minutos).isdigit() or int(minutos) <= 0):
+        raise ValidationError({"minutos": "Debe ser un entero positivo."})
+
+    # Códigos de lote solo como texto: una lista u objeto en el JSON no se busca
+    codigos = {f['lote'] for f in filas if not f.get('lote_id') and isinstance(f.get('lote'), str) and f['lote']}
+    por_codigo = dict(Lote.objects.filter(codigo__in=codigos).values_list('codigo', 'id')) if codigos else {}
+    lineas, errores = [], []
+    for i, fila in enumerate(filas, 1):
+        lote_id = fila.get('lote_id') or (por_codigo.get(fila['lote']) if isinstance(fila.get('lote'), str) else None)
+        try:
+            cantidad = Decimal(str(fila.get('cantidad')))
+        except ArithmeticError:
+            cantidad = None
+        if not lote_id or not str(lote_id).isdigit():
+            errores.append(f"Línea {i}: lote no encontrado ({fila.get('lote') or fila.get('lote_id')}).")
+        elif cantidad is None or not cantidad.is_finite() or cantidad <= 0:
+            errores.append(f"Línea {i}: la cantidad debe ser mayor que cero.")
+        else:
+            lineas.append({'lote_id': int(lote_id), 'cantidad': cantidad})
+    if not errores:
+        try:
+            creadas = reservar(lineas, referencia, usuario=request.user, minutos=int(minutos) if minutos else None)
+        except DjangoValidationError as e:
+            errores = e.messages
+    if errores:
+        raise ValidationError({"lineas": errores})
+
+    return Response({
+        "referencia": referencia,
+        "reservas": [
+            {"lote": r.lote.codigo, "lote_id": r.lote_id, "cantidad": _texto(r.cantidad), "vence": r.vence}
+            for r in creadas
+        ],
+    }, status=status.HTTP_201_CREATED)
+
+
+# ------------------------------------------------------------
+# ESCANEOS: GET / POST /api/escaneos/
+# ------------------------------------------------------------
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def escaneos(request):
+    """
+    Lecturas de códigos de barra (EAN/UPC) o SKU, resueltas con el índice en
+    memoria de productos/indice_codigos.py.
+
+    GET ?codigo=...&codigo=...: producto de cada código.
+    POST: publica las lecturas como un documento de movimiento (todo o nada).
+      {"tipo" (INGRESO por defecto), "bodega" (id o código; destino en entradas,
+       origen en salidas), "proveedor"?, "documento_referencia"?, "observacion"?,
+       "codigos": ["780...", ...]                       cada lectura = 1 unidad
+       | "lecturas": [{"codigo", "cantidad"?, "lote"?, "fecha_vencimiento"?}]}
+      Lecturas repetidas del mismo producto (y lote) se suman en una línea.
+      Acepta Idempotency-Key como /api/documentos/.
+    """
+    if request.method == 'GET':
+        codigos = [c for c in request.query_params.getlist('codigo') if c]
+        if not codigos:
+            raise ValidationError({"codigo": "Este campo es obligatorio."})
+        ids = indice_codigos.resolver(codigos)
+        productos = Producto.objects.in_bulk(set(ids.values()))
+        # Un producto eliminado después de la última recarga del índice cuenta como no encontrado
+        encontrados = {codigo: productos.get(pk) for codigo, pk in ids.items()}
+        return Response({"resultados": [
+            {
+                "codigo": codigo,
+                "producto_id": encontrados[codigo].pk if encontrados.get(codigo) else None,
+                "sku": encontrados[codigo].sku if encontrados.get(codigo) else None,
+                "nombre": encontrados[codigo].nombre if encontrados.get(codigo) else None,
+            }
+            for codigo in codigos
+        ]})
+
+    datos = request.data
+    tipo = datos.get('tipo') or 'INGRESO'
+    if tipo not in dict(TIPO_MOVIMIENTO) or tipo == 'TRANSFERENCIA':
+        raise ValidationError({"tipo": "Tipo de movimiento inválido para escaneos."})
+
+    lecturas = datos.get('lecturas')
+    if lecturas is None:
+        codigos = datos.get('codigos') or ([datos['codigo']] if datos.get('codigo') else None)
+        if not isinstance(codigos, list) or not codigos:
+            raise ValidationError({"codigos": "Se espera una lista de códigos."})
+        lecturas = [{'codigo': c} for c in codigos]
+    if not isinstance(lecturas, list) or not lecturas or not all(isinstance(l, dict) for l in lecturas):
+        raise ValidationError({"lecturas": "Se espera una lista de lecturas."})
+
+    ids = indice_codigos.resolver({str(l.get('codigo') or '') for l in lecturas})
+    desconocidos = sorted({str(l.get('codigo') or '') for l in lecturas} - set(ids))
+    if desconocidos:
+        raise ValidationError({"codigos": [f"Código {c or '(vacío)'} no encontrado." for c in desconocidos]})
+
+    # Una línea por (producto, lote, vencimiento): un pallet de 300 lecturas son pocas líneas
+    agrupadas = {}
+    for lectura in lecturas:
+        # lote, vencimiento y cantidad son valores simples: una lista u objeto no se agrupa ni se busca
+        for campo, tipos in (('lote', str), ('fecha_vencimiento', str), ('cantidad', (str, int, float))):
+            valor = lectura.get(campo)
+            if valor is not None and (not isinstance(valor, tipos) or isinstance(valor, bool)):
+                raise ValidationError({"lecturas": f"{campo} inválido en {lectura.get('codigo')}."})
+        try:
+            cantidad = Decimal(str(lectura.get('cantidad', 1)))
+        except ArithmeticError:
+            raise ValidationError({"lecturas": f"Cantidad inválida en {lectura.get('codigo')}."})
+        clave = (ids[str(lectura['codigo'])], lectura.get('lote') or None, lectura.get('fecha_vencimiento') or None)
+        if clave in agrupadas:
+            agrupadas[clave]['cantidad'] += cantidad
+        else:
+            agrupadas[clave] = {
+                'producto_id': clave[0], 'lote': clave[1], 'fecha_vencimiento': clave[2], 'cantidad': cantidad,
+            }
+
+    bodega = _bodega_por_valor(datos.get('bodega'), 'bodega')
+    entrada = tipo in ('INGRESO', 'DEVOLUCION', 'AJUSTE')
+    documento = DocumentoMovimiento(
+        tipo=tipo,
+        proveedor=_proveedor_por_valor(datos.get('proveedor')),
+        bodega_origen=None if entrada else bodega,
+        bodega_destino=bodega if entrada else None,
+        usuario=request.user,
+        documento_referencia=datos.get('documento_referencia') or None,
+        observacion=datos.get('observacion') or None,
+    )
+    respuesta = _publicar_documento(request, documento, list(agrupadas.values()))
+    respuesta.data['lecturas'] = len(lecturas)
+    return respuesta
+
+
+# ------------------------------------------------------------
+# CONTEOS CÍCLICOS: POST /api/conteos/<id>/escaneos/
+# ------------------------------------------------------------
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def conteo_escaneos(request, pk):
+    """
+    Suma lecturas de un escáner al conteo abierto: {"codigos": ["780...", "SKU1", ...]}
+    (cada lectura = 1 unidad) o {"lecturas": [{"codigo", "cantidad"?, "lote"?}]}. Todo o nada.
+    """
+    conteo = ConteoInventario.objects.filter(pk=pk).first()
+    if conteo is None:
+        raise NotFound("Conteo no encontrado.")
+    lecturas = request.data.get('lecturas')
+    if lecturas is not None:
+        if not isinstance(lecturas, list) or not all(isinstance(l, dict) for l in lecturas):
+            raise ValidationError({"lecturas": "Se espera una lista de lecturas."})
+        df = lecturas_de_filas(lecturas)
+    else:
+        codigos = request.data.get('codigos')
+        if not isinstance(codigos, list) or not codigos:
+            raise ValidationError({"codigos": "Se espera una lista de códigos."})
+        df = lecturas_de_codigos(codigos)
+    try:
+        res = cargar_conteo(conteo, df, sumar=True)
+    except DjangoValidationError as e:
+        raise ValidationError({"lecturas": e.messages})
+    return Response({"conteo": conteo.pk, **res})
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import MovimientoInventario, Bodega, Lote
+from .models import MovimientoInventario, Bodega, Lote, ReservaStock
 
 
 @admin.register(Bodega)
@@ -25,3 +25,10 @@ class MovimientoInventarioAdmin(admin.ModelAdmin):
 
     # Campos que se completan automáticamente con búsqueda
     autocomplete_fields = ("producto", "proveedor", "bodega_origen", "bodega_destino", "lote")
+
+
+@admin.register(ReservaStock)
+class ReservaStockAdmin(admin.ModelAdmin):
+    list_display = ("referencia", "lote", "cantidad", "vence", "usuario")
+    search_fields = ("referencia", "lote__codigo")
+    list_select_related = ("lote__producto", "usuario")
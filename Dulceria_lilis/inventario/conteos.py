@@ -0,0 +1,303 @@
+# inventario/conteos.py
+"""
+Conteos cíclicos (ConteoInventario + LineaConteo).
+
+abrir_conteo()    fotografía el saldo del sistema del alcance (bodega y/o categoría)
+                  con bulk_create: una línea por lote con saldo en la bodega para los
+                  productos con control por lote y una por producto para el resto
+                  (su saldo en la bodega según cierres y movimientos; sin bodega,
+                  Producto.stock_actual).
+leer_archivo()    CSV o XLSX con columnas codigo (SKU o EAN), cantidad y lote opcional.
+cargar_conteo()   cruza lo contado con las líneas en una pasada vectorizada (pandas):
+                  resuelve códigos con el índice en memoria, agrupa, une por
+                  (producto, lote), calcula diferencias y guarda con executemany.
+                  Un archivo reemplaza lo contado; los escaneos se suman.
+publicar_conteo() en una transacción bloquea conteo, productos y lotes, recalcula
+                  diferencia = contado - saldo vigente del lote o del producto en la
+                  bodega (los movimientos hechos durante el conteo se respetan) y publica un DocumentoMovimiento de AJUSTE
+                  con bulk_create. El AJUSTE lleva la cantidad con signo y se suma al
+                  producto y al lote, como lo leen kardex, saldos y valorización.
+"""
+import io
+import os
+from collections import defaultdict
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from productos.indice_codigos import indice as indice_codigos
+from productos.models import Producto
+from sistema.models import RegistroActividad
+from utils.bulk import bulk_update_valores
+from .models import ConteoInventario, DocumentoMovimiento, LineaConteo, Lote, MovimientoInventario
+from .resumen import registrar_movimientos_en_resumen
+from .saldos import saldos_al
+
+CHUNK_SIZE = 5000
+SIN_LOTE = 0            # clave de lote para líneas de productos sin control por lote
+MAX_ERRORES = 50
+COLUMNAS = {
+    'codigo': ('codigo', 'código', 'sku', 'ean', 'ean_upc', 'barra'),
+    'lote': ('lote', 'codigo_lote'),
+    'cantidad': ('cantidad', 'contado', 'cantidad_contada'),
+}
+
+
+def _decimal(valor):
+    return Decimal(f"{valor:.2f}")
+
+
+def _saldos_en_bodega(bodega_id):
+    """
+    {producto_id: saldo vigente en la bodega}. Un conteo de una bodega no compara
+    contra Producto.stock_actual: eso daría de baja lo que está en las demás.
+    """
+    _, saldos = saldos_al(None, bodega_id=bodega_id)
+    por_producto = defaultdict(Decimal)
+    for (producto_id, _, _), cantidad in saldos.items():
+        por_producto[producto_id] += cantidad
+    return por_producto
+
+
+def abrir_conteo(bodega=None, categoria=None, usuario=None, observacion=None):
+    """Crea el conteo con la foto del saldo de su alcance. Devuelve el ConteoInventario."""
+    productos = Producto.objects.all()
+    if categoria:
+        productos = productos.filter(categoria=categoria)
+    lotes = Lote.objects.filter(
+        producto__in=productos.filter(control_por_lote=True), cantidad_disponible__gt=0
+    )
+    if bodega is not None:
+        lotes = lotes.filter(bodega=bodega)
+
+    with transaction.atomic():
+        conteo = ConteoInventario.objects.create(
+            bodega=bodega, categoria=categoria or None, usuario=usuario, observacion=observacion,
+        )
+        sin_lote = productos.filter(control_por_lote=False).values_list('id', 'stock_actual')
+        if bodega is not None:
+            en_bodega = _saldos_en_bodega(bodega.pk)
+            sin_lote = ((pk, en_bodega[pk]) for pk, _ in sin_lote.iterator(chunk_size=CHUNK_SIZE))
+        else:
+            sin_lote = sin_lote.iterator(chunk_size=CHUNK_SIZE)
+        lineas = [
+            LineaConteo(conteo=conteo, producto_id=pk, cantidad_sistema=stock)
+            for pk, stock in sin_lote
+        ]
+        lineas += [
+            LineaConteo(conteo=conteo, producto_id=prod, lote_id=pk, cantidad_sistema=cantidad)
+            for pk, prod, cantidad in lotes.values_list('id', 'producto_id', 'cantidad_disponible')
+            .iterator(chunk_size=CHUNK_SIZE)
+        ]
+        LineaConteo.objects.bulk_create(lineas, batch_size=CHUNK_SIZE)
+        conteo.total_lineas = len(lineas)
+        conteo.save(update_fields=['total_lineas'])
+    return conteo
+
+
+def leer_archivo(archivo):
+    """DataFrame (codigo, lote, cantidad) desde un CSV o XLSX subido."""
+    nombre = os.path.basename(getattr(archivo, 'name', '') or '').lower()
+    try:
+        if nombre.endswith('.xlsx'):
+            df = pd.read_excel(archivo, dtype=str, engine='openpyxl')
+        elif nombre.endswith('.csv'):
+            texto = archivo.read().decode('utf-8-sig')
+            # Excel en español guarda CSV con ';'
+            encabezado = texto.split('\n', 1)[0]
+            separador = ';' if encabezado.count(';') > encabezado.count(',') else ','
+            df = pd.read_csv(io.StringIO(texto), dtype=str, sep=separador)
+        else:
+            raise ValidationError("Formato no soportado: use CSV o XLSX.")
+    except (ValueError, UnicodeDecodeError, pd.errors.ParserError) as e:
+        raise ValidationError(f"No se pudo leer el archivo: {e}")
+
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    renombrar = {}
+    for destino, alias in COLUMNAS.items():
+        encontrada = next((c for c in df.columns if c in alias), None)
+        if encontrada:
+            renombrar[encontrada] = destino
+    df = df.rename(columns=renombrar)
+    if 'codigo' not in df.columns or 'cantidad' not in df.columns:
+        raise ValidationError("El archivo debe tener las columnas codigo (SKU o EAN) y cantidad.")
+    if 'lote' not in df.columns:
+        df['lote'] = None
+    return df[['codigo', 'lote', 'cantidad']]
+
+
+def lecturas_de_codigos(codigos):
+    """DataFrame de escaneos: cada código leído cuenta 1 unidad."""
+    codigos = [c for c in (str(x).strip() for x in codigos) if c]
+    return pd.DataFrame({'codigo': codigos, 'lote': None, 'cantidad': 1})
+
+
+def lecturas_de_filas(filas):
+    """DataFrame de lecturas [{'codigo', 'cantidad' (1 por defecto), 'lote'}] (API)."""
+    return pd.DataFrame.from_records(
+        [(f.get('codigo'), f.get('lote'), f.get('cantidad', 1)) for f in filas],
+        columns=['codigo', 'lote', 'cantidad'],
+    )
+
+
+def _lineas_df(conteo):
+    df = pd.DataFrame.from_records(
+        conteo.lineas.values_list('id', 'producto_id', 'lote_id', 'cantidad_sistema', 'cantidad_contada')
+        .iterator(chunk_size=CHUNK_SIZE),
+        columns=['id', 'producto_id', 'lote_id', 'sistema', 'contada'],
+    )
+    df['lote_key'] = df['lote_id'].fillna(SIN_LOTE).astype('int64')
+    df['sistema'] = df['sistema'].astype(float)
+    df['contada'] = pd.to_numeric(df['contada'], errors='coerce').astype(float)
+    return df
+
+
+def cargar_conteo(conteo, lecturas, sumar=False):
+    """
+    Aplica lecturas (DataFrame codigo, lote, cantidad) al conteo abierto, todo o nada.
+    sumar=False reemplaza lo contado de cada línea leída; True lo suma (escaneos).
+    Devuelve {'lecturas', 'lineas', 'diferencias'}.
+    """
+    if conteo.estado != 'ABIERTO':
+        raise ValidationError("El conteo ya no está abierto.")
+    df = lecturas.reset_index(drop=True).copy()
+    # Número de fila como lo ve el usuario: la planilla tiene encabezado, los escaneos no
+    df['fila'] = df.index + (1 if sumar else 2)
+    df['codigo'] = df['codigo'].fillna('').astype(str).str.strip()
+    df['lote'] = df['lote'].fillna('').astype(str).str.strip()
+    df['cantidad'] = pd.to_numeric(df['cantidad'], errors='coerce')
+    df = df[(df['codigo'] != '') | df['cantidad'].notna()]
+    if df.empty:
+        raise ValidationError("No hay lecturas.")
+
+    errores = [f"Fila {f}: cantidad inválida." for f in df.loc[df['cantidad'].isna() | (df['cantidad'] < 0), 'fila']]
+
+    ids = indice_codigos.resolver(df['codigo'].unique().tolist())
+    df['producto_id'] = df['codigo'].map(ids)
+    errores += [f"Fila {f}: código {c} no encontrado." for f, c in df.loc[df['producto_id'].isna(), ['fila', 'codigo']].itertuples(index=False)]
+
+    codigos_lote = [c for c in df['lote'].unique() if c]
+    lotes = pd.DataFrame.from_records(
+        Lote.objects.filter(codigo__in=codigos_lote).values_list('codigo', 'id', 'producto_id'),
+        columns=['lote', 'lote_id', 'producto_lote'],
+    )
+    df = df.merge(lotes, on='lote', how='left')
+    con_lote = df['lote'] != ''
+    malos = con_lote & (df['lote_id'].isna() | (df['producto_lote'] != df['producto_id']))
+    errores += [f"Fila {f}: lote {l} no encontrado para ese producto." for f, l in df.loc[malos & df['producto_id'].notna(), ['fila', 'lote']].itertuples(index=False)]
+
+    lineas = _lineas_df(conteo)
+    # Sin lote: vale si el producto tiene una sola línea en el conteo (sin control por lote o un solo lote)
+    por_producto = lineas.groupby('producto_id')['lote_key'].agg(['size', 'first'])
+    unico = por_producto.loc[por_producto['size'] == 1, 'first']
+    df['lote_key'] = np.where(con_lote, df['lote_id'].fillna(-1), df['producto_id'].map(unico).fillna(-1)).astype('int64')
+    ambiguos = ~con_lote & (df['lote_key'] == -1) & df['producto_id'].isin(por_producto.index)
+    errores += [f"Fila {f}: {c} tiene varios lotes en el conteo, indique el lote." for f, c in df.loc[ambiguos, ['fila', 'codigo']].itertuples(index=False)]
+
+    validas = df[df['producto_id'].notna() & df['cantidad'].notna()].copy()
+    validas['producto_id'] = validas['producto_id'].astype('int64')
+    cruce = validas.merge(lineas[['id', 'producto_id', 'lote_key']], on=['producto_id', 'lote_key'], how='left')
+    fuera = cruce['id'].isna() & ~cruce['fila'].isin(df.loc[malos | ambiguos, 'fila'])
+    errores += [f"Fila {f}: {c} no está en el alcance de este conteo." for f, c in cruce.loc[fuera, ['fila', 'codigo']].itertuples(index=False)]
+    if errores:
+        extra = len(errores) - MAX_ERRORES
+        raise ValidationError(errores[:MAX_ERRORES] + ([f"... y {extra} errores más."] if extra > 0 else []))
+
+    # Una pasada: cantidad contada por línea y diferencia contra la foto del sistema
+    contado = cruce.groupby('id')['cantidad'].sum()
+    actual = lineas.set_index('id').loc[contado.index]
+    nueva = contado + actual['contada'].fillna(0.0) if sumar else contado
+    diferencia = (nueva - actual['sistema']).round(2)
+
+    objs = [
+        LineaConteo(pk=int(pk), cantidad_contada=_decimal(c), diferencia=_decimal(d))
+        for pk, c, d in zip(contado.index, nueva.to_numpy(), diferencia.to_numpy())
+    ]
+    with transaction.atomic():
+        if ConteoInventario.objects.select_for_update().filter(pk=conteo.pk, estado='ABIERTO').count() != 1:
+            raise ValidationError("El conteo ya no está abierto.")
+        bulk_update_valores(LineaConteo, objs, ['cantidad_contada', 'diferencia'])
+    return {
+        'lecturas': len(df),
+        'lineas': len(objs),
+        'diferencias': int((diferencia != 0).sum()),
+    }
+
+
+def publicar_conteo(conteo, usuario=None):
+    """
+    Publica las diferencias del conteo como un documento de AJUSTE (una transacción).
+    Devuelve el DocumentoMovimiento (None si no hubo diferencias).
+    """
+    with transaction.atomic():
+        conteo = ConteoInventario.objects.select_for_update().get(pk=conteo.pk)
+        if conteo.estado != 'ABIERTO':
+            raise ValidationError("El conteo ya no está abierto.")
+
+        contadas = list(conteo.lineas.filter(cantidad_contada__isnull=False))
+        # Mismo orden de bloqueo que MovimientoInventario.save(): producto y luego lotes
+        productos = Producto.objects.select_for_update().in_bulk(sorted({l.producto_id for l in contadas}))
+        lotes = Lote.objects.select_for_update().in_bulk(sorted({l.lote_id for l in contadas if l.lote_id}))
+        # Con los productos bloqueados, el saldo en la bodega no cambia hasta el final
+        en_bodega = _saldos_en_bodega(conteo.bodega_id) if conteo.bodega_id else None
+
+        documento = DocumentoMovimiento(
+            tipo='AJUSTE',
+            bodega_destino=conteo.bodega,
+            usuario=usuario,
+            documento_referencia=f"CONTEO-{conteo.pk}",
+            observacion=f"Ajuste por {conteo}",
+        )
+        movimientos, lotes_cambiados = [], []
+        for linea in contadas:
+            producto = productos[linea.producto_id]
+            lote = lotes.get(linea.lote_id) if linea.lote_id else None
+            if lote is not None:
+                saldo = lote.cantidad_disponible
+            else:
+                saldo = en_bodega[producto.pk] if en_bodega is not None else producto.stock_actual
+            linea.diferencia = linea.cantidad_contada - saldo
+            if not linea.diferencia:
+                continue
+            producto.stock_actual += linea.diferencia
+            if lote is not None:
+                lote.cantidad_disponible += linea.diferencia
+                lotes_cambiados.append(lote)
+            movimientos.append(MovimientoInventario(
+                tipo='AJUSTE',
+                producto=producto,
+                lote=lote,
+                cantidad=linea.diferencia,
+                bodega_destino=conteo.bodega or (lote.bodega if lote is not None else None),
+                usuario=usuario,
+                documento_referencia=documento.documento_referencia,
+                documento=documento,
+            ))
+
+        if movimientos:
+            documento.total_lineas = len(movimientos)
+            documento.save()
+            cambiados = {m.producto_id: productos[m.producto_id] for m in movimientos}
+            bulk_update_valores(Producto, list(cambiados.values()), ['stock_actual'])
+            bulk_update_valores(Lote, lotes_cambiados, ['cantidad_disponible'])
+            MovimientoInventario.objects.bulk_create(movimientos, batch_size=CHUNK_SIZE)
+            registrar_movimientos_en_resumen(movimientos)
+        bulk_update_valores(LineaConteo, contadas, ['diferencia'])
+
+        conteo.estado = 'PUBLICADO'
+        conteo.documento = documento if movimientos else None
+        conteo.publicado = timezone.now()
+        conteo.save(update_fields=['estado', 'documento', 'publicado'])
+
+        if usuario is not None:
+            RegistroActividad.objects.create(
+                usuario=usuario,
+                descripcion=f"{conteo}: {len(movimientos)} ajustes de {len(contadas)} líneas contadas",
+                modelo='ConteoInventario',
+                objeto_id=conteo.pk,
+            )
+    return conteo.documento
@@ -0,0 +1,158 @@
+# inventario/costeo.py
+"""
+Costo promedio ponderado (Producto.costo_promedio).
+
+Al registrar un INGRESO o DEVOLUCION:
+
+    costo_promedio = (stock × costo_promedio + cantidad × costo_unitario) / (stock + cantidad)
+
+costo_unitario = costo neto del ProductoProveedor del movimiento
+(costo × (1 - descuento_pct / 100), igual que en reposición); si no hay relación
+con ese proveedor se usa costo_estandar. El costo usado queda guardado en
+MovimientoInventario.costo_unitario, así la reconstrucción respeta el costo histórico.
+
+SALIDA, AJUSTE y TRANSFERENCIA mueven stock pero no cambian el costo promedio.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import Q
+
+from productos.models import Producto
+from proveedores.models import ProductoProveedor
+from utils.bulk import bulk_update_valores
+
+TIPOS_CON_COSTO = ('INGRESO', 'DEVOLUCION')
+CHUNK_SIZE = 5000
+CENTAVOS = Decimal('0.01')
+CIEN = Decimal('100')
+
+
+def costo_neto(costo, descuento_pct):
+    if costo is None:
+        return None
+    if descuento_pct:
+        costo = costo * (1 - descuento_pct / CIEN)
+    return costo
+
+
+def costo_unitario_proveedor(producto, proveedor_id):
+    """Costo neto del proveedor para el producto (una consulta por índice único) o costo_estandar."""
+    if proveedor_id:
+        fila = (
+            ProductoProveedor.objects
+            .filter(producto_id=producto.pk, proveedor_id=proveedor_id)
+            .values_list('costo', 'descuento_pct')
+            .first()
+        )
+        if fila:
+            return costo_neto(*fila)
+    return producto.costo_estandar
+
+
+def nuevo_costo_promedio(stock, costo_promedio, cantidad, costo_unitario):
+    """Promedio ponderado tras sumar `cantidad` a `costo_unitario`. O(1)."""
+    if costo_unitario is None:
+        return costo_promedio
+    if not costo_promedio or stock <= 0:
+        return Decimal(costo_unitario).quantize(CENTAVOS, ROUND_HALF_UP)
+    total = stock + cantidad
+    if total <= 0:
+        return costo_promedio
+    valor = stock * costo_promedio + cantidad * costo_unitario
+    return (valor / total).quantize(CENTAVOS, ROUND_HALF_UP)
+
+
+def _movimientos_cronologicos(lote=CHUNK_SIZE, producto_ids=None):
+    """
+    Todos los movimientos (o los de producto_ids) en orden (fecha, id), en bloques
+    por keyset. Cada bloque es una consulta acotada que usa el índice de fecha, sin OFFSET.
+    """
+    from .models import MovimientoInventario
+
+    campos = ('id', 'fecha', 'tipo', 'producto_id', 'proveedor_id', 'cantidad', 'costo_unitario')
+    base = MovimientoInventario.objects.order_by('fecha', 'id').values_list(*campos)
+    if producto_ids is not None:
+        base = base.filter(producto_id__in=producto_ids)
+    ultimo = None
+    while True:
+        qs = base
+        if ultimo is not None:
+            fecha, pk = ultimo
+            qs = qs.filter(Q(fecha__gt=fecha) | Q(fecha=fecha, id__gt=pk))
+        bloque = list(qs[:lote])
+        if not bloque:
+            return
+        yield bloque
+        ultimo = (bloque[-1][1], bloque[-1][0])
+
+
+def _aplicar(actual, tipo, cantidad, costo):
+    """[stock, costo_promedio] tras un movimiento, con la misma aritmética que MovimientoInventario.save()."""
+    if tipo in TIPOS_CON_COSTO:
+        actual[1] = nuevo_costo_promedio(actual[0], actual[1], cantidad, costo)
+        actual[0] += cantidad
+    elif tipo == 'SALIDA':
+        # Con signo, sin recorte a 0: el stock sigue al kardex aunque el historial sea antiguo
+        actual[0] -= cantidad
+    elif tipo == 'AJUSTE':
+        actual[0] += cantidad
+
+
+def recalcular_costos(chunk_size=CHUNK_SIZE):
+    """
+    Reconstruye costo_promedio de todos los productos recorriendo una sola vez el
+    historial de movimientos. Guarda el costo_unitario en los INGRESOS/DEVOLUCIONES
+    que no lo tenían (costo actual del proveedor). Devuelve
+    {'movimientos', 'costeados', 'productos'}.
+
+    Se procesa por bloques de chunk_size productos, cada uno en su transacción y con
+    los productos bloqueados (select_for_update) mientras se leen sus movimientos y
+    se escribe el costo: un movimiento publicado en paralelo espera el bloqueo y parte
+    del costo recalculado, o ya está confirmado y entra en el recorrido. No requiere
+    ventana de mantenimiento.
+    """
+    from .models import MovimientoInventario
+
+    costos_proveedor = {
+        (prod_id, prov_id): costo_neto(costo, desc)
+        for prod_id, prov_id, costo, desc in ProductoProveedor.objects.values_list(
+            'producto_id', 'proveedor_id', 'costo', 'descuento_pct'
+        ).iterator(chunk_size=chunk_size)
+    }
+    costo_estandar = dict(
+        Producto.objects.filter(costo_estandar__isnull=False)
+        .values_list('id', 'costo_estandar').iterator(chunk_size=chunk_size)
+    )
+
+    ids = list(Producto.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=chunk_size))
+    total = costeados = escritos = 0
+    for i in range(0, len(ids), chunk_size):
+        with transaction.atomic():
+            # Mismo orden de bloqueo que MovimientoInventario.save(): por producto, de menor a mayor id
+            bloqueados = list(
+                Producto.objects.select_for_update().filter(pk__in=ids[i:i + chunk_size])
+                .order_by('pk').values_list('pk', flat=True)
+            )
+            estado = {}          # producto_id -> [stock, costo_promedio]
+            for bloque in _movimientos_cronologicos(chunk_size, bloqueados):
+                sin_costo = []
+                for pk, _, tipo, prod_id, prov_id, cantidad, costo in bloque:
+                    total += 1
+                    if tipo in TIPOS_CON_COSTO and costo is None:
+                        costo = costos_proveedor.get((prod_id, prov_id), costo_estandar.get(prod_id))
+                        if costo is not None:
+                            sin_costo.append(MovimientoInventario(pk=pk, costo_unitario=costo))
+                    _aplicar(estado.setdefault(prod_id, [Decimal(0), None]), tipo, cantidad, costo)
+                if sin_costo:
+                    bulk_update_valores(MovimientoInventario, sin_costo, ['costo_unitario'])
+                    costeados += len(sin_costo)
+
+            productos = [
+                Producto(pk=prod_id, costo_promedio=costo)
+                for prod_id, (_, costo) in estado.items() if costo is not None
+            ]
+            bulk_update_valores(Producto, productos, ['costo_promedio'])
+            escritos += len(productos)
+
+    return {'movimientos': total, 'costeados': costeados, 'productos': escritos}
@@ -0,0 +1,476 @@
+# inventario/datos_prueba.py
+"""
+Generador masivo de datos sintéticos para benchmarks
+(`manage.py generar_datos_prueba --masivo`).
+
+Produce millones de productos, proveedores, relaciones producto-proveedor,
+lotes y movimientos en minutos:
+
+  - los valores salen de un numpy.random.Generator con semilla: la misma semilla
+    produce los mismos datos, con 1 o N procesos (SeedSequence.spawn por bloque);
+  - se generan por columnas (vectores numpy) y se insertan por bloques con
+    utils.bulk.insertar_filas (executemany, sin instanciar modelos ni pasar por
+    MovimientoInventario.save());
+  - productos, proveedores y lotes reciben ids explícitos (max(id) + 1 ...), así
+    los movimientos se arman sin releer lo insertado;
+  - los movimientos se generan por bloques, opcionalmente en un
+    ProcessPoolExecutor; el proceso principal solo inserta.
+
+Consistencia de saldos:
+  - cada bloque agrega, un día antes del período, un INGRESO de apertura por
+    (producto, bodega, lote) que cubre todas sus salidas del bloque: ningún saldo
+    queda negativo en ningún momento;
+  - los productos con control por lote siempre mueven un lote (en la bodega del
+    lote); las TRANSFERENCIAS sintéticas son solo de productos sin lote;
+  - al final stock_actual y los saldos de lote se calculan desde los movimientos
+    con consultas agrupadas (recalcular_saldos), con las mismas reglas que
+    kardex/saldos: INGRESO, DEVOLUCION y AJUSTE suman (el AJUSTE con signo),
+    SALIDA resta y la TRANSFERENCIA no cambia el stock del producto.
+
+Solo agrega filas: no toca los datos existentes. Usar en una base de pruebas.
+"""
+import time as reloj
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import numpy as np
+from django.db import connections, transaction
+from django.db.models import Max, Q, Sum
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from productos.forms import CATEGORIA_CHOICES, UOM_CHOICES
+from productos.models import Producto
+from proveedores.models import ProductoProveedor, Proveedor
+from usuarios.models import Usuario
+from utils.bulk import bulk_update_valores, insertar_filas, reiniciar_secuencias
+from .models import Bodega, Lote, MovimientoInventario
+from .valorizacion import inicializar_proceso
+
+BLOQUE = 50_000
+ENTRADAS = ('INGRESO', 'DEVOLUCION', 'AJUSTE')
+
+# Índices de TIPOS; pesos de cada tipo en los movimientos sintéticos
+TIPOS = np.array(['INGRESO', 'SALIDA', 'AJUSTE', 'DEVOLUCION', 'TRANSFERENCIA'])
+INGRESO, SALIDA, AJUSTE, DEVOLUCION, TRANSFERENCIA = range(5)
+PESOS_TIPOS = [0.40, 0.42, 0.05, 0.03, 0.10]
+
+# Valores que cumplen las reglas de ProductoForm / ProveedorForm (sin números, <= 20 caracteres)
+SUSTANTIVOS = ['Alfajor', 'Torta', 'Cuchufli', 'Bombon', 'Galleta', 'Queque', 'Brownie',
+               'Chocolate', 'Caramelo', 'Turron', 'Merengue', 'Berlin', 'Kuchen', 'Pie']
+SABORES = ['Clasico', 'Nuez', 'Manjar', 'Frambuesa', 'Limon', 'Coco', 'Menta',
+           'Vainilla', 'Almendra', 'Naranja']
+MARCAS = ['Lilis', 'Dulcemar', 'Artesanal', 'Premium', 'Del Sur']
+RAZONES = ['Distribuidora', 'Comercial', 'Importadora', 'Molinos', 'Envases', 'Lacteos',
+           'Azucarera', 'Cacaotera', 'Frutos', 'Insumos']
+CATEGORIAS = [c for c, _ in CATEGORIA_CHOICES]
+UOMS = [u for u, _ in UOM_CHOICES]
+CONDICIONES = ['EFECTIVO', 'DEBITO', 'TRANSFERENCIA']
+
+
+def _elegir(rng, valores, n):
+    return np.array(valores, dtype=object)[rng.integers(0, len(valores), n)]
+
+
+def _decimales(valores):
+    """Vector float -> lista de Decimal con 2 decimales."""
+    return [Decimal(t) for t in np.char.mod('%.2f', valores).tolist()]
+
+
+def _medianoche(dia):
+    return timezone.make_aware(datetime.combine(dia, datetime.min.time()))
+
+
+def _siguiente_id(modelo):
+    return (modelo.objects.aggregate(m=Max('id'))['m'] or 0) + 1
+
+
+def _maximo_numerico(qs, campo, regex):
+    """Mayor valor numérico de `campo` (texto) entre los que cumplen `regex`, sin recorrer la tabla en Python."""
+    return (
+        qs.filter(**{f'{campo}__regex': regex})
+        .annotate(largo=Length(campo))
+        .order_by('-largo', f'-{campo}')
+        .values_list(campo, flat=True)
+        .first()
+    )
+
+
+def digitos_verificadores_ean(cuerpos):
+    """Dígito verificador EAN-13 de cada cuerpo de 12 dígitos (vector de enteros)."""
+    suma = np.zeros(len(cuerpos), dtype=np.int64)
+    for posicion in range(12):
+        digito = (cuerpos // 10 ** (11 - posicion)) % 10
+        suma += digito * (3 if posicion % 2 else 1)
+    return (10 - suma % 10) % 10
+
+
+def digitos_verificadores_rut(cuerpos):
+    """Dígito verificador (módulo 11) de cada cuerpo de RUT (vector de enteros)."""
+    suma = np.zeros(len(cuerpos), dtype=np.int64)
+    for j in range(9):
+        suma += ((cuerpos // 10 ** j) % 10) * (2 + j % 6)
+    calc = 11 - suma % 11
+    return np.where(calc == 11, '0', np.where(calc == 10, 'K', calc.astype(str)))
+
+
+def _insertar(modelo, campos, columnas, bloque):
+    """Inserta columnas paralelas por bloques, una transacción por bloque."""
+    total = len(columnas[0])
+    for ini in range(0, total, bloque):
+        filas = list(zip(*(c[ini:ini + bloque] for c in columnas)))
+        with transaction.atomic():
+            insertar_filas(modelo, campos, filas)
+
+
+# ------------------------------------------------------------
+# Catálogo
+# ------------------------------------------------------------
+def generar_productos(n, rng, bloque=BLOQUE):
+    """Inserta n productos. Devuelve dict con sus ids y columnas necesarias para lo que sigue."""
+    primer_id = _siguiente_id(Producto)
+    ultimo_sku = _maximo_numerico(Producto.objects.all(), 'sku', r'^SKU[0-9]+$')
+    ultimo_ean = _maximo_numerico(Producto.objects.filter(ean_upc__startswith='2'), 'ean_upc', r'^[0-9]{13}$')
+    base = max(int(ultimo_sku[3:]) if ultimo_sku else 0, int(ultimo_ean[1:12]) if ultimo_ean else 0) + 1
+
+    ids = np.arange(primer_id, primer_id + n)
+    numeros = np.arange(base, base + n, dtype=np.int64)
+    # EAN-13 con prefijo 2 (GS1: uso interno), cuerpo = número del SKU
+    cuerpos = 2 * 10 ** 11 + numeros
+    eans = np.char.add(cuerpos.astype(str), digitos_verificadores_ean(cuerpos).astype(str))
+    con_ean = rng.random(n) < 0.8
+
+    costo = np.round(rng.uniform(200, 8000, n), 0)
+    stock_minimo = rng.integers(5, 60, n)
+    perecible = rng.random(n) < 0.4
+    con_lote = rng.random(n) < 0.3
+    ahora = timezone.now()
+    vencimiento = [
+        (ahora + timedelta(days=int(d))).date() if p else None
+        for d, p in zip(rng.integers(-10, 365, n), perecible)
+    ]
+
+    campos = ['id', 'sku', 'ean_upc', 'nombre', 'categoria', 'marca', 'uom_compra', 'uom_venta',
+              'factor_conversion', 'costo_estandar', 'costo_promedio', 'precio_venta', 'impuesto_iva',
+              'stock_minimo', 'stock_maximo', 'punto_reorden', 'perishable', 'control_por_lote',
+              'control_por_serie', 'stock_actual', 'fecha_vencimiento', 'updated_at']
+    costos = _decimales(costo)
+    columnas = [
+        ids.tolist(),
+        np.char.add('SKU', numeros.astype(str)).tolist(),
+        np.where(con_ean, eans, None).tolist(),
+        np.char.add(np.char.add(_elegir(rng, SUSTANTIVOS, n).astype(str), ' '), _elegir(rng, SABORES, n).astype(str)).tolist(),
+        _elegir(rng, CATEGORIAS, n).tolist(),
+        _elegir(rng, MARCAS, n).tolist(),
+        _elegir(rng, UOMS, n).tolist(),
+        ['UN'] * n,
+        [Decimal(1)] * n,
+        costos,
+        costos,
+        _decimales(np.round(costo * rng.uniform(1.3, 2.2, n), 0)),
+        [Decimal('19.00')] * n,
+        _decimales(stock_minimo),
+        _decimales(stock_minimo * rng.integers(5, 15, n)),
+        _decimales(stock_minimo * 2),
+        perecible.tolist(),
+        con_lote.tolist(),
+        [False] * n,
+        [Decimal(0)] * n,
+        vencimiento,
+        [ahora] * n,
+    ]
+    _insertar(Producto, campos, columnas, bloque)
+    reiniciar_secuencias(Producto)
+    return {'primer_id': primer_id, 'ids': ids, 'con_lote': con_lote, 'costo': costo,
+            'skus': columnas[1]}
+
+
+def generar_proveedores(n, rng, bloque=BLOQUE):
+    """Inserta n proveedores con RUT válido y único. Devuelve el vector de ids."""
+    primer_id = _siguiente_id(Proveedor)
+    ultimo = _maximo_numerico(Proveedor.objects.all(), 'rut_nif', r'^[0-9]{8}-[0-9K]$')
+    base = max(int(ultimo[:8]) + 1 if ultimo else 0, 50_000_000)
+    cuerpos = np.arange(base, base + n, dtype=np.int64)
+    ruts = np.char.add(np.char.add(cuerpos.astype(str), '-'), digitos_verificadores_rut(cuerpos))
+    ahora = timezone.now()
+
+    campos = ['id', 'rut_nif', 'razon_social', 'email', 'telefono', 'pais', 'condiciones_pago',
+              'moneda', 'estado', 'updated_at']
+    columnas = [
+        list(range(primer_id, primer_id + n)),
+        ruts.tolist(),
+        _elegir(rng, RAZONES, n).tolist(),
+        np.char.add(np.char.add('proveedor', cuerpos.astype(str)), '@proveedores.cl').tolist(),
+        (rng.integers(200_000_000, 999_999_999, n)).astype(str).tolist(),
+        ['Chile'] * n,
+        _elegir(rng, CONDICIONES, n).tolist(),
+        np.where(rng.random(n) < 0.9, 'CLP', 'USD').tolist(),
+        np.where(rng.random(n) < 0.95, 'ACTIVO', 'BLOQUEADO').tolist(),
+        [ahora] * n,
+    ]
+    _insertar(Proveedor, campos, columnas, bloque)
+    reiniciar_secuencias(Proveedor)
+    return np.arange(primer_id, primer_id + n)
+
+
+def generar_relaciones(productos, proveedores, rng, maximo=3, bloque=BLOQUE):
+    """1..maximo proveedores distintos por producto; el primero es el preferente. Devuelve cuántas."""
+    if not len(proveedores):
+        return 0
+    n = len(productos['ids'])
+    maximo = min(maximo, len(proveedores))
+    por_producto = rng.integers(1, maximo + 1, n)
+    prod_idx = np.repeat(np.arange(n), por_producto)
+    orden = np.arange(len(prod_idx)) - np.repeat(np.cumsum(por_producto) - por_producto, por_producto)
+    # Proveedores distintos dentro de cada producto: base + orden * paso (mod m)
+    paso = max(len(proveedores) // maximo, 1)
+    prov_idx = (rng.integers(0, len(proveedores), n)[prod_idx] + orden * paso) % len(proveedores)
+    total = len(prod_idx)
+
+    campos = ['producto_id', 'proveedor_id', 'costo', 'lead_time_dias', 'min_lote', 'descuento_pct', 'preferente']
+    columnas = [
+        productos['ids'][prod_idx].tolist(),
+        proveedores[prov_idx].tolist(),
+        _decimales(np.round(productos['costo'][prod_idx] * rng.uniform(0.6, 0.95, total), 0)),
+        rng.integers(1, 30, total).tolist(),
+        _decimales(rng.integers(1, 50, total)),
+        _decimales(np.where(rng.random(total) < 0.3, rng.integers(1, 15, total), 0)),
+        (orden == 0).tolist(),
+    ]
+    _insertar(ProductoProveedor, campos, columnas, bloque)
+    return total
+
+
+def generar_lotes(productos, bodegas, rng, por_producto=3, bloque=BLOQUE):
+    """
+    `por_producto` lotes por cada producto con control por lote, cada uno en una
+    bodega al azar. Devuelve {'primer_id', 'inicio' (índice del primer lote de cada
+    producto o -1), 'bodega' (índice de bodega de cada lote), 'por_producto'}.
+    """
+    con_lote = np.flatnonzero(productos['con_lote'])
+    inicio = np.full(len(productos['ids']), -1, dtype=np.int64)
+    inicio[con_lote] = np.arange(len(con_lote)) * por_producto
+    total = len(con_lote) * por_producto
+    primer_id = _siguiente_id(Lote)
+    bodega_idx = rng.integers(0, len(bodegas), total)
+
+    prod_idx = np.repeat(con_lote, por_producto)
+    numero = np.tile(np.arange(1, por_producto + 1), len(con_lote))
+    skus = np.array(productos['skus'], dtype=object)[prod_idx].astype(str)
+    ahora = timezone.now()
+    hoy = timezone.localdate()
+
+    campos = ['id', 'codigo', 'producto_id', 'bodega_id', 'fecha_vencimiento', 'cantidad_inicial',
+              'cantidad_disponible', 'fecha_creacion', 'updated_at']
+    columnas = [
+        list(range(primer_id, primer_id + total)),
+        np.char.add(np.char.add(np.char.add('LOT-', skus), '-'), np.char.zfill(numero.astype(str), 4)).tolist(),
+        productos['ids'][prod_idx].tolist(),
+        np.array(bodegas)[bodega_idx].tolist(),
+        [hoy + timedelta(days=int(d)) for d in rng.integers(30, 720, total)],
+        [Decimal(0)] * total,
+        [Decimal(0)] * total,
+        [ahora] * total,
+        [ahora] * total,
+    ]
+    _insertar(Lote, campos, columnas, bloque)
+    reiniciar_secuencias(Lote)
+    return {'primer_id': primer_id, 'inicio': inicio, 'bodega': bodega_idx, 'por_producto': por_producto}
+
+
+# ------------------------------------------------------------
+# Movimientos (por bloques, en uno o varios procesos)
+# ------------------------------------------------------------
+CAMPOS_MOVIMIENTO = ['fecha', 'tipo', 'producto_id', 'proveedor_id', 'bodega_origen_id', 'bodega_destino_id',
+                     'cantidad', 'costo_unitario', 'lote_id', 'usuario_id']
+
+_contexto = None
+
+
+def _inicializar_generador(contexto):
+    global _contexto
+    inicializar_proceso()
+    _contexto = contexto
+
+
+def bloque_movimientos(semilla, n, ctx=None):
+    """
+    Filas (en el orden de CAMPOS_MOVIMIENTO) de n movimientos al azar más los
+    INGRESOS de apertura que cubren sus salidas. No toca la base de datos.
+    """
+    ctx = ctx or _contexto
+    rng = np.random.default_rng(semilla)
+    bodegas = np.array(ctx['bodegas'])
+    nb = len(bodegas)
+
+    p = rng.integers(0, len(ctx['productos']), n)
+    tipo = rng.choice(len(TIPOS), n, p=PESOS_TIPOS)
+    inicio_lote = ctx['lote_inicio'][p]
+    con_lote = inicio_lote >= 0
+    # Transferencias solo de productos sin lote (y con más de una bodega)
+    tipo[(tipo == TRANSFERENCIA) & (con_lote | (nb < 2))] = SALIDA
+
+    lote_idx = np.where(con_lote, inicio_lote + rng.integers(0, ctx['lotes_por_producto'], n), -1)
+    b = np.where(con_lote, ctx['lote_bodega'][np.maximum(lote_idx, 0)], rng.integers(0, nb, n))
+    destino = (b + rng.integers(1, max(nb, 2), n)) % nb
+
+    cantidad = rng.integers(1, 50, n)
+    cantidad[(tipo == AJUSTE) & (rng.random(n) < 0.5)] *= -1
+    segundos = rng.integers(0, ctx['dias'] * 86_400, n)
+
+    # ---- INGRESOS de apertura: uno por (producto, bodega, lote) con salidas ----
+    sale = (tipo == SALIDA) | (tipo == TRANSFERENCIA) | ((tipo == AJUSTE) & (cantidad < 0))
+    claves = np.stack([p[sale], b[sale], lote_idx[sale]], axis=1)
+    if len(claves):
+        unicas, inversa = np.unique(claves, axis=0, return_inverse=True)
+        salidas = np.bincount(inversa.ravel(), weights=np.abs(cantidad[sale]), minlength=len(unicas))
+    else:
+        unicas, salidas = np.empty((0, 3), dtype=np.int64), np.empty(0)
+    m = len(unicas)
+
+    p = np.concatenate([unicas[:, 0], p])
+    b = np.concatenate([unicas[:, 1], b])
+    lote_idx = np.concatenate([unicas[:, 2], lote_idx])
+    tipo = np.concatenate([np.full(m, INGRESO), tipo])
+    destino = np.concatenate([np.zeros(m, dtype=np.int64), destino])
+    cantidad = np.concatenate([salidas.astype(np.int64) + rng.integers(0, 50, m), cantidad])
+    # Las aperturas van el día anterior al período
+    segundos = np.concatenate([rng.integers(-86_400, 0, m), segundos])
+    total = m + n
+
+    entra = (tipo == INGRESO) | (tipo == DEVOLUCION) | (tipo == AJUSTE)
+    transf = tipo == TRANSFERENCIA
+    con_costo = (tipo == INGRESO) | (tipo == DEVOLUCION)
+    costo = np.round(ctx['costo'][p] * rng.uniform(0.9, 1.1, total), 2)
+    proveedores = ctx['proveedores']
+    prov = proveedores[rng.integers(0, len(proveedores), total)] if len(proveedores) else np.zeros(total, dtype=np.int64)
+    usuarios = ctx['usuarios']
+
+    base = ctx['inicio']
+    fechas = [datetime.fromtimestamp(base + s, tz=dt_timezone.utc) for s in segundos.tolist()]
+    costos = [Decimal(t) for t in np.char.mod('%.2f', costo).tolist()]
+    return list(zip(
+        fechas,
+        TIPOS[tipo].tolist(),
+        ctx['productos'][p].tolist(),
+        np.where((tipo == INGRESO) & (prov > 0), prov, None).tolist(),
+        np.where(entra, None, bodegas[b]).tolist(),
+        np.where(entra, bodegas[b], np.where(transf, bodegas[destino], None)).tolist(),
+        cantidad.tolist(),
+        [c if cc else None for c, cc in zip(costos, con_costo.tolist())],
+        np.where(lote_idx >= 0, ctx['primer_lote_id'] + lote_idx, None).tolist(),
+        (np.array(usuarios)[rng.integers(0, len(usuarios), total)].tolist() if usuarios else [None] * total),
+    ))
+
+
+def generar_movimientos(n, contexto, semilla, procesos=1, bloque=BLOQUE):
+    """Inserta n movimientos sintéticos (más las aperturas). Devuelve cuántas filas insertó."""
+    tamanos = [min(bloque, n - i) for i in range(0, n, bloque)]
+    semillas = np.random.SeedSequence([semilla, 1]).spawn(len(tamanos))
+    total = 0
+
+    if procesos <= 1 or len(tamanos) <= 1:
+        bloques = (bloque_movimientos(s, t, contexto) for s, t in zip(semillas, tamanos))
+        for filas in bloques:
+            with transaction.atomic():
+                total += insertar_filas(MovimientoInventario, CAMPOS_MOVIMIENTO, filas)
+        return total
+
+    # Los procesos generan las filas; solo el principal escribe en la base
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_generador, initargs=(contexto,)) as pool:
+        for filas in pool.map(bloque_movimientos, semillas, tamanos):
+            with transaction.atomic():
+                total += insertar_filas(MovimientoInventario, CAMPOS_MOVIMIENTO, filas)
+    return total
+
+
+# ------------------------------------------------------------
+# Saldos
+# ------------------------------------------------------------
+def recalcular_saldos(primer_producto_id, bloque=BLOQUE):
+    """
+    stock_actual de los productos con id >= primer_producto_id y cantidad_inicial /
+    cantidad_disponible de sus lotes, desde los movimientos (dos consultas agrupadas).
+    """
+    movs = MovimientoInventario.objects.filter(producto_id__gte=primer_producto_id).order_by()
+    entradas = Q(tipo__in=ENTRADAS)
+    salidas = Q(tipo='SALIDA') | Q(tipo='TRANSFERENCIA', bodega_destino__isnull=True)
+
+    productos = [
+        Producto(pk=pk, stock_actual=(e or 0) - (s or 0))
+        for pk, e, s in movs.values('producto_id')
+        .annotate(e=Sum('cantidad', filter=entradas), s=Sum('cantidad', filter=salidas))
+        .values_list('producto_id', 'e', 's')
+        .iterator(chunk_size=bloque)
+    ]
+    lotes = [
+        Lote(pk=pk, cantidad_inicial=i or 0, cantidad_disponible=(e or 0) - (s or 0))
+        for pk, i, e, s in movs.filter(lote__isnull=False).values('lote_id')
+        .annotate(
+            i=Sum('cantidad', filter=Q(tipo__in=('INGRESO', 'DEVOLUCION'))),
+            e=Sum('cantidad', filter=entradas),
+            s=Sum('cantidad', filter=salidas),
+        )
+        .values_list('lote_id', 'i', 'e', 's')
+        .iterator(chunk_size=bloque)
+    ]
+    for ini in range(0, len(productos), bloque):
+        with transaction.atomic():
+            bulk_update_valores(Producto, productos[ini:ini + bloque], ['stock_actual'])
+    for ini in range(0, len(lotes), bloque):
+        with transaction.atomic():
+            bulk_update_valores(Lote, lotes[ini:ini + bloque], ['cantidad_inicial', 'cantidad_disponible'])
+    return {'productos': len(productos), 'lotes': len(lotes)}
+
+
+def generar(productos=100_000, proveedores=5_000, movimientos=1_000_000, lotes_por_producto=3,
+            dias=365, semilla=42, procesos=1, bloque=BLOQUE, avance=None):
+    """
+    Genera el conjunto completo y recalcula los saldos. `avance(etapa, filas, segundos)`
+    recibe cada etapa terminada. Devuelve {etapa: (filas, segundos)}.
+    """
+    rng_productos, rng_proveedores, rng_relaciones, rng_lotes = (
+        np.random.default_rng(s) for s in np.random.SeedSequence(semilla).spawn(4)
+    )
+    tiempos = {}
+    inicio = reloj.perf_counter()
+
+    def marcar(etapa, filas):
+        nonlocal inicio
+        fin = reloj.perf_counter()
+        tiempos[etapa] = (filas, fin - inicio)
+        if avance:
+            avance(etapa, filas, fin - inicio)
+        inicio = fin
+
+    bodegas = list(Bodega.objects.order_by('id').values_list('id', flat=True))
+    if not bodegas:
+        bodegas = [Bodega.objects.create(nombre="Bodega Central", codigo="BOD001").pk]
+
+    prods = generar_productos(productos, rng_productos, bloque)
+    marcar('productos', productos)
+    provs = generar_proveedores(proveedores, rng_proveedores, bloque)
+    marcar('proveedores', proveedores)
+    marcar('relaciones', generar_relaciones(prods, provs, rng_relaciones, bloque=bloque))
+    lotes = generar_lotes(prods, bodegas, rng_lotes, lotes_por_producto, bloque)
+    marcar('lotes', len(lotes['bodega']))
+
+    contexto = {
+        'productos': prods['ids'],
+        'costo': prods['costo'],
+        'lote_inicio': lotes['inicio'],
+        'lote_bodega': lotes['bodega'],
+        'lotes_por_producto': lotes_por_producto,
+        'primer_lote_id': lotes['primer_id'],
+        'bodegas': bodegas,
+        'proveedores': provs,
+        'usuarios': list(Usuario.objects.filter(is_active=True).order_by('id').values_list('id', flat=True)[:50]),
+        # Desde la medianoche: con la misma semilla, el mismo día da las mismas fechas
+        'inicio': (_medianoche(timezone.localdate()) - timedelta(days=dias)).timestamp(),
+        'dias': dias,
+    }
+    marcar('movimientos', generar_movimientos(movimientos, contexto, semilla, procesos, bloque) if movimientos else 0)
+    marcar('saldos', recalcular_saldos(prods['primer_id'], bloque)['productos'])
+    return tiempos
@@ -0,0 +1,366 @@
+# inventario/documentos.py
+"""
+Documentos de movimiento de varias líneas (DocumentoMovimiento + líneas).
+
+El encabezado guarda una vez los datos comunes (tipo, proveedor, bodegas, usuario,
+documento_referencia, observación); cada línea es un MovimientoInventario con
+documento = encabezado y sin observación propia.
+
+registrar_documento() valida y publica todas las líneas en una transacción con las
+mismas reglas que MovimientoInventario.save(), pero en bloque:
+
+  - productos y lotes se bloquean con una consulta cada uno;
+  - stock y costo promedio se calculan en memoria línea a línea (costeo.py) y se
+    guardan con un UPDATE por producto (executemany);
+  - los lotes nuevos se crean con bulk_create y las líneas con bulk_create;
+  - las salidas no pueden exceder el stock del producto y respetan las reservas
+    de stock de otras referencias (reservas.py);
+  - un AJUSTE lleva la cantidad con signo y se suma igual al producto y al lote
+    (como en conteos.py, kardex, saldos y valorización);
+  - el resumen diario se actualiza en bloque y se deja un registro de auditoría.
+
+Las transferencias se delegan a transferencias.registrar_transferencia().
+registrar_documento_una_vez() agrega la idempotencia por clave del cliente
+(idempotencia.py): un reenvío devuelve el documento original.
+"""
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_date
+
+from productos.models import Producto
+from proveedores.models import ProductoProveedor
+from sistema.models import RegistroActividad
+from utils.bulk import bulk_update_valores
+from .costeo import TIPOS_CON_COSTO, costo_neto, nuevo_costo_promedio
+from .idempotencia import ClaveEnConflicto, publicar_una_vez
+from .models import SEPARADOR_BODEGA, DocumentoMovimiento, Lote, MovimientoInventario
+from .reservas import consumir, reservado_por_lote
+from .resumen import registrar_movimientos_en_resumen
+from .transferencias import registrar_transferencia
+
+CERO = Decimal(0)
+MAX_LINEAS = 2000
+
+
+def _id(valor):
+    """Id entero positivo (int o texto de dígitos, como en la API) o None si no es válido."""
+    if isinstance(valor, int) and not isinstance(valor, bool):
+        return valor if valor > 0 else None
+    if isinstance(valor, str) and valor.strip().isdigit():
+        return int(valor) or None
+    return None
+
+
+def _texto(valor):
+    """SKU o código de lote: solo texto (una lista u objeto en el JSON no se busca)."""
+    return valor if isinstance(valor, str) and valor else None
+
+
+def resolver_lineas(filas, tipo=None):
+    """
+    Normaliza líneas {'producto_id' | 'sku', 'lote_id' | 'lote', 'cantidad',
+    'fecha_vencimiento'} a [{'producto_id', 'lote_id', 'cantidad', 'fecha_vencimiento'}],
+    resolviendo SKU y códigos de lote con una consulta cada uno. La cantidad debe ser
+    positiva, salvo en un AJUSTE, que lleva signo (distinta de cero).
+    Devuelve (lineas, errores).
+    """
+    skus = {f.get('sku') for f in filas if not f.get('producto_id') and _texto(f.get('sku'))}
+    codigos = {f.get('lote') for f in filas if not f.get('lote_id') and _texto(f.get('lote'))}
+    por_sku = dict(Producto.objects.filter(sku__in=skus).values_list('sku', 'id')) if skus else {}
+    por_codigo = dict(Lote.objects.filter(codigo__in=codigos).values_list('codigo', 'id')) if codigos else {}
+
+    lineas, errores = [], []
+    for i, fila in enumerate(filas, 1):
+        producto_id = _id(fila.get('producto_id')) if fila.get('producto_id') else por_sku.get(_texto(fila.get('sku')))
+        lote_id = _id(fila.get('lote_id')) if fila.get('lote_id') else por_codigo.get(_texto(fila.get('lote')))
+        try:
+            cantidad = Decimal(str(fila.get('cantidad')))
+        except (InvalidOperation, ValueError):
+            cantidad = None
+        vencimiento = fila.get('fecha_vencimiento') or None
+        if isinstance(vencimiento, str):
+            try:
+                vencimiento = parse_date(vencimiento)
+            except ValueError:
+                # Bien formada pero inexistente (2024-02-30): se informa como inválida
+                vencimiento = None
+        elif not isinstance(vencimiento, (date, type(None))):
+            vencimiento = None
+
+        if fila.get('producto_id') and producto_id is None:
+            errores.append(f"Línea {i}: producto_id inválido ({fila.get('producto_id')}).")
+        elif not producto_id:
+            errores.append(f"Línea {i}: producto no encontrado ({fila.get('sku') or fila.get('producto_id')}).")
+        elif fila.get('lote_id') and lote_id is None:
+            errores.append(f"Línea {i}: lote_id inválido ({fila.get('lote_id')}).")
+        elif fila.get('lote') and not lote_id:
+            errores.append(f"Línea {i}: lote {fila.get('lote')} no encontrado.")
+        elif cantidad is None or not cantidad.is_finite() or (cantidad == 0 if tipo == 'AJUSTE' else cantidad <= 0):
+            errores.append(
+                f"Línea {i}: la cantidad del ajuste debe ser distinta de cero." if tipo == 'AJUSTE'
+                else f"Línea {i}: la cantidad debe ser mayor que cero."
+            )
+        elif fila.get('fecha_vencimiento') and vencimiento is None:
+            errores.append(f"Línea {i}: fecha de vencimiento inválida (AAAA-MM-DD).")
+        else:
+            lineas.append({
+                'producto_id': producto_id,
+                'lote_id': lote_id,
+                'cantidad': cantidad,
+                'fecha_vencimiento': vencimiento,
+            })
+    return lineas, errores
+
+
+def _costos_proveedor(proveedor_id, producto_ids):
+    """{producto_id: costo neto} del proveedor del documento, una consulta."""
+    if not proveedor_id:
+        return {}
+    return {
+        prod: costo_neto(costo, desc)
+        for prod, costo, desc in ProductoProveedor.objects
+        .filter(proveedor_id=proveedor_id, producto_id__in=producto_ids)
+        .values_list('producto_id', 'costo', 'descuento_pct')
+    }
+
+
+def _siguientes_numeros_lote(productos):
+    """
+    {producto_id: siguiente correlativo} con la misma regla que Lote.generar_codigo(),
+    para varios productos en dos consultas.
+    """
+    ultimos = (
+        Lote.objects
+        .filter(producto_id__in=[p.pk for p in productos])
+        .exclude(codigo__contains=SEPARADOR_BODEGA)
+        .values('producto_id')
+        .annotate(ultimo=Max('id'))
+        .values_list('ultimo', flat=True)
+    )
+    codigos = dict(Lote.objects.filter(pk__in=list(ultimos)).values_list('producto_id', 'codigo'))
+    siguientes = {}
+    for p in productos:
+        base = f"LOT-{p.sku}-"
+        codigo = codigos.get(p.pk)
+        try:
+            siguientes[p.pk] = int(codigo.replace(base, '')) + 1 if codigo else 1
+        except ValueError:
+            siguientes[p.pk] = 1
+    return siguientes
+
+
+def _validar_linea(i, tipo, linea, producto, lote):
+    """Reglas de MovimientoInventarioForm.clean() para una línea. Devuelve el error o None."""
+    if producto is None:
+        return f"Línea {i}: producto no encontrado."
+    if linea['lote_id'] and lote is None:
+        return f"Línea {i}: lote no encontrado."
+    if lote is not None and lote.producto_id != producto.pk:
+        return f"Línea {i}: el lote {lote.codigo} no corresponde a {producto.sku}."
+    if producto.control_por_lote:
+        if tipo in ('SALIDA', 'AJUSTE') and lote is None:
+            return f"Línea {i}: {producto.sku} se controla por lote, debe indicar el lote."
+        if tipo in TIPOS_CON_COSTO and producto.perishable and not linea['fecha_vencimiento'] and lote is None:
+            return f"Línea {i}: {producto.sku} es perecible, indique vencimiento o un lote existente."
+    elif producto.perishable and not linea['fecha_vencimiento']:
+        return f"Línea {i}: {producto.sku} es perecible, indique la fecha de vencimiento."
+    return None
+
+
+def _registrar_lineas(documento, lineas):
+    tipo = documento.tipo
+    bodega = documento.bodega_destino or documento.bodega_origen
+
+    # Mismo orden de bloqueo que MovimientoInventario.save(): producto y luego lotes
+    productos = Producto.objects.select_for_update().in_bulk(sorted({l['producto_id'] for l in lineas}))
+    lotes = Lote.objects.select_for_update().in_bulk(sorted({l['lote_id'] for l in lineas if l['lote_id']}))
+
+    errores = []
+    for i, linea in enumerate(lineas, 1):
+        error = _validar_linea(
+            i, tipo, linea, productos.get(linea['producto_id']),
+            lotes.get(linea['lote_id']) if linea['lote_id'] else None,
+        )
+        if error:
+            errores.append(error)
+    if errores:
+        raise ValidationError(errores)
+
+    costos = {}
+    if tipo in TIPOS_CON_COSTO:
+        costos = _costos_proveedor(documento.proveedor_id, list(productos))
+
+    # Lotes nuevos (ingresos sin lote de productos con control por lote)
+    sin_lote = [
+        l for l in lineas
+        if tipo in TIPOS_CON_COSTO and not l['lote_id'] and productos[l['producto_id']].control_por_lote
+    ]
+    if sin_lote:
+        numeros = _siguientes_numeros_lote([productos[pk] for pk in {l['producto_id'] for l in sin_lote}])
+        nuevos = []
+        for linea in sin_lote:
+            producto = productos[linea['producto_id']]
+            codigo = f"LOT-{producto.sku}-{numeros[producto.pk]:04d}"
+            numeros[producto.pk] += 1
+            nuevos.append(Lote(
+                codigo=codigo, producto=producto, bodega=bodega,
+                cantidad_inicial=CERO, cantidad_disponible=CERO,
+                fecha_vencimiento=linea['fecha_vencimiento'],
+            ))
+            linea['lote_codigo'] = codigo
+        Lote.objects.bulk_create(nuevos)
+        # bulk_create no devuelve los id en todos los motores: se releen por código
+        creados = Lote.objects.select_for_update().in_bulk([n.codigo for n in nuevos], field_name='codigo')
+        for linea in sin_lote:
+            lote = creados[linea.pop('lote_codigo')]
+            linea['lote_id'] = lote.pk
+            lotes[lote.pk] = lote
+
+    # Las salidas respetan las reservas vigentes de otras referencias (reservas.py)
+    reservado, consumido = {}, defaultdict(Decimal)
+    if tipo not in TIPOS_CON_COSTO:
+        reservado = reservado_por_lote(
+            [l['lote_id'] for l in lineas if l['lote_id']],
+            excluir_referencia=documento.documento_referencia,
+        )
+
+    # Stock, costo promedio y lotes en memoria, línea a línea (como save())
+    movimientos, lotes_cambiados = [], {}
+    for i, linea in enumerate(lineas, 1):
+        producto = productos[linea['producto_id']]
+        cantidad = linea['cantidad']
+        lote = lotes.get(linea['lote_id']) if linea['lote_id'] else None
+        costo_unitario = None
+
+        if tipo in TIPOS_CON_COSTO:
+            costo_unitario = costos.get(producto.pk, producto.costo_estandar)
+            producto.costo_promedio = nuevo_costo_promedio(
+                producto.stock_actual, producto.costo_promedio, cantidad, costo_unitario
+            )
+            producto.stock_actual += cantidad
+        elif tipo == 'SALIDA':
+            if cantidad > producto.stock_actual:
+                errores.append(
+                    f"Línea {i}: no hay stock suficiente de {producto.sku} "
+                    f"(Disponible: {producto.stock_actual}, requerido: {cantidad})"
+                )
+                continue
+            producto.stock_actual -= cantidad
+        elif tipo == 'AJUSTE':
+            # Con signo: el producto y el lote suben o bajan en la misma cantidad
+            if producto.stock_actual + cantidad < 0:
+                errores.append(
+                    f"Línea {i}: el ajuste deja en negativo el stock de {producto.sku} "
+                    f"(Disponible: {producto.stock_actual})"
+                )
+                continue
+            producto.stock_actual += cantidad
+
+        if producto.control_por_lote and lote is not None:
+            if tipo in TIPOS_CON_COSTO:
+                lote.cantidad_inicial += cantidad
+                lote.cantidad_disponible += cantidad
+            elif tipo == 'AJUSTE' and cantidad > 0:
+                lote.cantidad_disponible += cantidad
+            else:
+                retiro = -cantidad if tipo == 'AJUSTE' else cantidad
+                libre = lote.cantidad_disponible - reservado.get(lote.pk, CERO)
+                if libre < retiro:
+                    errores.append(
+                        f"Línea {i}: no hay stock suficiente en lote {lote.codigo} "
+                        f"(Disponible: {libre}, requerido: {retiro})"
+                    )
+                    continue
+                lote.cantidad_disponible -= retiro
+                consumido[lote.pk] += retiro
+            lotes_cambiados[lote.pk] = lote
+
+        movimientos.append(MovimientoInventario(
+            tipo=tipo,
+            producto=producto,
+            proveedor_id=documento.proveedor_id,
+            bodega_origen_id=documento.bodega_origen_id,
+            bodega_destino_id=documento.bodega_destino_id,
+            cantidad=cantidad,
+            costo_unitario=costo_unitario,
+            lote=lote,
+            fecha_vencimiento=linea['fecha_vencimiento'],
+            usuario_id=documento.usuario_id,
+            documento_referencia=documento.documento_referencia,
+            documento=documento,
+        ))
+    if errores:
+        raise ValidationError(errores)
+
+    bulk_update_valores(Producto, list(productos.values()), ['stock_actual', 'costo_promedio'])
+    bulk_update_valores(Lote, list(lotes_cambiados.values()), ['cantidad_inicial', 'cantidad_disponible'])
+    consumir(consumido, documento.documento_referencia)
+    MovimientoInventario.objects.bulk_create(movimientos)
+    registrar_movimientos_en_resumen(movimientos)
+
+    if documento.usuario_id:
+        RegistroActividad.objects.create(
+            usuario_id=documento.usuario_id,
+            descripcion=f"{documento}: {len(movimientos)} líneas",
+            modelo='DocumentoMovimiento',
+            objeto_id=documento.pk,
+        )
+    return movimientos
+
+
+def registrar_documento(documento, lineas):
+    """
+    Guarda el encabezado (DocumentoMovimiento sin guardar) y publica sus líneas
+    [{'producto_id', 'lote_id', 'cantidad', 'fecha_vencimiento'}] en una
+    transacción: todas o ninguna (ValidationError con un mensaje por línea).
+    Devuelve los MovimientoInventario creados.
+    """
+    if not lineas:
+        raise ValidationError("El documento no tiene líneas.")
+    if len(lineas) > MAX_LINEAS:
+        raise ValidationError(f"Un documento admite hasta {MAX_LINEAS} líneas.")
+
+    with transaction.atomic():
+        documento.total_lineas = len(lineas)
+        documento.save()
+        if documento.tipo == 'TRANSFERENCIA':
+            return registrar_transferencia(
+                documento.bodega_origen, documento.bodega_destino, lineas,
+                usuario=documento.usuario,
+                documento_referencia=documento.documento_referencia,
+                observacion=documento.observacion,
+                documento=documento,
+            )
+        return _registrar_lineas(documento, lineas)
+
+
+def conflicto_de_clave(original, documento):
+    """Motivo por el que `original` (misma clave) no es un reenvío de `documento`, o None."""
+    if original.tipo != documento.tipo:
+        return "La clave de idempotencia ya se usó en un documento de otro tipo."
+    if (original.bodega_origen_id, original.bodega_destino_id) != (documento.bodega_origen_id, documento.bodega_destino_id):
+        return "La clave de idempotencia ya se usó en un documento de otras bodegas."
+    return None
+
+
+def registrar_documento_una_vez(documento, lineas):
+    """
+    registrar_documento() idempotente por documento.clave_idempotencia.
+    Devuelve (documento, creado); si la clave ya existía, el documento original
+    y creado=False, sin tocar el stock; ClaveEnConflicto si la clave es de otro documento.
+    """
+    def publicar():
+        registrar_documento(documento, lineas)
+        return documento
+
+    original, creado = publicar_una_vez(DocumentoMovimiento, documento.clave_idempotencia, publicar)
+    if not creado:
+        conflicto = conflicto_de_clave(original, documento)
+        if conflicto:
+            raise ClaveEnConflicto(conflicto)
+    return original, creado
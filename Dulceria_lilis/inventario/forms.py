@@ -2,7 +2,16 @@
 from django import forms
 from django.utils import timezone
 from productos.models import Producto
-from .models import MovimientoInventario, Lote
+from .idempotencia import LARGO_CLAVE, nueva_clave
+from .models import Bodega, ConteoInventario, DocumentoMovimiento, MovimientoInventario, Lote
+
+
+def campo_clave_idempotencia():
+    # Clave nueva en cada formulario mostrado; un reenvío (doble clic, F5) trae la misma
+    return forms.CharField(
+        required=False, max_length=LARGO_CLAVE,
+        initial=nueva_clave, widget=forms.HiddenInput,
+    )
 
 
 class MovimientoInventarioForm(forms.ModelForm):
@@ -16,6 +25,7 @@ class MovimientoInventarioForm(forms.ModelForm):
             format='%d-%m-%Y %H:%M:%S'
         )
     )
+    clave_idempotencia = campo_clave_idempotencia()
 
     # PRODUCTO: se llena por proveedor (AJAX) – al inicio vacío
     producto = forms.ModelChoiceField(
@@ -105,8 +115,8 @@ class MovimientoInventarioForm(forms.ModelForm):
 
     def clean_cantidad(self):
         cantidad = self.cleaned_data.get('cantidad')
-        if cantidad is None or cantidad <= 0:
-            raise forms.ValidationError("La cantidad debe ser mayor que cero.")
+        if cantidad is None or cantidad == 0:
+            raise forms.ValidationError("La cantidad debe ser distinta de cero.")
         return cantidad
 
     def clean(self):
@@ -114,7 +124,12 @@ class MovimientoInventarioForm(forms.ModelForm):
         tipo = cleaned_data.get('tipo')
         origen = cleaned_data.get('bodega_origen')
         destino = cleaned_data.get('bodega_destino')
+        cantidad = cleaned_data.get('cantidad')
         producto = cleaned_data.get('producto')
+
+        # Solo el AJUSTE lleva signo (+ sube el stock, - lo baja)
+        if cantidad is not None and cantidad < 0 and tipo != 'AJUSTE':
+            self.add_error('cantidad', "La cantidad debe ser mayor que cero.")
         lote = cleaned_data.get('lote')
         fecha_vencimiento = cleaned_data.get('fecha_vencimiento')
 
@@ -153,3 +168,124 @@ class MovimientoInventarioForm(forms.ModelForm):
                 )
 
         return cleaned_data
+
+
+# ---------------- DOCUMENTOS DE VARIAS LÍNEAS ----------------
+
+class TransferenciaForm(forms.Form):
+    clave_idempotencia = campo_clave_idempotencia()
+    bodega_origen = forms.ModelChoiceField(
+        queryset=Bodega.objects.order_by('codigo'),
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        error_messages={'required': 'Seleccione la bodega de origen.'},
+    )
+    bodega_destino = forms.ModelChoiceField(
+        queryset=Bodega.objects.order_by('codigo'),
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        error_messages={'required': 'Seleccione la bodega de destino.'},
+    )
+    documento_referencia = forms.CharField(
+        max_length=100, required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Ej: GUIA-1234'}),
+    )
+    observacion = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        origen = cleaned_data.get('bodega_origen')
+        destino = cleaned_data.get('bodega_destino')
+        if origen and destino and origen == destino:
+            self.add_error('bodega_destino', "La bodega destino no puede ser igual a la de origen.")
+        return cleaned_data
+
+
+class DocumentoMovimientoForm(forms.ModelForm):
+    clave_idempotencia = campo_clave_idempotencia()
+
+    class Meta:
+        model = DocumentoMovimiento
+        fields = ['tipo', 'proveedor', 'bodega_origen', 'bodega_destino', 'documento_referencia', 'observacion']
+        widgets = {
+            'tipo': forms.Select(attrs={'class': 'form-select'}),
+            'proveedor': forms.Select(attrs={'class': 'form-select'}),
+            'bodega_origen': forms.Select(attrs={'class': 'form-select'}),
+            'bodega_destino': forms.Select(attrs={'class': 'form-select'}),
+            'documento_referencia': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Ej: GUIA-1234'}),
+            'observacion': forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
+        }
+        error_messages = {
+            'tipo': {'required': 'Por favor seleccione un tipo de movimiento.'},
+        }
+
+    def clean(self):
+        cleaned_data = super().clean()
+        tipo = cleaned_data.get('tipo')
+        origen = cleaned_data.get('bodega_origen')
+        destino = cleaned_data.get('bodega_destino')
+
+        if tipo == 'TRANSFERENCIA':
+            if not origen:
+                self.add_error('bodega_origen', "Debe seleccionar una bodega de origen.")
+            if not destino:
+                self.add_error('bodega_destino', "Debe seleccionar una bodega de destino.")
+            if origen and destino and origen == destino:
+                self.add_error('bodega_destino', "La bodega destino no puede ser igual a la de origen.")
+        return cleaned_data
+
+
+class LineaDocumentoForm(forms.Form):
+    # Texto (SKU / código de lote) para poder cargar con lector de código de barras
+    sku = forms.CharField(max_length=50, widget=forms.TextInput(attrs={'class': 'form-control form-control-sm'}))
+    lote = forms.CharField(max_length=120, required=False, widget=forms.TextInput(attrs={'class': 'form-control form-control-sm'}))
+    # Con signo solo en un AJUSTE: lo valida resolver_lineas() según el tipo del documento
+    cantidad = forms.DecimalField(
+        max_digits=12, decimal_places=2,
+        widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm', 'step': '0.01'}),
+    )
+    fecha_vencimiento = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control form-control-sm', 'type': 'date'}),
+    )
+
+
+LineaDocumentoFormSet = forms.formset_factory(LineaDocumentoForm, extra=5, min_num=1, validate_min=True)
+
+
+class ConteoForm(forms.ModelForm):
+    categoria = forms.ChoiceField(required=False, widget=forms.Select(attrs={'class': 'form-select'}))
+
+    class Meta:
+        model = ConteoInventario
+        fields = ['bodega', 'categoria', 'observacion']
+        widgets = {
+            'bodega': forms.Select(attrs={'class': 'form-select'}),
+            'observacion': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Ej: Conteo pasillo 3'}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        categorias = Producto.objects.order_by('categoria').values_list('categoria', flat=True).distinct()
+        self.fields['categoria'].choices = [('', 'Todas las categorías')] + [(c, c) for c in categorias]
+
+
+class CargaConteoForm(forms.Form):
+    archivo = forms.FileField(
+        required=False,
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'}),
+    )
+    codigos = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={
+            'class': 'form-control', 'rows': 4,
+            'placeholder': 'Escanee los códigos (EAN o SKU), uno por línea',
+        }),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('archivo') and not (cleaned_data.get('codigos') or '').strip():
+            raise forms.ValidationError("Suba un archivo CSV/XLSX o escanee códigos.")
+        return cleaned_data
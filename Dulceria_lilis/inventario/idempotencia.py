@@ -0,0 +1,73 @@
+# inventario/idempotencia.py
+"""
+Claves de idempotencia para publicar movimientos.
+
+Escáneres, clientes de la API y formularios reenvían el mismo POST ante cortes
+de red o doble clic. Cada publicación puede traer una clave única
+(clave_idempotencia); si la clave ya se usó, se devuelve el registro original
+sin volver a tocar el stock:
+
+  - MovimientoInventario.clave_idempotencia: movimientos de una línea (formulario).
+  - DocumentoMovimiento.clave_idempotencia: documentos de varias líneas (API y
+    formularios). El documento se publica entero o nada, así que la clave del
+    encabezado cubre todas sus líneas.
+
+La búsqueda previa usa el índice único. Si dos envíos concurrentes pasan la
+búsqueda a la vez, el INSERT del segundo falla por la restricción única, su
+transacción se revierte (stock incluido) y se devuelve el registro del primero.
+Una clave reutilizada para otra operación (otro tipo u otras bodegas) no es un
+reenvío: se rechaza con ClaveEnConflicto en vez de devolver el registro ajeno.
+"""
+import re
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+
+LARGO_CLAVE = 64
+FORMATO_CLAVE = re.compile(r'^[\w.:@/+=-]{1,%d}$' % LARGO_CLAVE)
+
+
+class ClaveEnConflicto(ValidationError):
+    """La clave ya se usó en un registro que no corresponde a este envío (la API responde 409)."""
+
+
+def nueva_clave():
+    return uuid.uuid4().hex
+
+
+def normalizar_clave(valor):
+    """Clave recibida del cliente, sin espacios extremos; None si viene vacía."""
+    if valor in (None, ''):
+        return None
+    valor = str(valor).strip()
+    if not FORMATO_CLAVE.match(valor):
+        raise ValidationError(
+            f"Clave de idempotencia inválida (hasta {LARGO_CLAVE} caracteres, sin espacios)."
+        )
+    return valor
+
+
+def buscar_por_clave(modelo, clave):
+    if not clave:
+        return None
+    return modelo.objects.filter(clave_idempotencia=clave).first()
+
+
+def publicar_una_vez(modelo, clave, publicar):
+    """
+    Ejecuta publicar() (que guarda y devuelve un `modelo` con esa clave) salvo
+    que la clave ya exista. Devuelve (objeto, creado): el objeto recién publicado
+    o el original de la clave.
+    """
+    existente = buscar_por_clave(modelo, clave)
+    if existente is not None:
+        return existente, False
+    try:
+        return publicar(), True
+    except IntegrityError:
+        # Envío concurrente con la misma clave: ganó el otro
+        existente = buscar_por_clave(modelo, clave)
+        if existente is None:
+            raise
+        return existente, False
@@ -0,0 +1,154 @@
+# inventario/kardex.py
+"""
+Kardex (tarjeta de existencias) por producto y, opcionalmente, por bodega.
+
+Cada movimiento aporta una variación (delta) calculada en SQL:
+
+  INGRESO / DEVOLUCION / AJUSTE   +cantidad en bodega_destino (u origen)
+  SALIDA                          -cantidad en bodega_origen (o destino)
+  TRANSFERENCIA                   -cantidad en origen, +cantidad en destino
+                                  (a nivel producto no cambia el total; ver saldos.py)
+
+El saldo del producto (sin bodega) coincide con Producto.stock_actual: una SALIDA
+que excede el stock se rechaza en vez de recortar el stock a 0.
+
+Una página = saldo de apertura + suma acumulada (función de ventana) de los
+movimientos de la página. El saldo de apertura parte del CierreSaldo más cercano
+anterior y suma solo los movimientos posteriores a ese cierre, así el costo no
+depende del largo del historial. La paginación es por keyset (fecha, id).
+"""
+import base64
+import json
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When, Window
+from django.utils.dateparse import parse_datetime
+
+from .models import MovimientoInventario, SaldoInventario
+from .saldos import cierre_anterior
+
+LIMITE = 100
+LIMITE_MAX = 1000
+ENTRADAS = ('INGRESO', 'DEVOLUCION', 'AJUSTE')
+CERO = Decimal(0)
+
+_DECIMAL = DecimalField(max_digits=14, decimal_places=2)
+
+
+def expresion_delta(bodega_id=None):
+    """Variación de stock del movimiento (para todo el producto o para una bodega)."""
+    if bodega_id is None:
+        return Case(
+            When(tipo__in=ENTRADAS, then=F('cantidad')),
+            When(tipo='SALIDA', then=-F('cantidad')),
+            default=Value(CERO),
+            output_field=_DECIMAL,
+        )
+    en_destino = Q(bodega_destino_id=bodega_id) | Q(bodega_destino__isnull=True, bodega_origen_id=bodega_id)
+    en_origen = Q(bodega_origen_id=bodega_id) | Q(bodega_origen__isnull=True, bodega_destino_id=bodega_id)
+    return Case(
+        When(Q(tipo__in=ENTRADAS) & en_destino, then=F('cantidad')),
+        When(Q(tipo='SALIDA') & en_origen, then=-F('cantidad')),
+        When(tipo='TRANSFERENCIA', bodega_origen_id=bodega_id, bodega_destino_id=bodega_id, then=Value(CERO)),
+        When(tipo='TRANSFERENCIA', bodega_origen_id=bodega_id, bodega_destino__isnull=False, then=-F('cantidad')),
+        When(tipo='TRANSFERENCIA', bodega_destino_id=bodega_id, bodega_origen__isnull=False, then=F('cantidad')),
+        default=Value(CERO),
+        output_field=_DECIMAL,
+    )
+
+
+def movimientos_kardex(producto_id, bodega_id=None):
+    qs = MovimientoInventario.objects.filter(producto_id=producto_id)
+    if bodega_id is not None:
+        qs = qs.filter(Q(bodega_origen_id=bodega_id) | Q(bodega_destino_id=bodega_id))
+    return qs
+
+
+def saldo(producto_id, bodega_id=None, antes=None, hasta_id=None):
+    """
+    Saldo de los movimientos anteriores a `antes` (o todos si es None).
+    Con hasta_id se incluyen además los de fecha == antes e id <= hasta_id (posición keyset).
+    """
+    movimientos = movimientos_kardex(producto_id, bodega_id)
+    base = CERO
+
+    cierre = cierre_anterior(antes)
+    if cierre is not None:
+        fotos = SaldoInventario.objects.filter(cierre=cierre, producto_id=producto_id)
+        if bodega_id is not None:
+            fotos = fotos.filter(bodega_id=bodega_id)
+        base = fotos.aggregate(t=Sum('cantidad'))['t'] or CERO
+        movimientos = movimientos.filter(fecha__gte=cierre.corte)
+
+    if antes is not None:
+        limite = Q(fecha__lt=antes)
+        if hasta_id is not None:
+            limite |= Q(fecha=antes, id__lte=hasta_id)
+        movimientos = movimientos.filter(limite)
+
+    delta = movimientos.aggregate(t=Sum(expresion_delta(bodega_id)))['t'] or CERO
+    return base + delta
+
+
+def pagina_kardex(producto_id, bodega_id=None, desde=None, hasta=None, despues=None, limite=LIMITE):
+    """
+    Una página del kardex.
+    desde / hasta: instantes (aware) del rango; despues: (fecha, id) del último
+    movimiento de la página anterior. Devuelve {'apertura', 'filas', 'siguiente'}.
+    """
+    qs = movimientos_kardex(producto_id, bodega_id)
+    if hasta is not None:
+        qs = qs.filter(fecha__lt=hasta)
+
+    if despues is not None:
+        fecha, pk = despues
+        qs = qs.filter(Q(fecha__gt=fecha) | Q(fecha=fecha, id__gt=pk))
+        apertura = saldo(producto_id, bodega_id, fecha, pk)
+    elif desde is not None:
+        qs = qs.filter(fecha__gte=desde)
+        apertura = saldo(producto_id, bodega_id, desde)
+    else:
+        apertura = CERO
+
+    ids = list(qs.order_by('fecha', 'id').values_list('id', flat=True)[:limite + 1])
+    hay_mas = len(ids) > limite
+    ids = ids[:limite]
+
+    delta = expresion_delta(bodega_id)
+    filas = list(
+        MovimientoInventario.objects
+        .filter(id__in=ids)
+        .annotate(
+            delta=delta,
+            acumulado=Window(Sum(delta), order_by=[F('fecha').asc(), F('id').asc()]),
+        )
+        .order_by('fecha', 'id')
+        .values(
+            'id', 'fecha', 'tipo', 'cantidad', 'delta', 'acumulado', 'documento_referencia',
+            'bodega_origen__codigo', 'bodega_destino__codigo', 'lote__codigo', 'usuario__username',
+        )
+    )
+    for fila in filas:
+        fila['saldo'] = apertura + (fila.pop('acumulado') or CERO)
+
+    siguiente = (filas[-1]['fecha'], filas[-1]['id']) if hay_mas and filas else None
+    return {'apertura': apertura, 'filas': filas, 'siguiente': siguiente}
+
+
+def codificar_posicion(posicion):
+    fecha, pk = posicion
+    texto = json.dumps([fecha.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode()).decode()
+
+
+def decodificar_posicion(texto):
+    """Inverso de codificar_posicion(). ValueError si el cursor no es válido."""
+    try:
+        fecha, pk = json.loads(base64.urlsafe_b64decode(texto.encode()).decode())
+        fecha = parse_datetime(fecha)
+        pk = int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError("Cursor inválido.")
+    if fecha is None:
+        raise ValueError("Cursor inválido.")
+    return fecha, pk
@@ -0,0 +1,72 @@
+# inventario/management/commands/benchmark_valorizacion.py
+"""
+Benchmark de la valorización FIFO sobre un historial sintético.
+Crea una base desechable (la base de pruebas de Django: test_<nombre>, o un
+archivo temporal en SQLite), genera el historial con inventario/datos_prueba.py
+(saldos consistentes, misma semilla = mismos datos), mide el cálculo con 1..P
+procesos y destruye la base al terminar. La base configurada no se toca.
+Los procesos del pool se crean con fork y heredan la configuración de la base desechable.
+Ejecutar:
+python manage.py benchmark_valorizacion --movimientos 1000000 --procesos 1,2,4
+"""
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from inventario.datos_prueba import generar
+from inventario.valorizacion import calcular_valorizacion
+
+
+class Command(BaseCommand):
+    help = 'Mide la valorización FIFO sobre un historial sintético en una base desechable'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movimientos', type=int, default=1_000_000)
+        parser.add_argument('--productos', type=int, default=5000, help='Productos a generar.')
+        parser.add_argument('--procesos', type=str, default='1,2,4', help='Lista de procesos a medir.')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--conservar', action='store_true',
+                            help='No destruye la base desechable al terminar (para inspeccionarla).')
+
+    def handle(self, *args, **options):
+        procesos = [int(p) for p in options['procesos'].split(',')]
+        conexion = connections['default']
+        nombre_original = conexion.settings_dict['NAME']
+        if conexion.vendor == 'sqlite' and not conexion.settings_dict.get('TEST', {}).get('NAME'):
+            # La base de pruebas de SQLite es en memoria: los procesos del pool no la verían
+            conexion.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(
+                tempfile.gettempdir(), 'benchmark_valorizacion.sqlite3'
+            )
+        conexion.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.stdout.write(f"  Base desechable: {conexion.settings_dict['NAME']}")
+            self._medir(options, procesos)
+        finally:
+            if not options['conservar']:
+                conexion.creation.destroy_test_db(nombre_original, verbosity=0)
+
+    def _medir(self, options, procesos):
+        n = options['movimientos']
+        inicio = time.perf_counter()
+        generar(
+            productos=options['productos'], proveedores=max(1, options['productos'] // 20), movimientos=n,
+            semilla=options['semilla'], procesos=max(procesos),
+        )
+        self.stdout.write(f'  {n:,} movimientos generados en {time.perf_counter() - inicio:.1f}s')
+
+        corte = timezone.localdate()
+        for p in procesos:
+            inicio = time.perf_counter()
+            filas = movimientos = 0
+            for f, m in calcular_valorizacion(corte, procesos=p):
+                filas += len(f)
+                movimientos += m
+            dur = time.perf_counter() - inicio
+            self.stdout.write(
+                f'  {p} proceso(s): {movimientos:,} movimientos → {filas:,} filas '
+                f'en {dur:.2f}s ({movimientos / dur:,.0f} mov/s)'
+            )
@@ -0,0 +1,43 @@
+# inventario/management/commands/calcular_pronostico.py
+"""
+Calcula el pronóstico de demanda y el punto de reorden sugerido por producto,
+procesando solo los días nuevos desde la última corrida (pensado para cron nocturno).
+Ejecutar:
+python manage.py calcular_pronostico
+python manage.py calcular_pronostico --aplicar     # copia el sugerido a Producto.punto_reorden
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from inventario.pronostico import aplicar_puntos_reorden, calcular_pronosticos
+
+
+class Command(BaseCommand):
+    help = 'Pronóstico de demanda (SALIDAS) y punto de reorden sugerido, incremental'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hasta', type=str, default=None, help='Último día a procesar (AAAA-MM-DD). Por defecto: ayer.')
+        parser.add_argument('--aplicar', action='store_true', help='Actualiza Producto.punto_reorden con el sugerido.')
+
+    def handle(self, *args, **options):
+        hasta = None
+        if options['hasta']:
+            try:
+                hasta = parse_date(options['hasta'])
+            except ValueError:
+                hasta = None
+            if hasta is None:
+                raise CommandError('Fecha inválida. Use AAAA-MM-DD.')
+
+        ejecucion = calcular_pronosticos(hasta)
+        if ejecucion is None:
+            self.stdout.write(self.style.WARNING('No hay días nuevos que procesar.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Pronóstico {ejecucion.desde} → {ejecucion.hasta}: '
+                f'{ejecucion.productos} productos en {ejecucion.duracion_segundos:.1f}s'
+            ))
+
+        if options['aplicar']:
+            total = aplicar_puntos_reorden()
+            self.stdout.write(self.style.SUCCESS(f'Punto de reorden actualizado en {total} productos.'))
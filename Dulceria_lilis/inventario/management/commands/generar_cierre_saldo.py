@@ -0,0 +1,45 @@
+# inventario/management/commands/generar_cierre_saldo.py
+"""
+Genera una foto del saldo de stock por (producto, bodega, lote).
+Pensado para cron: solo crea el cierre si pasó CIERRE_SALDO_INTERVALO_HORAS
+desde el último (salvo --forzar).
+Ejecutar:
+python manage.py generar_cierre_saldo
+python manage.py generar_cierre_saldo --corte 2025-03-31     # fin del día indicado
+python manage.py generar_cierre_saldo --forzar
+"""
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from inventario.saldos import cierre_corresponde, generar_cierre
+
+
+class Command(BaseCommand):
+    help = 'Foto periódica del saldo de stock por producto, bodega y lote'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corte', type=str, default=None, help='Día (AAAA-MM-DD) cuyo cierre se genera. Por defecto: ahora.')
+        parser.add_argument('--forzar', action='store_true', help='Genera aunque no haya pasado el intervalo.')
+
+    def handle(self, *args, **options):
+        corte = None
+        if options['corte']:
+            try:
+                dia = parse_date(options['corte'])
+            except ValueError:
+                dia = None
+            if dia is None:
+                raise CommandError('Fecha inválida. Use AAAA-MM-DD.')
+            corte = timezone.make_aware(datetime.combine(dia + timedelta(days=1), time.min))
+        elif not options['forzar'] and not cierre_corresponde():
+            self.stdout.write(self.style.WARNING('Aún no corresponde un nuevo cierre.'))
+            return
+
+        cierre = generar_cierre(corte)
+        self.stdout.write(self.style.SUCCESS(
+            f'Cierre al {timezone.localtime(cierre.corte):%Y-%m-%d %H:%M}: '
+            f'{cierre.filas} saldos en {cierre.duracion_segundos:.1f}s'
+        ))
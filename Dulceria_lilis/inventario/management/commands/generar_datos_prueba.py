@@ -7,19 +7,27 @@ Genera:
 SIN NINGÚN ERROR (lotes únicos, bodega automática, ignora conflictos)
 Ejecutar:
 python manage.py generar_datos_prueba
+
+Modo masivo (--masivo, ver inventario/datos_prueba.py): millones de filas con
+generación vectorizada y semilla fija, sin Faker ni save() por fila. Los saldos
+(stock_actual y lotes) se recalculan al final desde los movimientos.
+python manage.py generar_datos_prueba --masivo --productos 1000000 --movimientos 10000000 --procesos 4 --semilla 7
 """
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from productos.models import Producto
 from proveedores.models import Proveedor, ProductoProveedor
 from inventario.models import MovimientoInventario, Bodega, Lote
 from usuarios.models import Usuario
-from faker import Faker
 import random
+import time as reloj
+from datetime import timedelta
 from decimal import Decimal
 
-fake = Faker('es_CL')
+from django.utils import timezone
+
+fake = None
 
 class Command(BaseCommand):
     help = 'GENERA DATOS MASIVOS – Versión 100% funcional para Dulcería Lili'
@@ -28,8 +36,30 @@ class Command(BaseCommand):
         parser.add_argument('--productos', type=int, default=10000)
         parser.add_argument('--proveedores', type=int, default=5000)
         parser.add_argument('--movimientos', type=int, default=15000)
+        parser.add_argument('--masivo', action='store_true',
+                            help='Generación vectorizada por bloques (millones de filas)')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla del generador (modo masivo)')
+        parser.add_argument('--procesos', type=int, default=1,
+                            help='Procesos que generan movimientos en paralelo (modo masivo)')
+        parser.add_argument('--bloque', type=int, default=50000, help='Filas por INSERT (modo masivo)')
+        parser.add_argument('--lotes-por-producto', type=int, default=3,
+                            help='Lotes por producto con control por lote (modo masivo)')
+        parser.add_argument('--dias', type=int, default=365,
+                            help='Días hacia atrás que cubren los movimientos (modo masivo)')
+        parser.add_argument('--sin-derivados', action='store_true',
+                            help='No reconstruir el resumen diario ni los costos (modo masivo)')
 
     def handle(self, *args, **options):
+        if options['masivo']:
+            return self.generar_masivo(options)
+
+        global fake
+        try:
+            from faker import Faker
+        except ImportError:
+            raise CommandError('El modo clásico necesita Faker (pip install Faker); use --masivo.')
+        fake = Faker('es_CL')
+
         self.stdout.write(self.style.WARNING('INICIANDO GENERACIÓN MASIVA – DULCERÍA LILI'))
 
         # === 1. PRODUCTOS ===
@@ -55,6 +85,41 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS('10.000 productos ✓ | 5.000 proveedores ✓ | 15.000 movimientos ✓'))
         self.stdout.write(self.style.SUCCESS('AHORA SACÁ LAS CAPTURAS Y ENTREGÁ EL 7.0'))
 
+    def generar_masivo(self, options):
+        from inventario import costeo, datos_prueba, resumen
+
+        if options['procesos'] < 1 or options['bloque'] < 1 or options['lotes_por_producto'] < 1:
+            raise CommandError('--procesos, --bloque y --lotes-por-producto deben ser mayores que 0.')
+
+        self.stdout.write(self.style.WARNING(
+            f"Generación masiva (semilla {options['semilla']}, {options['procesos']} proceso(s))"
+        ))
+        desde = (timezone.now() - timedelta(days=options['dias'] + 1)).date()
+
+        def avance(etapa, filas, segundos):
+            self.stdout.write(f"  {etapa:<12} {filas:>12,} filas  {segundos:8.1f}s")
+
+        inicio = reloj.perf_counter()
+        datos_prueba.generar(
+            productos=options['productos'],
+            proveedores=options['proveedores'],
+            movimientos=options['movimientos'],
+            lotes_por_producto=options['lotes_por_producto'],
+            dias=options['dias'],
+            semilla=options['semilla'],
+            procesos=options['procesos'],
+            bloque=options['bloque'],
+            avance=avance,
+        )
+
+        if not options['sin_derivados']:
+            t = reloj.perf_counter()
+            avance('resumen', resumen.reconstruir(desde)['filas'], reloj.perf_counter() - t)
+            t = reloj.perf_counter()
+            avance('costos', costeo.recalcular_costos()['movimientos'], reloj.perf_counter() - t)
+
+        self.stdout.write(self.style.SUCCESS(f"Listo en {reloj.perf_counter() - inicio:.1f}s"))
+
     @transaction.atomic
     def crear_productos(self, cantidad):
         categorias = ['ALFAJORES', 'CUCHUFLIS', 'TORTAS', 'PRODUCTOS A GRANEL',
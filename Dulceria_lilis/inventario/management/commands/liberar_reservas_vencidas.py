@@ -0,0 +1,27 @@
+# inventario/management/commands/liberar_reservas_vencidas.py
+"""
+Borra las reservas de stock vencidas (ReservaStock), por bloques.
+Las reservas vencidas ya no cuentan como reservadas; esto solo mantiene la tabla chica.
+Ejecutar (p. ej. cada 5 minutos desde cron):
+python manage.py liberar_reservas_vencidas
+python manage.py liberar_reservas_vencidas --bloque 2000
+"""
+import time as reloj
+
+from django.core.management.base import BaseCommand
+
+from inventario.reservas import CHUNK_SIZE, barrer_vencidas
+
+
+class Command(BaseCommand):
+    help = 'Borra por bloques las reservas de stock vencidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bloque', type=int, default=CHUNK_SIZE, help=f'Reservas por transacción (por defecto {CHUNK_SIZE}).')
+
+    def handle(self, *args, **options):
+        inicio = reloj.perf_counter()
+        total = barrer_vencidas(chunk_size=max(options['bloque'], 1))
+        self.stdout.write(self.style.SUCCESS(
+            f"Reservas vencidas liberadas: {total} ({reloj.perf_counter() - inicio:.1f}s)"
+        ))
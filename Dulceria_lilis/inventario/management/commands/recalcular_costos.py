@@ -0,0 +1,28 @@
+# inventario/management/commands/recalcular_costos.py
+"""
+Reconstruye Producto.costo_promedio (promedio ponderado) desde el historial completo
+de movimientos, en una sola pasada por bloques.
+Ejecutar:
+python manage.py recalcular_costos
+python manage.py recalcular_costos --chunk-size 10000
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventario.costeo import CHUNK_SIZE, recalcular_costos
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el costo promedio ponderado de todos los productos desde los movimientos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Movimientos por consulta y productos por transacción.')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        res = recalcular_costos(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{res['movimientos']} movimientos procesados, {res['costeados']} sin costo completados, "
+            f"{res['productos']} productos actualizados en {time.perf_counter() - inicio:.1f}s"
+        ))
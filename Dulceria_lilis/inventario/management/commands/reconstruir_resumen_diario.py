@@ -0,0 +1,39 @@
+# inventario/management/commands/reconstruir_resumen_diario.py
+"""
+Reconstruye el resumen diario de movimientos (ResumenDiarioMovimiento) desde la
+tabla de movimientos. Necesario tras cargas masivas con bulk_create, que no pasan
+por MovimientoInventario.save().
+Ejecutar:
+python manage.py reconstruir_resumen_diario
+python manage.py reconstruir_resumen_diario --desde 2025-03-01
+"""
+import time as reloj
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from inventario.resumen import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el resumen diario de movimientos por producto, bodega y tipo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=str, default=None, help='Primer día (AAAA-MM-DD) a reconstruir. Por defecto: todo.')
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['desde']:
+            try:
+                desde = parse_date(options['desde'])
+            except ValueError:
+                desde = None
+            if desde is None:
+                raise CommandError('Fecha inválida. Use AAAA-MM-DD.')
+
+        inicio = reloj.perf_counter()
+        res = reconstruir(desde)
+        self.stdout.write(self.style.SUCCESS(
+            f"Resumen diario: {res['filas']} filas en {res['meses']} meses "
+            f"({reloj.perf_counter() - inicio:.1f}s)"
+        ))
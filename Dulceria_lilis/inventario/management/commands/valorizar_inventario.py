@@ -0,0 +1,45 @@
+# inventario/management/commands/valorizar_inventario.py
+"""
+Valoriza el inventario a costo FIFO por producto y bodega a fin de mes.
+Ejecutar:
+python manage.py valorizar_inventario                    # cierre del mes anterior
+python manage.py valorizar_inventario --mes 2025-09
+python manage.py valorizar_inventario --corte 2025-09-15 --procesos 4
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from inventario.valorizacion import RANGO_PRODUCTOS, fin_de_mes, valorizar
+
+
+class Command(BaseCommand):
+    help = 'Valorización FIFO del inventario por producto y bodega a una fecha de corte'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mes', type=str, default=None, help='Mes a cerrar (AAAA-MM). Por defecto: el mes anterior.')
+        parser.add_argument('--corte', type=str, default=None, help='Fecha de corte exacta (AAAA-MM-DD).')
+        parser.add_argument('--procesos', type=int, default=1, help='Procesos en paralelo (por rangos de productos).')
+        parser.add_argument('--rango', type=int, default=RANGO_PRODUCTOS, help='Productos por tarea.')
+
+    def handle(self, *args, **options):
+        try:
+            if options['corte']:
+                corte = parse_date(options['corte'])
+            elif options['mes']:
+                anio, mes = (int(x) for x in options['mes'].split('-'))
+                corte = fin_de_mes(anio, mes) if 1 <= mes <= 12 else None
+            else:
+                corte = timezone.localdate().replace(day=1) - timedelta(days=1)
+        except ValueError:
+            corte = None
+        if corte is None:
+            raise CommandError('Fecha inválida. Use --mes AAAA-MM o --corte AAAA-MM-DD.')
+
+        ejecucion = valorizar(corte, procesos=max(1, options['procesos']), tamano=options['rango'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Valorización al {corte}: {ejecucion.movimientos} movimientos, {ejecucion.filas} filas, '
+            f'valor total {ejecucion.valor_total} en {ejecucion.duracion_segundos:.1f}s'
+        ))
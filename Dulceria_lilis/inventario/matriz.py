@@ -0,0 +1,83 @@
+# inventario/matriz.py
+"""
+Matriz de stock producto × bodega.
+
+El stock por bodega de un producto con control por lote es la suma de
+Lote.cantidad_disponible de sus lotes en cada bodega (una consulta agrupada por
+(producto, bodega)); el de un producto sin lotes es su saldo por bodega según
+cierres y movimientos (inventario/saldos.py). Ambos se limitan a los productos
+de la página, así el costo no depende del tamaño del catálogo. El total del
+producto es Producto.stock_actual.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Sum
+
+from .models import Lote
+from .saldos import saldos_al
+
+CHUNK_SIZE = 2000
+SIN_BODEGA = 0      # clave de columna para stock sin bodega asignada
+CERO = Decimal(0)
+
+
+def stock_por_bodega(producto_ids, sin_lote_ids=()):
+    """
+    {producto_id: {bodega_id | SIN_BODEGA: cantidad}}: lotes disponibles de
+    producto_ids y, para sin_lote_ids (productos sin control por lote), sus saldos.
+    """
+    matriz = defaultdict(dict)
+    filas = (
+        Lote.objects
+        .filter(producto_id__in=producto_ids, cantidad_disponible__gt=0)
+        .values('producto_id', 'bodega_id')
+        .annotate(total=Sum('cantidad_disponible'))
+        .values_list('producto_id', 'bodega_id', 'total')
+        .order_by()
+    )
+    for prod, bod, total in filas:
+        matriz[prod][bod or SIN_BODEGA] = total
+
+    if sin_lote_ids:
+        _, saldos = saldos_al(None, producto_ids=sin_lote_ids)
+        por_bodega = defaultdict(Decimal)
+        for (prod, bod, _), cantidad in saldos.items():
+            por_bodega[(prod, bod or SIN_BODEGA)] += cantidad
+        for (prod, bod), cantidad in por_bodega.items():
+            if cantidad:
+                matriz[prod][bod] = cantidad
+    return matriz
+
+
+def filas_matriz(productos, bodega_ids):
+    """
+    Une cada producto con su fila de stock por bodega (en el orden de bodega_ids).
+    `productos` es una página (o un bloque) ya cargado.
+    """
+    productos = list(productos)
+    stock = stock_por_bodega(
+        [p.pk for p in productos if p.control_por_lote], [p.pk for p in productos if not p.control_por_lote]
+    )
+    filas = []
+    for p in productos:
+        por_bodega = stock.get(p.pk, {})
+        filas.append({
+            'producto': p,
+            'celdas': [por_bodega.get(b, CERO) for b in bodega_ids],
+            'en_bodegas': sum(por_bodega.values(), CERO),
+            'bajo_stock': p.alerta_bajo_stock(),
+        })
+    return filas
+
+
+def iterar_filas_matriz(productos, bodega_ids, chunk_size=CHUNK_SIZE):
+    """filas_matriz() para todo el queryset, por bloques de productos (exportación)."""
+    bloque = []
+    for p in productos.iterator(chunk_size=chunk_size):
+        bloque.append(p)
+        if len(bloque) == chunk_size:
+            yield from filas_matriz(bloque, bodega_ids)
+            bloque = []
+    if bloque:
+        yield from filas_matriz(bloque, bodega_ids)
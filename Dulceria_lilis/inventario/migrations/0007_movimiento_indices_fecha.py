@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0006_lote_updated_at'),
+        ('productos', '0003_producto_updated_at'),
+        ('proveedores', '0004_proveedor_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['fecha'], name='inventario__fecha_f978ae_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['tipo', 'fecha'], name='inventario__tipo_e72913_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0007_movimiento_indices_fecha'),
+        ('productos', '0003_producto_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EjecucionPronostico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+                ('desde', models.DateField()),
+                ('hasta', models.DateField()),
+                ('productos', models.PositiveIntegerField(default=0)),
+                ('duracion_segundos', models.FloatField(default=0)),
+            ],
+            options={
+                'ordering': ['-hasta'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PronosticoDemanda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('demanda_media', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('demanda_suavizada', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('factores_dia_semana', models.JSONField(default=list)),
+                ('pronostico_7_dias', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('punto_reorden_sugerido', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('nivel', models.FloatField(blank=True, null=True)),
+                ('ventana', models.JSONField(default=list)),
+                ('suma_dia_semana', models.JSONField(default=list)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pronostico', to='productos.producto')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0008_pronostico_demanda'),
+        ('productos', '0004_indices_alertas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(fields=['fecha_vencimiento', 'cantidad_disponible'], name='lote_vencimiento_idx'),
+        ),
+    ]
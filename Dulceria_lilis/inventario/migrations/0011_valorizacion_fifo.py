@@ -0,0 +1,66 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0010_movimiento_costo_unitario'),
+        ('productos', '0004_indices_alertas'),
+        ('proveedores', '0004_proveedor_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EjecucionValorizacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+                ('corte', models.DateField(unique=True)),
+                ('movimientos', models.PositiveIntegerField(default=0)),
+                ('filas', models.PositiveIntegerField(default=0)),
+                ('valor_total', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('procesos', models.PositiveSmallIntegerField(default=1)),
+                ('duracion_segundos', models.FloatField(default=0)),
+            ],
+            options={
+                'ordering': ['-corte'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ValorizacionInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('corte', models.DateField()),
+                ('cantidad', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('valor', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('costo_unitario', models.DecimalField(decimal_places=6, max_digits=18)),
+                ('capas', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['corte', 'producto', 'bodega'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['producto', 'fecha'], name='inventario__product_fadacf_idx'),
+        ),
+        migrations.AddField(
+            model_name='valorizacioninventario',
+            name='bodega',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='inventario.bodega'),
+        ),
+        migrations.AddField(
+            model_name='valorizacioninventario',
+            name='producto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='productos.producto'),
+        ),
+        migrations.AddIndex(
+            model_name='valorizacioninventario',
+            index=models.Index(fields=['corte', 'producto'], name='inventario__corte_433068_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0012_saldos_inventario'),
+        ('productos', '0004_indices_alertas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiarioMovimiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('tipo', models.CharField(choices=[('INGRESO', 'Ingreso'), ('SALIDA', 'Salida'), ('AJUSTE', 'Ajuste'), ('DEVOLUCION', 'Devolución'), ('TRANSFERENCIA', 'Transferencia')], max_length=20)),
+                ('cantidad', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('movimientos', models.PositiveIntegerField(default=0)),
+                ('bodega', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='inventario.bodega')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='productos.producto')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tipo', 'dia'], name='inventario__tipo_0f3999_idx')],
+                'unique_together': {('dia', 'producto', 'bodega', 'tipo')},
+            },
+        ),
+    ]
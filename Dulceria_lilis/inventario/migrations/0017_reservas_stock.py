@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0016_idempotencia_movimientos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservaStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('referencia', models.CharField(max_length=100)),
+                ('cantidad', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('vence', models.DateTimeField()),
+                ('lote', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='inventario.lote')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['vence'], name='inventario__vence_a9e1cc_idx'), models.Index(fields=['lote', 'vence'], name='inventario__lote_id_aebde8_idx')],
+                'unique_together': {('referencia', 'lote')},
+            },
+        ),
+    ]
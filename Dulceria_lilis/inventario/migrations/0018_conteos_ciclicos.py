@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-19 16:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0017_reservas_stock'),
+        ('productos', '0005_indice_categoria_marca'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConteoInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+                ('categoria', models.CharField(blank=True, max_length=100, null=True)),
+                ('estado', models.CharField(choices=[('ABIERTO', 'Abierto'), ('PUBLICADO', 'Publicado'), ('ANULADO', 'Anulado')], default='ABIERTO', max_length=10)),
+                ('observacion', models.TextField(blank=True, null=True)),
+                ('total_lineas', models.PositiveIntegerField(default=0)),
+                ('publicado', models.DateTimeField(blank=True, null=True)),
+                ('bodega', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='inventario.bodega')),
+                ('documento', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='inventario.documentomovimiento')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LineaConteo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad_sistema', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('cantidad_contada', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True)),
+                ('diferencia', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True)),
+                ('conteo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lineas', to='inventario.conteoinventario')),
+                ('lote', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='inventario.lote')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='productos.producto')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['conteo', 'diferencia'], name='inventario__conteo__db9655_idx')],
+                'unique_together': {('conteo', 'producto', 'lote')},
+            },
+        ),
+    ]
@@ -1,7 +1,17 @@
-from django.db import models
-from productos.models import Producto
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db import models, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from productos.models import DIAS_ALERTA_VENCIMIENTO, Producto
 from proveedores.models import Proveedor
 from usuarios.models import Usuario
+from utils.sincronizacion import SincronizableQuerySet
+from .costeo import TIPOS_CON_COSTO, costo_unitario_proveedor, nuevo_costo_promedio
+from .resumen import registrar_en_resumen
+
+SEPARADOR_BODEGA = '@'   # LOT-SKU1-0001@BOD-NORTE: parte del lote recibida en otra bodega
 
 TIPO_MOVIMIENTO = [
     ('INGRESO', 'Ingreso'),
@@ -20,6 +30,44 @@ class Bodega(models.Model):
     def __str__(self):
         return f"{self.codigo} - {self.nombre}"
 
+class LoteQuerySet(SincronizableQuerySet):
+    """Ventanas de vencimiento de lotes con saldo, resueltas en la base de datos."""
+
+    def _q_por_vencer(self, dias):
+        hoy = date.today()
+        return Q(fecha_vencimiento__gte=hoy, fecha_vencimiento__lte=hoy + timedelta(days=dias))
+
+    def _q_vencidos(self):
+        return Q(fecha_vencimiento__lt=date.today())
+
+    def disponibles(self):
+        return self.filter(cantidad_disponible__gt=0)
+
+    def por_vencer(self, dias=DIAS_ALERTA_VENCIMIENTO):
+        return self.disponibles().filter(self._q_por_vencer(dias))
+
+    def vencidos(self):
+        return self.disponibles().filter(self._q_vencidos())
+
+    def con_reservado(self, ahora=None):
+        """
+        Anota `reservado` (reservas vigentes, ver reservas.py) y `libre` =
+        cantidad_disponible - reservado, en la misma consulta.
+        """
+        vigentes = Q(reservas__vence__gt=ahora or timezone.now())
+        cantidad = DecimalField(max_digits=12, decimal_places=2)
+        return self.annotate(
+            reservado=Coalesce(Sum('reservas__cantidad', filter=vigentes), Value(Decimal(0)), output_field=cantidad),
+        ).annotate(libre=F('cantidad_disponible') - F('reservado'))
+
+    def conteo_alertas(self, dias=DIAS_ALERTA_VENCIMIENTO):
+        """{'por_vencer', 'vencidos'} de lotes con saldo en una sola consulta."""
+        return self.disponibles().aggregate(
+            por_vencer=Count('pk', filter=self._q_por_vencer(dias)),
+            vencidos=Count('pk', filter=self._q_vencidos()),
+        )
+
+
 class Lote(models.Model):
     codigo = models.CharField(max_length=120, unique=True)
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
@@ -37,12 +85,18 @@ class Lote(models.Model):
     cantidad_disponible = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
     fecha_creacion = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = LoteQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.codigo} - {self.producto}"
 
     class Meta:
         ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['fecha_vencimiento', 'cantidad_disponible'], name='lote_vencimiento_idx'),
+        ]
 
     @staticmethod
     def generar_codigo(producto):
@@ -56,6 +110,7 @@ class Lote(models.Model):
         ultimo = (
             Lote.objects
             .filter(codigo__startswith=base)
+            .exclude(codigo__contains=SEPARADOR_BODEGA)   # lotes recibidos por transferencia
             .order_by('-id')
             .first()
         )
@@ -71,6 +126,65 @@ class Lote(models.Model):
         return f"{base}{num:04d}"
 
 
+class ReservaStock(models.Model):
+    """
+    Retención temporal de stock de un lote para una referencia (pedido en picking).
+    No descuenta Lote.cantidad_disponible: mientras está vigente, los demás
+    movimientos solo ven disponible - reservado. Ver inventario/reservas.py.
+    """
+    lote = models.ForeignKey(Lote, on_delete=models.CASCADE, related_name='reservas')
+    referencia = models.CharField(max_length=100)
+    cantidad = models.DecimalField(max_digits=12, decimal_places=2)
+    usuario = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True)
+    vence = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('referencia', 'lote')
+        indexes = [
+            # Barrido de reservas vencidas
+            models.Index(fields=['vence']),
+            # Reservado vigente por lote
+            models.Index(fields=['lote', 'vence']),
+        ]
+
+    def __str__(self):
+        return f"{self.referencia} - {self.lote.codigo} - {self.cantidad}"
+
+
+class DocumentoMovimiento(models.Model):
+    """
+    Encabezado de un documento de varias líneas (guía, recepción, transferencia).
+    Los datos comunes se guardan una vez aquí; cada línea es un MovimientoInventario
+    con documento = este encabezado (sin repetir la observación).
+    Se publica con inventario/documentos.registrar_documento().
+    """
+    fecha = models.DateTimeField(auto_now_add=True)
+    tipo = models.CharField(max_length=20, choices=TIPO_MOVIMIENTO)
+    proveedor = models.ForeignKey(Proveedor, on_delete=models.SET_NULL, null=True, blank=True)
+    bodega_origen = models.ForeignKey(
+        Bodega, on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='documentos_origen'
+    )
+    bodega_destino = models.ForeignKey(
+        Bodega, on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='documentos_destino'
+    )
+    usuario = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True)
+    documento_referencia = models.CharField(max_length=100, blank=True, null=True)
+    observacion = models.TextField(blank=True, null=True)
+    total_lineas = models.PositiveIntegerField(default=0)
+    # Clave del cliente: un reenvío con la misma clave devuelve este documento (idempotencia.py)
+    clave_idempotencia = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+
+    class Meta:
+        ordering = ['-fecha']
+
+    def __str__(self):
+        return f"Documento {self.pk} - {self.tipo} {self.documento_referencia or ''}".strip()
+
+
 class MovimientoInventario(models.Model):
     fecha = models.DateTimeField(auto_now_add=True)
     tipo = models.CharField(max_length=20, choices=TIPO_MOVIMIENTO)
@@ -90,17 +204,39 @@ class MovimientoInventario(models.Model):
     )
 
     cantidad = models.DecimalField(max_digits=12, decimal_places=2)
+    # Costo unitario neto aplicado al costo promedio (solo INGRESO / DEVOLUCION)
+    costo_unitario = models.DecimalField(max_digits=18, decimal_places=6, blank=True, null=True)
 
     lote = models.ForeignKey(Lote, on_delete=models.SET_NULL, null=True, blank=True)
+    # TRANSFERENCIA: lote que recibe la cantidad en bodega_destino
+    lote_destino = models.ForeignKey(
+        Lote, on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='transferencias_recibidas'
+    )
     serie = models.CharField(max_length=120, blank=True, null=True)
     fecha_vencimiento = models.DateField(blank=True, null=True)
 
     usuario = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True)
     observacion = models.TextField(blank=True, null=True)
     documento_referencia = models.CharField(max_length=100, blank=True, null=True)
+    documento = models.ForeignKey(
+        DocumentoMovimiento, on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='lineas'
+    )
+    # Clave del cliente: un reenvío con la misma clave no se vuelve a publicar (idempotencia.py)
+    clave_idempotencia = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ['-fecha']
+        indexes = [
+            # Filtros por rango de fecha y tipo (listado, extracción NDJSON)
+            models.Index(fields=['fecha']),
+            models.Index(fields=['tipo', 'fecha']),
+            # Recorrido cronológico por producto (valorización FIFO)
+            models.Index(fields=['producto', 'fecha']),
+        ]
 
     def __str__(self):
         return f"{self.tipo} - {self.producto} - {self.cantidad}"
@@ -111,18 +247,44 @@ class MovimientoInventario(models.Model):
     def _ajustar_stock_producto(self):
         prod = self.producto
 
-        if self.tipo in ['INGRESO', 'DEVOLUCION']:
+        if self.tipo in TIPOS_CON_COSTO:
+            # Costo promedio ponderado con el stock previo al ingreso (ver costeo.py)
+            if self.costo_unitario is None:
+                self.costo_unitario = costo_unitario_proveedor(prod, self.proveedor_id)
+            prod.costo_promedio = nuevo_costo_promedio(
+                prod.stock_actual, prod.costo_promedio, self.cantidad, self.costo_unitario
+            )
             prod.stock_actual += self.cantidad
 
         elif self.tipo in ['SALIDA']:
+            # Sin recorte a 0: el stock queda igual al saldo del kardex y de los cierres
+            if self.cantidad > prod.stock_actual:
+                from django.core.exceptions import ValidationError
+                raise ValidationError(
+                    f"No hay stock suficiente de {prod.sku} (Disponible: {prod.stock_actual}, requerido: {self.cantidad})"
+                )
             prod.stock_actual -= self.cantidad
-            if prod.stock_actual < 0:
-                prod.stock_actual = 0
 
         elif self.tipo == 'AJUSTE':
-            # Ajuste directo (+ o -)
+            # Ajuste directo con signo (+ o -), igual para el producto y el lote
+            if prod.stock_actual + self.cantidad < 0:
+                from django.core.exceptions import ValidationError
+                raise ValidationError(
+                    f"El ajuste deja en negativo el stock de {prod.sku} (Disponible: {prod.stock_actual})"
+                )
             prod.stock_actual += self.cantidad
 
+        elif self.tipo == 'TRANSFERENCIA' and self.lote_id is None and self.bodega_origen_id:
+            # Sin lote no hay cantidad_disponible que la limite: se valida el saldo de la bodega
+            from .transferencias import saldos_en_bodega
+            disponible = saldos_en_bodega(self.bodega_origen_id, [prod.pk])[prod.pk]
+            if self.cantidad > disponible:
+                from django.core.exceptions import ValidationError
+                raise ValidationError(
+                    f"No hay stock suficiente de {prod.sku} en {self.bodega_origen.codigo} "
+                    f"(Disponible: {disponible}, requerido: {self.cantidad})"
+                )
+
         prod.save()
 
     def _ajustar_lote(self):
@@ -133,11 +295,24 @@ class MovimientoInventario(models.Model):
         if not controla:
             return
 
+        if self.tipo == 'TRANSFERENCIA':
+            self._transferir_lote()
+            return
+
         # ¿a qué bodega va el lote?
         bodega = self.bodega_destino or self.bodega_origen
 
-        # INGRESOS
-        if self.tipo in ['INGRESO', 'DEVOLUCION']:
+        # INGRESOS / AJUSTES POSITIVOS
+        if self.tipo == 'AJUSTE' and self.cantidad > 0:
+            if not self.lote:
+                from django.core.exceptions import ValidationError
+                raise ValidationError("Debe seleccionar lote para este movimiento.")
+            lote = Lote.objects.select_for_update().get(pk=self.lote_id)
+            lote.cantidad_disponible += self.cantidad
+            lote.save()
+            self.lote = lote
+
+        elif self.tipo in ['INGRESO', 'DEVOLUCION']:
             if self.lote:
                 lote = self.lote
             else:
@@ -165,29 +340,267 @@ class MovimientoInventario(models.Model):
                     f"queda en {lote.cantidad_disponible}, por debajo del mínimo ({lote.producto.stock_minimo})"
                 )
 
-        # SALIDAS / AJUSTES / TRANSFERENCIAS
+        # SALIDAS / AJUSTES NEGATIVOS
         else:
             if not self.lote:
                 from django.core.exceptions import ValidationError
                 raise ValidationError("Debe seleccionar lote para este movimiento.")
 
-            lote = self.lote
+            from django.core.exceptions import ValidationError
+            from .reservas import consumir, validar_consumo
 
-            if lote.cantidad_disponible < self.cantidad:
-                from django.core.exceptions import ValidationError
-                raise ValidationError(
-                    f"No hay stock suficiente en lote {lote.codigo} "
-                    f"(Disponible: {lote.cantidad_disponible}, requerido: {self.cantidad})"
-                )
+            lote = Lote.objects.select_for_update().get(pk=self.lote_id)
+            self.lote = lote
+            retiro = -self.cantidad if self.tipo == 'AJUSTE' else self.cantidad
+            # Respeta las reservas vigentes de otras referencias
+            errores = validar_consumo({lote.pk: lote}, {lote.pk: retiro}, self.documento_referencia)
+            if errores:
+                raise ValidationError(errores[0])
 
-            lote.cantidad_disponible -= self.cantidad
+            lote.cantidad_disponible -= retiro
             lote.save()
+            consumir({lote.pk: retiro}, self.documento_referencia)
+
+    def _transferir_lote(self):
+        """Saca la cantidad del lote de origen y la suma al lote del producto en bodega_destino."""
+        from django.core.exceptions import ValidationError
+        from .reservas import consumir, validar_consumo
+        from .transferencias import lotes_destino, nuevo_lote_destino
+
+        if not self.lote_id:
+            raise ValidationError("Debe seleccionar lote para este movimiento.")
+        if not self.bodega_destino_id:
+            raise ValidationError("Debe indicar la bodega de destino.")
+
+        origen = Lote.objects.select_for_update().get(pk=self.lote_id)
+        if self.bodega_origen_id and origen.bodega_id and origen.bodega_id != self.bodega_origen_id:
+            raise ValidationError(f"El lote {origen.codigo} no está en la bodega de origen.")
+        if origen.bodega_id == self.bodega_destino_id:
+            raise ValidationError(f"El lote {origen.codigo} ya está en la bodega de destino.")
+        errores = validar_consumo({origen.pk: origen}, {origen.pk: self.cantidad}, self.documento_referencia)
+        if errores:
+            raise ValidationError(errores[0])
+
+        destino = lotes_destino([origen], self.bodega_destino)[origen.pk] or nuevo_lote_destino(origen, self.bodega_destino)
+
+        origen.cantidad_disponible -= self.cantidad
+        origen.save()
+        consumir({origen.pk: self.cantidad}, self.documento_referencia)
+        destino.cantidad_inicial += self.cantidad
+        destino.cantidad_disponible += self.cantidad
+        destino.save()
+
+        self.lote = origen
+        self.lote_destino = destino
+        if not self.bodega_origen_id:
+            self.bodega_origen_id = origen.bodega_id
 
     def save(self, *args, **kwargs):
         es_nuevo = self.pk is None
 
-        if es_nuevo:
-            self._ajustar_stock_producto()
-            self._ajustar_lote()
+        with transaction.atomic():
+            if es_nuevo:
+                # Bloquea el producto: stock y costo promedio se calculan sobre la fila vigente
+                self.producto = Producto.objects.select_for_update().get(pk=self.producto_id)
+                self._ajustar_stock_producto()
+                self._ajustar_lote()
+            else:
+                # Editar un movimiento ya incluido en un cierre de saldo lo invalida
+                from .saldos import invalidar_cierres
+                invalidar_cierres(self.fecha)
+                anterior = MovimientoInventario.objects.filter(pk=self.pk).first()
+                if anterior:
+                    registrar_en_resumen(anterior, -1)
+
+            super().save(*args, **kwargs)
+            registrar_en_resumen(self, 1)
+
+    def delete(self, *args, **kwargs):
+        from .saldos import invalidar_cierres
+        with transaction.atomic():
+            invalidar_cierres(self.fecha)
+            registrar_en_resumen(self, -1)
+            return super().delete(*args, **kwargs)
+
+
+ESTADO_CONTEO = [
+    ('ABIERTO', 'Abierto'),
+    ('PUBLICADO', 'Publicado'),
+    ('ANULADO', 'Anulado'),
+]
+
+
+class ConteoInventario(models.Model):
+    """
+    Conteo cíclico de una bodega y/o categoría. Al abrirlo se fotografía el saldo
+    del sistema por producto (y lote); las cantidades contadas se cargan por archivo
+    o escaneo y las diferencias se publican como un documento de AJUSTE.
+    Ver inventario/conteos.py.
+    """
+    fecha = models.DateTimeField(auto_now_add=True)
+    bodega = models.ForeignKey(Bodega, on_delete=models.SET_NULL, null=True, blank=True)
+    categoria = models.CharField(max_length=100, blank=True, null=True)
+    estado = models.CharField(max_length=10, choices=ESTADO_CONTEO, default='ABIERTO')
+    usuario = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True)
+    observacion = models.TextField(blank=True, null=True)
+    documento = models.ForeignKey(DocumentoMovimiento, on_delete=models.SET_NULL, null=True, blank=True)
+    total_lineas = models.PositiveIntegerField(default=0)
+    publicado = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-fecha']
+
+    def __str__(self):
+        alcance = " / ".join(str(x) for x in (self.bodega, self.categoria) if x) or "Todo"
+        return f"Conteo {self.pk} - {alcance}"
+
+
+class LineaConteo(models.Model):
+    conteo = models.ForeignKey(ConteoInventario, on_delete=models.CASCADE, related_name='lineas')
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
+    lote = models.ForeignKey(Lote, on_delete=models.CASCADE, null=True, blank=True)
+    cantidad_sistema = models.DecimalField(max_digits=14, decimal_places=2)
+    cantidad_contada = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    diferencia = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+
+    class Meta:
+        unique_together = ('conteo', 'producto', 'lote')
+        indexes = [
+            # Solo diferencias (revisión y publicación)
+            models.Index(fields=['conteo', 'diferencia']),
+        ]
+
+    def __str__(self):
+        return f"{self.conteo_id} - {self.producto_id} - {self.cantidad_contada}"
+
+
+class PronosticoDemanda(models.Model):
+    """
+    Pronóstico de demanda diaria (SALIDAS) por producto y punto de reorden sugerido.
+    Guarda además el estado de los modelos (nivel, ventana, suma por día de semana)
+    para que el cálculo nocturno procese solo los días nuevos (ver inventario/pronostico.py).
+    """
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, related_name='pronostico')
+
+    # Resultados
+    demanda_media = models.DecimalField(max_digits=12, decimal_places=2, default=0)       # media móvil
+    demanda_suavizada = models.DecimalField(max_digits=12, decimal_places=2, default=0)   # suavizamiento exponencial
+    factores_dia_semana = models.JSONField(default=list)                                  # lunes..domingo
+    pronostico_7_dias = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    punto_reorden_sugerido = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    # Estado para el cálculo incremental
+    nivel = models.FloatField(null=True, blank=True)
+    ventana = models.JSONField(default=list)
+    suma_dia_semana = models.JSONField(default=list)
+
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Pronóstico {self.producto}: {self.demanda_suavizada}/día"
+
+
+class EjecucionPronostico(models.Model):
+    """Cada corrida del cálculo de pronósticos; `hasta` es el último día procesado."""
+    fecha = models.DateTimeField(auto_now_add=True)
+    desde = models.DateField()
+    hasta = models.DateField()
+    productos = models.PositiveIntegerField(default=0)
+    duracion_segundos = models.FloatField(default=0)
 
-        super().save(*args, **kwargs)
+    class Meta:
+        ordering = ['-hasta']
+
+    def __str__(self):
+        return f"Pronóstico {self.desde} → {self.hasta} ({self.productos} productos)"
+
+
+class ValorizacionInventario(models.Model):
+    """
+    Stock valorizado a costo FIFO por producto y bodega a una fecha de corte
+    (fin de mes). Se genera con inventario/valorizacion.py.
+    """
+    corte = models.DateField()
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='+')
+    bodega = models.ForeignKey(Bodega, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    cantidad = models.DecimalField(max_digits=14, decimal_places=2)
+    valor = models.DecimalField(max_digits=18, decimal_places=2)
+    costo_unitario = models.DecimalField(max_digits=18, decimal_places=6)
+    capas = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['corte', 'producto', 'bodega']
+        indexes = [models.Index(fields=['corte', 'producto'])]
+
+    def __str__(self):
+        return f"{self.corte} {self.producto_id}/{self.bodega_id}: {self.valor}"
+
+
+class EjecucionValorizacion(models.Model):
+    """Cada valorización FIFO generada para una fecha de corte."""
+    fecha = models.DateTimeField(auto_now_add=True)
+    corte = models.DateField(unique=True)
+    movimientos = models.PositiveIntegerField(default=0)
+    filas = models.PositiveIntegerField(default=0)
+    valor_total = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    procesos = models.PositiveSmallIntegerField(default=1)
+    duracion_segundos = models.FloatField(default=0)
+
+    class Meta:
+        ordering = ['-corte']
+
+    def __str__(self):
+        return f"Valorización FIFO al {self.corte}: {self.valor_total}"
+
+
+class CierreSaldo(models.Model):
+    """
+    Foto del saldo de inventario en un instante: incluye todos los movimientos con
+    fecha < corte. El detalle por producto, bodega y lote está en SaldoInventario.
+    Sirve de saldo de apertura para el kardex y las consultas de stock a una fecha.
+    """
+    corte = models.DateTimeField(unique=True)
+    filas = models.PositiveIntegerField(default=0)
+    duracion_segundos = models.FloatField(default=0)
+    creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-corte']
+
+    def __str__(self):
+        return f"Cierre de saldo {self.corte:%Y-%m-%d %H:%M} ({self.filas} filas)"
+
+
+class SaldoInventario(models.Model):
+    cierre = models.ForeignKey(CierreSaldo, on_delete=models.CASCADE, related_name='saldos')
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='+')
+    bodega = models.ForeignKey(Bodega, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    lote = models.ForeignKey(Lote, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    cantidad = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        indexes = [models.Index(fields=['producto', 'cierre'])]
+
+    def __str__(self):
+        return f"{self.producto_id}/{self.bodega_id}/{self.lote_id}: {self.cantidad}"
+
+
+class ResumenDiarioMovimiento(models.Model):
+    """
+    Totales diarios de movimientos por producto, bodega y tipo.
+    Se mantiene al registrar/editar/eliminar movimientos y se reconstruye con
+    `manage.py reconstruir_resumen_diario` (ver inventario/resumen.py).
+    """
+    dia = models.DateField()
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='+')
+    bodega = models.ForeignKey(Bodega, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    tipo = models.CharField(max_length=20, choices=TIPO_MOVIMIENTO)
+    cantidad = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    movimientos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('dia', 'producto', 'bodega', 'tipo')
+        indexes = [models.Index(fields=['tipo', 'dia'])]
+
+    def __str__(self):
+        return f"{self.dia} {self.tipo} {self.producto_id}/{self.bodega_id}: {self.cantidad}"
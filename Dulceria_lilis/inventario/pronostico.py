@@ -0,0 +1,179 @@
+# inventario/pronostico.py
+"""
+Pronóstico de demanda a partir del historial de SALIDAS.
+
+1. Una consulta agrupada sobre el resumen diario (inventario/resumen.py) trae la
+   cantidad de SALIDA por (producto, día) desde el último día procesado
+   (EjecucionPronostico.hasta) hasta ayer.
+2. Se arma una matriz productos × días y todos los modelos se actualizan con
+   operaciones NumPy sobre la matriz completa (sin bucles por producto):
+     - media móvil de los últimos VENTANA_DIAS días,
+     - suavizamiento exponencial simple (ALFA),
+     - estacionalidad por día de semana (participación de cada día × 7).
+3. Punto de reorden sugerido = demanda × lead time + Z × desviación × √lead time,
+   con el lead time del proveedor preferido (o LEAD_TIME_DEFECTO).
+
+El estado de cada modelo queda en PronosticoDemanda, así la corrida nocturna
+solo procesa los días nuevos.
+"""
+import time as reloj
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Min, Sum
+from django.utils import timezone
+
+from productos.models import Producto
+from utils.bulk import bulk_update_valores
+from .models import EjecucionPronostico, PronosticoDemanda, ResumenDiarioMovimiento
+from .reposicion import cargar_proveedor_preferido
+
+ALFA = 0.3
+VENTANA_DIAS = 28
+Z_SERVICIO = 1.65          # ~95% de nivel de servicio
+LEAD_TIME_DEFECTO = 7
+DIAS_HISTORIA_INICIAL = 365
+CHUNK_SIZE = 2000
+
+CAMPOS_ACTUALIZABLES = [
+    'demanda_media', 'demanda_suavizada', 'factores_dia_semana', 'pronostico_7_dias',
+    'punto_reorden_sugerido', 'nivel', 'ventana', 'suma_dia_semana', 'actualizado',
+]
+
+
+def salidas_diarias(desde, hasta):
+    """(producto_id, día, cantidad) de SALIDAS entre desde y hasta (inclusive), desde el resumen diario."""
+    return (
+        ResumenDiarioMovimiento.objects
+        .filter(tipo='SALIDA', dia__gte=desde, dia__lte=hasta)
+        .values('producto_id', 'dia')
+        .annotate(total=Sum('cantidad'))
+        .values_list('producto_id', 'dia', 'total')
+        .order_by()
+    )
+
+
+def rango_pendiente(hasta=None):
+    """Días a procesar: desde el día siguiente a la última corrida hasta `hasta` (ayer)."""
+    hasta = hasta or timezone.localdate() - timedelta(days=1)
+    ultima = EjecucionPronostico.objects.order_by('-hasta').first()
+    if ultima:
+        desde = ultima.hasta + timedelta(days=1)
+    else:
+        primera = ResumenDiarioMovimiento.objects.filter(tipo='SALIDA').aggregate(m=Min('dia'))['m']
+        if primera is None:
+            return None, hasta
+        desde = max(primera, hasta - timedelta(days=DIAS_HISTORIA_INICIAL - 1))
+    return desde, hasta
+
+
+def calcular_pronosticos(hasta=None):
+    """Procesa los días pendientes para todo el catálogo. Devuelve la EjecucionPronostico o None."""
+    inicio = reloj.perf_counter()
+    desde, hasta = rango_pendiente(hasta)
+    if desde is None or desde > hasta:
+        return None
+
+    # ---- Productos y estado previo ----
+    ids = np.fromiter(Producto.objects.order_by('id').values_list('id', flat=True), dtype=np.int64)
+    n = len(ids)
+    posicion = {pid: i for i, pid in enumerate(ids.tolist())}
+
+    nivel = np.full(n, np.nan)
+    ventana = np.zeros((n, VENTANA_DIAS))
+    suma_dow = np.zeros((n, 7))
+    existentes = {}
+    for pk, producto_id, niv, ven, sdw in PronosticoDemanda.objects.values_list(
+        'pk', 'producto_id', 'nivel', 'ventana', 'suma_dia_semana'
+    ).iterator(chunk_size=CHUNK_SIZE):
+        i = posicion.get(producto_id)
+        if i is None:
+            continue
+        existentes[producto_id] = pk
+        if niv is not None:
+            nivel[i] = niv
+        if len(ven) == VENTANA_DIAS:
+            ventana[i] = ven
+        if len(sdw) == 7:
+            suma_dow[i] = sdw
+
+    # ---- Matriz productos × días ----
+    dias = (hasta - desde).days + 1
+    matriz = np.zeros((n, dias))
+    for producto_id, dia, cantidad in salidas_diarias(desde, hasta).iterator(chunk_size=CHUNK_SIZE):
+        i = posicion.get(producto_id)
+        if i is not None:
+            matriz[i, (dia - desde).days] += float(cantidad)
+
+    # ---- Modelos (vectorizados sobre productos) ----
+    # Media móvil: últimos VENTANA_DIAS días de [ventana previa | días nuevos]
+    ventana = np.concatenate([ventana, matriz], axis=1)[:, -VENTANA_DIAS:]
+
+    # Suavizamiento exponencial: recursión por día, vectorizada en productos
+    for d in range(dias):
+        x = matriz[:, d]
+        nivel = np.where(np.isnan(nivel), x, ALFA * x + (1 - ALFA) * nivel)
+
+    # Estacionalidad por día de semana (0 = lunes)
+    dow = np.array([(desde + timedelta(days=d)).weekday() for d in range(dias)])
+    for w in range(7):
+        suma_dow[:, w] += matriz[:, dow == w].sum(axis=1)
+    total = suma_dow.sum(axis=1, keepdims=True)
+    factores = np.divide(suma_dow * 7, total, out=np.ones_like(suma_dow), where=total > 0)
+
+    media = ventana.mean(axis=1)
+    desviacion = ventana.std(axis=1)
+    proximos = [(hasta + timedelta(days=k)).weekday() for k in range(1, 8)]
+    pronostico_7 = (nivel[:, None] * factores[:, proximos]).sum(axis=1)
+
+    lead = np.full(n, float(LEAD_TIME_DEFECTO))
+    prov = cargar_proveedor_preferido()
+    if len(prov):
+        idx = np.array([posicion.get(pid, -1) for pid in prov['producto_id'].tolist()])
+        ok = idx >= 0
+        lead[idx[ok]] = prov['lead_time_dias'].to_numpy(dtype=float)[ok]
+    punto_reorden = nivel * lead + Z_SERVICIO * desviacion * np.sqrt(lead)
+
+    # ---- Persistencia por bloques ----
+    ahora = timezone.now()
+    with transaction.atomic():
+        for ini in range(0, n, CHUNK_SIZE):
+            nuevos, cambiados = [], []
+            for i in range(ini, min(ini + CHUNK_SIZE, n)):
+                pid = int(ids[i])
+                obj = PronosticoDemanda(
+                    pk=existentes.get(pid),
+                    producto_id=pid,
+                    demanda_media=round(float(media[i]), 2),
+                    demanda_suavizada=round(float(nivel[i]), 2),
+                    factores_dia_semana=np.round(factores[i], 4).tolist(),
+                    pronostico_7_dias=round(float(pronostico_7[i]), 2),
+                    punto_reorden_sugerido=round(float(punto_reorden[i]), 2),
+                    nivel=float(nivel[i]),
+                    ventana=ventana[i].tolist(),
+                    suma_dia_semana=suma_dow[i].tolist(),
+                    actualizado=ahora,
+                )
+                (cambiados if obj.pk else nuevos).append(obj)
+            if nuevos:
+                PronosticoDemanda.objects.bulk_create(nuevos)
+            bulk_update_valores(PronosticoDemanda, cambiados, CAMPOS_ACTUALIZABLES)
+
+        return EjecucionPronostico.objects.create(
+            desde=desde,
+            hasta=hasta,
+            productos=n,
+            duracion_segundos=round(reloj.perf_counter() - inicio, 3),
+        )
+
+
+def aplicar_puntos_reorden():
+    """Copia punto_reorden_sugerido a Producto.punto_reorden (un UPDATE por bloque)."""
+    total = 0
+    pares = PronosticoDemanda.objects.values_list('producto_id', 'punto_reorden_sugerido')
+    productos = [Producto(pk=pid, punto_reorden=rop) for pid, rop in pares.iterator(chunk_size=CHUNK_SIZE)]
+    with transaction.atomic():
+        for ini in range(0, len(productos), CHUNK_SIZE):
+            total += bulk_update_valores(Producto, productos[ini:ini + CHUNK_SIZE], ['punto_reorden'])
+    return total
@@ -0,0 +1,110 @@
+# inventario/reposicion.py
+"""
+Motor de reposición: sugerencias de compra para todo el catálogo.
+
+Carga stock, punto_reorden, stock_maximo y el proveedor preferido de cada producto
+en dos consultas y calcula las cantidades con operaciones vectorizadas de pandas/NumPy
+(sin recorrer productos uno a uno). El resultado se guarda en caché
+(REPOSICION_CACHE_TTL) y se usa para la vista y la exportación.
+
+Regla por producto:
+    reorden   = punto_reorden (o stock_minimo si no tiene)
+    objetivo  = stock_maximo si es mayor que reorden; si no, 2 × reorden
+    pedir     = objetivo - stock_actual, solo si stock_actual <= reorden
+    cantidad  = pedir redondeado hacia arriba al múltiplo de min_lote del proveedor
+    costo     = cantidad × costo × (1 - descuento_pct / 100)
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+
+from productos.models import Producto
+from proveedores.models import ProductoProveedor
+
+CACHE_KEY = 'inventario:reposicion'
+
+COLUMNAS_PRODUCTO = [
+    'id', 'sku', 'nombre', 'categoria',
+    'stock_actual', 'stock_minimo', 'stock_maximo', 'punto_reorden',
+]
+COLUMNAS_PROVEEDOR = [
+    'producto_id', 'proveedor_id', 'proveedor__razon_social',
+    'costo', 'lead_time_dias', 'min_lote', 'descuento_pct', 'preferente',
+]
+
+
+def _a_float(serie):
+    # Decimal / None → float64 / NaN
+    return pd.to_numeric(serie, errors='coerce').astype('float64')
+
+
+def cargar_productos():
+    df = pd.DataFrame.from_records(
+        Producto.objects.values_list(*COLUMNAS_PRODUCTO).iterator(chunk_size=5000),
+        columns=COLUMNAS_PRODUCTO,
+    )
+    for col in ('stock_actual', 'stock_minimo', 'stock_maximo', 'punto_reorden'):
+        df[col] = _a_float(df[col])
+    return df
+
+
+def cargar_proveedor_preferido():
+    """Una fila por producto: el proveedor preferente o, si no hay, el de menor costo neto."""
+    df = pd.DataFrame.from_records(
+        ProductoProveedor.objects.values_list(*COLUMNAS_PROVEEDOR).iterator(chunk_size=5000),
+        columns=COLUMNAS_PROVEEDOR,
+    ).rename(columns={'proveedor__razon_social': 'proveedor'})
+    for col in ('costo', 'min_lote', 'descuento_pct'):
+        df[col] = _a_float(df[col])
+    df['descuento_pct'] = df['descuento_pct'].fillna(0.0)
+    df['costo_unitario'] = df['costo'] * (1.0 - df['descuento_pct'] / 100.0)
+    df = df.sort_values(
+        ['producto_id', 'preferente', 'costo_unitario'],
+        ascending=[True, False, True],
+        kind='mergesort',
+    )
+    return df.drop_duplicates('producto_id', keep='first')
+
+
+def calcular_reposicion():
+    """DataFrame con una fila por producto que necesita compra, ordenado por costo total."""
+    productos = cargar_productos()
+    proveedores = cargar_proveedor_preferido()
+    df = productos.merge(proveedores, how='left', left_on='id', right_on='producto_id')
+
+    stock = df['stock_actual'].to_numpy()
+    reorden = df['punto_reorden'].fillna(df['stock_minimo']).to_numpy()
+    maximo = df['stock_maximo'].to_numpy()
+
+    objetivo = np.where(np.nan_to_num(maximo, nan=-1.0) > reorden, maximo, reorden * 2.0)
+    pedir = np.where(stock <= reorden, np.maximum(objetivo - stock, 0.0), 0.0)
+
+    min_lote = df['min_lote'].fillna(1.0).to_numpy()
+    min_lote = np.where(min_lote > 0, min_lote, 1.0)
+    cantidad = np.ceil(pedir / min_lote) * min_lote
+
+    df['reorden'] = reorden
+    df['objetivo'] = objetivo
+    df['cantidad'] = cantidad
+    df['costo_total'] = cantidad * df['costo_unitario'].to_numpy()
+    lead = df['lead_time_dias'].fillna(0).astype('int64')
+    df['llegada_estimada'] = pd.Timestamp(date.today()) + pd.to_timedelta(lead, unit='D')
+
+    df = df[df['cantidad'] > 0]
+    return df[[
+        'id', 'sku', 'nombre', 'categoria', 'stock_actual', 'reorden', 'objetivo',
+        'cantidad', 'proveedor_id', 'proveedor', 'costo_unitario', 'lead_time_dias',
+        'llegada_estimada', 'costo_total',
+    ]].sort_values('costo_total', ascending=False, na_position='last').reset_index(drop=True)
+
+
+def reporte_reposicion(recalcular=False):
+    """Sugerencias desde caché; se recalculan si no hay o si se pide."""
+    df = None if recalcular else cache.get(CACHE_KEY)
+    if df is None:
+        df = calcular_reposicion()
+        cache.set(CACHE_KEY, df, getattr(settings, 'REPOSICION_CACHE_TTL', 15 * 60))
+    return df
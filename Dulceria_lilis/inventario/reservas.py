@@ -0,0 +1,181 @@
+# inventario/reservas.py
+"""
+Reservas de stock para SALIDAs pendientes (picking de pedidos grandes).
+
+Una ReservaStock retiene por un tiempo limitado parte de Lote.cantidad_disponible
+para una referencia (el documento_referencia del pedido). La reserva no descuenta
+el lote:
+
+  - mientras está vigente (vence > ahora), los movimientos que consumen el lote
+    con otra referencia solo ven disponible - reservado (validar_consumo);
+  - la SALIDA o TRANSFERENCIA con documento_referencia = referencia usa lo
+    reservado y descuenta su reserva (consumir);
+  - hay a lo sumo una fila por (referencia, lote): reservar de nuevo suma y
+    renueva el vencimiento.
+
+Las reservas vencidas dejan de contar aunque sigan en la tabla; barrer_vencidas()
+las borra por bloques sobre el índice de `vence`
+(`manage.py liberar_reservas_vencidas`). La tabla cambia mucho, así que se escribe
+con bulk_create / executemany / DELETE directo, sin auditoría fila a fila.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from utils.bulk import borrar_filas, bulk_update_valores
+from .models import Lote, ReservaStock
+
+CERO = Decimal(0)
+CHUNK_SIZE = 5000
+
+
+def duracion_reserva(minutos=None):
+    return timedelta(minutes=minutos or getattr(settings, 'RESERVA_STOCK_MINUTOS', 30))
+
+
+def vigentes(ahora=None):
+    return ReservaStock.objects.filter(vence__gt=ahora or timezone.now())
+
+
+def reservado_por_lote(lote_ids, excluir_referencia=None, ahora=None):
+    """{lote_id: cantidad reservada vigente} de los lotes indicados, en una consulta agrupada."""
+    if not lote_ids:
+        return {}
+    qs = vigentes(ahora).filter(lote_id__in=lote_ids)
+    if excluir_referencia:
+        qs = qs.exclude(referencia=excluir_referencia)
+    return dict(
+        qs.order_by()
+        .values('lote_id')
+        .annotate(total=Sum('cantidad'))
+        .values_list('lote_id', 'total')
+    )
+
+
+def validar_consumo(lotes, pedido, referencia=None):
+    """
+    Mensajes de error para consumir {lote_id: cantidad} de `lotes` ({lote_id: Lote},
+    bloqueados por el llamador) respetando las reservas vigentes de otras
+    referencias. Lista vacía si alcanza.
+    """
+    reservado = reservado_por_lote(list(pedido), excluir_referencia=referencia)
+    errores = []
+    for lote_id, cantidad in pedido.items():
+        lote = lotes[lote_id]
+        ajeno = reservado.get(lote_id, CERO)
+        libre = lote.cantidad_disponible - ajeno
+        if libre < cantidad:
+            detalle = f", reservado: {ajeno}" if ajeno else ""
+            errores.append(
+                f"No hay stock suficiente en lote {lote.codigo} "
+                f"(Disponible: {libre}, requerido: {cantidad}{detalle})"
+            )
+    return errores
+
+
+def consumir(pedido, referencia):
+    """
+    Descuenta lo consumido {lote_id: cantidad} de las reservas de `referencia`
+    y borra las que quedan en cero. Sin referencia no hace nada.
+    """
+    if not referencia or not pedido:
+        return
+    cambiadas, agotadas = [], []
+    for reserva in ReservaStock.objects.select_for_update().filter(referencia=referencia, lote_id__in=list(pedido)):
+        reserva.cantidad -= pedido[reserva.lote_id]
+        if reserva.cantidad > 0:
+            cambiadas.append(reserva)
+        else:
+            agotadas.append(reserva.pk)
+    bulk_update_valores(ReservaStock, cambiadas, ['cantidad'])
+    if agotadas:
+        borrar_filas(ReservaStock.objects.filter(pk__in=agotadas))
+
+
+def reservar(lineas, referencia, usuario=None, minutos=None):
+    """
+    Reserva [{'lote_id', 'cantidad'}] para `referencia` hasta ahora + minutos
+    (RESERVA_STOCK_MINUTOS por defecto). Todas las líneas o ninguna
+    (ValidationError con un mensaje por lote). Devuelve las reservas de la
+    referencia en esos lotes.
+    """
+    if not referencia:
+        raise ValidationError("La reserva necesita una referencia (p. ej. el N° de pedido).")
+    pedido = defaultdict(Decimal)
+    for linea in lineas:
+        pedido[linea['lote_id']] += linea['cantidad']
+    if not pedido:
+        raise ValidationError("La reserva no tiene líneas.")
+
+    ahora = timezone.now()
+    vence = ahora + duracion_reserva(minutos)
+    with transaction.atomic():
+        lotes = Lote.objects.select_for_update().in_bulk(sorted(pedido))
+        faltantes = [f"Lote {pk} no encontrado." for pk in pedido if pk not in lotes]
+        if faltantes:
+            raise ValidationError(faltantes)
+
+        propias = {
+            r.lote_id: r
+            for r in ReservaStock.objects.select_for_update().filter(referencia=referencia, lote_id__in=list(pedido))
+        }
+        # Lo ya reservado por la misma referencia (si sigue vigente) se suma a lo pedido
+        totales = {
+            pk: cantidad + (propias[pk].cantidad if pk in propias and propias[pk].vence > ahora else CERO)
+            for pk, cantidad in pedido.items()
+        }
+        errores = validar_consumo(lotes, totales, referencia)
+        if errores:
+            raise ValidationError(errores)
+
+        nuevas, cambiadas = [], []
+        for pk, total in totales.items():
+            reserva = propias.get(pk)
+            if reserva is None:
+                nuevas.append(ReservaStock(lote_id=pk, referencia=referencia, cantidad=total, usuario=usuario, vence=vence))
+            else:
+                reserva.cantidad, reserva.vence = total, vence
+                cambiadas.append(reserva)
+        bulk_update_valores(ReservaStock, cambiadas, ['cantidad', 'vence'])
+        ReservaStock.objects.bulk_create(nuevas)
+
+    return list(
+        ReservaStock.objects
+        .filter(referencia=referencia, lote_id__in=list(pedido))
+        .select_related('lote')
+        .order_by('lote__codigo')
+    )
+
+
+def liberar(referencia, lote_ids=None):
+    """Borra las reservas de `referencia` (en esos lotes o todas). Devuelve cuántas."""
+    qs = ReservaStock.objects.filter(referencia=referencia)
+    if lote_ids is not None:
+        qs = qs.filter(lote_id__in=lote_ids)
+    return borrar_filas(qs)
+
+
+def barrer_vencidas(ahora=None, chunk_size=CHUNK_SIZE):
+    """
+    Borra las reservas vencidas en bloques de chunk_size (una transacción corta
+    por bloque, sin bloquear la tabla entera). Devuelve el total borrado.
+    """
+    ahora = ahora or timezone.now()
+    total = 0
+    while True:
+        ids = list(
+            ReservaStock.objects.filter(vence__lte=ahora)
+            .order_by('vence')
+            .values_list('pk', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return total
+        with transaction.atomic():
+            # vence__lte otra vez: una reserva renovada entre ambas consultas se conserva
+            total += borrar_filas(ReservaStock.objects.filter(pk__in=ids, vence__lte=ahora))
@@ -0,0 +1,222 @@
+# inventario/resumen.py
+"""
+Resumen diario de movimientos (ResumenDiarioMovimiento): cantidad y número de
+movimientos por (día, producto, bodega, tipo).
+
+Gráficos, reportes y el pronóstico de demanda leen esta tabla en vez de agrupar
+la tabla de movimientos: una tendencia de 90 días son unos miles de filas.
+
+Bodega del resumen (la misma regla que kardex.py para entradas y salidas):
+  INGRESO / DEVOLUCION / AJUSTE   bodega_destino (u origen)
+  SALIDA / TRANSFERENCIA          bodega_origen (o destino)
+
+Mantenimiento:
+  - MovimientoInventario.save() / delete() suman o restan el movimiento en su
+    fila (UPDATE con F(); la fila se crea si no existía). Los movimientos creados
+    con bulk_create se registran con registrar_movimientos_en_resumen().
+  - reconstruir() rehace el resumen desde los movimientos, mes a mes
+    (`manage.py reconstruir_resumen_diario`), p. ej. tras cargas con bulk_create.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Min, Sum, When
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth
+from django.utils import timezone
+
+from utils.bulk import borrar_filas, bulk_update_valores
+
+CHUNK_SIZE = 5000
+ENTRADAS = ('INGRESO', 'DEVOLUCION', 'AJUSTE')
+CERO = Decimal(0)
+
+
+def bodega_resumen(tipo, bodega_origen_id, bodega_destino_id):
+    if tipo in ENTRADAS:
+        return bodega_destino_id or bodega_origen_id
+    return bodega_origen_id or bodega_destino_id
+
+
+def _clave(mov):
+    return (
+        timezone.localdate(mov.fecha),
+        mov.producto_id,
+        bodega_resumen(mov.tipo, mov.bodega_origen_id, mov.bodega_destino_id),
+        mov.tipo,
+    )
+
+
+def _sumar(clave, cantidad, movimientos):
+    from .models import ResumenDiarioMovimiento
+
+    dia, producto_id, bodega_id, tipo = clave
+    filtro = dict(dia=dia, producto_id=producto_id, bodega_id=bodega_id, tipo=tipo)
+    actualizadas = ResumenDiarioMovimiento.objects.filter(**filtro).update(
+        cantidad=F('cantidad') + cantidad,
+        movimientos=F('movimientos') + movimientos,
+    )
+    if not actualizadas and movimientos > 0:
+        ResumenDiarioMovimiento.objects.create(cantidad=cantidad, movimientos=movimientos, **filtro)
+
+
+def registrar_en_resumen(mov, signo=1):
+    """Suma (signo=1) o resta (signo=-1) el movimiento en su fila del resumen diario."""
+    _sumar(_clave(mov), Decimal(mov.cantidad) * signo, signo)
+
+
+def registrar_movimientos_en_resumen(movimientos):
+    """
+    registrar_en_resumen() para movimientos creados en bloque: lee las filas
+    afectadas en una consulta, actualiza las existentes con executemany y crea
+    las faltantes con bulk_create. Debe llamarse con los productos bloqueados
+    (como en MovimientoInventario.save()), dentro de la transacción.
+    """
+    from .models import ResumenDiarioMovimiento
+
+    totales = defaultdict(lambda: [CERO, 0])
+    for mov in movimientos:
+        total = totales[_clave(mov)]
+        total[0] += Decimal(mov.cantidad)
+        total[1] += 1
+    if not totales:
+        return
+
+    existentes = {
+        (r.dia, r.producto_id, r.bodega_id, r.tipo): r
+        for r in ResumenDiarioMovimiento.objects.select_for_update().filter(
+            dia__in={c[0] for c in totales},
+            producto_id__in={c[1] for c in totales},
+            tipo__in={c[3] for c in totales},
+        )
+    }
+    cambiados, nuevos = [], []
+    for (dia, producto_id, bodega_id, tipo), (cantidad, n) in totales.items():
+        fila = existentes.get((dia, producto_id, bodega_id, tipo))
+        if fila is None:
+            nuevos.append(ResumenDiarioMovimiento(
+                dia=dia, producto_id=producto_id, bodega_id=bodega_id, tipo=tipo,
+                cantidad=cantidad, movimientos=n,
+            ))
+        else:
+            fila.cantidad += cantidad
+            fila.movimientos += n
+            cambiados.append(fila)
+    bulk_update_valores(ResumenDiarioMovimiento, cambiados, ['cantidad', 'movimientos'])
+    ResumenDiarioMovimiento.objects.bulk_create(nuevos, batch_size=CHUNK_SIZE)
+
+
+def _inicio_dia(fecha):
+    return timezone.make_aware(datetime.combine(fecha, time.min))
+
+
+def _meses(desde, hasta):
+    """Primeros días de cada mes entre desde y hasta (inclusive)."""
+    actual = desde.replace(day=1)
+    while actual <= hasta:
+        yield actual
+        actual = date(actual.year + actual.month // 12, actual.month % 12 + 1, 1)
+
+
+def agrupar_movimientos(desde, hasta):
+    """(dia, producto_id, bodega_id, tipo, cantidad, movimientos) de los días [desde, hasta)."""
+    from .models import MovimientoInventario
+
+    bodega = Case(
+        When(tipo__in=ENTRADAS, then=Coalesce('bodega_destino_id', 'bodega_origen_id')),
+        default=Coalesce('bodega_origen_id', 'bodega_destino_id'),
+    )
+    return (
+        MovimientoInventario.objects
+        .filter(fecha__gte=_inicio_dia(desde), fecha__lt=_inicio_dia(hasta))
+        .annotate(dia=TruncDate('fecha'), bod=bodega)
+        .values('dia', 'producto_id', 'bod', 'tipo')
+        .annotate(total=Sum('cantidad'), n=Count('id'))
+        .values_list('dia', 'producto_id', 'bod', 'tipo', 'total', 'n')
+        .order_by()
+    )
+
+
+def reconstruir(desde=None):
+    """
+    Rehace el resumen desde el día `desde` (o completo). Un mes por transacción:
+    borra las filas del mes y las inserta de nuevo desde una consulta agrupada.
+    Devuelve {'meses', 'filas'}.
+    """
+    from .models import MovimientoInventario, ResumenDiarioMovimiento
+
+    limites = MovimientoInventario.objects.aggregate(a=Min('fecha'), b=Max('fecha'))
+    if limites['a'] is None:
+        borrar_filas(ResumenDiarioMovimiento.objects.all())
+        return {'meses': 0, 'filas': 0}
+
+    primero = timezone.localtime(limites['a']).date()
+    ultimo = timezone.localtime(limites['b']).date()
+    desde = max(desde, primero) if desde else primero
+
+    # Filas fuera del rango de movimientos (p. ej. movimientos borrados en bloque)
+    with transaction.atomic():
+        sobrantes = ResumenDiarioMovimiento.objects.filter(dia__gt=ultimo)
+        if desde == primero:
+            sobrantes |= ResumenDiarioMovimiento.objects.filter(dia__lt=primero)
+        borrar_filas(sobrantes)
+
+    meses = filas = 0
+    for mes in _meses(desde, ultimo):
+        inicio = max(mes, desde)
+        fin = date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+        objs = [
+            ResumenDiarioMovimiento(
+                dia=dia, producto_id=prod, bodega_id=bod, tipo=tipo, cantidad=total, movimientos=n,
+            )
+            for dia, prod, bod, tipo, total, n in agrupar_movimientos(inicio, fin).iterator(chunk_size=CHUNK_SIZE)
+        ]
+        with transaction.atomic():
+            borrar_filas(ResumenDiarioMovimiento.objects.filter(dia__gte=inicio, dia__lt=fin))
+            ResumenDiarioMovimiento.objects.bulk_create(objs, batch_size=CHUNK_SIZE)
+        meses += 1
+        filas += len(objs)
+    return {'meses': meses, 'filas': filas}
+
+
+def tendencia(desde, hasta, agrupar='dia', bodega_id=None, tipos=None):
+    """
+    Cantidad y movimientos por (período, tipo) entre desde y hasta (inclusive),
+    agrupando por 'dia' o 'mes'. Lee solo el resumen diario.
+    """
+    from .models import ResumenDiarioMovimiento
+
+    qs = ResumenDiarioMovimiento.objects.filter(dia__gte=desde, dia__lte=hasta)
+    if bodega_id is not None:
+        qs = qs.filter(bodega_id=bodega_id)
+    if tipos:
+        qs = qs.filter(tipo__in=tipos)
+    periodo = TruncMonth('dia') if agrupar == 'mes' else F('dia')
+    return (
+        qs.annotate(periodo=periodo)
+        .values('periodo', 'tipo')
+        .annotate(cantidad=Sum('cantidad'), movimientos=Sum('movimientos'))
+        .order_by('periodo', 'tipo')
+    )
+
+
+def serie_por_tipo(desde, hasta, agrupar='dia', bodega_id=None):
+    """{'periodos': [...], 'series': {tipo: [cantidad por período]}} para Chart.js."""
+    if agrupar == 'mes':
+        periodos = list(_meses(desde, hasta))
+    else:
+        periodos = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+    indice = {p: i for i, p in enumerate(periodos)}
+
+    series = {}
+    for fila in tendencia(desde, hasta, agrupar, bodega_id):
+        periodo = fila['periodo']
+        if isinstance(periodo, datetime):
+            periodo = periodo.date()
+        i = indice.get(periodo)
+        if i is None:
+            continue
+        serie = series.setdefault(fila['tipo'], [0.0] * len(periodos))
+        serie[i] = float(fila['cantidad'] or CERO)
+    return {'periodos': [p.isoformat() for p in periodos], 'series': series}
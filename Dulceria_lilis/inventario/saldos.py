@@ -0,0 +1,166 @@
+# inventario/saldos.py
+"""
+Cierres de saldo: fotos periódicas del stock por (producto, bodega, lote).
+
+Un cierre en el instante `corte` guarda el saldo de todos los movimientos con
+fecha < corte. Se construye a partir del cierre anterior más las variaciones
+agrupadas de los movimientos entre ambos (consultas agrupadas, sin recorrer el
+historial), y se inserta con bulk_create. Solo se guardan saldos distintos de 0.
+
+El stock a una fecha cualquiera = cierre más cercano anterior + variaciones
+desde ese cierre: cuesta O(movimientos desde el cierre), no O(historial).
+
+Reglas por bodega (las mismas que inventario/kardex.py):
+  INGRESO / DEVOLUCION / AJUSTE   +cantidad en bodega_destino (u origen)
+  SALIDA                          -cantidad en bodega_origen (o destino)
+  TRANSFERENCIA (origen y destino) -cantidad en origen (lote), +cantidad en destino
+                                   (lote_destino, o el mismo lote en transferencias antiguas)
+
+La suma de un producto en todas sus bodegas es Producto.stock_actual (las SALIDAs
+que excederían el stock se rechazan, no se recortan a 0).
+
+Si se edita o elimina un movimiento anterior a un cierre, los cierres
+posteriores dejan de ser válidos y se descartan (invalidar_cierres).
+"""
+import time as reloj
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from utils.bulk import borrar_filas
+from .models import CierreSaldo, MovimientoInventario, SaldoInventario
+
+CHUNK_SIZE = 5000
+CERO = Decimal(0)
+ENTRADAS = ('INGRESO', 'DEVOLUCION', 'AJUSTE')
+
+
+def cierre_anterior(instante=None):
+    """CierreSaldo más reciente con corte <= instante (o el último si instante es None)."""
+    qs = CierreSaldo.objects.order_by('-corte')
+    if instante is not None:
+        qs = qs.filter(corte__lte=instante)
+    return qs.first()
+
+
+def variaciones(desde=None, hasta=None, producto_id=None, bodega_id=None, producto_ids=None):
+    """
+    {(producto_id, bodega_id, lote_id): variación} de los movimientos con
+    desde <= fecha < hasta (sin límite si es None). Cuatro consultas agrupadas
+    (entradas, salidas y las dos patas de las transferencias); con bodega_id,
+    solo las variaciones de esa bodega; con producto_ids, solo esos productos.
+    """
+    qs = MovimientoInventario.objects.all()
+    if desde is not None:
+        qs = qs.filter(fecha__gte=desde)
+    if hasta is not None:
+        qs = qs.filter(fecha__lt=hasta)
+    if producto_id is not None:
+        qs = qs.filter(producto_id=producto_id)
+    if producto_ids is not None:
+        qs = qs.filter(producto_id__in=producto_ids)
+
+    transferencias = qs.filter(
+        tipo='TRANSFERENCIA', bodega_origen__isnull=False, bodega_destino__isnull=False
+    )
+    lote = F('lote_id')
+    partes = (
+        (qs.filter(tipo__in=ENTRADAS), Coalesce('bodega_destino_id', 'bodega_origen_id'), lote, 1),
+        (qs.filter(tipo='SALIDA'), Coalesce('bodega_origen_id', 'bodega_destino_id'), lote, -1),
+        (transferencias, F('bodega_origen_id'), lote, -1),
+        (transferencias, F('bodega_destino_id'), Coalesce('lote_destino_id', 'lote_id'), 1),
+    )
+
+    resultado = defaultdict(Decimal)
+    for parte, bodega, lote, signo in partes:
+        filas = parte.order_by().annotate(bod=bodega, lot=lote)
+        if bodega_id is not None:
+            filas = filas.filter(bod=bodega_id)
+        filas = (
+            filas.values('producto_id', 'bod', 'lot')
+            .annotate(total=Sum('cantidad'))
+            .values_list('producto_id', 'bod', 'lot', 'total')
+        )
+        for prod, bod, lote, total in filas.iterator(chunk_size=CHUNK_SIZE):
+            resultado[(prod, bod, lote)] += signo * total
+    return resultado
+
+
+def saldos_al(instante, producto_id=None, bodega_id=None, producto_ids=None):
+    """
+    Saldos por (producto, bodega, lote) de los movimientos con fecha < instante
+    (instante None: todos, el saldo vigente), opcionalmente de una sola bodega
+    o de un conjunto de productos (producto_ids, p. ej. una página).
+    Devuelve (cierre usado o None, {(producto_id, bodega_id, lote_id): cantidad}).
+    """
+    cierre = cierre_anterior(instante)
+    saldos = defaultdict(Decimal)
+    desde = None
+    if cierre is not None:
+        fotos = SaldoInventario.objects.filter(cierre=cierre)
+        if producto_id is not None:
+            fotos = fotos.filter(producto_id=producto_id)
+        if bodega_id is not None:
+            fotos = fotos.filter(bodega_id=bodega_id)
+        if producto_ids is not None:
+            fotos = fotos.filter(producto_id__in=producto_ids)
+        for prod, bod, lote, cantidad in fotos.values_list(
+            'producto_id', 'bodega_id', 'lote_id', 'cantidad'
+        ).iterator(chunk_size=CHUNK_SIZE):
+            saldos[(prod, bod, lote)] = cantidad
+        desde = cierre.corte
+
+    for clave, variacion in variaciones(desde, instante, producto_id, bodega_id, producto_ids).items():
+        saldos[clave] += variacion
+    return cierre, saldos
+
+
+def generar_cierre(corte=None):
+    """Crea (o rehace) el cierre en `corte` (por defecto, ahora). Devuelve el CierreSaldo."""
+    inicio = reloj.perf_counter()
+    corte = corte or timezone.now()
+
+    with transaction.atomic():
+        existente = CierreSaldo.objects.filter(corte=corte).first()
+        if existente:
+            _borrar_cierres(CierreSaldo.objects.filter(pk=existente.pk))
+
+        _, saldos = saldos_al(corte)
+        cierre = CierreSaldo.objects.create(corte=corte)
+        filas = [
+            SaldoInventario(cierre=cierre, producto_id=prod, bodega_id=bod, lote_id=lote, cantidad=cantidad)
+            for (prod, bod, lote), cantidad in saldos.items() if cantidad
+        ]
+        SaldoInventario.objects.bulk_create(filas, batch_size=CHUNK_SIZE)
+
+        cierre.filas = len(filas)
+        cierre.duracion_segundos = round(reloj.perf_counter() - inicio, 3)
+        cierre.save(update_fields=['filas', 'duracion_segundos'])
+    return cierre
+
+
+def cierre_corresponde(ahora=None):
+    """True si pasó el intervalo configurado (CIERRE_SALDO_INTERVALO_HORAS) desde el último cierre."""
+    ahora = ahora or timezone.now()
+    ultimo = cierre_anterior()
+    intervalo = timedelta(hours=getattr(settings, 'CIERRE_SALDO_INTERVALO_HORAS', 24))
+    return ultimo is None or ultimo.corte + intervalo <= ahora
+
+
+def _borrar_cierres(cierres):
+    # DELETE directo: la auditoría de post_delete cargaría cada SaldoInventario
+    borrar_filas(SaldoInventario.objects.filter(cierre__in=cierres.values('pk')))
+    borrar_filas(cierres)
+
+
+def invalidar_cierres(fecha):
+    """Descarta los cierres posteriores a `fecha` (un movimiento de esa fecha cambió)."""
+    cierres = CierreSaldo.objects.filter(corte__gt=fecha)
+    if cierres.exists():
+        _borrar_cierres(cierres)
@@ -1,3 +1,1068 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, transaction
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from inventario import kardex
+from inventario.conteos import (
+    abrir_conteo, cargar_conteo, leer_archivo, lecturas_de_codigos, lecturas_de_filas, publicar_conteo,
+)
+from inventario.costeo import nuevo_costo_promedio, recalcular_costos
+from inventario.datos_prueba import generar
+from inventario.documentos import registrar_documento, resolver_lineas
+from inventario.idempotencia import publicar_una_vez
+from inventario.matriz import filas_matriz
+from inventario.pronostico import LEAD_TIME_DEFECTO, aplicar_puntos_reorden, calcular_pronosticos
+from inventario.reposicion import reporte_reposicion
+from inventario.models import (
+    Bodega, CierreSaldo, DocumentoMovimiento, EjecucionPronostico, Lote, MovimientoInventario, PronosticoDemanda, ReservaStock,
+    ResumenDiarioMovimiento, ValorizacionInventario,
+)
+from inventario.reservas import barrer_vencidas, liberar, reservar
+from inventario.resumen import reconstruir, tendencia
+from inventario.saldos import generar_cierre, saldos_al
+from inventario.transferencias import registrar_transferencia
+from inventario.valorizacion import valorizar
+from productos.models import Producto
+from proveedores.forms import normalizar_rut
+from proveedores.models import ProductoProveedor, Proveedor
+from utils.pruebas import PresupuestoConsultasMixin, crear_datos_semilla
+
+XHR = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+
+class PresupuestoInventarioTests(PresupuestoConsultasMixin, TestCase):
+    """Consultas y filas máximas de las vistas y endpoints AJAX de inventario sobre los datos semilla."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.bodega = cls.datos['bodegas'][0]
+        cls.producto = cls.datos['sin_lote'][0]
+        cls.proveedor = ProductoProveedor.objects.filter(producto=cls.producto).order_by('id').first().proveedor
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.datos['admin'])
+
+    def get(self, url, datos=None, **cabeceras):
+        respuesta = self.client.get(url, datos, **cabeceras)
+        self.assertLess(respuesta.status_code, 400)
+        return respuesta
+
+    # ---- Movimientos ----
+    def test_movimientos_lista(self):
+        with self.assertPresupuesto(consultas=10, filas=23):
+            self.get(reverse('inventario:inicio'), {'tipo': '', 'buscar': '', 'bodega': '', 'pp': 10})
+
+    def test_movimientos_lista_filtrada(self):
+        with self.assertPresupuesto(consultas=9, filas=13):
+            self.get(reverse('inventario:inicio'), {
+                'tipo': 'INGRESO', 'buscar': 'SKU00', 'bodega': self.bodega.pk, 'pp': 100,
+            })
+
+    def test_movimientos_exportar_xlsx(self):
+        with self.assertPresupuesto(consultas=6, filas=92):
+            self.get(reverse('inventario:inicio'), {'export': 'xlsx', 'tipo': '', 'buscar': '', 'bodega': ''})
+
+    def test_movimientos_registrar(self):
+        antes = MovimientoInventario.objects.count()
+        with self.assertPresupuesto(consultas=15, filas=11):
+            self.client.post(reverse('inventario:inicio'), {
+                'tipo': 'INGRESO', 'proveedor': self.proveedor.pk, 'producto': self.producto.pk,
+                'bodega_destino': self.bodega.pk, 'cantidad': '1', 'observacion': 'presupuesto',
+            })
+        self.assertEqual(MovimientoInventario.objects.count(), antes + 1)
+
+    def test_movimiento_detalle(self):
+        with self.assertPresupuesto(consultas=8, filas=8):
+            self.get(reverse('inventario:detalle_movimiento', args=[self.datos['movimiento'].pk]))
+
+    def test_movimiento_editar(self):
+        with self.assertPresupuesto(consultas=10, filas=27):
+            self.get(reverse('inventario:editar_movimiento', args=[self.datos['movimiento'].pk]))
+
+    # ---- AJAX ----
+    def test_ajax_productos_por_proveedor(self):
+        with self.assertPresupuesto(consultas=3, filas=12):
+            self.get(reverse('inventario:productos_por_proveedor', args=[self.proveedor.pk]), **XHR)
+
+    def test_ajax_lotes_por_producto(self):
+        with self.assertPresupuesto(consultas=3, filas=4):
+            self.get(reverse('inventario:lotes_por_producto', args=[self.datos['lote'].producto_id]), **XHR)
+
+    # ---- Bodegas, documentos y transferencias ----
+    def test_bodegas(self):
+        with self.assertPresupuesto(consultas=3, filas=4):
+            self.get(reverse('inventario:lista_bodegas'))
+
+    def test_stock_por_bodega(self):
+        # Los productos sin lote suman el cierre y las cuatro consultas agrupadas de saldos (fijas por página)
+        with self.assertPresupuesto(consultas=15, filas=122):
+            self.get(reverse('inventario:stock_bodegas'))
+
+    def test_documento_nuevo(self):
+        with self.assertPresupuesto(consultas=5, filas=12):
+            self.get(reverse('inventario:nuevo_documento'))
+
+    def test_documento_detalle(self):
+        with self.assertPresupuesto(consultas=4, filas=33):
+            self.get(reverse('inventario:detalle_documento', args=[self.datos['ingresos'][0].pk]))
+
+    def test_transferencia_nueva(self):
+        with self.assertPresupuesto(consultas=4, filas=6):
+            self.get(reverse('inventario:nueva_transferencia'))
+
+    # ---- Conteos, lotes y reportes ----
+    def test_conteos(self):
+        with self.assertPresupuesto(consultas=6, filas=8):
+            self.get(reverse('inventario:lista_conteos'))
+
+    def test_conteo_detalle(self):
+        with self.assertPresupuesto(consultas=6, filas=35):
+            self.get(reverse('inventario:detalle_conteo', args=[self.datos['conteo'].pk]))
+
+    def test_lotes(self):
+        with self.assertPresupuesto(consultas=6, filas=26):
+            self.get(reverse('inventario:lista_lotes'))
+
+    def test_reposicion(self):
+        with self.assertPresupuesto(consultas=4, filas=92):
+            self.get(reverse('inventario:reposicion'))
+
+    def test_kardex(self):
+        with self.assertPresupuesto(consultas=6, filas=15):
+            self.get(reverse('inventario:kardex', args=[self.producto.pk]))
+
+    def test_valorizacion(self):
+        with self.assertPresupuesto(consultas=7, filas=57):
+            self.get(reverse('inventario:valorizacion'))
+
+    def test_resumen_movimientos(self):
+        with self.assertPresupuesto(consultas=4, filas=8):
+            self.get(reverse('inventario:resumen_movimientos'))
+
+
+class CuadraturaMixin:
+    """Stock del producto y de cada lote contra el saldo del kardex y de los cierres."""
+
+    def assertSaldosCuadran(self):
+        _, saldos = saldos_al(timezone.now() + timedelta(seconds=1))
+        por_producto, por_lote = defaultdict(Decimal), defaultdict(Decimal)
+        for (producto_id, _, lote_id), cantidad in saldos.items():
+            por_producto[producto_id] += cantidad
+            if lote_id:
+                por_lote[lote_id] += cantidad
+        for producto in Producto.objects.all():
+            self.assertEqual(por_producto[producto.pk], producto.stock_actual, producto.sku)
+            self.assertEqual(kardex.saldo(producto.pk), producto.stock_actual, producto.sku)
+        for lote in Lote.objects.filter(producto__control_por_lote=True):
+            self.assertEqual(por_lote[lote.pk], lote.cantidad_disponible, lote.codigo)
+
+
+class SaldosTests(CuadraturaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.bodega = cls.datos['bodegas'][0]
+        cls.producto = cls.datos['sin_lote'][0]
+
+    def setUp(self):
+        self.producto.refresh_from_db()
+
+    def test_datos_semilla_cuadran(self):
+        self.assertSaldosCuadran()
+
+    def test_cierre_y_variaciones_posteriores(self):
+        cierre = generar_cierre()
+        self.assertGreater(cierre.filas, 0)
+        MovimientoInventario(
+            tipo='SALIDA', producto=self.producto, bodega_origen=self.bodega, cantidad=Decimal(2),
+        ).save()
+        _, saldos = saldos_al(timezone.now() + timedelta(seconds=1), producto_id=self.producto.pk)
+        self.producto.refresh_from_db()
+        self.assertEqual(sum(saldos.values()), self.producto.stock_actual)
+        self.assertEqual(kardex.saldo(self.producto.pk), self.producto.stock_actual)
+
+    def test_saldo_historico_y_cierre_invalidado(self):
+        movimiento = MovimientoInventario(
+            tipo='INGRESO', producto=self.producto, bodega_destino=self.bodega, cantidad=Decimal(5),
+        )
+        movimiento.save()
+        instante = movimiento.fecha + timedelta(microseconds=1)
+        _, antes = saldos_al(instante, producto_id=self.producto.pk)
+        cierre = generar_cierre()
+        MovimientoInventario(
+            tipo='SALIDA', producto=self.producto, bodega_origen=self.bodega, cantidad=Decimal(1),
+        ).save()
+        # El saldo a un instante pasado no cambia con el cierre ni con movimientos posteriores
+        self.assertEqual(saldos_al(instante, producto_id=self.producto.pk)[1], antes)
+        self.assertSaldosCuadran()
+
+        # Editar un movimiento anterior al corte descarta la foto que lo incluía
+        movimiento.observacion = 'corregido'
+        movimiento.save()
+        self.assertFalse(CierreSaldo.objects.filter(pk=cierre.pk).exists())
+        self.assertSaldosCuadran()
+
+    def test_salida_mayor_al_stock_se_rechaza(self):
+        stock = self.producto.stock_actual
+        with self.assertRaises(ValidationError):
+            MovimientoInventario(
+                tipo='SALIDA', producto=self.producto, bodega_origen=self.bodega, cantidad=stock + 1,
+            ).save()
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock_actual, stock)
+        self.assertSaldosCuadran()
+
+    def test_documento_salida_mayor_al_stock_se_rechaza(self):
+        documento = DocumentoMovimiento(tipo='SALIDA', bodega_origen=self.bodega)
+        linea = {'producto_id': self.producto.pk, 'lote_id': None, 'cantidad': self.producto.stock_actual + 1,
+                 'fecha_vencimiento': None}
+        with self.assertRaises(ValidationError) as error:
+            registrar_documento(documento, [linea])
+        self.assertIn('no hay stock suficiente', error.exception.messages[0])
+        self.assertFalse(DocumentoMovimiento.objects.filter(pk=documento.pk).exists())
+        self.assertSaldosCuadran()
+
+
+class AjusteTests(CuadraturaMixin, TestCase):
+    """El AJUSTE lleva signo y mueve igual el stock del producto y el del lote."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.bodega = cls.datos['bodegas'][1]
+        cls.lote = Lote.objects.filter(bodega=cls.bodega, producto__control_por_lote=True).order_by('id').first()
+
+    def setUp(self):
+        self.lote.refresh_from_db()
+        self.producto = Producto.objects.get(pk=self.lote.producto_id)
+
+    def ajustar_documento(self, cantidad, **fila):
+        lineas, errores = resolver_lineas([{'lote_id': self.lote.pk, 'cantidad': cantidad, **fila}], 'AJUSTE')
+        self.assertEqual(errores, [])
+        registrar_documento(DocumentoMovimiento(tipo='AJUSTE', bodega_destino=self.bodega), lineas)
+
+    def assertCambio(self, cantidad):
+        stock, disponible = self.producto.stock_actual, self.lote.cantidad_disponible
+        self.producto.refresh_from_db()
+        self.lote.refresh_from_db()
+        self.assertEqual(self.producto.stock_actual, stock + cantidad)
+        self.assertEqual(self.lote.cantidad_disponible, disponible + cantidad)
+        self.assertSaldosCuadran()
+
+    def test_documento_ajuste_positivo(self):
+        self.ajustar_documento('3', producto_id=self.producto.pk)
+        self.assertCambio(3)
+
+    def test_documento_ajuste_negativo(self):
+        self.ajustar_documento('-2', sku=self.producto.sku)
+        self.assertCambio(-2)
+
+    def test_movimiento_ajuste_con_signo(self):
+        for cantidad in (Decimal(4), Decimal(-1)):
+            MovimientoInventario(
+                tipo='AJUSTE', producto=self.producto, lote=self.lote, bodega_destino=self.bodega, cantidad=cantidad,
+            ).save()
+            self.assertCambio(cantidad)
+
+    def test_ajuste_no_deja_el_lote_en_negativo(self):
+        retiro = -(self.lote.cantidad_disponible + 1)
+        lineas, _ = resolver_lineas([{'producto_id': self.producto.pk, 'lote_id': self.lote.pk, 'cantidad': retiro}], 'AJUSTE')
+        with self.assertRaises(ValidationError):
+            registrar_documento(DocumentoMovimiento(tipo='AJUSTE', bodega_destino=self.bodega), lineas)
+        with self.assertRaises(ValidationError):
+            MovimientoInventario(
+                tipo='AJUSTE', producto=self.producto, lote=self.lote, bodega_destino=self.bodega, cantidad=retiro,
+            ).save()
+        self.assertCambio(0)
+
+    def test_cantidades_validas_segun_tipo(self):
+        fila = {'producto_id': self.producto.pk, 'cantidad': '-1'}
+        self.assertEqual(len(resolver_lineas([fila], 'AJUSTE')[0]), 1)
+        self.assertEqual(len(resolver_lineas([fila], 'SALIDA')[1]), 1)
+        self.assertEqual(len(resolver_lineas([{**fila, 'cantidad': '0'}], 'AJUSTE')[1]), 1)
+
+
+class ConteoPorBodegaTests(CuadraturaMixin, TestCase):
+    """Un conteo de una bodega compara contra el saldo de esa bodega, no contra el stock total."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.n1, cls.n2 = cls.datos['bodegas'][:2]
+        cls.producto = Producto.objects.create(sku='CONTEO-N', nombre='Producto en dos bodegas', categoria='TORTAS')
+        for bodega in (cls.n1, cls.n2):
+            MovimientoInventario(
+                tipo='INGRESO', producto=cls.producto, bodega_destino=bodega, cantidad=Decimal(50),
+            ).save()
+
+    def contar(self, conteo, cantidad):
+        cargar_conteo(conteo, lecturas_de_filas([{'codigo': self.producto.sku, 'cantidad': cantidad}]))
+        return publicar_conteo(conteo)
+
+    def saldo_n1(self):
+        return kardex.saldo(self.producto.pk, self.n1.pk)
+
+    def test_foto_con_el_saldo_de_la_bodega(self):
+        conteo = abrir_conteo(bodega=self.n1, categoria='TORTAS')
+        self.assertEqual(conteo.lineas.get(producto=self.producto).cantidad_sistema, 50)
+
+    def test_conteo_correcto_no_ajusta(self):
+        self.assertIsNone(self.contar(abrir_conteo(bodega=self.n1, categoria='TORTAS'), 50))
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock_actual, 100)
+        self.assertEqual(kardex.saldo(self.producto.pk, self.n2.pk), 50)
+
+    def test_diferencia_solo_en_la_bodega_contada(self):
+        documento = self.contar(abrir_conteo(bodega=self.n1, categoria='TORTAS'), 45)
+        ajuste = documento.lineas.get()
+        self.assertEqual((ajuste.cantidad, ajuste.bodega_destino_id), (-5, self.n1.pk))
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock_actual, 95)
+        self.assertEqual(self.saldo_n1(), 45)
+        self.assertSaldosCuadran()
+
+    def test_movimientos_durante_el_conteo_se_respetan(self):
+        conteo = abrir_conteo(bodega=self.n1, categoria='TORTAS')
+        MovimientoInventario(tipo='SALIDA', producto=self.producto, bodega_origen=self.n1, cantidad=Decimal(10)).save()
+        self.assertIsNone(self.contar(conteo, 40))
+        self.assertEqual(self.saldo_n1(), 40)
+
+
+class ValorizacionFifoTests(TestCase):
+    """Capas FIFO por producto y bodega: las salidas consumen las más antiguas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.n1, cls.n2 = cls.datos['bodegas'][:2]
+        cls.producto = Producto.objects.create(sku='FIFO-1', nombre='Producto FIFO', categoria='TORTAS')
+        for tipo, cantidad, costo, origen, destino in (
+            ('INGRESO', 10, 100, None, cls.n1),
+            ('INGRESO', 10, 200, None, cls.n1),
+            ('SALIDA', 12, None, cls.n1, None),
+            ('TRANSFERENCIA', 3, None, cls.n1, cls.n2),
+        ):
+            MovimientoInventario(
+                tipo=tipo, producto=cls.producto, cantidad=Decimal(cantidad),
+                costo_unitario=Decimal(costo) if costo else None, bodega_origen=origen, bodega_destino=destino,
+            ).save()
+        cls.corte = timezone.localdate()
+
+    def filas(self):
+        return {
+            v.bodega_id: (v.cantidad, v.valor)
+            for v in ValorizacionInventario.objects.filter(corte=self.corte, producto=self.producto)
+        }
+
+    def test_salida_consume_las_capas_mas_antiguas(self):
+        ejecucion = valorizar(self.corte)
+        # Quedan 8 de la capa de 200; 3 pasan a N2 con su costo
+        self.assertEqual(self.filas(), {self.n1.pk: (5, 1000), self.n2.pk: (3, 600)})
+        self.assertGreaterEqual(ejecucion.filas, 2)
+
+    def test_recalcular_reemplaza_el_corte(self):
+        primera = valorizar(self.corte)
+        total = ValorizacionInventario.objects.filter(corte=self.corte).count()
+        segunda = valorizar(self.corte)
+        self.assertEqual(ValorizacionInventario.objects.filter(corte=self.corte).count(), total)
+        self.assertEqual((segunda.pk, segunda.valor_total), (primera.pk, primera.valor_total))
+
+
+class FiltrosInvalidosTests(TestCase):
+    """Un filtro mal escrito en la URL de un reporte se ignora, no termina en error 500."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        valorizar(timezone.localdate())
+
+    def setUp(self):
+        self.client.force_login(self.datos['admin'])
+
+    def test_valorizacion(self):
+        for filtros in ({'corte': '2024-02-30'}, {'corte': 'abc'}, {'bodega': 'x'}):
+            with self.subTest(filtros=filtros):
+                respuesta = self.client.get(reverse('inventario:valorizacion'), filtros)
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertEqual(respuesta.context['ejecucion'].corte, timezone.localdate())
+
+    def test_kardex(self):
+        url = reverse('inventario:kardex', args=[self.datos['sin_lote'][0].pk])
+        completo = self.client.get(url)
+        respuesta = self.client.get(url, {'desde': '2024-02-30', 'hasta': '2024-13-01'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.context['f_desde'], '')
+        self.assertEqual(len(respuesta.context['filas']), len(completo.context['filas']))
+
+    def test_resumen_movimientos(self):
+        respuesta = self.client.get(reverse('inventario:resumen_movimientos'), {'desde': '2024-02-30', 'hasta': 'x'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.context['hasta'], timezone.localdate())
+
+
+class MatrizStockTests(TestCase):
+    """Matriz producto × bodega: lotes para productos con lote, saldos para el resto."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.n1, cls.n2 = cls.datos['bodegas'][:2]
+        cls.producto = Producto.objects.create(sku='MATRIZ-1', nombre='Producto sin lote', categoria='TORTAS')
+        for bodega, cantidad in ((cls.n1, 50), (cls.n2, 30)):
+            MovimientoInventario(
+                tipo='INGRESO', producto=cls.producto, bodega_destino=bodega, cantidad=Decimal(cantidad),
+            ).save()
+        MovimientoInventario(
+            tipo='TRANSFERENCIA', producto=cls.producto, bodega_origen=cls.n1, bodega_destino=cls.n2, cantidad=Decimal(5),
+        ).save()
+
+    def test_producto_sin_lote_por_bodega(self):
+        generar_cierre()
+        MovimientoInventario(tipo='SALIDA', producto=self.producto, bodega_origen=self.n2, cantidad=Decimal(1)).save()
+        self.producto.refresh_from_db()
+        fila, = filas_matriz([self.producto], [self.n1.pk, self.n2.pk])
+        self.assertEqual(fila['celdas'], [45, 34])
+        self.assertEqual(fila['en_bodegas'], self.producto.stock_actual)
+
+    def test_producto_con_lote_desde_los_lotes(self):
+        lote = self.datos['lote']
+        producto = Producto.objects.get(pk=lote.producto_id)
+        fila, = filas_matriz([producto], [lote.bodega_id])
+        disponible = sum(Lote.objects.filter(producto=producto, bodega=lote.bodega_id).values_list('cantidad_disponible', flat=True))
+        self.assertEqual(fila['celdas'], [disponible])
+
+
+class CostoPromedioTests(TestCase):
+    """Costo promedio ponderado incremental y su reconstrucción desde el historial."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.bodega = cls.datos['bodegas'][0]
+        cls.proveedor = cls.datos['proveedores'][0]
+        cls.producto = Producto.objects.create(
+            sku='COSTO-1', nombre='Producto costeado', categoria='TORTAS', costo_estandar=Decimal(90),
+        )
+        ProductoProveedor.objects.create(
+            producto=cls.producto, proveedor=cls.proveedor, costo=Decimal(200), descuento_pct=Decimal(10),
+        )
+
+    def ingresar(self, cantidad, proveedor=None):
+        movimiento = MovimientoInventario(
+            tipo='INGRESO', producto=Producto.objects.get(pk=self.producto.pk), proveedor=proveedor,
+            bodega_destino=self.bodega, cantidad=Decimal(cantidad),
+        )
+        movimiento.save()
+        return movimiento
+
+    def costo(self):
+        return Producto.objects.get(pk=self.producto.pk).costo_promedio
+
+    def test_formula(self):
+        self.assertEqual(nuevo_costo_promedio(Decimal(10), Decimal(100), Decimal(10), Decimal(200)), 150)
+        self.assertEqual(nuevo_costo_promedio(Decimal(0), Decimal(100), Decimal(5), Decimal('80.456')), Decimal('80.46'))
+        self.assertEqual(nuevo_costo_promedio(Decimal(10), Decimal(100), Decimal(5), None), 100)
+
+    def test_costo_del_proveedor_con_descuento_o_estandar(self):
+        self.assertEqual(self.ingresar(10).costo_unitario, 90)
+        self.assertEqual(self.ingresar(10, self.proveedor).costo_unitario, 180)
+        self.assertEqual(self.costo(), 135)
+        # La salida mueve stock pero no el costo
+        MovimientoInventario(
+            tipo='SALIDA', producto=Producto.objects.get(pk=self.producto.pk), bodega_origen=self.bodega,
+            cantidad=Decimal(15),
+        ).save()
+        self.ingresar(5, self.proveedor)
+        self.assertEqual(self.costo(), Decimal('157.50'))
+
+    def test_documento_igual_que_movimientos_sueltos(self):
+        lineas = [{'producto_id': self.producto.pk, 'lote_id': None, 'cantidad': Decimal(c), 'fecha_vencimiento': None}
+                  for c in (10, 30)]
+        registrar_documento(DocumentoMovimiento(tipo='INGRESO', proveedor=self.proveedor, bodega_destino=self.bodega), lineas)
+        self.assertEqual(self.costo(), 180)
+
+    def test_recalcular_reconstruye_el_incremental(self):
+        self.ingresar(10)
+        self.ingresar(30, self.proveedor)
+        incremental = self.costo()
+        Producto.objects.filter(pk=self.producto.pk).update(costo_promedio=None)
+        recalcular_costos()
+        self.assertEqual(self.costo(), incremental)
+
+    def test_recalcular_salida_con_signo(self):
+        # Historial antiguo (sin pasar por save()) con una salida mayor al stock de entonces;
+        # misma fecha: el recorrido sigue el orden de id
+        base = {'producto': self.producto, 'bodega_destino': self.bodega, 'bodega_origen': self.bodega}
+        MovimientoInventario.objects.bulk_create([
+            MovimientoInventario(tipo='INGRESO', cantidad=Decimal(10), costo_unitario=Decimal(100), **base),
+            MovimientoInventario(tipo='SALIDA', cantidad=Decimal(15), **base),
+            MovimientoInventario(tipo='INGRESO', cantidad=Decimal(10), costo_unitario=Decimal(200), **base),
+            MovimientoInventario(tipo='INGRESO', cantidad=Decimal(10), costo_unitario=Decimal(100), **base),
+        ])
+        recalcular_costos()
+        # Stock -5 → 5 al costo 200; luego (5 × 200 + 10 × 100) / 15, no (10 × 200 + 10 × 100) / 20
+        self.assertEqual(self.costo(), Decimal('133.33'))
+
+
+class TransferenciaTests(CuadraturaMixin, TestCase):
+    """La TRANSFERENCIA mueve cantidad del lote de origen a su parte en la bodega de destino."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.origen = Lote.objects.filter(
+            producto__control_por_lote=True, bodega__isnull=False, cantidad_disponible__gte=10,
+        ).order_by('id').first()
+        cls.destino = next(b for b in cls.datos['bodegas'] if b.pk != cls.origen.bodega_id)
+
+    def setUp(self):
+        self.origen.refresh_from_db()
+        self.producto = Producto.objects.get(pk=self.origen.producto_id)
+
+    def transferir(self, cantidad, lote=None, origen=None, destino=None):
+        lote = lote or self.origen
+        movimiento = MovimientoInventario(
+            tipo='TRANSFERENCIA', producto=self.producto, lote=lote, cantidad=Decimal(cantidad),
+            bodega_origen_id=(origen or lote.bodega).pk, bodega_destino=destino or self.destino,
+        )
+        movimiento.save()
+        return movimiento
+
+    def test_mueve_el_lote_sin_cambiar_el_stock_del_producto(self):
+        disponible, stock = self.origen.cantidad_disponible, self.producto.stock_actual
+        movimiento = self.transferir(3)
+        parte = movimiento.lote_destino
+        self.assertEqual(parte.codigo, f"{self.origen.codigo}@{self.destino.codigo}")
+        self.assertEqual((parte.bodega_id, parte.fecha_vencimiento), (self.destino.pk, self.origen.fecha_vencimiento))
+        self.assertEqual(parte.cantidad_disponible, 3)
+        # La segunda transferencia reutiliza la misma parte
+        self.assertEqual(self.transferir(2).lote_destino.pk, parte.pk)
+        self.origen.refresh_from_db()
+        parte.refresh_from_db()
+        self.producto.refresh_from_db()
+        self.assertEqual((self.origen.cantidad_disponible, parte.cantidad_disponible), (disponible - 5, 5))
+        self.assertEqual(self.producto.stock_actual, stock)
+        self.assertSaldosCuadran()
+
+    def test_volver_a_la_bodega_del_lote_base(self):
+        parte = self.transferir(4).lote_destino
+        regreso = self.transferir(4, lote=parte, origen=self.destino, destino=self.origen.bodega)
+        self.assertEqual(regreso.lote_destino.pk, self.origen.pk)
+        self.assertSaldosCuadran()
+
+    def test_documento_todo_o_nada(self):
+        disponible = self.origen.cantidad_disponible
+        linea = {'producto_id': self.producto.pk, 'lote_id': self.origen.pk, 'cantidad': disponible}
+        with self.assertRaises(ValidationError):
+            registrar_transferencia(self.origen.bodega, self.destino, [linea, {**linea, 'cantidad': Decimal(1)}])
+        self.origen.refresh_from_db()
+        self.assertEqual(self.origen.cantidad_disponible, disponible)
+
+        movimientos = registrar_transferencia(
+            self.origen.bodega, self.destino, [{**linea, 'cantidad': Decimal(1)}, {**linea, 'cantidad': Decimal(2)}],
+        )
+        self.assertEqual(len({m.lote_destino_id for m in movimientos}), 1)
+        self.origen.refresh_from_db()
+        self.assertEqual(self.origen.cantidad_disponible, disponible - 3)
+        self.assertSaldosCuadran()
+
+    def test_lote_fuera_de_la_bodega_de_origen(self):
+        linea = {'producto_id': self.producto.pk, 'lote_id': self.origen.pk, 'cantidad': Decimal(1)}
+        with self.assertRaises(ValidationError) as error:
+            registrar_transferencia(self.destino, self.origen.bodega, [linea])
+        self.assertIn('no está en', error.exception.messages[0])
+
+    def test_sin_lote_no_saca_mas_que_el_saldo_de_la_bodega(self):
+        producto = Producto.objects.get(pk=self.datos['sin_lote'][0].pk)
+        bodega, destino = self.datos['bodegas'][0], self.datos['bodegas'][1]
+        _, saldos = saldos_al(None, bodega_id=bodega.pk, producto_ids=[producto.pk])
+        en_bodega = sum(saldos.values(), Decimal(0))
+        self.assertGreater(en_bodega, 0)
+
+        transferencias = MovimientoInventario.objects.filter(tipo='TRANSFERENCIA', producto=producto)
+        antes = transferencias.count()
+
+        linea = {'producto_id': producto.pk, 'lote_id': None, 'cantidad': en_bodega}
+        # Dos líneas que juntas exceden el saldo, aunque cada una cabe
+        with self.assertRaises(ValidationError) as error:
+            registrar_transferencia(bodega, destino, [linea, {**linea, 'cantidad': Decimal(1)}])
+        self.assertIn('no hay stock suficiente', error.exception.messages[0])
+        with self.assertRaises(ValidationError):
+            MovimientoInventario(
+                tipo='TRANSFERENCIA', producto=producto, cantidad=en_bodega + 1,
+                bodega_origen=bodega, bodega_destino=destino,
+            ).save()
+        self.assertEqual(transferencias.count(), antes)
+
+        registrar_transferencia(bodega, destino, [linea])
+        _, saldos = saldos_al(None, bodega_id=bodega.pk, producto_ids=[producto.pk])
+        self.assertEqual(sum(saldos.values(), Decimal(0)), 0)
+        self.assertSaldosCuadran()
+
+
+class DocumentoTests(CuadraturaMixin, TestCase):
+    """Documentos de varias líneas: todas se publican en una transacción con las reglas de save()."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.bodega = cls.datos['bodegas'][0]
+        cls.con_lote = next(p for p in cls.datos['productos'] if p.control_por_lote)
+        cls.sin_lote = cls.datos['sin_lote'][0]
+
+    def test_resolver_por_sku_y_codigo_de_lote(self):
+        lote = self.datos['lote']
+        producto = Producto.objects.get(pk=lote.producto_id)
+        lineas, errores = resolver_lineas([
+            {'sku': producto.sku, 'lote': lote.codigo, 'cantidad': '2.5'},
+            {'sku': 'NO-EXISTE', 'cantidad': '1'},
+            {'producto_id': producto.pk, 'cantidad': '1', 'fecha_vencimiento': '31-12-2030'},
+            {'producto_id': producto.pk, 'cantidad': 'NaN'},
+        ], 'SALIDA')
+        self.assertEqual(lineas, [
+            {'producto_id': producto.pk, 'lote_id': lote.pk, 'cantidad': Decimal('2.5'), 'fecha_vencimiento': None},
+        ])
+        self.assertEqual([e.split(':')[0] for e in errores], ['Línea 2', 'Línea 3', 'Línea 4'])
+
+    def test_ingreso_crea_lotes_y_una_linea_por_fila(self):
+        stock = Producto.objects.get(pk=self.con_lote.pk).stock_actual
+        vence = timezone.localdate() + timedelta(days=90)
+        lineas, errores = resolver_lineas([
+            {'producto_id': self.con_lote.pk, 'cantidad': '5', 'fecha_vencimiento': vence.isoformat()},
+            {'producto_id': self.con_lote.pk, 'cantidad': '7', 'fecha_vencimiento': vence.isoformat()},
+            {'producto_id': self.sin_lote.pk, 'cantidad': '3'},
+        ], 'INGRESO')
+        self.assertEqual(errores, [])
+        documento = DocumentoMovimiento(tipo='INGRESO', bodega_destino=self.bodega, documento_referencia='FAC-1')
+        registrar_documento(documento, lineas)
+
+        self.assertEqual(documento.total_lineas, 3)
+        movimientos = list(documento.lineas.order_by('id'))
+        self.assertEqual([m.documento_referencia for m in movimientos], ['FAC-1'] * 3)
+        nuevos = [m.lote for m in movimientos[:2]]
+        self.assertEqual(len({l.codigo for l in nuevos}), 2)
+        self.assertEqual([l.bodega_id for l in nuevos], [self.bodega.pk] * 2)
+        self.assertEqual(nuevos[0].fecha_vencimiento, vence)
+        self.assertEqual(Producto.objects.get(pk=self.con_lote.pk).stock_actual, stock + 12)
+        self.assertSaldosCuadran()
+
+    def test_perecible_sin_vencimiento_se_rechaza(self):
+        linea = {'producto_id': self.con_lote.pk, 'lote_id': None, 'cantidad': Decimal(1), 'fecha_vencimiento': None}
+        with self.assertRaises(ValidationError) as error:
+            registrar_documento(DocumentoMovimiento(tipo='INGRESO', bodega_destino=self.bodega), [linea])
+        self.assertIn('indique vencimiento', error.exception.messages[0])
+
+    def test_salida_de_lote(self):
+        lote = Lote.objects.filter(producto=self.con_lote, cantidad_disponible__gte=2).order_by('id').first()
+        documento = DocumentoMovimiento(tipo='SALIDA', bodega_origen=lote.bodega)
+        registrar_documento(documento, [
+            {'producto_id': self.con_lote.pk, 'lote_id': lote.pk, 'cantidad': Decimal(1), 'fecha_vencimiento': None},
+            {'producto_id': self.con_lote.pk, 'lote_id': lote.pk, 'cantidad': Decimal(1), 'fecha_vencimiento': None},
+        ])
+        disponible = lote.cantidad_disponible
+        lote.refresh_from_db()
+        self.assertEqual(lote.cantidad_disponible, disponible - 2)
+        self.assertSaldosCuadran()
+
+
+class IdempotenciaTests(TestCase):
+    """Publicación una sola vez por clave, en el formulario y ante envíos concurrentes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.bodega = cls.datos['bodegas'][0]
+        cls.producto = cls.datos['sin_lote'][0]
+        cls.proveedor = ProductoProveedor.objects.filter(producto=cls.producto).order_by('id').first().proveedor
+
+    def test_formulario_reenviado(self):
+        self.client.force_login(self.datos['admin'])
+        datos = {
+            'tipo': 'INGRESO', 'proveedor': self.proveedor.pk, 'producto': self.producto.pk,
+            'bodega_destino': self.bodega.pk, 'cantidad': '1', 'clave_idempotencia': 'form-1',
+        }
+        for _ in range(2):
+            self.client.post(reverse('inventario:inicio'), datos)
+        self.assertEqual(MovimientoInventario.objects.filter(clave_idempotencia='form-1').count(), 1)
+
+    def test_envio_concurrente_devuelve_el_del_ganador(self):
+        def publicar():
+            # El otro envío inserta la misma clave justo antes que este
+            MovimientoInventario(
+                tipo='INGRESO', producto=self.producto, bodega_destino=self.bodega, cantidad=Decimal(1),
+                clave_idempotencia='carrera',
+            ).save()
+            raise IntegrityError('UNIQUE constraint failed')
+
+        objeto, creado = publicar_una_vez(MovimientoInventario, 'carrera', publicar)
+        self.assertFalse(creado)
+        self.assertEqual(objeto.clave_idempotencia, 'carrera')
+
+
+class ReservaTests(TestCase):
+    """Lo reservado por una referencia no lo puede consumir otra; la SALIDA de la referencia lo usa."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.lote = Lote.objects.filter(
+            producto__control_por_lote=True, bodega__isnull=False, cantidad_disponible__gte=10,
+        ).order_by('id').first()
+
+    def setUp(self):
+        ReservaStock.objects.all().delete()
+        self.lote.refresh_from_db()
+        self.producto = Producto.objects.get(pk=self.lote.producto_id)
+
+    def reservar(self, cantidad, referencia='RES-A', **kwargs):
+        return reservar([{'lote_id': self.lote.pk, 'cantidad': Decimal(cantidad)}], referencia, **kwargs)
+
+    def salida(self, cantidad, referencia=None):
+        MovimientoInventario(
+            tipo='SALIDA', producto=Producto.objects.get(pk=self.producto.pk), lote=self.lote,
+            bodega_origen=self.lote.bodega, cantidad=Decimal(cantidad), documento_referencia=referencia,
+        ).save()
+
+    def test_otra_referencia_solo_ve_lo_libre(self):
+        libre = Decimal(2)
+        self.reservar(self.lote.cantidad_disponible - libre)
+        with self.assertRaises(ValidationError) as error:
+            self.salida(libre + 1, 'OTRO')
+        self.assertIn('reservado', error.exception.messages[0])
+        self.salida(libre, 'OTRO')
+
+    def test_salida_de_la_referencia_consume_la_reserva(self):
+        self.reservar(5)
+        self.salida(3, 'RES-A')
+        self.assertEqual(ReservaStock.objects.get(referencia='RES-A').cantidad, 2)
+        self.salida(2, 'RES-A')
+        self.assertFalse(ReservaStock.objects.filter(referencia='RES-A').exists())
+
+    def test_reservar_de_nuevo_suma_y_renueva(self):
+        primera, = self.reservar(2, minutos=5)
+        segunda, = self.reservar(3, minutos=60)
+        self.assertEqual((segunda.pk, segunda.cantidad), (primera.pk, 5))
+        self.assertGreater(segunda.vence, primera.vence)
+        with self.assertRaises(ValidationError):
+            self.reservar(self.lote.cantidad_disponible, referencia='RES-B')
+
+    def test_vencidas_no_cuentan_y_se_barren(self):
+        self.reservar(self.lote.cantidad_disponible)
+        ReservaStock.objects.update(vence=timezone.now() - timedelta(minutes=1))
+        self.reservar(1, referencia='RES-B')
+        self.assertEqual(barrer_vencidas(), 1)
+        self.assertEqual(liberar('RES-B'), 1)
+        self.assertFalse(ReservaStock.objects.exists())
+
+
+class ConteoTests(CuadraturaMixin, TestCase):
+    """Conteo cíclico: foto, carga de lo contado y publicación del AJUSTE."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.lote = Lote.objects.filter(
+            producto__control_por_lote=True, bodega__isnull=False, cantidad_disponible__gte=5,
+        ).order_by('id').first()
+        cls.bodega = cls.lote.bodega
+
+    def setUp(self):
+        self.conteo = abrir_conteo(bodega=self.bodega)
+        self.lote.refresh_from_db()
+
+    def test_leer_csv_con_punto_y_coma(self):
+        archivo = SimpleUploadedFile('conteo.csv', 'Código;Lote;Contado\nSKU1;L-1;4\n'.encode('utf-8-sig'))
+        df = leer_archivo(archivo)
+        self.assertEqual(list(df.columns), ['codigo', 'lote', 'cantidad'])
+        self.assertEqual(df.iloc[0].tolist(), ['SKU1', 'L-1', '4'])
+        with self.assertRaises(ValidationError):
+            leer_archivo(SimpleUploadedFile('conteo.txt', b'x'))
+
+    def test_errores_por_fila_sin_cambios(self):
+        with self.assertRaises(ValidationError) as error:
+            cargar_conteo(self.conteo, lecturas_de_filas([
+                {'codigo': 'NO-EXISTE', 'cantidad': 1},
+                {'codigo': self.lote.producto.sku, 'lote': 'NO-LOTE', 'cantidad': 1},
+                {'codigo': self.lote.producto.sku, 'lote': self.lote.codigo, 'cantidad': -1},
+            ]))
+        self.assertEqual(len(error.exception.messages), 3)
+        self.assertFalse(self.conteo.lineas.filter(cantidad_contada__isnull=False).exists())
+
+    def test_escaneos_se_suman_y_el_archivo_reemplaza(self):
+        codigo = self.lote.producto.sku
+        lectura = {'codigo': codigo, 'lote': self.lote.codigo, 'cantidad': 2}
+        cargar_conteo(self.conteo, lecturas_de_filas([lectura, lectura]), sumar=True)
+        cargar_conteo(self.conteo, lecturas_de_filas([lectura]), sumar=True)
+        linea = self.conteo.lineas.get(lote=self.lote)
+        self.assertEqual(linea.cantidad_contada, 6)
+        cargar_conteo(self.conteo, lecturas_de_filas([{**lectura, 'cantidad': 1}]))
+        linea.refresh_from_db()
+        self.assertEqual((linea.cantidad_contada, linea.diferencia), (1, 1 - self.lote.cantidad_disponible))
+
+    def test_publicar_ajusta_el_lote_y_cierra_el_conteo(self):
+        contado = self.lote.cantidad_disponible - 2
+        cargar_conteo(self.conteo, lecturas_de_filas([
+            {'codigo': self.lote.producto.sku, 'lote': self.lote.codigo, 'cantidad': contado},
+        ]))
+        documento = publicar_conteo(self.conteo, usuario=self.datos['admin'])
+        ajuste = documento.lineas.get()
+        self.assertEqual((ajuste.tipo, ajuste.lote_id, ajuste.cantidad), ('AJUSTE', self.lote.pk, -2))
+        self.lote.refresh_from_db()
+        self.assertEqual(self.lote.cantidad_disponible, contado)
+        self.assertSaldosCuadran()
+        with self.assertRaises(ValidationError):
+            publicar_conteo(self.conteo)
+        with self.assertRaises(ValidationError):
+            cargar_conteo(self.conteo, lecturas_de_codigos([self.lote.producto.sku]))
+
+
+class ReposicionTests(TestCase):
+    """Cantidad a pedir, proveedor elegido y costo por producto, calculados para todo el catálogo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.p1, cls.p2 = Proveedor.objects.bulk_create([
+            Proveedor(rut_nif=f'7600000{i}-0', razon_social=nombre, email=f'rep{i}@lilis.cl', condiciones_pago='EFECTIVO')
+            for i, nombre in enumerate(('Preferente', 'Barato'))
+        ])
+        # Bajo el punto de reorden, hasta stock_maximo y en múltiplos de min_lote
+        cls.con_maximo = Producto.objects.create(
+            sku='REP-1', nombre='Con maximo', categoria='TORTAS', stock_actual=5, punto_reorden=10, stock_maximo=50,
+        )
+        # Sin punto_reorden ni máximo: reorden = stock_minimo y objetivo = 2 × reorden
+        cls.sin_maximo = Producto.objects.create(sku='REP-2', nombre='Sin maximo', categoria='TORTAS', stock_actual=4, stock_minimo=5)
+        cls.con_stock = Producto.objects.create(sku='REP-3', nombre='Con stock', categoria='TORTAS', stock_actual=20, punto_reorden=10)
+        ProductoProveedor.objects.bulk_create([
+            ProductoProveedor(producto=cls.con_maximo, proveedor=cls.p1, costo=100, min_lote=12, lead_time_dias=3, preferente=True),
+            ProductoProveedor(producto=cls.con_maximo, proveedor=cls.p2, costo=50),
+            ProductoProveedor(producto=cls.sin_maximo, proveedor=cls.p1, costo=100, descuento_pct=50, lead_time_dias=3),
+            ProductoProveedor(producto=cls.sin_maximo, proveedor=cls.p2, costo=60),
+        ])
+
+    def sugerencias(self, recalcular=True):
+        df = reporte_reposicion(recalcular=recalcular)
+        return {fila.sku: fila for fila in df.itertuples()}
+
+    def test_cantidades_proveedor_y_costo(self):
+        filas = self.sugerencias()
+        self.assertEqual(set(filas), {'REP-1', 'REP-2'})
+
+        fila = filas['REP-1']
+        # Pedir 45 → 48 (múltiplo de 12); el preferente gana aunque sea más caro
+        self.assertEqual((fila.objetivo, fila.cantidad, fila.proveedor_id), (50, 48, self.p1.pk))
+        self.assertEqual(fila.costo_total, 4800)
+        self.assertEqual(fila.llegada_estimada.date(), date.today() + timedelta(days=3))
+
+        fila = filas['REP-2']
+        # Sin preferente: el de menor costo neto (100 con 50 % de descuento)
+        self.assertEqual((fila.reorden, fila.objetivo, fila.cantidad), (5, 10, 6))
+        self.assertEqual((fila.proveedor_id, fila.costo_unitario), (self.p1.pk, 50))
+
+    def test_cache_hasta_recalcular(self):
+        self.sugerencias()
+        Producto.objects.filter(pk=self.con_stock.pk).update(stock_actual=0)
+        self.assertNotIn('REP-3', self.sugerencias(recalcular=False))
+        self.assertIn('REP-3', self.sugerencias())
+
+
+class PronosticoTests(TestCase):
+    """Pronóstico de SALIDAS por producto: la corrida incremental equivale a procesar todo de una vez."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.constante = Producto.objects.create(sku='PRO-1', nombre='Constante', categoria='TORTAS')
+        cls.variable = Producto.objects.create(sku='PRO-2', nombre='Variable', categoria='TORTAS')
+        cls.hasta = timezone.localdate() - timedelta(days=1)
+        cls.inicio = cls.hasta - timedelta(days=59)
+        ResumenDiarioMovimiento.objects.bulk_create([
+            ResumenDiarioMovimiento(dia=cls.inicio + timedelta(days=d), producto=producto, tipo='SALIDA', cantidad=cantidad)
+            for d in range(60)
+            for producto, cantidad in ((cls.constante, 4), (cls.variable, d % 7 * 2))
+        ])
+
+    def estado(self):
+        return {
+            p.producto_id: (p.demanda_media, p.demanda_suavizada, p.pronostico_7_dias, p.punto_reorden_sugerido)
+            for p in PronosticoDemanda.objects.all()
+        }
+
+    def test_demanda_constante(self):
+        calcular_pronosticos(self.hasta)
+        pronostico = PronosticoDemanda.objects.get(producto=self.constante)
+        self.assertEqual((pronostico.demanda_media, pronostico.demanda_suavizada, pronostico.pronostico_7_dias), (4, 4, 28))
+        # Sin variación: punto de reorden = demanda × lead time por defecto
+        self.assertEqual(pronostico.punto_reorden_sugerido, 4 * LEAD_TIME_DEFECTO)
+        self.assertIsNone(calcular_pronosticos(self.hasta))
+
+    def test_incremental_igual_a_completo(self):
+        for corte in (self.hasta - timedelta(days=20), self.hasta - timedelta(days=1), self.hasta):
+            calcular_pronosticos(corte)
+        incremental = self.estado()
+        self.assertEqual(EjecucionPronostico.objects.count(), 3)
+
+        PronosticoDemanda.objects.all().delete()
+        EjecucionPronostico.objects.all().delete()
+        calcular_pronosticos(self.hasta)
+        self.assertEqual(self.estado(), incremental)
+
+    def test_aplicar_puntos_reorden(self):
+        calcular_pronosticos(self.hasta)
+        self.assertEqual(aplicar_puntos_reorden(), 2)
+        self.constante.refresh_from_db()
+        self.assertEqual(self.constante.punto_reorden, 4 * LEAD_TIME_DEFECTO)
+
+
+class AlertasLoteTests(TestCase):
+    """Ventanas de vencimiento sobre lotes que aún tienen saldo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        producto = Producto.objects.create(sku='VEN-1', nombre='Perecible', categoria='TORTAS', perishable=True)
+        hoy = date.today()
+        Lote.objects.bulk_create([
+            Lote(codigo=codigo, producto=producto, fecha_vencimiento=hoy + timedelta(days=dias), cantidad_disponible=cantidad)
+            for codigo, dias, cantidad in (
+                ('VEN-HOY', 0, 5), ('VEN-7', 7, 5), ('VEN-8', 8, 5), ('VEN-AYER', -1, 5), ('VEN-VACIO', 2, 0),
+            )
+        ])
+
+    def codigos(self, qs):
+        return set(qs.values_list('codigo', flat=True))
+
+    def test_por_vencer_y_vencidos(self):
+        self.assertEqual(self.codigos(Lote.objects.disponibles()), {'VEN-HOY', 'VEN-7', 'VEN-8', 'VEN-AYER'})
+        self.assertEqual(self.codigos(Lote.objects.por_vencer()), {'VEN-HOY', 'VEN-7'})
+        self.assertEqual(self.codigos(Lote.objects.vencidos()), {'VEN-AYER'})
+        with self.assertNumQueries(1):
+            self.assertEqual(Lote.objects.conteo_alertas(), {'por_vencer': 2, 'vencidos': 1})
+
+
+class ResumenDiarioTests(TestCase):
+    """El resumen mantenido al guardar, editar o borrar movimientos coincide con reconstruirlo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+
+    def resumen(self):
+        # Las filas que quedan en cero tras editar o borrar no cuentan
+        return set(
+            ResumenDiarioMovimiento.objects.filter(movimientos__gt=0)
+            .values_list('dia', 'producto_id', 'bodega_id', 'tipo', 'cantidad', 'movimientos')
+        )
+
+    def assertIgualAReconstruir(self):
+        mantenido = self.resumen()
+        reconstruir()
+        self.assertEqual(self.resumen(), mantenido)
+
+    def test_datos_semilla(self):
+        self.assertTrue(self.resumen())
+        self.assertIgualAReconstruir()
+
+    def test_editar_y_borrar_movimientos(self):
+        hoy = timezone.localdate()
+        producto = self.datos['sin_lote'][0]
+        movimiento = MovimientoInventario(
+            tipo='INGRESO', producto=producto, cantidad=Decimal(6), bodega_destino=self.datos['bodegas'][0],
+        )
+        movimiento.save()
+        movimiento.fecha = movimiento.fecha - timedelta(days=40)
+        movimiento.save()
+        self.assertIgualAReconstruir()
+
+        ingresos = {f['periodo']: f['cantidad'] for f in tendencia(hoy - timedelta(days=40), hoy, tipos=['INGRESO'])}
+        self.assertEqual(ingresos[hoy - timedelta(days=40)], 6)
+
+        MovimientoInventario.objects.get(pk=movimiento.pk).delete()
+        self.assertIgualAReconstruir()
+
+
+class DatosPruebaTests(CuadraturaMixin, TestCase):
+    """Generador masivo: saldos consistentes con los movimientos y la misma semilla da los mismos datos."""
+
+    def generar(self, semilla=7):
+        generar(productos=40, proveedores=5, movimientos=600, dias=30, semilla=semilla, bloque=250)
+
+    def datos(self):
+        return (
+            list(Producto.objects.order_by('id').values_list('sku', 'ean_upc', 'nombre', 'stock_actual')),
+            list(Proveedor.objects.order_by('id').values_list('rut_nif', 'razon_social', 'email')),
+            list(
+                MovimientoInventario.objects.order_by('id')
+                .values_list('fecha', 'tipo', 'producto_id', 'lote_id', 'bodega_origen_id', 'bodega_destino_id', 'cantidad')
+            ),
+        )
+
+    def test_saldos_cuadran_y_nunca_quedan_negativos(self):
+        self.generar()
+        self.assertEqual(Producto.objects.count(), 40)
+        self.assertGreater(MovimientoInventario.objects.count(), 600)
+        self.assertSaldosCuadran()
+        self.assertFalse(Producto.objects.filter(stock_actual__lt=0).exists())
+        self.assertFalse(Lote.objects.filter(cantidad_disponible__lt=0).exists())
+        # Los RUT generados pasan la validación del formulario de proveedores
+        for rut in Proveedor.objects.values_list('rut_nif', flat=True):
+            self.assertEqual(normalizar_rut(rut), rut)
+
+    def test_misma_semilla_mismos_datos(self):
+        generados = []
+        for semilla in (7, 7, 8):
+            with transaction.atomic():
+                self.generar(semilla)
+                generados.append(self.datos())
+                transaction.set_rollback(True)
+        self.assertEqual(generados[0], generados[1])
+        self.assertNotEqual(generados[0][2], generados[2][2])
+
+
+class KardexTests(TestCase):
+    """Saldo acumulado por movimiento, del producto o de una bodega, continuo entre páginas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.n1 = Bodega.objects.create(codigo='KDX-1', nombre='Norte')
+        cls.n2 = Bodega.objects.create(codigo='KDX-2', nombre='Sur')
+        cls.producto = Producto.objects.create(sku='KDX-1', nombre='Kardex', categoria='TORTAS')
+        for i, (tipo, cantidad, origen, destino) in enumerate((
+            ('INGRESO', 10, None, cls.n1),
+            ('SALIDA', 3, cls.n1, None),
+            ('TRANSFERENCIA', 4, cls.n1, cls.n2),
+            ('AJUSTE', -1, None, cls.n2),
+            ('INGRESO', 5, None, cls.n2),
+        )):
+            MovimientoInventario(
+                tipo=tipo, producto=cls.producto, cantidad=Decimal(cantidad), bodega_origen=origen, bodega_destino=destino,
+            ).save()
+            if i == 2:
+                # Las páginas posteriores parten de la foto del cierre
+                generar_cierre()
+
+    def saldos(self, bodega_id=None, limite=100):
+        saldos, despues = [], None
+        while True:
+            pagina = kardex.pagina_kardex(self.producto.pk, bodega_id, despues=despues, limite=limite)
+            saldos.extend(fila['saldo'] for fila in pagina['filas'])
+            despues = pagina['siguiente']
+            if despues is None:
+                return saldos
+
+    def test_saldo_del_producto_y_por_bodega(self):
+        self.assertEqual(self.saldos(), [10, 7, 7, 6, 11])
+        self.assertEqual(self.saldos(self.n1.pk), [10, 7, 3])
+        self.assertEqual(self.saldos(self.n2.pk), [4, 3, 8])
 
-# Create your tests here.
+    def test_paginas_continuas(self):
+        for bodega_id in (None, self.n1.pk, self.n2.pk):
+            with self.subTest(bodega_id=bodega_id):
+                self.assertEqual(self.saldos(bodega_id, limite=2), self.saldos(bodega_id))
+        self.assertEqual(kardex.saldo(self.producto.pk), 11)
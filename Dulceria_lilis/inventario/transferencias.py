@@ -0,0 +1,199 @@
+# inventario/transferencias.py
+"""
+Transferencias de stock entre bodegas.
+
+Una TRANSFERENCIA saca la cantidad del lote de origen y la suma a un lote del
+mismo producto en bodega_destino (MovimientoInventario.lote_destino):
+
+  - el lote de destino es el lote base si ya está en esa bodega (LOT-SKU1-0001),
+    o su parte en esa bodega (LOT-SKU1-0001@BOD-NORTE), que se crea la primera
+    vez con el mismo vencimiento;
+  - el stock total del producto no cambia;
+  - los productos sin control por lote se transfieren sin lote, contra su saldo
+    en bodega_origen (saldos.py): no se puede sacar más de lo que hay ahí.
+
+registrar_transferencia() publica un documento de varias líneas (p. ej. un pallet)
+en una sola transacción: bloquea productos y lotes con una consulta cada uno,
+crea los lotes de destino faltantes con bulk_create, actualiza los saldos de los
+lotes con un UPDATE por lote (executemany) e inserta los movimientos con bulk_create.
+Respeta las reservas de stock de otras referencias (reservas.py).
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from productos.models import Producto
+from sistema.models import RegistroActividad
+from utils.bulk import bulk_update_valores
+from .models import SEPARADOR_BODEGA, Lote, MovimientoInventario
+from .reservas import consumir, validar_consumo
+from .resumen import registrar_movimientos_en_resumen
+from .saldos import saldos_al
+
+CERO = Decimal(0)
+
+
+def codigo_base(codigo):
+    return codigo.split(SEPARADOR_BODEGA)[0]
+
+
+def codigo_en_bodega(codigo, bodega):
+    return f"{codigo_base(codigo)}{SEPARADOR_BODEGA}{bodega.codigo}"
+
+
+def lotes_destino(lotes, bodega):
+    """
+    {lote_id: lote que recibe en `bodega` (bloqueado) o None si hay que crearlo}
+    para los lotes de origen indicados. Una consulta.
+    """
+    candidatos = {l.pk: (codigo_base(l.codigo), codigo_en_bodega(l.codigo, bodega)) for l in lotes}
+    codigos = {c for par in candidatos.values() for c in par}
+    existentes = {
+        l.codigo: l
+        for l in Lote.objects.select_for_update().filter(bodega=bodega, codigo__in=codigos)
+    }
+    return {
+        pk: existentes.get(base) or existentes.get(derivado)
+        for pk, (base, derivado) in candidatos.items()
+    }
+
+
+def saldos_en_bodega(bodega_id, producto_ids):
+    """{producto_id: saldo vigente en la bodega}. Llamar con los productos bloqueados."""
+    _, saldos = saldos_al(None, bodega_id=bodega_id, producto_ids=list(producto_ids))
+    por_producto = defaultdict(Decimal)
+    for (producto_id, _, _), cantidad in saldos.items():
+        por_producto[producto_id] += cantidad
+    return por_producto
+
+
+def nuevo_lote_destino(origen, bodega):
+    return Lote(
+        codigo=codigo_en_bodega(origen.codigo, bodega),
+        producto_id=origen.producto_id,
+        bodega=bodega,
+        fecha_vencimiento=origen.fecha_vencimiento,
+        cantidad_inicial=CERO,
+        cantidad_disponible=CERO,
+    )
+
+
+def registrar_transferencia(bodega_origen, bodega_destino, lineas, usuario=None,
+                            documento_referencia=None, observacion=None, documento=None):
+    """
+    Publica una transferencia de varias líneas [{'producto_id', 'lote_id', 'cantidad'}]
+    en una transacción. Todas las líneas se aplican o ninguna (ValidationError con
+    un mensaje por línea). Con `documento` (DocumentoMovimiento ya guardado) las
+    líneas quedan asociadas a él y la observación solo vive en el encabezado.
+    Devuelve los MovimientoInventario creados.
+    """
+    if not bodega_origen or not bodega_destino:
+        raise ValidationError("Debe indicar bodega de origen y de destino.")
+    if bodega_origen.pk == bodega_destino.pk:
+        raise ValidationError("La bodega destino no puede ser igual a la de origen.")
+    if not lineas:
+        raise ValidationError("La transferencia no tiene líneas.")
+
+    with transaction.atomic():
+        # Mismo orden de bloqueo que MovimientoInventario.save(): producto y luego lotes
+        productos = Producto.objects.select_for_update().in_bulk(
+            sorted({l['producto_id'] for l in lineas})
+        )
+        lotes = Lote.objects.select_for_update().in_bulk(
+            sorted({l['lote_id'] for l in lineas if l['lote_id']})
+        )
+
+        errores = []
+        pedido = defaultdict(Decimal)
+        sin_lote = {}  # producto_id -> [primera línea, cantidad total]
+        for i, linea in enumerate(lineas, 1):
+            producto = productos.get(linea['producto_id'])
+            lote = lotes.get(linea['lote_id']) if linea['lote_id'] else None
+            if producto is None:
+                errores.append(f"Línea {i}: producto no encontrado.")
+            elif linea['lote_id'] and lote is None:
+                errores.append(f"Línea {i}: lote no encontrado.")
+            elif producto.control_por_lote and lote is None:
+                errores.append(f"Línea {i}: {producto.sku} se controla por lote, debe indicar el lote.")
+            elif lote is not None and lote.producto_id != producto.pk:
+                errores.append(f"Línea {i}: el lote {lote.codigo} no corresponde a {producto.sku}.")
+            elif lote is not None and lote.bodega_id and lote.bodega_id != bodega_origen.pk:
+                errores.append(f"Línea {i}: el lote {lote.codigo} no está en {bodega_origen.codigo}.")
+            elif lote is not None:
+                pedido[lote.pk] += linea['cantidad']
+            else:
+                sin_lote.setdefault(producto.pk, [i, CERO])[1] += linea['cantidad']
+
+        if not errores and sin_lote:
+            disponibles = saldos_en_bodega(bodega_origen.pk, sin_lote)
+            for producto_id, (i, cantidad) in sin_lote.items():
+                if cantidad > disponibles[producto_id]:
+                    errores.append(
+                        f"Línea {i}: no hay stock suficiente de {productos[producto_id].sku} en "
+                        f"{bodega_origen.codigo} (Disponible: {disponibles[producto_id]}, requerido: {cantidad})"
+                    )
+        if not errores:
+            errores = validar_consumo(lotes, pedido, documento_referencia)
+        if errores:
+            raise ValidationError(errores)
+
+        # Lotes de destino: existentes (bloqueados) + faltantes en un bulk_create
+        origenes = [lotes[pk] for pk in pedido]
+        destinos = lotes_destino(origenes, bodega_destino)
+        faltantes = {}
+        for pk, destino in destinos.items():
+            if destino is None:
+                nuevo = nuevo_lote_destino(lotes[pk], bodega_destino)
+                faltantes.setdefault(nuevo.codigo, nuevo)
+        faltantes = list(faltantes.values())
+        if faltantes:
+            Lote.objects.bulk_create(faltantes)
+            # bulk_create no devuelve los id en todos los motores: se releen por código
+            creados = {
+                l.codigo: l
+                for l in Lote.objects.select_for_update().filter(codigo__in=[f.codigo for f in faltantes])
+            }
+            for pk, destino in destinos.items():
+                if destino is None:
+                    destinos[pk] = creados[codigo_en_bodega(lotes[pk].codigo, bodega_destino)]
+
+        for pk, cantidad in pedido.items():
+            lotes[pk].cantidad_disponible -= cantidad
+            destinos[pk].cantidad_inicial += cantidad
+            destinos[pk].cantidad_disponible += cantidad
+        cambiados = {l.pk: l for l in origenes + list(destinos.values())}
+        bulk_update_valores(Lote, list(cambiados.values()), ['cantidad_inicial', 'cantidad_disponible'])
+        consumir(pedido, documento_referencia)
+
+        movimientos = [
+            MovimientoInventario(
+                tipo='TRANSFERENCIA',
+                producto_id=linea['producto_id'],
+                bodega_origen=bodega_origen,
+                bodega_destino=bodega_destino,
+                cantidad=linea['cantidad'],
+                lote_id=linea['lote_id'],
+                lote_destino=destinos.get(linea['lote_id']),
+                usuario=usuario,
+                documento_referencia=documento_referencia,
+                observacion=None if documento else observacion,
+                documento=documento,
+            )
+            for linea in lineas
+        ]
+        MovimientoInventario.objects.bulk_create(movimientos)
+        registrar_movimientos_en_resumen(movimientos)
+
+        # bulk_create no dispara la auditoría por fila: un registro por documento
+        if usuario is not None and usuario.is_authenticated:
+            RegistroActividad.objects.create(
+                usuario=usuario,
+                descripcion=(
+                    f"Transferencia{' ' + documento_referencia if documento_referencia else ''} "
+                    f"de {bodega_origen.codigo} a {bodega_destino.codigo}: {len(movimientos)} líneas"
+                ),
+                modelo='MovimientoInventario',
+            )
+    return movimientos
@@ -11,4 +11,15 @@ urlpatterns = [
     path('movimiento/<int:pk>/editar/', views.MovimientoInventarioUpdateView.as_view(), name='editar_movimiento'),
     path('movimiento/<int:pk>/', views.MovimientoInventarioDetailView.as_view(), name='detalle_movimiento'),
     path('bodegas/', views.BodegaListView.as_view(), name='lista_bodegas'),
+    path('documentos/nuevo/', views.DocumentoMovimientoCreateView.as_view(), name='nuevo_documento'),
+    path('documentos/<int:pk>/', views.DocumentoMovimientoDetailView.as_view(), name='detalle_documento'),
+    path('transferencias/nueva/', views.TransferenciaView.as_view(), name='nueva_transferencia'),
+    path('conteos/', views.ConteoListView.as_view(), name='lista_conteos'),
+    path('conteos/<int:pk>/', views.ConteoDetailView.as_view(), name='detalle_conteo'),
+    path('bodegas/stock/', views.StockBodegaMatrizView.as_view(), name='stock_bodegas'),
+    path('lotes/', views.LoteListView.as_view(), name='lista_lotes'),
+    path('reposicion/', views.ReposicionView.as_view(), name='reposicion'),
+    path('kardex/<int:producto_id>/', views.KardexView.as_view(), name='kardex'),
+    path('valorizacion/', views.ValorizacionView.as_view(), name='valorizacion'),
+    path('resumen/', views.ResumenMovimientosView.as_view(), name='resumen_movimientos'),
 ]
@@ -0,0 +1,233 @@
+# inventario/valorizacion.py
+"""
+Valorización de inventario a costo FIFO por producto y bodega a una fecha de corte.
+
+Los movimientos se recorren en orden (producto, fecha, id), por rangos de
+producto_id y en bloques por keyset. Solo se mantiene en memoria el producto en
+curso: una cola (deque) de capas [cantidad, costo] por bodega.
+
+  INGRESO / DEVOLUCION  agrega una capa en bodega_destino (u origen) al costo del
+                        movimiento (costo_unitario, o costo promedio / estándar).
+  SALIDA                consume las capas más antiguas de bodega_origen (o destino).
+  AJUSTE                positivo agrega una capa, negativo consume.
+  TRANSFERENCIA         consume en origen y pasa esas mismas capas a destino.
+
+Si una salida supera las capas disponibles, el faltante no se valoriza (no
+ocurre con movimientos nuevos: las SALIDAs que exceden el stock se rechazan).
+
+valorizar() reemplaza las filas del corte en una sola transacción: quien lee la
+valorización ve la corrida anterior completa o la nueva, nunca una mezcla.
+
+Los rangos de productos son independientes y pueden repartirse en un pool de
+procesos; el proceso principal solo escribe los resultados.
+"""
+import time as reloj
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import chain
+
+from django.db import connections, transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from productos.models import Producto
+from utils.bulk import borrar_filas
+from .models import EjecucionValorizacion, MovimientoInventario, ValorizacionInventario
+
+RANGO_PRODUCTOS = 2000      # productos por tarea
+CHUNK_SIZE = 5000           # movimientos por consulta
+CERO = Decimal(0)
+CENTAVOS = Decimal('0.01')
+CAMPOS_MOVIMIENTO = (
+    'id', 'producto_id', 'fecha', 'tipo', 'cantidad', 'costo_unitario',
+    'bodega_origen_id', 'bodega_destino_id',
+)
+
+
+def _fin_de_corte(corte):
+    """Instante en que termina el día de corte (los movimientos válidos son anteriores)."""
+    return timezone.make_aware(datetime.combine(corte + timedelta(days=1), time.min))
+
+
+def _consumir(capas, cantidad):
+    """Saca `cantidad` de las capas más antiguas. Devuelve las porciones [(cantidad, costo)]."""
+    sacado = []
+    while cantidad > 0 and capas:
+        capa = capas[0]
+        if capa[0] <= cantidad:
+            capas.popleft()
+            sacado.append((capa[0], capa[1]))
+            cantidad -= capa[0]
+        else:
+            capa[0] -= cantidad
+            sacado.append((cantidad, capa[1]))
+            cantidad = CERO
+    return sacado
+
+
+def _agregar(capas, cantidad, costo):
+    # Capas contiguas al mismo costo se fusionan: la cola queda compacta
+    if capas and capas[-1][1] == costo:
+        capas[-1][0] += cantidad
+    else:
+        capas.append([cantidad, costo])
+
+
+def _resumen(producto_id, por_bodega):
+    filas = []
+    for bodega_id, capas in por_bodega.items():
+        cantidad = sum((c[0] for c in capas), CERO)
+        if cantidad <= 0:
+            continue
+        valor = sum((c[0] * c[1] for c in capas), CERO).quantize(CENTAVOS)
+        filas.append((producto_id, bodega_id, cantidad, valor, len(capas)))
+    return filas
+
+
+def _movimientos_rango(desde_id, hasta_id, fin, lote):
+    """Movimientos de productos [desde_id, hasta_id) anteriores a `fin`, en bloques por keyset."""
+    base = (
+        MovimientoInventario.objects
+        .filter(producto_id__gte=desde_id, producto_id__lt=hasta_id, fecha__lt=fin)
+        .order_by('producto_id', 'fecha', 'id')
+        .values_list(*CAMPOS_MOVIMIENTO)
+    )
+    ultimo = None
+    while True:
+        qs = base
+        if ultimo is not None:
+            pk, prod, fecha = ultimo
+            qs = qs.filter(
+                Q(producto_id__gt=prod) |
+                Q(producto_id=prod, fecha__gt=fecha) |
+                Q(producto_id=prod, fecha=fecha, id__gt=pk)
+            )
+        bloque = list(qs[:lote])
+        if not bloque:
+            return
+        yield bloque
+        ultimo = bloque[-1][:3]
+
+
+def valorizar_rango(desde_id, hasta_id, corte, lote=CHUNK_SIZE):
+    """
+    FIFO de los productos con id en [desde_id, hasta_id) al cierre de `corte`.
+    Devuelve (filas, movimientos); filas = [(producto_id, bodega_id, cantidad, valor, capas)].
+    """
+    fin = _fin_de_corte(corte)
+    costo_defecto = {
+        pk: prom or est or CERO
+        for pk, prom, est in Producto.objects.filter(id__gte=desde_id, id__lt=hasta_id)
+        .values_list('id', 'costo_promedio', 'costo_estandar')
+    }
+
+    filas, total = [], 0
+    actual, por_bodega = None, {}
+    for bloque in _movimientos_rango(desde_id, hasta_id, fin, lote):
+        total += len(bloque)
+        for _, prod, _, tipo, cantidad, costo, origen, destino in bloque:
+            if prod != actual:
+                if actual is not None:
+                    filas.extend(_resumen(actual, por_bodega))
+                actual, por_bodega = prod, {}
+
+            if tipo == 'SALIDA':
+                _consumir(por_bodega.setdefault(origen or destino, deque()), cantidad)
+            elif tipo == 'TRANSFERENCIA':
+                sacado = _consumir(por_bodega.setdefault(origen, deque()), cantidad)
+                if destino:
+                    capas = por_bodega.setdefault(destino, deque())
+                    for cant, cost in sacado:
+                        _agregar(capas, cant, cost)
+            elif tipo == 'AJUSTE' and cantidad < 0:
+                _consumir(por_bodega.setdefault(destino or origen, deque()), -cantidad)
+            else:  # INGRESO, DEVOLUCION, AJUSTE positivo
+                if costo is None:
+                    costo = costo_defecto.get(prod, CERO)
+                _agregar(por_bodega.setdefault(destino or origen, deque()), cantidad, costo)
+
+    if actual is not None:
+        filas.extend(_resumen(actual, por_bodega))
+    return filas, total
+
+
+def _tarea(args):
+    return valorizar_rango(*args)
+
+
+def inicializar_proceso():
+    # Con "spawn" (macOS/Windows) el proceso hijo arranca sin Django configurado
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def rangos_productos(tamano=RANGO_PRODUCTOS):
+    """Rangos [desde, hasta) de producto_id que cubren todo el catálogo."""
+    lim = Producto.objects.aggregate(a=Min('id'), b=Max('id'))
+    if lim['a'] is None:
+        return []
+    return [(i, i + tamano) for i in range(lim['a'], lim['b'] + 1, tamano)]
+
+
+def calcular_valorizacion(corte, procesos=1, tamano=RANGO_PRODUCTOS, lote=CHUNK_SIZE):
+    """
+    Genera (filas, movimientos) por rango de productos, en orden de rango.
+    Con procesos > 1 los rangos se calculan en un ProcessPoolExecutor.
+    """
+    tareas = [(a, b, corte, lote) for a, b in rangos_productos(tamano)]
+    if procesos <= 1 or len(tareas) <= 1:
+        for t in tareas:
+            yield _tarea(t)
+        return
+
+    # Las conexiones abiertas no deben heredarse en los procesos hijos
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=procesos, initializer=inicializar_proceso) as pool:
+        yield from pool.map(_tarea, tareas)
+
+
+def valorizar(corte, procesos=1, tamano=RANGO_PRODUCTOS):
+    """Recalcula la valorización FIFO al `corte` y la guarda. Devuelve la EjecucionValorizacion."""
+    inicio = reloj.perf_counter()
+    resultados = calcular_valorizacion(corte, procesos, tamano)
+    # El primer rango se pide antes de abrir la transacción: con procesos > 1,
+    # calcular_valorizacion cierra las conexiones y lanza el pool
+    primero = next(resultados, None)
+
+    total_mov = total_filas = 0
+    valor_total = CERO
+    with transaction.atomic():
+        borrar_filas(ValorizacionInventario.objects.filter(corte=corte))
+        for filas, movimientos in chain([primero] if primero else [], resultados):
+            total_mov += movimientos
+            objs = [
+                ValorizacionInventario(
+                    corte=corte, producto_id=prod, bodega_id=bod, cantidad=cant,
+                    valor=valor, costo_unitario=(valor / cant).quantize(Decimal('0.000001')), capas=capas,
+                )
+                for prod, bod, cant, valor, capas in filas
+            ]
+            ValorizacionInventario.objects.bulk_create(objs, batch_size=CHUNK_SIZE)
+            total_filas += len(objs)
+            valor_total += sum((o.valor for o in objs), CERO)
+
+        ejecucion, _ = EjecucionValorizacion.objects.update_or_create(
+            corte=corte,
+            defaults=dict(
+                movimientos=total_mov,
+                filas=total_filas,
+                valor_total=valor_total,
+                procesos=procesos,
+                duracion_segundos=round(reloj.perf_counter() - inicio, 3),
+            ),
+        )
+    return ejecucion
+
+
+def fin_de_mes(anio, mes):
+    siguiente = datetime(anio + mes // 12, mes % 12 + 1, 1).date()
+    return siguiente - timedelta(days=1)
@@ -1,17 +1,34 @@
+from datetime import date, datetime, time, timedelta
 from django.forms import ValidationError
 from django.urls import reverse_lazy
 from django.views.generic import ListView, DetailView, UpdateView
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.utils.decorators import method_decorator
-from django.shortcuts import redirect, render
+from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib import messages
-from django.db.models import Q
+from django.db.models import Count, Q, Sum
 from django.core.paginator import Paginator
 from django.views import View
 from django.http import HttpResponse, JsonResponse
 from proveedores.models import ProductoProveedor
 from sistema.decorators import permiso_requerido
-from .models import MovimientoInventario, Bodega, Lote
-from .forms import MovimientoInventarioForm
+from .models import (
+    TIPO_MOVIMIENTO, MovimientoInventario, Bodega, Lote, DocumentoMovimiento, ConteoInventario,
+    EjecucionValorizacion, ValorizacionInventario,
+)
+from .forms import (
+    CargaConteoForm, ConteoForm, DocumentoMovimientoForm, LineaDocumentoFormSet,
+    MovimientoInventarioForm, TransferenciaForm,
+)
+from .reposicion import reporte_reposicion
+from .kardex import codificar_posicion, decodificar_posicion, pagina_kardex
+from .resumen import tendencia
+from .matriz import SIN_BODEGA, filas_matriz, iterar_filas_matriz
+from .documentos import registrar_documento_una_vez, resolver_lineas
+from .idempotencia import publicar_una_vez
+from .conteos import abrir_conteo, cargar_conteo, lecturas_de_codigos, leer_archivo, publicar_conteo
+from productos.models import Producto
 from utils.export_excel import queryset_to_excel
 
 
@@ -88,7 +105,7 @@ class MovimientoInventarioListCreateView(View):
         # ===== EXPORTAR EXCEL =====
         if request.GET.get("export") == "xlsx":
             # Aplicar filtros antes de exportar
-            movimientos, _, _, _, _ = self._apply_filters(request, movimientos)
+            movimientos, _, _, _, _ = self._apply_filters(request, movimientos.select_related('documento', 'lote__producto'))
             
             columns = [
                 ("Fecha",           lambda m: m.fecha.replace(tzinfo=None) if m.fecha else ""),
@@ -100,7 +117,7 @@ class MovimientoInventarioListCreateView(View):
                 ("Documento Ref.",  lambda m: m.documento_referencia or ""),
                 ("Serie",           lambda m: m.serie or ""),
                 ("Lote",            lambda m: str(m.lote) if m.lote else ""),
-                ("Observación",     lambda m: m.observacion or ""),
+                ("Observación",     lambda m: m.observacion or (m.documento.observacion if m.documento_id else "") or ""),
                 ("Usuario",         lambda m: m.usuario.username if m.usuario_id else ""),
             ]
             raw, fname = queryset_to_excel("movimientos_inventario", columns, movimientos)
@@ -147,9 +164,18 @@ class MovimientoInventarioListCreateView(View):
             movimiento = form.save(commit=False)
             if request.user.is_authenticated:
                 movimiento.usuario = request.user
-            try:
+            movimiento.clave_idempotencia = form.cleaned_data.get('clave_idempotencia') or None
+
+            def publicar():
                 movimiento.save()
-                messages.success(request, "✅ Movimiento registrado correctamente.")
+                return movimiento
+
+            try:
+                _, creado = publicar_una_vez(MovimientoInventario, movimiento.clave_idempotencia, publicar)
+                if creado:
+                    messages.success(request, "✅ Movimiento registrado correctamente.")
+                else:
+                    messages.info(request, "ℹ️ Este movimiento ya estaba registrado (envío repetido).")
                 return redirect('inventario:inicio')
 
             except ValidationError as e:
@@ -211,14 +237,16 @@ def lotes_por_producto(request, producto_id):
     lotes = Lote.objects.filter(
         producto_id=producto_id,
         cantidad_disponible__gt=0
-    ).order_by('codigo')
+    ).select_related('producto').con_reservado().order_by('codigo')
 
     data = [
         {
             "id": lote.id,
             "codigo": lote.codigo,
             "descripcion": str(lote),
-            "disponible": float(lote.cantidad_disponible),
+            # Disponible menos reservas vigentes (reservas.py), en la misma consulta
+            "disponible": float(lote.libre),
+            "reservado": float(lote.reservado),
         }
         for lote in lotes
     ]
@@ -265,3 +293,647 @@ class BodegaListView(ListView):
     template_name = 'inventario/bodega_list.html'
     context_object_name = 'bodegas'
     ordering = ['codigo']
+
+
+# ----------------------------------------------------------
+# DOCUMENTO DE VARIAS LÍNEAS (ENCABEZADO + LÍNEAS, UNA TRANSACCIÓN)
+# ----------------------------------------------------------
+@method_decorator(permiso_requerido('inventario.agregar_movimientos'), name='dispatch')
+class DocumentoMovimientoCreateView(View):
+    template_name = 'inventario/documento_form.html'
+    form_class = DocumentoMovimientoForm
+
+    def _encabezado(self, form):
+        documento = form.save(commit=False)
+        documento.usuario = self.request.user
+        return documento
+
+    def get(self, request):
+        context = {
+            'form': self.form_class(),
+            'formset': LineaDocumentoFormSet(prefix='lineas'),
+        }
+        return render(request, self.template_name, context)
+
+    def post(self, request):
+        form = self.form_class(request.POST)
+        formset = LineaDocumentoFormSet(request.POST, prefix='lineas')
+
+        if form.is_valid() and formset.is_valid():
+            filas = [f.cleaned_data for f in formset if f.cleaned_data]
+            documento = self._encabezado(form)
+            lineas, errores = resolver_lineas(filas, documento.tipo)
+            if not errores:
+                documento.clave_idempotencia = form.cleaned_data.get('clave_idempotencia') or None
+                try:
+                    documento, creado = registrar_documento_una_vez(documento, lineas)
+                    if creado:
+                        messages.success(request, f"✅ Documento registrado: {documento.total_lineas} línea(s).")
+                    else:
+                        messages.info(request, "ℹ️ Este documento ya estaba registrado (envío repetido).")
+                    return redirect('inventario:detalle_documento', pk=documento.pk)
+                except ValidationError as e:
+                    errores = e.messages
+            for error in errores:
+                form.add_error(None, error)
+            messages.error(request, "❌ El documento no se registró. Revise las líneas.")
+        else:
+            messages.error(request, "⚠️ Por favor complete todos los campos obligatorios correctamente.")
+
+        return render(request, self.template_name, {'form': form, 'formset': formset})
+
+
+class TransferenciaView(DocumentoMovimientoCreateView):
+    template_name = 'inventario/transferencia_form.html'
+    form_class = TransferenciaForm
+
+    def _encabezado(self, form):
+        return DocumentoMovimiento(
+            tipo='TRANSFERENCIA',
+            bodega_origen=form.cleaned_data['bodega_origen'],
+            bodega_destino=form.cleaned_data['bodega_destino'],
+            usuario=self.request.user,
+            documento_referencia=form.cleaned_data['documento_referencia'] or None,
+            observacion=form.cleaned_data['observacion'] or None,
+        )
+
+
+@method_decorator(permiso_requerido('inventario.ver_movimientos'), name='dispatch')
+class DocumentoMovimientoDetailView(DetailView):
+    model = DocumentoMovimiento
+    template_name = 'inventario/documento_detalle.html'
+    context_object_name = 'documento'
+
+    def get_queryset(self):
+        return DocumentoMovimiento.objects.select_related(
+            'proveedor', 'bodega_origen', 'bodega_destino', 'usuario'
+        )
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx['lineas'] = (
+            self.object.lineas
+            .select_related('producto', 'lote', 'lote_destino')
+            .order_by('id')
+        )
+        return ctx
+
+
+# ----------------------------------------------------------
+# MATRIZ DE STOCK PRODUCTO × BODEGA (FILTROS, PAGINACIÓN Y EXPORTAR)
+# ----------------------------------------------------------
+@method_decorator(permiso_requerido('inventario.ver_movimientos'), name='dispatch')
+class StockBodegaMatrizView(View):
+    template_name = 'inventario/stock_matriz.html'
+
+    def _apply_filters(self, request, qs):
+        session = request.session
+
+        # ---- 1) Limpiar filtros si viene clear=1 ----
+        if request.GET.get("clear") == "1":
+            for k in ("f_buscar_matriz", "f_categoria_matriz", "f_marca_matriz", "f_alerta_matriz", "f_pp_matriz"):
+                session.pop(k, None)
+            return qs, "", "", "", "", 50
+
+        # ---- 2) Si vienen filtros por GET, guardarlos en sesión ----
+        for param, key in (("buscar", "f_buscar_matriz"), ("categoria", "f_categoria_matriz"),
+                           ("marca", "f_marca_matriz"), ("alerta", "f_alerta_matriz"), ("pp", "f_pp_matriz")):
+            valor = request.GET.get(param)
+            if valor is not None:
+                session[key] = valor
+
+        # ---- 3) Leer valores finales desde sesión ----
+        buscar = session.get("f_buscar_matriz", "")
+        categoria = session.get("f_categoria_matriz", "")
+        marca = session.get("f_marca_matriz", "")
+        alerta = session.get("f_alerta_matriz", "")
+        per_page = session.get("f_pp_matriz", "50")
+
+        # ---- 4) Aplicar filtros ----
+        if buscar:
+            qs = qs.filter(Q(sku__icontains=buscar) | Q(nombre__icontains=buscar))
+        if categoria:
+            qs = qs.filter(categoria=categoria)
+        if marca:
+            qs = qs.filter(marca=marca)
+        if alerta == "bajo_stock":
+            qs = qs.bajo_stock()
+        else:
+            alerta = ""
+
+        return qs, buscar, categoria, marca, alerta, per_page
+
+    def get(self, request):
+        productos = Producto.objects.order_by('sku')
+        productos, buscar, categoria, marca, alerta, per_page = self._apply_filters(request, productos)
+
+        bodegas = list(Bodega.objects.order_by('codigo'))
+        columnas = [(b.pk, b.codigo) for b in bodegas]
+        if (Lote.objects.disponibles().filter(bodega__isnull=True).exists()
+                or MovimientoInventario.objects.filter(bodega_origen__isnull=True, bodega_destino__isnull=True).exists()):
+            columnas.append((SIN_BODEGA, "Sin bodega"))
+        bodega_ids = [pk for pk, _ in columnas]
+
+        # ===== EXPORTAR EXCEL =====
+        if request.GET.get("export") == "xlsx":
+            columns = [
+                ("SKU",        lambda f: f["producto"].sku),
+                ("Producto",   lambda f: f["producto"].nombre),
+                ("Categoría",  lambda f: f["producto"].categoria),
+                ("Marca",      lambda f: f["producto"].marca or ""),
+            ]
+            columns += [
+                (codigo, lambda f, i=i: f["celdas"][i])
+                for i, (_, codigo) in enumerate(columnas)
+            ]
+            columns += [
+                ("Total en bodegas", lambda f: f["en_bodegas"]),
+                ("Stock actual",    lambda f: f["producto"].stock_actual),
+                ("Bajo stock",      lambda f: "Sí" if f["bajo_stock"] else ""),
+            ]
+            raw, fname = queryset_to_excel("stock_por_bodega", columns, iterar_filas_matriz(productos, bodega_ids))
+            resp = HttpResponse(
+                raw,
+                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
+            resp["Content-Disposition"] = f'attachment; filename="{fname}"'
+            return resp
+
+        # ===== PAGINADOR =====
+        try:
+            per_page_int = int(per_page)
+        except (TypeError, ValueError):
+            per_page_int = 50
+        if per_page_int not in (20, 50, 100, 500):
+            per_page_int = 50
+
+        paginator = Paginator(productos, per_page_int)
+        page_obj = paginator.get_page(request.GET.get('page'))
+
+        context = {
+            'page_obj': page_obj,
+            'filas': filas_matriz(page_obj, bodega_ids),
+            'columnas': columnas,
+            'categorias': Producto.objects.order_by('categoria').values_list('categoria', flat=True).distinct(),
+            'marcas': (
+                Producto.objects.exclude(marca__isnull=True).exclude(marca='')
+                .order_by('marca').values_list('marca', flat=True).distinct()
+            ),
+            'f_buscar': buscar,
+            'f_categoria': categoria,
+            'f_marca': marca,
+            'f_alerta': alerta,
+            'per_page': per_page_int,
+        }
+        return render(request, self.template_name, context)
+
+
+# ----------------------------------------------------------
+# LISTAR LOTES (CON ALERTAS DE VENCIMIENTO, PAGINACIÓN Y EXPORTAR)
+# ----------------------------------------------------------
+@method_decorator(permiso_requerido('inventario.ver_movimientos'), name='dispatch')
+class LoteListView(View):
+    template_name = 'inventario/lote_list.html'
+    ALERTAS = {
+        'por_vencer': lambda qs: qs.por_vencer(),
+        'vencidos': lambda qs: qs.vencidos(),
+    }
+
+    def _apply_filters(self, request, qs):
+        session = request.session
+
+        # ---- 1) Limpiar filtros si viene clear=1 ----
+        if request.GET.get("clear") == "1":
+            for k in ("f_buscar_lote", "f_bodega_lote", "f_alerta_lote", "f_pp_lote"):
+                session.pop(k, None)
+            return qs, "", "", "", 20
+
+        # ---- 2) Si vienen filtros por GET, guardarlos en sesión ----
+        for param, key in (("buscar", "f_buscar_lote"), ("bodega", "f_bodega_lote"),
+                           ("alerta", "f_alerta_lote"), ("pp", "f_pp_lote")):
+            valor = request.GET.get(param)
+            if valor is not None:
+                session[key] = valor
+
+        # ---- 3) Leer valores finales desde sesión ----
+        buscar = session.get("f_buscar_lote", "")
+        bodega = session.get("f_bodega_lote", "")
+        alerta = session.get("f_alerta_lote", "")
+        per_page = session.get("f_pp_lote", "20")
+        if alerta not in self.ALERTAS:
+            alerta = ""
+
+        # ---- 4) Aplicar filtros ----
+        if buscar:
+            qs = qs.filter(
+                Q(codigo__icontains=buscar) |
+                Q(producto__sku__icontains=buscar) |
+                Q(producto__nombre__icontains=buscar)
+            )
+        if bodega:
+            qs = qs.filter(bodega_id=bodega)
+        if alerta:
+            qs = self.ALERTAS[alerta](qs)
+
+        return qs, buscar, bodega, alerta, per_page
+
+    def get(self, request):
+        lotes = Lote.objects.select_related('producto', 'bodega').order_by('fecha_vencimiento', 'codigo')
+        lotes, buscar, bodega, alerta, per_page = self._apply_filters(request, lotes)
+
+        # ===== EXPORTAR EXCEL =====
+        if request.GET.get("export") == "xlsx":
+            columns = [
+                ("Código",            lambda l: l.codigo),
+                ("SKU",               lambda l: l.producto.sku),
+                ("Producto",          lambda l: l.producto.nombre),
+                ("Bodega",            lambda l: str(l.bodega) if l.bodega else ""),
+                ("Vencimiento",       lambda l: l.fecha_vencimiento or ""),
+                ("Cantidad inicial",  lambda l: l.cantidad_inicial),
+                ("Disponible",        lambda l: l.cantidad_disponible),
+            ]
+            raw, fname = queryset_to_excel("lotes", columns, lotes)
+            resp = HttpResponse(
+                raw,
+                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
+            resp["Content-Disposition"] = f'attachment; filename="{fname}"'
+            return resp
+
+        # ===== PAGINADOR =====
+        try:
+            per_page_int = int(per_page)
+        except (TypeError, ValueError):
+            per_page_int = 20
+        if per_page_int not in (20, 50, 100, 500):
+            per_page_int = 20
+
+        paginator = Paginator(lotes, per_page_int)
+        page_obj = paginator.get_page(request.GET.get('page'))
+
+        context = {
+            'page_obj': page_obj,
+            'lotes': page_obj,
+            'bodegas': Bodega.objects.order_by('codigo'),
+            'alertas': Lote.objects.conteo_alertas(),
+            'hoy': date.today(),
+            'f_buscar': buscar,
+            'f_bodega': bodega,
+            'f_alerta': alerta,
+            'per_page': per_page_int,
+        }
+        return render(request, self.template_name, context)
+
+
+# ----------------------------------------------------------
+# REPOSICIÓN: SUGERENCIAS DE COMPRA (CACHÉ + EXPORTAR)
+# ----------------------------------------------------------
+@method_decorator(permiso_requerido('inventario.ver_movimientos'), name='dispatch')
+class ReposicionView(View):
+    template_name = 'inventario/reposicion.html'
+
+    def get(self, request):
+        df = reporte_reposicion(recalcular=request.GET.get("recalcular") == "1")
+        if request.GET.get("recalcular") == "1":
+            messages.success(request, "✅ Sugerencias de reposición recalculadas.")
+
+        categoria = request.GET.get("categoria", "")
+        categorias = sorted(df['categoria'].dropna().unique())
+        if categoria:
+            df = df[df['categoria'] == categoria]
+
+        # ===== EXPORTAR EXCEL =====
+        if request.GET.get("export") == "xlsx":
+            # NaN → None (celda vacía)
+            filas = df.astype(object).where(df.notna(), None)
+            columns = [
+                ("SKU",               lambda r: r.sku),
+                ("Nombre",            lambda r: r.nombre),
+                ("Categoría",         lambda r: r.categoria),
+                ("Stock actual",      lambda r: r.stock_actual),
+                ("Punto de reorden",  lambda r: r.reorden),
+                ("Stock objetivo",    lambda r: r.objetivo),
+                ("Cantidad sugerida", lambda r: r.cantidad),
+                ("Proveedor",         lambda r: r.proveedor),
+                ("Costo unitario",    lambda r: r.costo_unitario),
+                ("Lead time (días)",  lambda r: int(r.lead_time_dias) if r.lead_time_dias is not None else ""),
+                ("Llegada estimada",  lambda r: r.llegada_estimada.date()),
+                ("Costo total",       lambda r: r.costo_total),
+            ]
+            raw, fname = queryset_to_excel("reposicion", columns, filas.itertuples(index=False))
+            resp = HttpResponse(
+                raw,
+                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
+            resp["Content-Disposition"] = f'attachment; filename="{fname}"'
+            return resp
+
+        # ===== PAGINADOR (sobre posiciones del DataFrame) =====
+        paginator = Paginator(range(len(df)), 50)
+        page_obj = paginator.get_page(request.GET.get('page'))
+        filas = df.iloc[page_obj.start_index() - 1:page_obj.end_index()].to_dict('records') if len(df) else []
+
+        context = {
+            'page_obj': page_obj,
+            'sugerencias': filas,
+            'categorias': categorias,
+            'f_categoria': categoria,
+            'total_productos': len(df),
+            'costo_total': float(df['costo_total'].sum()) if len(df) else 0,
+        }
+        return render(request, self.template_name, context)
+
+
+def _fecha_get(request, nombre):
+    """Fecha AAAA-MM-DD del querystring; None si falta o no es una fecha válida (2024-02-30)."""
+    try:
+        return parse_date(request.GET.get(nombre, "") or "")
+    except ValueError:
+        return None
+
+
+# ----------------------------------------------------------
+# VALORIZACIÓN FIFO A FIN DE MES (REPORTE + EXPORTAR)
+# ----------------------------------------------------------
+@method_decorator(permiso_requerido('inventario.ver_movimientos'), name='dispatch')
+class ValorizacionView(View):
+    template_name = 'inventario/valorizacion.html'
+
+    def get(self, request):
+        ejecuciones = EjecucionValorizacion.objects.all()
+        corte = _fecha_get(request, "corte")
+        ejecucion = (ejecuciones.filter(corte=corte).first() if corte else None) or ejecuciones.first()
+
+        filas = ValorizacionInventario.objects.none()
+        bodega = request.GET.get("bodega", "")
+        if not bodega.isdigit():
+            bodega = ""
+        if ejecucion:
+            filas = (
+                ValorizacionInventario.objects
+                .filter(corte=ejecucion.corte)
+                .select_related('producto', 'bodega')
+                .order_by('producto__sku', 'bodega__codigo')
+            )
+            if bodega:
+                filas = filas.filter(bodega_id=bodega)
+
+        # ===== EXPORTAR EXCEL =====
+        if request.GET.get("export") == "xlsx" and ejecucion:
+            columns = [
+                ("Corte",           lambda v: v.corte),
+                ("SKU",             lambda v: v.producto.sku),
+                ("Producto",        lambda v: v.producto.nombre),
+                ("Bodega",          lambda v: str(v.bodega) if v.bodega else "Sin bodega"),
+                ("Cantidad",        lambda v: v.cantidad),
+                ("Costo unitario",  lambda v: v.costo_unitario),
+                ("Valor FIFO",      lambda v: v.valor),
+                ("Capas",           lambda v: v.capas),
+            ]
+            raw, fname = queryset_to_excel(f"valorizacion_{ejecucion.corte}", columns, filas.iterator(chunk_size=2000))
+            resp = HttpResponse(
+                raw,
+                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
+            resp["Content-Disposition"] = f'attachment; filename="{fname}"'
+            return resp
+
+        paginator = Paginator(filas, 50)
+        page_obj = paginator.get_page(request.GET.get('page'))
+
+        context = {
+            'page_obj': page_obj,
+            'filas': page_obj,
+            'ejecucion': ejecucion,
+            'ejecuciones': ejecuciones,
+            'bodegas': Bodega.objects.order_by('codigo'),
+            'f_bodega': bodega,
+            'valor_filtrado': filas.aggregate(t=Sum('valor'))['t'] if bodega else None,
+        }
+        return render(request, self.template_name, context)
+
+
+# ----------------------------------------------------------
+# RESUMEN DE MOVIMIENTOS POR DÍA / MES (DESDE EL RESUMEN DIARIO)
+# ----------------------------------------------------------
+@method_decorator(permiso_requerido('inventario.ver_movimientos'), name='dispatch')
+class ResumenMovimientosView(View):
+    template_name = 'inventario/resumen_movimientos.html'
+
+    def get(self, request):
+        hoy = timezone.localdate()
+        agrupar = request.GET.get("agrupar", "dia")
+        if agrupar not in ("dia", "mes"):
+            agrupar = "dia"
+        hasta = _fecha_get(request, "hasta") or hoy
+        desde = _fecha_get(request, "desde") or (
+            hasta - timedelta(days=29) if agrupar == "dia" else hasta.replace(month=1, day=1)
+        )
+        bodega = request.GET.get("bodega", "")
+        bodega_id = int(bodega) if bodega.isdigit() else None
+
+        filas = list(tendencia(desde, hasta, agrupar, bodega_id))
+
+        # ===== EXPORTAR EXCEL =====
+        if request.GET.get("export") == "xlsx":
+            columns = [
+                ("Período",      lambda f: f["periodo"]),
+                ("Tipo",         lambda f: f["tipo"]),
+                ("Cantidad",     lambda f: f["cantidad"]),
+                ("Movimientos",  lambda f: f["movimientos"]),
+            ]
+            raw, fname = queryset_to_excel(f"resumen_movimientos_{desde}_{hasta}", columns, filas)
+            resp = HttpResponse(
+                raw,
+                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
+            resp["Content-Disposition"] = f'attachment; filename="{fname}"'
+            return resp
+
+        # Una fila por período, una columna por tipo
+        tipos = [t for t, _ in TIPO_MOVIMIENTO]
+        periodos = {}
+        for f in filas:
+            fila = periodos.setdefault(f["periodo"], {t: None for t in tipos})
+            fila[f["tipo"]] = f
+        tabla = [
+            {"periodo": periodo, "celdas": [celdas[t] for t in tipos]}
+            for periodo, celdas in periodos.items()
+        ]
+
+        context = {
+            'tabla': tabla,
+            'tipos': TIPO_MOVIMIENTO,
+            'agrupar': agrupar,
+            'desde': desde,
+            'hasta': hasta,
+            'bodegas': Bodega.objects.order_by('codigo'),
+            'f_bodega': bodega,
+        }
+        return render(request, self.template_name, context)
+
+
+# ----------------------------------------------------------
+# KARDEX POR PRODUCTO (SALDO ACUMULADO, PAGINACIÓN POR KEYSET)
+# ----------------------------------------------------------
+@method_decorator(permiso_requerido('inventario.ver_movimientos'), name='dispatch')
+class KardexView(View):
+    template_name = 'inventario/kardex.html'
+
+    def get(self, request, producto_id):
+        producto = get_object_or_404(Producto, pk=producto_id)
+
+        bodega = request.GET.get("bodega", "")
+        desde = _fecha_get(request, "desde")
+        hasta = _fecha_get(request, "hasta")
+        try:
+            despues = decodificar_posicion(request.GET["cursor"]) if request.GET.get("cursor") else None
+        except ValueError:
+            messages.error(request, "⚠️ Cursor de página inválido, se muestra desde el inicio.")
+            despues = None
+
+        def inicio_dia(d):
+            return timezone.make_aware(datetime.combine(d, time.min))
+
+        pagina = pagina_kardex(
+            producto.pk,
+            bodega_id=int(bodega) if bodega.isdigit() else None,
+            desde=inicio_dia(desde) if desde else None,
+            hasta=inicio_dia(hasta + timedelta(days=1)) if hasta else None,
+            despues=despues,
+        )
+
+        context = {
+            'producto': producto,
+            'bodegas': Bodega.objects.order_by('codigo'),
+            'apertura': pagina['apertura'],
+            'filas': pagina['filas'],
+            'siguiente': codificar_posicion(pagina['siguiente']) if pagina['siguiente'] else "",
+            'es_continuacion': despues is not None,
+            'f_bodega': bodega,
+            'f_desde': desde.isoformat() if desde else "",
+            'f_hasta': hasta.isoformat() if hasta else "",
+        }
+        return render(request, self.template_name, context)
+
+
+# ----------------------------------------------------------
+# CONTEOS CÍCLICOS
+# ----------------------------------------------------------
+@method_decorator(permiso_requerido('inventario.ver_movimientos'), name='dispatch')
+@method_decorator(permiso_requerido('inventario.agregar_movimientos'), name='post')
+class ConteoListView(View):
+    template_name = 'inventario/conteo_list.html'
+
+    def _render(self, request, form):
+        conteos = ConteoInventario.objects.select_related('bodega', 'usuario', 'documento')
+        page_obj = Paginator(conteos, 20).get_page(request.GET.get('page'))
+        return render(request, self.template_name, {'form': form, 'page_obj': page_obj, 'conteos': page_obj})
+
+    def get(self, request):
+        return self._render(request, ConteoForm())
+
+    def post(self, request):
+        form = ConteoForm(request.POST)
+        if not form.is_valid():
+            messages.error(request, "⚠️ Revise el alcance del conteo.")
+            return self._render(request, form)
+        conteo = abrir_conteo(
+            bodega=form.cleaned_data['bodega'],
+            categoria=form.cleaned_data['categoria'] or None,
+            usuario=request.user,
+            observacion=form.cleaned_data['observacion'] or None,
+        )
+        messages.success(request, f"✅ {conteo} abierto con {conteo.total_lineas} línea(s).")
+        return redirect('inventario:detalle_conteo', pk=conteo.pk)
+
+
+@method_decorator(permiso_requerido('inventario.ver_movimientos'), name='dispatch')
+@method_decorator(permiso_requerido('inventario.agregar_movimientos'), name='post')
+class ConteoDetailView(View):
+    template_name = 'inventario/conteo_detalle.html'
+
+    def get(self, request, pk, form=None):
+        conteo = get_object_or_404(ConteoInventario.objects.select_related('bodega', 'usuario', 'documento'), pk=pk)
+        ver = request.GET.get('ver', '')
+        lineas = conteo.lineas.select_related('producto', 'lote').order_by('producto__sku', 'lote__codigo')
+        if ver == 'diferencias':
+            lineas = lineas.exclude(diferencia=0).filter(diferencia__isnull=False)
+        elif ver == 'pendientes':
+            lineas = lineas.filter(cantidad_contada__isnull=True)
+
+        # ===== EXPORTAR EXCEL =====
+        if request.GET.get("export") == "xlsx":
+            columns = [
+                ("SKU",              lambda l: l.producto.sku),
+                ("Producto",         lambda l: l.producto.nombre),
+                ("Lote",             lambda l: l.lote.codigo if l.lote else ""),
+                ("Sistema",          lambda l: l.cantidad_sistema),
+                ("Contado",          lambda l: l.cantidad_contada if l.cantidad_contada is not None else ""),
+                ("Diferencia",       lambda l: l.diferencia if l.diferencia is not None else ""),
+            ]
+            raw, fname = queryset_to_excel(f"conteo_{conteo.pk}", columns, lineas.iterator(chunk_size=2000))
+            resp = HttpResponse(
+                raw,
+                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
+            resp["Content-Disposition"] = f'attachment; filename="{fname}"'
+            return resp
+
+        resumen = conteo.lineas.aggregate(
+            contadas=Count('pk', filter=Q(cantidad_contada__isnull=False)),
+            diferencias=Count('pk', filter=Q(diferencia__isnull=False) & ~Q(diferencia=0)),
+            neto=Sum('diferencia'),
+        )
+        page_obj = Paginator(lineas, 50).get_page(request.GET.get('page'))
+        context = {
+            'conteo': conteo,
+            'form': form or CargaConteoForm(),
+            'page_obj': page_obj,
+            'lineas': page_obj,
+            'resumen': resumen,
+            'f_ver': ver,
+        }
+        return render(request, self.template_name, context)
+
+    def post(self, request, pk):
+        conteo = get_object_or_404(ConteoInventario, pk=pk)
+        accion = request.POST.get('accion')
+
+        if accion == 'publicar':
+            try:
+                documento = publicar_conteo(conteo, usuario=request.user)
+            except ValidationError as e:
+                messages.error(request, f"❌ {' '.join(e.messages)}")
+                return redirect('inventario:detalle_conteo', pk=pk)
+            if documento is None:
+                messages.info(request, "ℹ️ Conteo cerrado sin diferencias.")
+                return redirect('inventario:detalle_conteo', pk=pk)
+            messages.success(request, f"✅ Ajustes publicados: {documento.total_lineas} línea(s).")
+            return redirect('inventario:detalle_documento', pk=documento.pk)
+
+        if accion == 'anular':
+            if conteo.estado == 'ABIERTO':
+                conteo.estado = 'ANULADO'
+                conteo.save(update_fields=['estado'])
+                messages.success(request, f"✅ {conteo} anulado.")
+            return redirect('inventario:detalle_conteo', pk=pk)
+
+        form = CargaConteoForm(request.POST, request.FILES)
+        if not form.is_valid():
+            return self.get(request, pk, form=form)
+        try:
+            if form.cleaned_data['archivo']:
+                res = cargar_conteo(conteo, leer_archivo(form.cleaned_data['archivo']))
+            else:
+                res = cargar_conteo(conteo, lecturas_de_codigos(form.cleaned_data['codigos'].split()), sumar=True)
+        except ValidationError as e:
+            for error in e.messages:
+                form.add_error(None, error)
+            messages.error(request, "❌ No se cargó el conteo. Revise los errores.")
+            return self.get(request, pk, form=form)
+        messages.success(
+            request,
+            f"✅ {res['lecturas']} lectura(s) en {res['lineas']} línea(s); {res['diferencias']} con diferencia.",
+        )
+        return redirect('inventario:detalle_conteo', pk=pk)
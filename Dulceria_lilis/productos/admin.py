@@ -1,7 +1,13 @@
 from django.contrib import admin
-from .models import Producto
+from .models import ImportacionProductos, Producto
 
 @admin.register(Producto)
 class ProductoAdmin(admin.ModelAdmin):
     list_display = ("sku", "nombre", "categoria", "precio_venta", "stock_actual")
     search_fields = ("sku", "nombre", "categoria")  # 🔥 Necesario
+
+
+@admin.register(ImportacionProductos)
+class ImportacionProductosAdmin(admin.ModelAdmin):
+    list_display = ("id", "nombre_archivo", "estado", "filas", "creados", "actualizados", "errores", "fecha")
+    list_filter = ("estado",)
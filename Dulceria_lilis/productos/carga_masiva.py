@@ -0,0 +1,199 @@
+# productos/carga_masiva.py
+"""
+Upsert masivo de productos por SKU (API bulk e importaciones).
+
+Los SKU y EAN existentes se resuelven con una consulta cada uno (IN), la validación
+por fila la aporta quien llama (serializer o reglas del formulario) y los cambios
+se aplican en bloques (bulk_create y UPDATE por lotes), cada bloque en su transacción;
+si un bloque choca con una restricción única, se reintenta fila por fila con un
+savepoint cada una y solo se informan como error las filas que chocan.
+En las actualizaciones solo se escriben los campos que cambian, agrupando las filas
+por conjunto de campos (ver utils.bulk.bulk_update_valores).
+"""
+from django.db import IntegrityError, transaction
+
+from utils.bulk import bulk_update_valores, en_bloques
+from .models import Producto
+
+CHUNK_SIZE = 1000
+
+
+def productos_por_sku(skus):
+    """{sku: Producto} de los SKU que ya existen."""
+    existentes = {}
+    for bloque in en_bloques(skus):
+        existentes.update((p.sku, p) for p in Producto.objects.filter(sku__in=bloque))
+    return existentes
+
+
+def duenos_ean(eans):
+    """{ean_upc: sku} de los EAN que ya existen."""
+    duenos = {}
+    for bloque in en_bloques(eans):
+        duenos.update(Producto.objects.filter(ean_upc__in=bloque).values_list('ean_upc', 'sku'))
+    return duenos
+
+
+def normalizar_sku(sku):
+    """SKU como lo guarda ProductoForm.clean_sku (sin espacios, en mayúsculas)."""
+    return sku.strip().upper()
+
+
+def _error(i, sku, errores):
+    return {"fila": i, "sku": sku, "estado": "error", "errores": errores}
+
+
+def _aplicar(nuevos, cambiados):
+    """Inserta los nuevos y actualiza los cambiados, agrupados por conjunto de campos."""
+    if nuevos:
+        Producto.objects.bulk_create([obj for _, obj in nuevos])
+    grupos = {}  # (campos que cambian) -> [Producto]
+    for _, obj, campos in cambiados:
+        grupos.setdefault(campos, []).append(obj)
+    for campos, objs in grupos.items():
+        bulk_update_valores(Producto, objs, campos)
+
+
+def _aplicar_por_fila(nuevos, cambiados):
+    """
+    Tras un IntegrityError del bloque: cada fila en su savepoint, para no
+    marcar como fallidas las que no chocaron. Devuelve {fila: error}.
+    """
+    fallidas = {}
+    for item in [(i, obj, None) for i, obj in nuevos] + cambiados:
+        try:
+            with transaction.atomic():
+                if item[2] is None:
+                    _aplicar([item[:2]], [])
+                else:
+                    _aplicar([], [item])
+        except IntegrityError as e:
+            fallidas[item[0]] = e
+    return fallidas
+
+
+def upsert_productos(filas, validar, chunk_size=CHUNK_SIZE, vistos=None):
+    """
+    Crea o actualiza productos por SKU. El SKU se normaliza (normalizar_sku) antes
+    de buscar repetidos y existentes, y la fila llega a `validar` ya normalizada.
+
+    filas:   lista de dicts con al menos 'sku'.
+    validar: función (fila, existente) -> (datos, errores). `existente` es el
+             Producto con ese SKU o None; `datos` son los valores ya limpios.
+    vistos:  set de SKU ya recibidos en llamadas anteriores (importación por
+             bloques); se completa con los de esta llamada.
+
+    Retorna {"creados", "actualizados", "errores", "resultados"} con un resultado por fila
+    (estado: creado, actualizado, sin_cambios o error).
+    """
+    resultados = [None] * len(filas)
+
+    # ---- 1) SKU por fila + duplicados dentro del mismo envío ----
+    if vistos is None:
+        vistos = set()
+    candidatas = []
+    for i, fila in enumerate(filas):
+        if not isinstance(fila, dict):
+            resultados[i] = _error(i, None, {"non_field_errors": ["La fila debe ser un objeto."]})
+            continue
+        sku = fila.get('sku')
+        if not isinstance(sku, str) or not sku.strip():
+            resultados[i] = _error(i, sku, {"sku": ["El campo SKU es obligatorio."]})
+            continue
+        sku = normalizar_sku(sku)
+        if sku in vistos:
+            resultados[i] = _error(i, sku, {"sku": ["SKU repetido en el envío."]})
+            continue
+        vistos.add(sku)
+        candidatas.append((i, sku, {**fila, 'sku': sku}))
+
+    existentes = productos_por_sku(sku for _, sku, _ in candidatas)
+
+    # ---- 2) Validación por fila (sin consultas) ----
+    validas = []
+    eans = {}
+    for i, sku, fila in candidatas:
+        existente = existentes.get(sku)
+        datos, errores = validar(fila, existente)
+        if errores:
+            resultados[i] = _error(i, sku, errores)
+            continue
+        ean = datos.get('ean_upc')
+        if ean:
+            if ean in eans:
+                resultados[i] = _error(i, sku, {"ean_upc": ["EAN/UPC repetido en el envío."]})
+                continue
+            eans[ean] = sku
+        validas.append((i, sku, datos, existente))
+
+    # ---- 3) EAN contra la base de datos (una consulta) ----
+    duenos = duenos_ean(eans)
+    if duenos:
+        filtradas = []
+        for item in validas:
+            i, sku, datos, _ = item
+            dueno = duenos.get(datos.get('ean_upc'))
+            if dueno is not None and dueno != sku:
+                resultados[i] = _error(i, sku, {"ean_upc": ["Ya existe un producto con este EAN/UPC."]})
+            else:
+                filtradas.append(item)
+        validas = filtradas
+
+    # ---- 4) Aplicar por bloques ----
+    creados = actualizados = 0
+    for inicio in range(0, len(validas), chunk_size):
+        bloque = validas[inicio:inicio + chunk_size]
+        nuevos, cambiados, sin_cambios = [], [], []
+
+        for i, sku, datos, existente in bloque:
+            if existente is None:
+                obj = Producto(**datos)
+                # Igual que Producto.save(): punto_reorden por defecto = stock_minimo
+                if obj.punto_reorden is None:
+                    obj.punto_reorden = obj.stock_minimo
+                nuevos.append((i, obj))
+            else:
+                campos = []
+                for campo, valor in datos.items():
+                    if campo != 'sku' and getattr(existente, campo) != valor:
+                        setattr(existente, campo, valor)
+                        campos.append(campo)
+                if existente.punto_reorden is None:
+                    existente.punto_reorden = existente.stock_minimo
+                    campos.append('punto_reorden')
+                if campos:
+                    cambiados.append((i, existente, tuple(sorted(campos))))
+                else:
+                    sin_cambios.append((i, existente))
+
+        try:
+            with transaction.atomic():
+                _aplicar(nuevos, cambiados)
+        except IntegrityError:
+            # Choque con una escritura concurrente: se reintenta fila por fila
+            fallidas = _aplicar_por_fila(nuevos, cambiados)
+            for i, sku, _, _ in bloque:
+                if i in fallidas:
+                    resultados[i] = _error(i, sku, {"non_field_errors": [str(fallidas[i])]})
+            nuevos = [(i, obj) for i, obj in nuevos if i not in fallidas]
+            cambiados = [item for item in cambiados if item[0] not in fallidas]
+
+        # MySQL no devuelve ids en bulk_create: se resuelven con una consulta por bloque
+        sin_id = [obj.sku for _, obj in nuevos if obj.pk is None]
+        ids = dict(Producto.objects.filter(sku__in=sin_id).values_list('sku', 'id')) if sin_id else {}
+
+        for i, obj in nuevos:
+            resultados[i] = {"fila": i, "sku": obj.sku, "estado": "creado", "id": obj.pk or ids.get(obj.sku)}
+        for i, obj, _ in cambiados:
+            resultados[i] = {"fila": i, "sku": obj.sku, "estado": "actualizado", "id": obj.pk}
+        for i, obj in sin_cambios:
+            resultados[i] = {"fila": i, "sku": obj.sku, "estado": "sin_cambios", "id": obj.pk}
+        creados += len(nuevos)
+        actualizados += len(cambiados)
+
+    return {
+        "creados": creados,
+        "actualizados": actualizados,
+        "errores": sum(1 for r in resultados if r["estado"] == "error"),
+        "resultados": resultados,
+    }
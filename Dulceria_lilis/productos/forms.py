@@ -32,6 +32,20 @@ def validar_url(valor):
     if valor and not valor.startswith(('http://', 'https://')):
         raise ValidationError("La URL debe comenzar con 'http://' o 'https://'.")
 
+# Formato de SKU y EAN/UPC, común al formulario y a la importación masiva
+def validar_sku(valor):
+    sku = (valor or '').upper().strip()
+    if not sku:
+        raise ValidationError("El campo SKU es obligatorio.")
+    if not re.match(r'^SKU[0-9]+$', sku):
+        raise ValidationError("El SKU debe comenzar con 'Sku' seguido de un número positivo (ej: Sku1, Sku25).")
+    return sku
+
+def validar_ean_upc(valor):
+    if valor and not re.match(r'^[0-9]{8,13}$', valor):
+        raise ValidationError("El EAN/UPC debe tener entre 8 y 13 dígitos numéricos.")
+    return valor
+
 class ProductoForm(forms.ModelForm):
     class Meta:
         model = Producto
@@ -73,11 +87,7 @@ class ProductoForm(forms.ModelForm):
     # ==========================
 
     def clean_sku(self):
-        sku = self.cleaned_data.get('sku', '').upper().strip()
-        if not sku:
-            raise ValidationError("El campo SKU es obligatorio.")
-        if not re.match(r'^SKU[0-9]+$', sku):
-            raise ValidationError("El SKU debe comenzar con 'Sku' seguido de un número positivo (ej: Sku1, Sku25).")
+        sku = validar_sku(self.cleaned_data.get('sku'))
 
         qs = Producto.objects.filter(sku=sku)
         if self.instance.pk:
@@ -88,10 +98,8 @@ class ProductoForm(forms.ModelForm):
         return sku
 
     def clean_ean_upc(self):
-        ean = self.cleaned_data.get('ean_upc')
+        ean = validar_ean_upc(self.cleaned_data.get('ean_upc'))
         if ean:
-            if not re.match(r'^[0-9]{8,13}$', ean):
-                raise ValidationError("El EAN/UPC debe tener entre 8 y 13 dígitos numéricos.")
             qs = Producto.objects.filter(ean_upc=ean)
             if self.instance.pk:
                 qs = qs.exclude(pk=self.instance.pk)
@@ -242,4 +250,37 @@ class ProductoForm(forms.ModelForm):
         if len(descripcion) > 1000:
             raise ValidationError("La descripción debe tener menos de 1000 caracteres.")
         return descripcion
-        
\ No newline at end of file
+        
+
+class ProductoImportacionForm(ProductoForm):
+    """
+    Reglas de ProductoForm para la importación masiva (productos.importacion).
+    La unicidad de SKU y EAN/UPC se resuelve en bloque (productos.carga_masiva),
+    así que aquí solo se revisa el formato, sin consultas por fila.
+    El stock y el costo promedio los mueven los movimientos, no la importación.
+    """
+    class Meta(ProductoForm.Meta):
+        fields = None
+        exclude = ['stock_actual', 'costo_promedio']
+
+    def clean_sku(self):
+        return validar_sku(self.cleaned_data.get('sku'))
+
+    def clean_ean_upc(self):
+        return validar_ean_upc(self.cleaned_data.get('ean_upc'))
+
+    def validate_unique(self):
+        pass
+
+
+class ImportacionProductosForm(forms.Form):
+    archivo = forms.FileField(
+        label="Archivo (.xlsx o .csv)",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.xlsx,.csv'}),
+    )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith(('.xlsx', '.csv')):
+            raise ValidationError("El archivo debe ser .xlsx o .csv.")
+        return archivo
@@ -0,0 +1,220 @@
+# productos/importacion.py
+"""
+Importación masiva de productos desde un XLSX o CSV, en segundo plano.
+
+El archivo subido queda en MEDIA_ROOT (ImportacionProductos.archivo) y se procesa
+fuera de la petición:
+
+  - se lee en streaming (utils.importacion: openpyxl en modo read_only o
+    csv.reader), sin cargar el archivo entero; las filas se juntan en bloques
+    de CHUNK_SIZE;
+  - cada fila pasa por las reglas de ProductoForm (ProductoImportacionForm). Las
+    columnas ausentes conservan el valor actual del producto (o el valor por
+    defecto si es nuevo);
+  - SKU y EAN/UPC se validan contra la base en bloque y se aplican con
+    upsert_productos() (bulk_create + UPDATE por lotes), igual que /api/productos/bulk/.
+    Un SKU repetido en el archivo es error, aunque esté en otro bloque;
+  - los errores se escriben fila a fila en un CSV (ImportacionProductos.reporte_errores)
+    y el progreso se guarda después de cada bloque.
+
+lanzar_importacion() arranca el proceso en un hilo cuando la transacción que creó
+la importación confirma. `manage.py importar_productos` importa un archivo desde
+la consola o retoma las importaciones que quedaron pendientes.
+"""
+import csv
+import io
+import itertools
+import logging
+import os
+import tempfile
+import threading
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import close_old_connections, transaction
+from django.forms.models import model_to_dict
+from django.utils import timezone
+
+from sistema.models import RegistroActividad
+from utils.importacion import leer_archivo
+from .carga_masiva import upsert_productos
+from .forms import ProductoImportacionForm
+from .models import ImportacionProductos, Producto
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+
+# Encabezados aceptados (normalizados, ver utils.importacion).
+# Incluye los del Excel que exporta el listado de productos.
+COLUMNAS = {
+    'sku': {'sku'},
+    'ean_upc': {'ean_upc', 'ean/upc', 'ean', 'upc', 'codigo_barras'},
+    'nombre': {'nombre'},
+    'descripcion': {'descripcion'},
+    'categoria': {'categoria'},
+    'marca': {'marca'},
+    'modelo': {'modelo'},
+    'uom_compra': {'uom_compra'},
+    'uom_venta': {'uom_venta'},
+    'factor_conversion': {'factor_conversion'},
+    'costo_estandar': {'costo_estandar'},
+    'precio_venta': {'precio_venta'},
+    'impuesto_iva': {'impuesto_iva', 'iva', 'iva_%'},
+    'stock_minimo': {'stock_minimo'},
+    'stock_maximo': {'stock_maximo'},
+    'punto_reorden': {'punto_reorden', 'punto_de_reorden'},
+    'perishable': {'perishable', 'perecible'},
+    'control_por_lote': {'control_por_lote'},
+    'control_por_serie': {'control_por_serie'},
+    'imagen_url': {'imagen_url'},
+    'ficha_tecnica_url': {'ficha_tecnica_url'},
+    'fecha_vencimiento': {'fecha_vencimiento', 'vencimiento'},
+}
+BOOLEANOS = {'perishable', 'control_por_lote', 'control_por_serie'}
+VERDADEROS = {'si', 'sí', 's', 'true', 'verdadero', '1', 'x', 'yes'}
+
+
+def leer_filas(archivo, nombre):
+    """(número de fila, {campo: valor}) del archivo, de a una fila (utils.importacion)."""
+    for numero, fila in leer_archivo(archivo, nombre, COLUMNAS, {'sku': 'SKU'}):
+        fila['sku'] = fila['sku'].upper()
+        for campo in BOOLEANOS & fila.keys():
+            fila[campo] = fila[campo].lower() in VERDADEROS
+        yield numero, fila
+
+
+class ValidadorFilas:
+    """
+    validar(fila, existente) de upsert_productos() con las reglas de
+    ProductoImportacionForm. Crear un formulario por fila copia sus 25 campos
+    (~1 ms); con cientos de miles de filas se reutiliza una sola instancia y
+    solo se reinicia su estado.
+    """
+
+    def __init__(self):
+        self.form = ProductoImportacionForm()
+        self.campos = list(self.form.fields)
+        opts = Producto._meta
+        self.defecto = {
+            c: opts.get_field(c).get_default() if opts.get_field(c).has_default() else ''
+            for c in self.campos
+        }
+
+    def __call__(self, fila, existente):
+        base = model_to_dict(existente, fields=self.campos) if existente else self.defecto
+        form = self.form
+        form.data = {**base, **fila}
+        form.instance = Producto()
+        form.is_bound = True
+        form._errors = None
+        form._bound_fields_cache = {}
+        if form.is_valid():
+            return dict(form.cleaned_data), None
+        return None, {campo: list(mensajes) for campo, mensajes in form.errors.items()}
+
+
+def _escribir_errores(escritor, resultados, numeros):
+    for r in resultados:
+        if r["estado"] != "error":
+            continue
+        for campo, mensajes in r["errores"].items():
+            for mensaje in mensajes:
+                escritor.writerow([numeros[r["fila"]], r["sku"] or "", campo, mensaje])
+
+
+def importar(importacion, chunk_size=CHUNK_SIZE):
+    """
+    Procesa una ImportacionProductos PENDIENTE en el hilo o proceso que llama.
+    Deja el resultado en la misma fila: TERMINADA con los totales o FALLIDA con
+    el mensaje (los bloques ya aplicados se conservan). Si otro proceso ya la
+    tomó, no hace nada.
+    """
+    tomada = ImportacionProductos.objects.filter(pk=importacion.pk, estado='PENDIENTE').update(
+        estado='PROCESANDO', inicio=timezone.now()
+    )
+    if not tomada:
+        importacion.refresh_from_db()
+        return importacion
+
+    totales = dict.fromkeys(('filas', 'creados', 'actualizados', 'sin_cambios', 'errores'), 0)
+    # El reporte va a un archivo temporal: puede tener tantas líneas como el archivo
+    temporal = tempfile.TemporaryFile()
+    reporte = io.TextIOWrapper(temporal, encoding='utf-8-sig', newline='')
+    escritor = csv.writer(reporte)
+    escritor.writerow(['fila', 'sku', 'campo', 'error'])
+
+    try:
+        validar = ValidadorFilas()
+        vistos = set()
+        with importacion.archivo.open('rb') as archivo:
+            filas = leer_filas(archivo, importacion.nombre_archivo)
+            while True:
+                bloque = list(itertools.islice(filas, chunk_size))
+                if not bloque:
+                    break
+                numeros = [n for n, _ in bloque]
+                resumen = upsert_productos([f for _, f in bloque], validar, vistos=vistos)
+                _escribir_errores(escritor, resumen["resultados"], numeros)
+
+                totales['filas'] += len(bloque)
+                totales['creados'] += resumen["creados"]
+                totales['actualizados'] += resumen["actualizados"]
+                totales['errores'] += resumen["errores"]
+                totales['sin_cambios'] += sum(1 for r in resumen["resultados"] if r["estado"] == "sin_cambios")
+                ImportacionProductos.objects.filter(pk=importacion.pk).update(**totales)
+
+        for campo, valor in totales.items():
+            setattr(importacion, campo, valor)
+        if totales['errores']:
+            reporte.flush()
+            temporal.seek(0)
+            nombre = f"{os.path.splitext(os.path.basename(importacion.archivo.name))[0]}_errores.csv"
+            importacion.reporte_errores.save(nombre, File(temporal), save=False)
+    except Exception as e:
+        if isinstance(e, ValidationError):
+            mensaje = " ".join(e.messages)
+        else:
+            logger.exception("Importación de productos #%s fallida", importacion.pk)
+            mensaje = str(e)
+        ImportacionProductos.objects.filter(pk=importacion.pk).update(
+            estado='FALLIDA', fin=timezone.now(), mensaje=mensaje, **totales
+        )
+        importacion.refresh_from_db()
+        return importacion
+    finally:
+        reporte.close()
+
+    importacion.estado = 'TERMINADA'
+    importacion.inicio = importacion.inicio or timezone.now()
+    importacion.fin = timezone.now()
+    importacion.save()
+
+    # bulk_create/bulk_update no disparan la auditoría por fila: un registro por importación
+    if importacion.creados or importacion.actualizados:
+        RegistroActividad.objects.create(
+            usuario=importacion.usuario,
+            descripcion=(
+                f"Importación de productos {importacion.nombre_archivo}: {importacion.creados} creados, "
+                f"{importacion.actualizados} actualizados, {importacion.errores} con error"
+            ),
+            modelo='Producto',
+        )
+    return importacion
+
+
+def _importar_en_hilo(pk):
+    close_old_connections()
+    try:
+        importar(ImportacionProductos.objects.get(pk=pk))
+    finally:
+        close_old_connections()
+
+
+def lanzar_importacion(importacion):
+    """Procesa la importación en un hilo aparte cuando la transacción actual confirma."""
+    transaction.on_commit(
+        lambda: threading.Thread(
+            target=_importar_en_hilo, args=(importacion.pk,), name=f"importacion-{importacion.pk}", daemon=True
+        ).start()
+    )
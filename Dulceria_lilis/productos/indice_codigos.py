@@ -0,0 +1,163 @@
+# productos/indice_codigos.py
+"""
+Índice en memoria de códigos de producto (EAN/UPC y SKU) → producto_id, para
+resolver escaneos sin ir a la base de datos.
+
+Cada proceso carga el índice una vez: un dict de cadenas internadas a enteros
+(~200 mil entradas para 100 mil productos). Se mantiene vigente con una marca de
+versión, la misma que usa la sincronización incremental (api/changes):
+
+  - (updated_at más reciente visto, id del último tombstone de producto);
+  - al revisar (como mucho cada INDICE_CODIGOS_REVISION_SEGUNDOS) se leen solo
+    los productos con updated_at >= marca - MARGEN y los tombstones nuevos,
+    con los índices de esas columnas. Un producto cuyo stock cambió ya tiene sus
+    códigos en el índice y no cuesta nada; solo altas, cambios de código y
+    bajas reconstruyen el dict (una pasada en memoria, sin releer la tabla);
+  - el MARGEN cubre transacciones que confirman con un updated_at anterior a la marca.
+
+Un código que no está en el índice se busca en la base (una consulta por lote de
+escaneos) y se agrega, así un producto recién creado se puede escanear aunque la
+revisión todavía no haya pasado.
+"""
+import sys
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Q
+
+from sistema.models import RegistroEliminacion
+from .models import Producto
+
+CHUNK_SIZE = 5000
+MARGEN = timedelta(seconds=60)
+
+
+def normalizar_codigo(codigo):
+    return str(codigo).strip()
+
+
+def variantes(codigo):
+    """Formas equivalentes de un código leído: UPC-A de 12 dígitos = EAN-13 con 0 inicial."""
+    if len(codigo) == 12 and codigo.isdigit():
+        return (codigo, '0' + codigo)
+    return (codigo,)
+
+
+def _entradas(filas):
+    """(código internado, producto_id) de filas (id, sku, ean_upc). El EAN gana si coincide con un SKU."""
+    for pk, sku, ean in filas:
+        if sku:
+            yield sys.intern(normalizar_codigo(sku)), pk
+    for pk, sku, ean in filas:
+        if ean:
+            yield sys.intern(normalizar_codigo(ean)), pk
+
+
+class IndiceCodigos:
+    def __init__(self):
+        self._codigos = {}
+        self._marca = None           # updated_at más reciente visto
+        self._tombstone = 0          # id del último RegistroEliminacion de producto visto
+        self._revisado = None        # time.monotonic() de la última revisión
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._codigos)
+
+    @property
+    def version(self):
+        return (self._marca, self._tombstone)
+
+    def _tombstones(self):
+        return RegistroEliminacion.objects.filter(modelo='producto', id__gt=self._tombstone)
+
+    def cargar(self):
+        """Carga completa (primera vez o recarga forzada)."""
+        ultimo = self._tombstones().aggregate(m=Max('id'))['m']
+        filas = list(Producto.objects.values_list('id', 'sku', 'ean_upc', 'updated_at').iterator(chunk_size=CHUNK_SIZE))
+        self._codigos = dict(_entradas([f[:3] for f in filas]))
+        self._marca = max((f[3] for f in filas), default=None)
+        self._tombstone = ultimo or self._tombstone
+        self._revisado = time.monotonic()
+
+    def _aplicar_cambios(self):
+        """Aplica altas, cambios de código y bajas desde la marca de versión."""
+        borrados = list(self._tombstones().order_by('id').values_list('id', 'objeto_id'))
+        qs = Producto.objects.values_list('id', 'sku', 'ean_upc', 'updated_at')
+        if self._marca is not None:
+            qs = qs.filter(updated_at__gte=self._marca - MARGEN)
+        cambios = list(qs.iterator(chunk_size=CHUNK_SIZE))
+
+        codigos = self._codigos
+        # Productos cuyos códigos ya apuntan a ellos (p. ej. solo cambió el stock): nada que hacer
+        distintos = [
+            (pk, sku, ean) for pk, sku, ean, _ in cambios
+            if (sku and codigos.get(normalizar_codigo(sku)) != pk) or (ean and codigos.get(normalizar_codigo(ean)) != pk)
+        ]
+        quitar = {pk for _, pk in borrados} | {pk for pk, _, _ in distintos}
+        if quitar:
+            # Se reconstruye aparte y se reemplaza de una vez: los lectores ven el dict viejo o el nuevo
+            nuevo = {c: pk for c, pk in codigos.items() if pk not in quitar}
+            nuevo.update(_entradas(distintos))
+            self._codigos = nuevo
+
+        if cambios:
+            ultimo = max(c[3] for c in cambios)
+            self._marca = ultimo if self._marca is None else max(self._marca, ultimo)
+        if borrados:
+            self._tombstone = borrados[-1][0]
+
+    def asegurar_vigente(self, forzar=False):
+        """Carga o refresca el índice si pasó el intervalo de revisión (o si se fuerza)."""
+        intervalo = getattr(settings, 'INDICE_CODIGOS_REVISION_SEGUNDOS', 2)
+        if not forzar and self._revisado is not None and time.monotonic() - self._revisado < intervalo:
+            return
+        with self._lock:
+            if self._revisado is None:
+                self.cargar()
+            elif forzar or time.monotonic() - self._revisado >= intervalo:
+                self._aplicar_cambios()
+                self._revisado = time.monotonic()
+
+    def buscar(self, codigo):
+        """producto_id del código (solo en memoria) o None."""
+        codigos = self._codigos
+        for variante in variantes(normalizar_codigo(codigo)):
+            pk = codigos.get(variante)
+            if pk is not None:
+                return pk
+        return None
+
+    def resolver(self, codigos):
+        """
+        {código: producto_id} de los códigos conocidos. Los que no están en memoria
+        se buscan en la base con una sola consulta y se agregan al índice.
+        """
+        self.asegurar_vigente()
+        resultado, faltantes = {}, []
+        for codigo in codigos:
+            pk = self.buscar(codigo)
+            if pk is None:
+                faltantes.append(codigo)
+            else:
+                resultado[codigo] = pk
+        if faltantes:
+            buscados = {v for c in faltantes for v in variantes(normalizar_codigo(c))}
+            filas = list(
+                Producto.objects
+                .filter(Q(sku__in=buscados) | Q(ean_upc__in=buscados))
+                .values_list('id', 'sku', 'ean_upc')
+            )
+            if filas:
+                self._codigos.update(_entradas(filas))
+                for codigo in faltantes:
+                    pk = self.buscar(codigo)
+                    if pk is not None:
+                        resultado[codigo] = pk
+        return resultado
+
+
+# Un índice por proceso
+indice = IndiceCodigos()
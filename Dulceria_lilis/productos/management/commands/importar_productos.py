@@ -0,0 +1,59 @@
+# productos/management/commands/importar_productos.py
+"""
+Importa productos desde un XLSX o CSV (mismas reglas que la importación web),
+o procesa las importaciones web que quedaron pendientes (p. ej. si el servidor
+se reinició antes de que el hilo las tomara).
+Ejecutar:
+python manage.py importar_productos catalogo.xlsx
+python manage.py importar_productos catalogo.csv --bloque 5000
+python manage.py importar_productos --pendientes
+"""
+import os
+import time as reloj
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from productos.importacion import CHUNK_SIZE, importar
+from productos.models import ImportacionProductos
+
+
+class Command(BaseCommand):
+    help = 'Importa productos desde un XLSX/CSV o procesa las importaciones pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', nargs='?', help='Ruta del .xlsx o .csv a importar.')
+        parser.add_argument('--pendientes', action='store_true', help='Procesa las importaciones en estado PENDIENTE.')
+        parser.add_argument('--bloque', type=int, default=CHUNK_SIZE, help=f'Filas por bloque (por defecto {CHUNK_SIZE}).')
+
+    def handle(self, *args, **options):
+        bloque = max(options['bloque'], 1)
+        if options['pendientes']:
+            importaciones = list(ImportacionProductos.objects.filter(estado='PENDIENTE').order_by('fecha'))
+        elif options['archivo']:
+            ruta = options['archivo']
+            if not os.path.isfile(ruta):
+                raise CommandError(f"No existe el archivo {ruta}")
+            nombre = os.path.basename(ruta)
+            importacion = ImportacionProductos(nombre_archivo=nombre)
+            with open(ruta, 'rb') as f:
+                importacion.archivo.save(nombre, File(f), save=False)
+            importacion.save()
+            importaciones = [importacion]
+        else:
+            raise CommandError("Indique un archivo o --pendientes.")
+
+        for importacion in importaciones:
+            inicio = reloj.perf_counter()
+            importacion = importar(importacion, chunk_size=bloque)
+            resumen = (
+                f"#{importacion.pk} {importacion.nombre_archivo}: {importacion.get_estado_display()} - "
+                f"{importacion.filas} filas, {importacion.creados} creados, {importacion.actualizados} actualizados, "
+                f"{importacion.errores} con error ({reloj.perf_counter() - inicio:.1f}s)"
+            )
+            if importacion.estado == 'TERMINADA':
+                self.stdout.write(self.style.SUCCESS(resumen))
+                if importacion.reporte_errores:
+                    self.stdout.write(f"  Reporte de errores: {importacion.reporte_errores.path}")
+            else:
+                self.stdout.write(self.style.ERROR(f"{resumen}\n  {importacion.mensaje or ''}"))
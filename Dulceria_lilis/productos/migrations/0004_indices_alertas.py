@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:24
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0003_producto_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(models.ExpressionWrapper(django.db.models.expressions.CombinedExpression(models.F('stock_actual'), '-', django.db.models.functions.comparison.Coalesce('punto_reorden', 'stock_minimo')), output_field=models.FloatField()), name='producto_margen_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['fecha_vencimiento', 'perishable'], name='producto_vencimiento_idx'),
+        ),
+    ]
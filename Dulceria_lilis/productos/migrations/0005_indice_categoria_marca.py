@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0004_indices_alertas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['categoria', 'marca'], name='producto_categoria_marca_idx'),
+        ),
+    ]
@@ -1,5 +1,52 @@
 from django.db import models
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q
+from django.db.models.functions import Coalesce
 from datetime import date, timedelta
+from usuarios.models import Usuario
+from utils.sincronizacion import SincronizableQuerySet
+
+DIAS_ALERTA_VENCIMIENTO = 7
+
+# stock_actual - COALESCE(punto_reorden, stock_minimo): <= 0 significa bajo stock.
+# La misma expresión está indexada en Producto.Meta; el motor solo usa el índice si
+# el SQL del filtro coincide con el del índice. Con salida Decimal, Django envuelve
+# la expresión del índice en un CAST extra en SQLite y ya no coincide, por eso
+# se declara Float (solo se usa para filtrar, nunca se lee el valor).
+MARGEN_STOCK = ExpressionWrapper(
+    F('stock_actual') - Coalesce('punto_reorden', 'stock_minimo'),
+    output_field=FloatField(),
+)
+
+
+class ProductoQuerySet(SincronizableQuerySet):
+    """Alertas de stock y vencimiento resueltas en la base de datos."""
+
+    def _q_bajo_stock(self):
+        return Q(margen_stock__lte=0)
+
+    def _q_por_vencer(self, dias):
+        return Q(perishable=True, fecha_vencimiento__lte=date.today() + timedelta(days=dias))
+
+    def bajo_stock(self):
+        return self.alias(margen_stock=MARGEN_STOCK).filter(self._q_bajo_stock())
+
+    def por_vencer(self, dias=DIAS_ALERTA_VENCIMIENTO):
+        return self.filter(self._q_por_vencer(dias))
+
+    def con_alerta(self, dias=DIAS_ALERTA_VENCIMIENTO):
+        """Productos con bajo stock o por vencer."""
+        return self.alias(margen_stock=MARGEN_STOCK).filter(
+            self._q_bajo_stock() | self._q_por_vencer(dias)
+        )
+
+    def conteo_alertas(self, dias=DIAS_ALERTA_VENCIMIENTO):
+        """{'bajo_stock', 'por_vencer', 'con_alerta'} en una sola consulta."""
+        bajo, vencer = self._q_bajo_stock(), self._q_por_vencer(dias)
+        return self.alias(margen_stock=MARGEN_STOCK).aggregate(
+            bajo_stock=Count('pk', filter=bajo),
+            por_vencer=Count('pk', filter=vencer),
+            con_alerta=Count('pk', filter=bajo | vencer),
+        )
 
 
 class Producto(models.Model):
@@ -31,14 +78,27 @@ class Producto(models.Model):
 
     stock_actual = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     fecha_vencimiento = models.DateField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = ProductoQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(MARGEN_STOCK, name='producto_margen_stock_idx'),
+            models.Index(fields=['fecha_vencimiento', 'perishable'], name='producto_vencimiento_idx'),
+            models.Index(fields=['categoria', 'marca'], name='producto_categoria_marca_idx'),
+        ]
+
     def alerta_bajo_stock(self):
         """Devuelve True si el stock actual está por debajo del punto de reorden o mínimo."""
-        return self.stock_actual <= (self.punto_reorden or self.stock_minimo)
+        # Igual que ProductoQuerySet.bajo_stock(): COALESCE(punto_reorden, stock_minimo)
+        reorden = self.stock_minimo if self.punto_reorden is None else self.punto_reorden
+        return self.stock_actual <= reorden
     
     def alerta_por_vencer(self):
         """Devuelve True si el producto perecible vence en los próximos 7 días."""
         if self.perishable and self.fecha_vencimiento:
-            return self.fecha_vencimiento <= date.today() + timedelta(days=7)
+            return self.fecha_vencimiento <= date.today() + timedelta(days=DIAS_ALERTA_VENCIMIENTO)
         return False
 
     def save(self, *args, **kwargs):
@@ -48,4 +108,42 @@ class Producto(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.sku} - {self.nombre}"
\ No newline at end of file
+        return f"{self.sku} - {self.nombre}"
+
+
+ESTADO_IMPORTACION = [
+    ('PENDIENTE', 'Pendiente'),
+    ('PROCESANDO', 'Procesando'),
+    ('TERMINADA', 'Terminada'),
+    ('FALLIDA', 'Fallida'),
+]
+
+
+class ImportacionProductos(models.Model):
+    """Carga de productos desde un XLSX/CSV, procesada en segundo plano (productos.importacion)."""
+    archivo = models.FileField(upload_to='importaciones/productos/')
+    nombre_archivo = models.CharField(max_length=255)
+    usuario = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_IMPORTACION, default='PENDIENTE', db_index=True)
+    fecha = models.DateTimeField(auto_now_add=True)
+    inicio = models.DateTimeField(null=True, blank=True)
+    fin = models.DateTimeField(null=True, blank=True)
+
+    filas = models.PositiveIntegerField(default=0)
+    creados = models.PositiveIntegerField(default=0)
+    actualizados = models.PositiveIntegerField(default=0)
+    sin_cambios = models.PositiveIntegerField(default=0)
+    errores = models.PositiveIntegerField(default=0)
+    # CSV con una línea por error (fila del archivo, SKU, campo, mensaje)
+    reporte_errores = models.FileField(upload_to='importaciones/productos/', blank=True)
+    mensaje = models.TextField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-fecha']
+
+    @property
+    def en_curso(self):
+        return self.estado in ('PENDIENTE', 'PROCESANDO')
+
+    def __str__(self):
+        return f"Importación #{self.pk} - {self.nombre_archivo} ({self.get_estado_display()})"
@@ -1,3 +1,238 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from productos.forms import ProductoForm, ProductoImportacionForm
+from productos.importacion import importar
+from productos.indice_codigos import IndiceCodigos, variantes
+from productos.models import ImportacionProductos, Producto
+from utils.pruebas import PresupuestoConsultasMixin, crear_datos_semilla
+
+XHR = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+
+class PresupuestoProductosTests(PresupuestoConsultasMixin, TestCase):
+    """Consultas y filas máximas de cada vista de productos sobre los datos semilla."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.producto = cls.datos['productos'][0]
+        cls.importacion = ImportacionProductos.objects.create(
+            nombre_archivo='productos.xlsx', usuario=cls.datos['admin'], estado='COMPLETADA', filas=30, creados=30,
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.datos['admin'])
+
+    def get(self, url, datos=None, **cabeceras):
+        respuesta = self.client.get(url, datos, **cabeceras)
+        self.assertLess(respuesta.status_code, 400)
+        return respuesta
+
+    def test_lista(self):
+        with self.assertPresupuesto(consultas=8, filas=14):
+            self.get(reverse('productos:lista'), {'buscar': '', 'alerta': '', 'pp': 10})
+
+    def test_lista_todas_las_filas(self):
+        with self.assertPresupuesto(consultas=8, filas=14):
+            self.get(reverse('productos:lista'), {'buscar': '', 'alerta': '', 'pp': 100})
+
+    def test_lista_busqueda_y_alertas(self):
+        with self.assertPresupuesto(consultas=7, filas=4):
+            self.get(reverse('productos:lista'), {'buscar': 'SKU00', 'alerta': 'todas', 'pp': 10})
+
+    def test_busqueda_ajax(self):
+        with self.assertPresupuesto(consultas=8, filas=14):
+            self.get(reverse('productos:lista'), {'live': 1, 'buscar': 'SKU00', 'pp': 10}, **XHR)
+
+    def test_exportar_xlsx(self):
+        with self.assertPresupuesto(consultas=6, filas=32):
+            self.get(reverse('productos:lista'), {'export': 'xlsx', 'buscar': '', 'alerta': ''})
+
+    def test_crear_formulario_invalido(self):
+        # El alta se envía desde el listado; si no valida, vuelve a cargar el listado paginado
+        with self.assertPresupuesto(consultas=4, filas=13):
+            respuesta = self.client.post(reverse('productos:crear'), {'sku': ''})
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_editar(self):
+        with self.assertPresupuesto(consultas=3, filas=3):
+            self.get(reverse('productos:editar', args=[self.producto.pk]))
+
+    def test_detalle(self):
+        with self.assertPresupuesto(consultas=4, filas=3):
+            self.get(reverse('productos:detalle', args=[self.producto.pk]))
+
+    def test_eliminar(self):
+        with self.assertPresupuesto(consultas=52, filas=31):
+            self.get(reverse('productos:eliminar', args=[self.producto.pk]))
+
+    def test_importar(self):
+        with self.assertPresupuesto(consultas=3, filas=3):
+            self.get(reverse('productos:importar'))
+
+    def test_importacion_detalle(self):
+        with self.assertPresupuesto(consultas=3, filas=3):
+            self.get(reverse('productos:importacion', args=[self.importacion.pk]))
+
+
+class IndiceCodigosTests(TestCase):
+    """Índice en memoria EAN/SKU → producto_id y su revisión incremental."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.producto = Producto.objects.create(sku='IDX-1', ean_upc='0012345678905', nombre='Indexado', categoria='TORTAS')
+
+    def setUp(self):
+        self.indice = IndiceCodigos()
+        self.indice.cargar()
+
+    def test_sku_ean_y_upc_de_12_digitos(self):
+        self.assertEqual(variantes('012345678905'), ('012345678905', '0012345678905'))
+        self.assertEqual(self.indice.resolver(['IDX-1', ' 0012345678905 ', '012345678905', 'NADA']), {
+            'IDX-1': self.producto.pk, ' 0012345678905 ': self.producto.pk, '012345678905': self.producto.pk,
+        })
+
+    def test_producto_nuevo_se_busca_en_la_base(self):
+        nuevo = Producto.objects.create(sku='IDX-2', nombre='Nuevo', categoria='TORTAS')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.indice.resolver(['IDX-2']), {'IDX-2': nuevo.pk})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.indice.buscar('IDX-2'), nuevo.pk)
+
+    def test_revision_aplica_cambios_de_codigo_y_bajas(self):
+        otro = Producto.objects.create(sku='IDX-3', nombre='Otro', categoria='TORTAS')
+        self.indice.cargar()
+        self.producto.sku = 'IDX-1B'
+        self.producto.save()
+        otro.delete()
+        self.indice.asegurar_vigente(forzar=True)
+        self.assertIsNone(self.indice.buscar('IDX-1'))
+        self.assertEqual(self.indice.buscar('IDX-1B'), self.producto.pk)
+        self.assertIsNone(self.indice.buscar('IDX-3'))
+
+    @override_settings(INDICE_CODIGOS_REVISION_SEGUNDOS=3600)
+    def test_sin_revision_dentro_del_intervalo(self):
+        with self.assertNumQueries(0):
+            self.indice.asegurar_vigente()
+
+
+class ImportacionProductosTests(TestCase):
+    """Importación por bloques con las reglas de ProductoForm y reporte de errores por fila."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.existente = Producto.objects.create(
+            sku='SKU9001', nombre='Existente', categoria='TORTAS', marca='Lilis', stock_minimo=7,
+        )
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        ajuste = override_settings(MEDIA_ROOT=self.media)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+
+    def importar(self, contenido, nombre='productos.csv', chunk_size=2):
+        importacion = ImportacionProductos.objects.create(
+            archivo=SimpleUploadedFile(nombre, contenido.encode('utf-8-sig')), nombre_archivo=nombre,
+        )
+        return importar(importacion, chunk_size=chunk_size)
+
+    def test_crea_actualiza_y_reporta_por_fila(self):
+        importacion = self.importar(
+            'SKU;Nombre;Categoría;Marca;Perecible\n'
+            'sku9002;Torta Nueva;TORTAS;Lilis;si\n'
+            'SKU9001;Renombrado;TORTAS;Lilis;\n'
+            'SKU9003;Con Numero 9;TORTAS;Lilis;no\n'
+            'sku9002;Repetido;TORTAS;Lilis;no\n'
+        )
+        self.assertEqual(importacion.estado, 'TERMINADA')
+        self.assertEqual(
+            (importacion.filas, importacion.creados, importacion.actualizados, importacion.errores), (4, 1, 1, 2),
+        )
+        nuevo = Producto.objects.get(sku='SKU9002')
+        self.assertTrue(nuevo.perishable)
+        self.existente.refresh_from_db()
+        # Las columnas ausentes conservan el valor actual
+        self.assertEqual((self.existente.nombre, self.existente.stock_minimo), ('Renombrado', 7))
+        with importacion.reporte_errores.open('rb') as f:
+            reporte = f.read().decode('utf-8-sig').splitlines()
+        self.assertEqual([linea.split(',')[:2] for linea in reporte[1:]], [['4', 'SKU9003'], ['5', 'SKU9002']])
+
+    def test_mismo_formato_que_el_formulario_sin_consultar_unicidad(self):
+        datos = {'nombre': 'Torta', 'categoria': 'TORTAS', 'marca': 'Lilis'}
+        for campos in ({'sku': 'ABC1'}, {'sku': 'SKU9010', 'ean_upc': '12AB'}):
+            with self.subTest(campos=campos):
+                errores = [form(data={**datos, **campos}).errors for form in (ProductoForm, ProductoImportacionForm)]
+                campo = 'ean_upc' if 'ean_upc' in campos else 'sku'
+                self.assertEqual(errores[0][campo], errores[1][campo])
+        # El SKU repetido lo resuelve la carga por bloques, no el formulario de importación
+        importacion = ProductoImportacionForm(data={**datos, 'sku': ' sku9001 '})
+        with self.assertNumQueries(0):
+            importacion.full_clean()
+        self.assertNotIn('sku', importacion.errors)
+        self.assertIn('sku', ProductoForm(data={**datos, 'sku': 'SKU9001'}).errors)
+
+    def test_sin_columna_sku_falla(self):
+        importacion = self.importar('nombre\nTorta\n')
+        self.assertEqual(importacion.estado, 'FALLIDA')
+        self.assertIn('SKU', importacion.mensaje)
+
+    def test_no_se_procesa_dos_veces(self):
+        importacion = self.importar('sku;nombre;categoria;marca\nSKU9004;Otra Torta;TORTAS;Lilis\n')
+        self.assertEqual(importar(importacion).creados, 1)
+        self.assertEqual(Producto.objects.filter(sku='SKU9004').count(), 1)
+
+
+class AlertasProductoTests(TestCase):
+    """Bajo stock y por vencer resueltos en la base, con la misma regla que los métodos del modelo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        hoy = date.today()
+        # bulk_create: punto_reorden queda NULL (save() lo copiaría de stock_minimo)
+        Producto.objects.bulk_create([
+            Producto(sku='ALR-1', nombre='Bajo minimo', categoria='TORTAS', stock_actual=3, stock_minimo=5),
+            Producto(sku='ALR-2', nombre='Reorden cero', categoria='TORTAS', stock_actual=3, stock_minimo=5, punto_reorden=0),
+            Producto(sku='ALR-3', nombre='En reorden', categoria='TORTAS', stock_actual=8, stock_minimo=5, punto_reorden=8),
+            Producto(
+                sku='ALR-4', nombre='Por vencer', categoria='TORTAS', stock_actual=50, perishable=True,
+                fecha_vencimiento=hoy + timedelta(days=3),
+            ),
+            Producto(
+                sku='ALR-5', nombre='Lejano', categoria='TORTAS', stock_actual=50, perishable=True,
+                fecha_vencimiento=hoy + timedelta(days=30),
+            ),
+            Producto(
+                sku='ALR-6', nombre='No perecible', categoria='TORTAS', stock_actual=50, fecha_vencimiento=hoy,
+            ),
+        ])
+
+    def skus(self, qs):
+        return set(qs.values_list('sku', flat=True))
+
+    def test_consultas_y_conteo(self):
+        self.assertEqual(self.skus(Producto.objects.bajo_stock()), {'ALR-1', 'ALR-3'})
+        self.assertEqual(self.skus(Producto.objects.por_vencer()), {'ALR-4'})
+        self.assertEqual(self.skus(Producto.objects.por_vencer(dias=30)), {'ALR-4', 'ALR-5'})
+        self.assertEqual(self.skus(Producto.objects.con_alerta()), {'ALR-1', 'ALR-3', 'ALR-4'})
+        with self.assertNumQueries(1):
+            conteo = Producto.objects.conteo_alertas()
+        self.assertEqual(conteo, {'bajo_stock': 2, 'por_vencer': 1, 'con_alerta': 3})
+
+    def test_mismo_criterio_que_el_modelo(self):
+        en_base = self.skus(Producto.objects.bajo_stock())
+        self.assertEqual({p.sku for p in Producto.objects.all() if p.alerta_bajo_stock()}, en_base)
+
+    @skipUnless(connection.vendor == 'sqlite', 'plan de consulta de SQLite')
+    def test_bajo_stock_usa_el_indice(self):
+        self.assertIn('producto_margen_stock_idx', Producto.objects.bajo_stock().explain())
@@ -9,4 +9,6 @@ urlpatterns = [
     path('<int:pk>/editar/', views.ProductoUpdateView.as_view(), name='editar'),
     path('<int:pk>/eliminar/', views.ProductoDeleteView.as_view(), name='eliminar'),
     path('<int:pk>/', views.ProductoDetailView.as_view(), name='detalle'),
+    path('importar/', views.ImportacionProductosView.as_view(), name='importar'),
+    path('importar/<int:pk>/', views.ImportacionDetalleView.as_view(), name='importacion'),
 ]
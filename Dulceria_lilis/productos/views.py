@@ -1,15 +1,18 @@
 # productos/views.py
 from django.urls import reverse_lazy
+from django.views import View
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.utils.decorators import method_decorator
-from django.http import HttpResponse
+from django.http import FileResponse, Http404, HttpResponse
 from django.db.models import Q
 from django.core.paginator import Paginator
 from sistema.decorators import permiso_requerido
-from .models import Producto
-from .forms import ProductoForm
+from inventario.models import PronosticoDemanda
+from .models import ImportacionProductos, Producto
+from .forms import ImportacionProductosForm, ProductoForm
+from .importacion import lanzar_importacion
 from utils.export_excel import queryset_to_excel
 
 # ------------------------------
@@ -22,34 +25,48 @@ class ProductoListView(ListView):
     context_object_name = 'productos'
     ordering = ['nombre']
 
+    ALERTAS = {
+        'bajo_stock': lambda qs: qs.bajo_stock(),
+        'por_vencer': lambda qs: qs.por_vencer(),
+        'todas': lambda qs: qs.con_alerta(),
+    }
+
     def _apply_filters(self, request, qs):
         session = request.session
 
         # Tomar valores desde GET
         buscar_get = request.GET.get('buscar')
         pp_get = request.GET.get('pp')
+        alerta_get = request.GET.get('alerta')
 
         # Limpiar filtros si viene clear=1
         if request.GET.get("clear") == "1":
-            for k in ("f_buscar_prod", "f_pp_prod"):
+            for k in ("f_buscar_prod", "f_pp_prod", "f_alerta_prod"):
                 session.pop(k, None)
-            return qs, "", 10
+            return qs, "", 10, ""
 
         # Guardar en sesión si vienen por GET
         if buscar_get is not None:
             session["f_buscar_prod"] = buscar_get
         if pp_get is not None:
             session["f_pp_prod"] = pp_get
+        if alerta_get is not None:
+            session["f_alerta_prod"] = alerta_get
 
         # Leer valores desde sesión
         buscar = request.GET.get("buscar", session.get("f_buscar_prod", ""))
         per_page = session.get("f_pp_prod", "10")
+        alerta = session.get("f_alerta_prod", "")
+        if alerta not in self.ALERTAS:
+            alerta = ""
 
         # Aplicar filtros
         if buscar:
             qs = qs.filter(Q(sku__icontains=buscar) | Q(nombre__icontains=buscar))
+        if alerta:
+            qs = self.ALERTAS[alerta](qs)
 
-        return qs, buscar, per_page
+        return qs, buscar, per_page, alerta
 
     def get(self, request, *args, **kwargs):
         productos = Producto.objects.all().order_by('nombre')
@@ -60,7 +77,7 @@ class ProductoListView(ListView):
 
         # ===== EXPORTAR EXCEL =====
         if request.GET.get("export") == "xlsx":
-            productos, _, _ = self._apply_filters(request, productos)
+            productos, _, _, _ = self._apply_filters(request, productos)
             columns = [
                 ("SKU", lambda p: p.sku),
                 ("Nombre", lambda p: p.nombre),
@@ -91,7 +108,10 @@ class ProductoListView(ListView):
         
 
         # ===== FILTROS =====
-        productos, buscar, per_page = self._apply_filters(request, productos)
+        productos, buscar, per_page, alerta = self._apply_filters(request, productos)
+
+        # ===== CONTADORES DE ALERTAS (una sola consulta) =====
+        alertas = Producto.objects.conteo_alertas()
 
         # ===== PAGINADOR =====
         try:
@@ -112,6 +132,8 @@ class ProductoListView(ListView):
             'buscar': buscar,
             'per_page': per_page_int,
             'busqueda_activa': bool(buscar),
+            'alerta': alerta,
+            'alertas': alertas,
         }
         return render(request, self.template_name, context)
 
@@ -209,4 +231,55 @@ class ProductoDetailView(DetailView):
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         ctx['alerta_bajo_stock'] = self.object.alerta_bajo_stock()
-        return ctx
\ No newline at end of file
+        ctx['pronostico'] = PronosticoDemanda.objects.filter(producto=self.object).first()
+        return ctx
+
+
+# ------------------------------
+# IMPORTAR PRODUCTOS (XLSX/CSV en segundo plano)
+# ------------------------------
+@method_decorator(permiso_requerido('productos.add_producto'), name='dispatch')
+class ImportacionProductosView(View):
+    template_name = 'productos/importacion.html'
+
+    def get(self, request, form=None):
+        context = {
+            'form': form or ImportacionProductosForm(),
+            'importaciones': ImportacionProductos.objects.select_related('usuario')[:20],
+        }
+        return render(request, self.template_name, context)
+
+    def post(self, request):
+        form = ImportacionProductosForm(request.POST, request.FILES)
+        if not form.is_valid():
+            return self.get(request, form)
+
+        archivo = form.cleaned_data['archivo']
+        importacion = ImportacionProductos.objects.create(
+            archivo=archivo,
+            nombre_archivo=archivo.name,
+            usuario=request.user,
+        )
+        lanzar_importacion(importacion)
+        messages.success(request, f"Importación #{importacion.pk} en proceso: puede seguir trabajando mientras se carga.")
+        return redirect('productos:importacion', pk=importacion.pk)
+
+
+@method_decorator(permiso_requerido('productos.add_producto'), name='dispatch')
+class ImportacionDetalleView(View):
+    template_name = 'productos/importacion_detalle.html'
+
+    def get(self, request, pk):
+        importacion = get_object_or_404(ImportacionProductos.objects.select_related('usuario'), pk=pk)
+
+        # ===== REPORTE DE ERRORES =====
+        if request.GET.get('descargar') == 'errores':
+            if not importacion.reporte_errores:
+                raise Http404("La importación no tiene reporte de errores.")
+            return FileResponse(
+                importacion.reporte_errores.open('rb'),
+                as_attachment=True,
+                filename=f"importacion_{importacion.pk}_errores.csv",
+            )
+
+        return render(request, self.template_name, {'importacion': importacion})
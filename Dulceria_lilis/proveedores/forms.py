@@ -86,150 +86,179 @@ class ProveedorForm(forms.ModelForm):
             'condiciones_pago': {'required': 'Seleccione una condición de pago válida.'},
         }
 
-        # Validación de email
+    # Las reglas viven en funciones de módulo (más abajo) para que la importación
+    # masiva (proveedores.importacion) valide igual sin instanciar un formulario por fila.
     def clean_email(self):
-        email = self.cleaned_data.get("email")
-        # bloquea nombres con solo números
-        patron = r'^[A-Za-z][A-Za-z0-9._%+-]{2,}@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$'
-        if not re.match(patron, email):
-            raise ValidationError("Ingrese un email válido. Ej: nombre@dominio.cl")
-            # Bloquear correos donde la parte antes del @ sea SOLO números
-        local_part = email.split("@")[0]
-        if local_part.isdigit():  
-            raise ValidationError("El email no puede tener solo números antes del '@'.")
-        # Bloquear correos tipo: 1@dominio.cl
-        if len(local_part) < 2:
-            raise ValidationError("La parte antes del '@' debe tener al menos 2 caracteres.")
-        return email
+        return validar_email(self.cleaned_data.get("email"))
 
-    
-    # Validación de RUT
     def clean_rut_nif(self):
-        rut = self.cleaned_data['rut_nif'].upper().replace('.', '').replace('-', '')
-
-        # ---- 1. Validación de formato (7 u 8 dígitos + DV)
-        if not re.match(r'^\d{7,8}[0-9K]$', rut):
-            raise ValidationError("Formato de RUT inválido. Ejemplo válido: 21983048-3")
-
-        cuerpo, dv = rut[:-1], rut[-1]
-
-        # ---- 2. Bloquear cuerpos repetidos (22.222.222-2, 33.333.333-3...)
-        if cuerpo == cuerpo[0] * len(cuerpo):
-            raise ValidationError("El RUT no puede tener todos los dígitos repetidos.")
-
-        # ---- 3. Bloquear cuerpos muy comunes falsos
-        RUT_INVALIDOS = {
-            "11111111", "12345678", "22222222", "33333333", "44444444",
-            "55555555", "66666666", "77777777", "88888888", "99999999",
-            "00000000"
-        }
-
-        if cuerpo in RUT_INVALIDOS:
-            raise ValidationError("Este RUT es inválido.")
-
-        # ---- 4. Validación del dígito verificador
-        suma, multiplo = 0, 2
-        for c in reversed(cuerpo):
-            suma += int(c) * multiplo
-            multiplo = multiplo + 1 if multiplo < 7 else 2
-
-        resto = suma % 11
-        calc = 11 - resto
-        dv_esperado = (
-            '0' if calc == 11 else
-            'K' if calc == 10 else
-            str(calc)
-        )
-
-        if dv != dv_esperado:
-            raise ValidationError("RUT inválido. El dígito verificador no coincide.")
-
-        # ---- 5. Retorno en formato estándar
-        return f"{cuerpo}-{dv}"
+        return normalizar_rut(self.cleaned_data['rut_nif'])
 
-    # Validación de teléfono
     def clean_telefono(self):
-        telefono = self.cleaned_data.get('telefono')
-    
-        if not telefono:
-            return telefono  # Si el teléfono está vacío, lo dejamos pasar.
-    
-        if not telefono.isdigit():
-            raise ValidationError("El teléfono debe contener solo números.")
-    
-        if len(telefono) != 9:
-            raise ValidationError("El teléfono debe tener exactamente 9 dígitos.")
-    
-        if re.match(r'^(\d)\1{8,}$', telefono):
-            raise ValidationError(f"El teléfono no debe contener secuencias repetidas como {telefono[0] * 9}.")
-    
-        return telefono
-    
+        return validar_telefono(self.cleaned_data.get('telefono'))
+
     def clean_nombre_fantasia(self):
-        nombre_fantasia = self.cleaned_data.get('nombre_fantasia')
-        if not nombre_fantasia:
-            return nombre_fantasia
-        if len(nombre_fantasia) > 20:
-            raise ValidationError("El nombre de fantasia no puede exceder los 20 caracteres.")
-        if nombre_fantasia and not nombre_fantasia.isalpha():
-            raise ValidationError("El nombre de fantasia debe contener solo letras.")
-        return nombre_fantasia
-    
-    def clean_razon_social(self):
-        razon_social = self.cleaned_data.get('razon_social')
-        if not razon_social:
-            return razon_social
-        if len(razon_social) > 20:
-            raise ValidationError("La razon social no puede exceder los 20 caracteres.")
-        if razon_social and not razon_social.isalpha():
-            raise ValidationError("La razon social debe contener solo letras.")
-        return razon_social
-    
-    def clean_direccion(self):
-        direccion = self.cleaned_data.get("direccion")
+        return validar_nombre_fantasia(self.cleaned_data.get('nombre_fantasia'))
 
-        if not direccion:
-            return direccion  # es opcional
+    def clean_razon_social(self):
+        return validar_razon_social(self.cleaned_data.get('razon_social'))
 
-        if len(direccion) < 5:
-            raise ValidationError("La dirección debe tener al menos 5 caracteres.")
-        if len(direccion) > 100:
-            raise ValidationError("La dirección debe tener maximo 100 caracteres.")
+    def clean_direccion(self):
+        return validar_direccion(self.cleaned_data.get("direccion"))
 
-        if not re.match(r"^[A-Za-z0-9ÁÉÍÓÚÑáéíóúñ\s\-\#\.,]+$", direccion):
-            raise ValidationError("La dirección contiene caracteres no permitidos.")
-        return direccion
-    
     def clean_ciudad(self):
-        ciudad = self.cleaned_data.get("ciudad")
-
-        if not ciudad:
-            return ciudad  # opcional
-
-        if len(ciudad) < 3:
-            raise ValidationError("La ciudad debe tener al menos 3 caracteres.")
-        if len(ciudad) > 30:
-            raise ValidationError("La ciudad debe tener menos de 30 caracteres.")
-
-        if not re.match(r"^[A-Za-zÁÉÍÓÚÑáéíóúñ\s]+$", ciudad):
-            raise ValidationError("La ciudad solo puede contener letras.")
-
-        return ciudad
+        return validar_ciudad(self.cleaned_data.get("ciudad"))
 
     def clean_pais(self):
-        pais = self.cleaned_data.get("pais")
-
-        if not pais:
-            return pais  # opcional
-
-        if len(pais) < 3:
-            raise ValidationError("El país debe tener al menos 3 caracteres.")
+        return validar_pais(self.cleaned_data.get("pais"))
+
+
+# ==========================
+#  REGLAS DE PROVEEDOR (formulario e importación masiva)
+# ==========================
+# Patrones compilados una vez
+RE_EMAIL = re.compile(r'^[A-Za-z][A-Za-z0-9._%+-]{2,}@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$')
+RE_RUT = re.compile(r'^\d{7,8}[0-9K]$')
+RE_TELEFONO_REPETIDO = re.compile(r'^(\d)\1{8,}$')
+RE_DIRECCION = re.compile(r"^[A-Za-z0-9ÁÉÍÓÚÑáéíóúñ\s\-\#\.,]+$")
+RE_SOLO_LETRAS = re.compile(r"^[A-Za-zÁÉÍÓÚÑáéíóúñ\s]+$")
+
+# Cuerpos de RUT muy comunes y falsos
+RUT_INVALIDOS = frozenset({
+    "11111111", "12345678", "22222222", "33333333", "44444444",
+    "55555555", "66666666", "77777777", "88888888", "99999999",
+    "00000000"
+})
+
+
+def validar_email(email):
+    # bloquea nombres con solo números
+    if not RE_EMAIL.match(email):
+        raise ValidationError("Ingrese un email válido. Ej: nombre@dominio.cl")
+    # Bloquear correos donde la parte antes del @ sea SOLO números
+    local_part = email.split("@")[0]
+    if local_part.isdigit():
+        raise ValidationError("El email no puede tener solo números antes del '@'.")
+    # Bloquear correos tipo: 1@dominio.cl
+    if len(local_part) < 2:
+        raise ValidationError("La parte antes del '@' debe tener al menos 2 caracteres.")
+    return email
+
+
+def digito_verificador(cuerpo):
+    """Dígito verificador (módulo 11) del cuerpo de un RUT."""
+    suma, multiplo = 0, 2
+    for c in reversed(cuerpo):
+        suma += int(c) * multiplo
+        multiplo = multiplo + 1 if multiplo < 7 else 2
+
+    calc = 11 - suma % 11
+    return '0' if calc == 11 else 'K' if calc == 10 else str(calc)
+
+
+def normalizar_rut(rut):
+    """RUT validado en formato estándar 12345678-5."""
+    rut = rut.upper().replace('.', '').replace('-', '')
+
+    # ---- 1. Validación de formato (7 u 8 dígitos + DV)
+    if not RE_RUT.match(rut):
+        raise ValidationError("Formato de RUT inválido. Ejemplo válido: 21983048-3")
+
+    cuerpo, dv = rut[:-1], rut[-1]
+
+    # ---- 2. Bloquear cuerpos repetidos (22.222.222-2, 33.333.333-3...)
+    if cuerpo == cuerpo[0] * len(cuerpo):
+        raise ValidationError("El RUT no puede tener todos los dígitos repetidos.")
+
+    # ---- 3. Bloquear cuerpos muy comunes falsos
+    if cuerpo in RUT_INVALIDOS:
+        raise ValidationError("Este RUT es inválido.")
+
+    # ---- 4. Validación del dígito verificador
+    if dv != digito_verificador(cuerpo):
+        raise ValidationError("RUT inválido. El dígito verificador no coincide.")
+
+    # ---- 5. Retorno en formato estándar
+    return f"{cuerpo}-{dv}"
+
+
+def validar_telefono(telefono):
+    if not telefono:
+        return telefono  # Si el teléfono está vacío, lo dejamos pasar.
+    if not telefono.isdigit():
+        raise ValidationError("El teléfono debe contener solo números.")
+    if len(telefono) != 9:
+        raise ValidationError("El teléfono debe tener exactamente 9 dígitos.")
+    if RE_TELEFONO_REPETIDO.match(telefono):
+        raise ValidationError(f"El teléfono no debe contener secuencias repetidas como {telefono[0] * 9}.")
+    return telefono
+
+
+def validar_nombre_fantasia(nombre_fantasia):
+    if not nombre_fantasia:
+        return nombre_fantasia
+    if len(nombre_fantasia) > 20:
+        raise ValidationError("El nombre de fantasia no puede exceder los 20 caracteres.")
+    if not nombre_fantasia.isalpha():
+        raise ValidationError("El nombre de fantasia debe contener solo letras.")
+    return nombre_fantasia
 
-        if not re.match(r"^[A-Za-zÁÉÍÓÚÑáéíóúñ\s]+$", pais):
-            raise ValidationError("El país solo puede contener letras.")
 
-        return pais
+def validar_razon_social(razon_social):
+    if not razon_social:
+        return razon_social
+    if len(razon_social) > 20:
+        raise ValidationError("La razon social no puede exceder los 20 caracteres.")
+    if not razon_social.isalpha():
+        raise ValidationError("La razon social debe contener solo letras.")
+    return razon_social
+
+
+def validar_direccion(direccion):
+    if not direccion:
+        return direccion  # es opcional
+    if len(direccion) < 5:
+        raise ValidationError("La dirección debe tener al menos 5 caracteres.")
+    if len(direccion) > 100:
+        raise ValidationError("La dirección debe tener maximo 100 caracteres.")
+    if not RE_DIRECCION.match(direccion):
+        raise ValidationError("La dirección contiene caracteres no permitidos.")
+    return direccion
+
+
+def validar_ciudad(ciudad):
+    if not ciudad:
+        return ciudad  # opcional
+    if len(ciudad) < 3:
+        raise ValidationError("La ciudad debe tener al menos 3 caracteres.")
+    if len(ciudad) > 30:
+        raise ValidationError("La ciudad debe tener menos de 30 caracteres.")
+    if not RE_SOLO_LETRAS.match(ciudad):
+        raise ValidationError("La ciudad solo puede contener letras.")
+    return ciudad
+
+
+def validar_pais(pais):
+    if not pais:
+        return pais  # opcional
+    if len(pais) < 3:
+        raise ValidationError("El país debe tener al menos 3 caracteres.")
+    if not RE_SOLO_LETRAS.match(pais):
+        raise ValidationError("El país solo puede contener letras.")
+    return pais
+
+
+class ImportacionProveedoresForm(forms.Form):
+    archivo = forms.FileField(
+        label="Archivo (.xlsx o .csv)",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.xlsx,.csv'}),
+    )
 
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith(('.xlsx', '.csv')):
+            raise ValidationError("El archivo debe ser .xlsx o .csv.")
+        return archivo
 
 
 # Formulario para el modelo ProductoProveedor
@@ -246,15 +275,6 @@ class ProductoProveedorInlineForm(forms.ModelForm):
             "preferente": forms.CheckboxInput(attrs={"class": "form-check-input"}),
         }
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-
-        # Agregar data-costo a cada <option>
-        productos = Producto.objects.all()
-        self.fields["producto"].queryset = productos
-        self.costo_producto = {
-            p.id: float(p.costo_estandar or 0) for p in productos
-        }
     def clean_costo(self):
         costo = self.cleaned_data.get("costo")
 
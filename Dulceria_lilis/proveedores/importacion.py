@@ -0,0 +1,198 @@
+# proveedores/importacion.py
+"""
+Alta masiva de proveedores desde un XLSX o CSV.
+
+Todo el archivo se valida en una pasada, sin consultas por fila:
+
+  - cada fila pasa por las mismas reglas de ProveedorForm (funciones de
+    proveedores.forms con los patrones ya compilados: RUT con dígito verificador
+    y cuerpos bloqueados, email, teléfono, ...), más opciones y largo máximo;
+  - los RUT y emails repetidos dentro del archivo se detectan con un dict;
+  - los que ya existen en la base se buscan con una consulta IN por columna;
+  - las filas válidas se insertan con bulk_create por bloques de CHUNK_SIZE,
+    cada bloque en su transacción, y queda un solo registro de actividad.
+
+Las filas con error no se insertan y se informan (fila, RUT, campo, error).
+"""
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from sistema.models import RegistroActividad
+from utils.bulk import en_bloques
+from utils.importacion import leer_archivo
+from .forms import (
+    CONDICIONES_PAGO_CHOICES, MONEDA_CHOICES, normalizar_rut, validar_ciudad, validar_direccion,
+    validar_email, validar_nombre_fantasia, validar_pais, validar_razon_social, validar_sitio_web,
+    validar_telefono,
+)
+from .models import Proveedor
+
+CHUNK_SIZE = 1000
+
+# Encabezados aceptados (normalizados, ver utils.importacion).
+# Incluye los del Excel que exporta el listado de proveedores.
+COLUMNAS = {
+    'rut_nif': {'rut_nif', 'rut/nif', 'rut', 'nif'},
+    'razon_social': {'razon_social'},
+    'nombre_fantasia': {'nombre_fantasia'},
+    'email': {'email', 'correo'},
+    'telefono': {'telefono'},
+    'sitio_web': {'sitio_web', 'web'},
+    'direccion': {'direccion'},
+    'ciudad': {'ciudad'},
+    'pais': {'pais'},
+    'condiciones_pago': {'condiciones_pago', 'condiciones_de_pago'},
+    'moneda': {'moneda'},
+    'contacto_principal_nombre': {'contacto_principal_nombre', 'contacto_principal', 'contacto'},
+    'contacto_principal_email': {'contacto_principal_email', 'email_contacto'},
+    'contacto_principal_telefono': {'contacto_principal_telefono', 'telefono_contacto'},
+    'estado': {'estado'},
+    'observaciones': {'observaciones'},
+}
+OBLIGATORIAS = {
+    'rut_nif': 'Ingrese el RUT del proveedor.',
+    'razon_social': 'Ingrese la razón social del proveedor.',
+    'email': 'Ingrese el email del proveedor.',
+    'condiciones_pago': 'Seleccione una condición de pago válida.',
+}
+
+
+def _validar_sitio_web(valor):
+    validar_sitio_web(valor)
+    return valor
+
+
+def _validar_email_contacto(valor):
+    if valor:
+        validate_email(valor)
+    return valor
+
+
+# Mismas reglas que ProveedorForm.clean_<campo>
+VALIDADORES = {
+    'rut_nif': normalizar_rut,
+    'email': validar_email,
+    'telefono': validar_telefono,
+    'nombre_fantasia': validar_nombre_fantasia,
+    'razon_social': validar_razon_social,
+    'direccion': validar_direccion,
+    'ciudad': validar_ciudad,
+    'pais': validar_pais,
+    'sitio_web': _validar_sitio_web,
+    'contacto_principal_email': _validar_email_contacto,
+}
+OPCIONES = {
+    'condiciones_pago': {v for v, _ in CONDICIONES_PAGO_CHOICES},
+    'moneda': {v for v, _ in MONEDA_CHOICES},
+    'estado': {v for v, _ in Proveedor.ESTADO_CHOICES},
+}
+LARGOS = {
+    f.name: f.max_length
+    for f in Proveedor._meta.concrete_fields
+    if f.name in COLUMNAS and getattr(f, 'max_length', None)
+}
+DEFECTOS = {campo: Proveedor._meta.get_field(campo).get_default() for campo in ('pais', 'moneda', 'estado')}
+
+
+def validar_fila(fila):
+    """(datos, [(campo, mensaje)]) de una fila {campo: texto}. Sin consultas."""
+    datos, errores = {}, []
+    for campo in COLUMNAS:
+        valor = fila.get(campo, '')
+        if not valor:
+            if campo in OBLIGATORIAS:
+                errores.append((campo, OBLIGATORIAS[campo]))
+            else:
+                datos[campo] = DEFECTOS.get(campo)
+            continue
+        if campo in OPCIONES:
+            valor = valor.upper()
+            if valor not in OPCIONES[campo]:
+                errores.append((campo, f"Valor inválido. Debe ser uno de: {', '.join(sorted(OPCIONES[campo]))}"))
+                continue
+        try:
+            valor = VALIDADORES[campo](valor) if campo in VALIDADORES else valor
+        except ValidationError as e:
+            errores.extend((campo, m) for m in e.messages)
+            continue
+        if campo in LARGOS and len(valor) > LARGOS[campo]:
+            errores.append((campo, f"Debe tener como máximo {LARGOS[campo]} caracteres."))
+            continue
+        datos[campo] = valor
+    return datos, errores
+
+
+def _existentes(campo, valores):
+    """Valores de `campo` que ya están en la base (una consulta IN por bloque)."""
+    encontrados = set()
+    for bloque in en_bloques(valores):
+        encontrados.update(Proveedor.objects.filter(**{f'{campo}__in': bloque}).values_list(campo, flat=True))
+    return encontrados
+
+
+def importar_proveedores(filas, usuario=None, chunk_size=CHUNK_SIZE):
+    """
+    Crea los proveedores de `filas` (iterable de (número de fila, {campo: texto})).
+    Retorna {"filas", "creados", "errores": [{"fila", "rut", "campo", "error"}]}.
+    """
+    errores = []
+    validas = []
+    ruts, emails = {}, {}
+    total = 0
+
+    # ---- 1) Reglas por fila + repetidos dentro del archivo ----
+    for numero, fila in filas:
+        total += 1
+        datos, errores_fila = validar_fila(fila)
+        rut = datos.get('rut_nif') or fila.get('rut_nif', '')
+        if not errores_fila:
+            if datos['rut_nif'] in ruts:
+                errores_fila.append(('rut_nif', f"RUT/NIF repetido en el archivo (fila {ruts[datos['rut_nif']]})."))
+            if datos['email'] in emails:
+                errores_fila.append(('email', f"Correo repetido en el archivo (fila {emails[datos['email']]})."))
+        if errores_fila:
+            errores.extend({"fila": numero, "rut": rut, "campo": c, "error": m} for c, m in errores_fila)
+            continue
+        ruts[datos['rut_nif']] = numero
+        emails[datos['email']] = numero
+        validas.append((numero, datos))
+
+    # ---- 2) Contra la base de datos (una consulta por columna) ----
+    ruts_db = _existentes('rut_nif', ruts)
+    emails_db = _existentes('email', emails)
+    if ruts_db or emails_db:
+        filtradas = []
+        for numero, datos in validas:
+            errores_fila = []
+            if datos['rut_nif'] in ruts_db:
+                errores_fila.append(('rut_nif', 'Ya existe un proveedor con este RUT/NIF.'))
+            if datos['email'] in emails_db:
+                errores_fila.append(('email', 'Ya existe un proveedor con este correo electrónico.'))
+            if errores_fila:
+                errores.extend({"fila": numero, "rut": datos['rut_nif'], "campo": c, "error": m} for c, m in errores_fila)
+            else:
+                filtradas.append((numero, datos))
+        validas = filtradas
+
+    # ---- 3) Insertar por bloques ----
+    for inicio in range(0, len(validas), chunk_size):
+        with transaction.atomic():
+            Proveedor.objects.bulk_create([Proveedor(**datos) for _, datos in validas[inicio:inicio + chunk_size]])
+
+    # bulk_create no dispara la auditoría por fila: un registro por importación
+    if validas and usuario is not None and usuario.is_authenticated:
+        RegistroActividad.objects.create(
+            usuario=usuario,
+            descripcion=f"Importación de proveedores: {len(validas)} creados, {total - len(validas)} filas con error",
+            modelo='Proveedor',
+        )
+
+    errores.sort(key=lambda e: e["fila"])
+    return {"filas": total, "creados": len(validas), "errores": errores}
+
+
+def importar_archivo(archivo, nombre, usuario=None):
+    """importar_proveedores() sobre un XLSX/CSV, leído de a una fila (utils.importacion)."""
+    filas = leer_archivo(archivo, nombre, COLUMNAS, {'rut_nif': 'RUT/NIF'})
+    return importar_proveedores(filas, usuario=usuario)
@@ -0,0 +1,49 @@
+# proveedores/management/commands/importar_proveedores.py
+"""
+Alta masiva de proveedores desde un XLSX o CSV (mismas reglas que la importación web).
+Ejecutar:
+python manage.py importar_proveedores proveedores.xlsx
+python manage.py importar_proveedores proveedores.csv --errores errores.csv
+"""
+import csv
+import os
+import time as reloj
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from proveedores.importacion import importar_archivo
+
+
+class Command(BaseCommand):
+    help = 'Importa proveedores desde un XLSX/CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del .xlsx o .csv a importar.')
+        parser.add_argument('--errores', help='Escribe los errores en este CSV (fila, rut, campo, error).')
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        if not os.path.isfile(ruta):
+            raise CommandError(f"No existe el archivo {ruta}")
+
+        inicio = reloj.perf_counter()
+        try:
+            with open(ruta, 'rb') as f:
+                resumen = importar_archivo(f, os.path.basename(ruta))
+        except ValidationError as e:
+            raise CommandError(" ".join(e.messages))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumen['filas']} filas, {resumen['creados']} proveedores creados, "
+            f"{len(resumen['errores'])} errores ({reloj.perf_counter() - inicio:.1f}s)"
+        ))
+        if options['errores'] and resumen['errores']:
+            with open(options['errores'], 'w', newline='', encoding='utf-8-sig') as f:
+                escritor = csv.DictWriter(f, fieldnames=['fila', 'rut', 'campo', 'error'])
+                escritor.writeheader()
+                escritor.writerows(resumen['errores'])
+            self.stdout.write(f"  Errores: {options['errores']}")
+        else:
+            for e in resumen['errores'][:20]:
+                self.stdout.write(f"  Fila {e['fila']} ({e['rut'] or '—'}) {e['campo']}: {e['error']}")
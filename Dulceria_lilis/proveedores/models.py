@@ -1,5 +1,6 @@
 from django.db import models
 from productos.models import Producto
+from utils.sincronizacion import SincronizableQuerySet
 
 class Proveedor(models.Model):
     # Identificación legal
@@ -31,6 +32,9 @@ class Proveedor(models.Model):
     estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='ACTIVO')
 
     observaciones = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = SincronizableQuerySet.as_manager()
 
     def __str__(self):
         return self.razon_social
@@ -1,3 +1,99 @@
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from proveedores.importacion import importar_archivo
+from proveedores.models import Proveedor
+from utils.pruebas import PresupuestoConsultasMixin, crear_datos_semilla
+
+
+class PresupuestoProveedoresTests(PresupuestoConsultasMixin, TestCase):
+    """Consultas y filas máximas de cada vista de proveedores sobre los datos semilla."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.proveedor = cls.datos['proveedores'][0]
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.datos['admin'])
+
+    def get(self, url, datos=None):
+        respuesta = self.client.get(url, datos)
+        self.assertLess(respuesta.status_code, 400)
+        return respuesta
+
+    def test_lista(self):
+        with self.assertPresupuesto(consultas=8, filas=39):
+            self.get(reverse('proveedores:lista'), {'buscar_Rut_Nif': '', 'pp': 10})
+
+    def test_lista_busqueda(self):
+        with self.assertPresupuesto(consultas=8, filas=39):
+            self.get(reverse('proveedores:lista'), {'buscar_Rut_Nif': '76', 'pp': 100})
+
+    def test_lista_formulario_invalido(self):
+        # El POST inválido vuelve a cargar el listado paginado con los errores
+        with self.assertPresupuesto(consultas=5, filas=39):
+            respuesta = self.client.post(reverse('proveedores:lista'), {'razon_social': ''})
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_exportar_xlsx(self):
+        with self.assertPresupuesto(consultas=6, filas=8):
+            self.get(reverse('proveedores:lista'), {'export': 'xlsx', 'buscar_Rut_Nif': ''})
+
+    def test_editar_con_productos_asociados(self):
+        with self.assertPresupuesto(consultas=5, filas=43):
+            self.get(reverse('proveedores:editar', args=[self.proveedor.pk]))
+
+    def test_detalle(self):
+        with self.assertPresupuesto(consultas=4, filas=13):
+            self.get(reverse('proveedores:detalle', args=[self.proveedor.pk]))
+
+    def test_eliminar(self):
+        with self.assertPresupuesto(consultas=40, filas=34):
+            self.get(reverse('proveedores:eliminar', args=[self.proveedor.pk]))
+
+    def test_importar(self):
+        with self.assertPresupuesto(consultas=2, filas=2):
+            self.get(reverse('proveedores:importar'))
+
+
+class ImportacionProveedoresTests(TestCase):
+    """Alta masiva: reglas de ProveedorForm por fila, repetidos en el archivo y contra la base."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # 76086428-5: RUT válido ya registrado
+        Proveedor.objects.create(
+            rut_nif='76086428-5', razon_social='Existente', email='existente@lilis.cl', condiciones_pago='EFECTIVO',
+        )
+
+    def importar(self, contenido):
+        archivo = SimpleUploadedFile('proveedores.csv', contenido.encode('utf-8-sig'))
+        return importar_archivo(archivo, 'proveedores.csv')
+
+    def test_valida_todo_el_archivo_en_una_pasada(self):
+        resultado = self.importar(
+            'RUT/NIF,Razón social,Email,Condiciones de pago\n'
+            '77.123.456-9,Dulceros,uno@lilis.cl,transferencia\n'
+            '15.234.567-4,Azucarera,dos@lilis.cl,EFECTIVO\n'
+            '77123456-9,Repetido,tres@lilis.cl,EFECTIVO\n'
+            '76086428-5,Duplicado,cuatro@lilis.cl,EFECTIVO\n'
+            '15234567-0,Errado,cinco@lilis.cl,EFECTIVO\n'
+            ',Vacio,no-es-email,CHEQUE\n'
+        )
+        self.assertEqual((resultado['filas'], resultado['creados']), (6, 2))
+        por_fila = {}
+        for error in resultado['errores']:
+            por_fila.setdefault(error['fila'], set()).add(error['campo'])
+        self.assertEqual(por_fila, {
+            4: {'rut_nif'}, 5: {'rut_nif'}, 6: {'rut_nif'}, 7: {'rut_nif', 'email', 'condiciones_pago'},
+        })
+        nuevo = Proveedor.objects.get(rut_nif='77123456-9')
+        self.assertEqual(nuevo.condiciones_pago, 'TRANSFERENCIA')
+
+    def test_email_repetido_contra_la_base(self):
+        resultado = self.importar('rut,razon_social,email,condiciones_pago\n15234567-4,Otro,existente@lilis.cl,DEBITO\n')
+        self.assertEqual(resultado['creados'], 0)
+        self.assertEqual([e['campo'] for e in resultado['errores']], ['email'])
@@ -9,4 +9,5 @@ urlpatterns = [
     path('<int:pk>/editar/', views.ProveedorUpdateView.as_view(), name='editar'),
     path('<int:pk>/eliminar/', views.ProveedorDeleteView.as_view(), name='eliminar'),
     path('<int:pk>/', views.ProveedorDetailView.as_view(), name='detalle'),
+    path('importar/', views.ProveedorImportacionView.as_view(), name='importar'),
 ]
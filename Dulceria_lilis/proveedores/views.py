@@ -1,14 +1,17 @@
 # proveedores/views.py
 from django.urls import reverse_lazy
+from django.views import View
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.utils.decorators import method_decorator
 from django.http import HttpResponse
 from django.db.models import Q
+from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
+from .importacion import importar_archivo
 from .models import Proveedor, ProductoProveedor, Producto
-from .forms import ProveedorForm, ProductoProveedorFormSet, ProductoRelacionForm
+from .forms import ImportacionProveedoresForm, ProveedorForm, ProductoProveedorFormSet, ProductoRelacionForm
 from sistema.decorators import permiso_requerido
 from utils.export_excel import queryset_to_excel
 
@@ -248,8 +251,8 @@ class ProveedorUpdateView(UpdateView):
         else:
             context["pp_formset"] = ProductoProveedorFormSet(instance=self.object)
 
-        # Productos para el select
-        context["productos"] = Producto.objects.all()
+        # Productos para el select: una sola consulta para todas las filas del formset
+        context["productos"] = Producto.objects.only('id', 'sku', 'nombre', 'costo_estandar')
 
         context['titulo'] = 'Editar'
         return context
@@ -322,5 +325,39 @@ class ProveedorDetailView(DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['productos_asociados'] = ProductoProveedor.objects.filter(proveedor=self.object)
-        return context
\ No newline at end of file
+        context['productos_asociados'] = ProductoProveedor.objects.filter(proveedor=self.object).select_related('producto')
+        return context
+
+
+# ----------------------------------------------------------
+# IMPORTAR PROVEEDORES (XLSX/CSV, validación en una pasada)
+# ----------------------------------------------------------
+@method_decorator(permiso_requerido('proveedores.add_proveedor'), name='dispatch')
+class ProveedorImportacionView(View):
+    template_name = 'proveedores/importacion.html'
+    MAX_ERRORES_EN_PANTALLA = 500
+
+    def get(self, request):
+        return render(request, self.template_name, {'form': ImportacionProveedoresForm()})
+
+    def post(self, request):
+        form = ImportacionProveedoresForm(request.POST, request.FILES)
+        resumen = None
+        if form.is_valid():
+            archivo = form.cleaned_data['archivo']
+            try:
+                resumen = importar_archivo(archivo, archivo.name, usuario=request.user)
+            except ValidationError as e:
+                form.add_error('archivo', e)
+
+        if resumen is not None:
+            if resumen['creados']:
+                messages.success(request, f"{resumen['creados']} proveedor(es) creados.")
+            if resumen['errores']:
+                messages.warning(request, f"{len(resumen['errores'])} error(es): esas filas no se cargaron.")
+
+        return render(request, self.template_name, {
+            'form': form if resumen is None else ImportacionProveedoresForm(),
+            'resumen': resumen,
+            'errores': resumen['errores'][:self.MAX_ERRORES_EN_PANTALLA] if resumen else [],
+        })
@@ -0,0 +1,270 @@
+# sistema/benchmark.py
+"""
+Suite de benchmarks de las rutas más usadas (`manage.py benchmark_rutas`).
+
+Cada caso es una petición completa por el cliente de pruebas de Django
+(middleware, vista, plantilla y serialización, sin servidor HTTP), contra los
+datos de la base configurada: usar una base generada con
+`generar_datos_prueba --masivo`.
+
+Por caso se registra:
+  - latencia p50 / p95 / mínima / máxima (ms) de N repeticiones, tras una de
+    calentamiento (los casos pesados, como las exportaciones, limitan las
+    repeticiones y no calientan);
+  - consultas SQL por petición (la mayor de las repeticiones);
+  - memoria pico de Python durante una petición extra con tracemalloc (aparte,
+    porque tracemalloc hace más lentas las mediciones de tiempo; en las
+    exportaciones grandes la multiplica, se puede omitir);
+  - bytes y código de la respuesta.
+
+Los casos que escriben (registrar un movimiento) corren dentro de una
+transacción que se revierte: la base queda igual.
+
+Los resultados se guardan en JSON y se comparan con una base guardada
+(comparar()): hay regresión si la p50 sube más que la tolerancia (y más de
+MARGEN_MS) o si aumentan las consultas.
+"""
+import platform
+import resource
+import time as reloj
+import tracemalloc
+from itertools import product as combinaciones
+
+import django
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from inventario.models import Bodega, Lote, MovimientoInventario
+from productos.models import Producto
+from proveedores.models import ProductoProveedor, Proveedor
+
+VERSION = 1
+MARGEN_MS = 2.0
+XHR = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+
+def _caso(nombre, url, datos=None, metodo='get', cabeceras=None, maximo=None, revertir=False):
+    """`maximo` limita las repeticiones (y omite el calentamiento) de los casos pesados."""
+    return {
+        'nombre': nombre, 'url': url, 'datos': datos or {}, 'metodo': metodo,
+        'cabeceras': cabeceras or {}, 'maximo': maximo, 'revertir': revertir,
+    }
+
+
+def preparar_contexto(usuario):
+    """Ids y valores reales de la base que usan los casos (un proveedor con productos, un lote, ...)."""
+    bodega = Bodega.objects.order_by('id').first()
+    relacion = (
+        ProductoProveedor.objects
+        .filter(producto__control_por_lote=False, producto__perishable=False)
+        .order_by('id').values('producto_id', 'producto__sku', 'proveedor_id').first()
+    )
+    lote = Lote.objects.filter(cantidad_disponible__gt=0).order_by('id').values('producto_id').first()
+    proveedor = Proveedor.objects.order_by('id').values('rut_nif').first()
+    if bodega is None or relacion is None:
+        raise ValueError('Faltan datos: se necesita al menos una bodega y un producto con proveedor.')
+    return {
+        'token': Token.objects.get_or_create(user=usuario)[0].key,
+        'bodega_id': bodega.pk,
+        'bodega': bodega.codigo,
+        'producto_id': relacion['producto_id'],
+        'proveedor_id': relacion['proveedor_id'],
+        'producto_lote_id': lote['producto_id'] if lote else relacion['producto_id'],
+        # Búsquedas que encuentran algo sin ser exactas
+        'buscar_sku': relacion['producto__sku'][:4],
+        'buscar_rut': proveedor['rut_nif'][:3] if proveedor else '1',
+    }
+
+
+def casos(ctx):
+    """Lista de casos de la suite, con nombres estables (son las claves del JSON)."""
+    lista = []
+
+    # ---- Movimientos: cada combinación de filtros y tamaño de página ----
+    movimientos = reverse('inventario:inicio')
+    for tipo, buscar, bodega, pp in combinaciones(
+        ('', 'SALIDA'), ('', ctx['buscar_sku']), ('', ctx['bodega']), (10, 100, 2000)
+    ):
+        filtros = '+'.join(n for n, v in (('tipo', tipo), ('buscar', buscar), ('bodega', bodega)) if v) or 'sin_filtros'
+        lista.append(_caso(
+            f'movimientos.lista[{filtros},pp={pp}]', movimientos,
+            {'tipo': tipo, 'buscar': buscar, 'bodega': bodega, 'pp': pp},
+            maximo=5 if pp == 2000 else None,
+        ))
+    lista.append(_caso('movimientos.lista[pagina=50,pp=100]', movimientos,
+                       {'tipo': '', 'buscar': '', 'bodega': '', 'pp': 100, 'page': 50}))
+
+    # ---- Productos y proveedores ----
+    productos = reverse('productos:lista')
+    for pp in (10, 1500):
+        lista.append(_caso(f'productos.lista[pp={pp}]', productos, {'buscar': '', 'alerta': '', 'pp': pp}))
+    lista.append(_caso('productos.lista[buscar]', productos, {'buscar': ctx['buscar_sku'], 'alerta': '', 'pp': 10}))
+    lista.append(_caso('productos.lista[alerta=todas]', productos, {'buscar': '', 'alerta': 'todas', 'pp': 10}))
+    proveedores = reverse('proveedores:lista')
+    for pp in (10, 2000):
+        lista.append(_caso(f'proveedores.lista[pp={pp}]', proveedores, {'buscar_Rut_Nif': '', 'pp': pp}))
+    lista.append(_caso('proveedores.lista[buscar]', proveedores, {'buscar_Rut_Nif': ctx['buscar_rut'], 'pp': 10}))
+
+    # ---- Dashboard ----
+    lista.append(_caso('dashboard', reverse('dashboard')))
+
+    # ---- AJAX ----
+    lista.append(_caso('ajax.dashboard_grafico', reverse('dashboard'), cabeceras=XHR))
+    lista.append(_caso('ajax.productos_por_proveedor',
+                       reverse('inventario:productos_por_proveedor', args=[ctx['proveedor_id']]), cabeceras=XHR))
+    lista.append(_caso('ajax.lotes_por_producto',
+                       reverse('inventario:lotes_por_producto', args=[ctx['producto_lote_id']]), cabeceras=XHR))
+    lista.append(_caso('ajax.productos_busqueda', productos,
+                       {'live': 1, 'buscar': ctx['buscar_sku'], 'pp': 10}, cabeceras=XHR))
+
+    # ---- Exportaciones XLSX ----
+    lista.append(_caso('exportar.movimientos[tipo=AJUSTE]', movimientos,
+                       {'export': 'xlsx', 'tipo': 'AJUSTE', 'buscar': '', 'bodega': ''}, maximo=3))
+    lista.append(_caso('exportar.productos', productos, {'export': 'xlsx', 'buscar': '', 'alerta': ''}, maximo=3))
+    lista.append(_caso('exportar.proveedores', proveedores, {'export': 'xlsx', 'buscar_Rut_Nif': ''}, maximo=3))
+
+    # ---- Registrar un movimiento (se revierte) ----
+    lista.append(_caso('movimientos.registrar', movimientos, {
+        'tipo': 'INGRESO', 'proveedor': ctx['proveedor_id'], 'producto': ctx['producto_id'],
+        'bodega_destino': ctx['bodega_id'], 'cantidad': '1', 'observacion': 'benchmark',
+    }, metodo='post', revertir=True))
+
+    # ---- API ----
+    api = {'HTTP_AUTHORIZATION': f"Token {ctx['token']}"}
+    lista.append(_caso('api.productos.lista', '/api/productos/', cabeceras=api, maximo=5))
+    lista.append(_caso('api.productos.detalle', f"/api/productos/{ctx['producto_id']}/", cabeceras=api))
+    return lista
+
+
+def _ejecutar(cliente, caso):
+    """Hace la petición y consume el cuerpo (también si es streaming). Devuelve (status, bytes)."""
+    def pedir():
+        respuesta = getattr(cliente, caso['metodo'])(caso['url'], caso['datos'], **caso['cabeceras'])
+        if respuesta.streaming:
+            largo = sum(len(parte) for parte in respuesta.streaming_content)
+        else:
+            largo = len(respuesta.content)
+        respuesta.close()
+        return respuesta.status_code, largo
+
+    if not caso['revertir']:
+        return pedir()
+    with transaction.atomic():
+        resultado = pedir()
+        transaction.set_rollback(True)
+    return resultado
+
+
+def medir(cliente, caso, repeticiones, memoria=True):
+    """Mide un caso: {'p50_ms', 'p95_ms', 'min_ms', 'max_ms', 'consultas', 'memoria_pico_kb', ...}."""
+    n = min(repeticiones, caso['maximo']) if caso['maximo'] else repeticiones
+    if not caso['maximo']:
+        _ejecutar(cliente, caso)
+
+    tiempos, consultas = [], []
+    for _ in range(max(n, 1)):
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = reloj.perf_counter()
+            status, largo = _ejecutar(cliente, caso)
+            tiempos.append((reloj.perf_counter() - inicio) * 1000)
+        consultas.append(len(capturadas))
+
+    pico = None
+    if memoria:
+        tracemalloc.start()
+        try:
+            _ejecutar(cliente, caso)
+            pico = tracemalloc.get_traced_memory()[1] // 1024
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'p50_ms': round(float(np.percentile(tiempos, 50)), 2),
+        'p95_ms': round(float(np.percentile(tiempos, 95)), 2),
+        'min_ms': round(min(tiempos), 2),
+        'max_ms': round(max(tiempos), 2),
+        'consultas': max(consultas),
+        'memoria_pico_kb': pico,
+        'bytes': largo,
+        'status': status,
+        'repeticiones': len(tiempos),
+    }
+
+
+def resumen_datos():
+    return {
+        'productos': Producto.objects.count(),
+        'proveedores': Proveedor.objects.count(),
+        'lotes': Lote.objects.count(),
+        'movimientos': MovimientoInventario.objects.count(),
+    }
+
+
+def ejecutar_suite(usuario, repeticiones=10, filtro=None, memoria=True, avance=None):
+    """
+    Corre los casos (los que contienen `filtro` en el nombre, si se da) y devuelve
+    el documento de resultados listo para guardar en JSON.
+    """
+    cliente = Client()
+    cliente.force_login(usuario)
+    seleccion = [c for c in casos(preparar_contexto(usuario)) if not filtro or filtro in c['nombre']]
+
+    resultados = {}
+    for caso in seleccion:
+        resultados[caso['nombre']] = medir(cliente, caso, repeticiones, memoria)
+        if avance:
+            avance(caso['nombre'], resultados[caso['nombre']])
+
+    return {
+        'version': VERSION,
+        'fecha': timezone.now().isoformat(timespec='seconds'),
+        'entorno': {
+            'motor': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'debug': settings.DEBUG,
+            'maquina': platform.node(),
+        },
+        'datos': resumen_datos(),
+        'repeticiones': repeticiones,
+        'memoria_pico_proceso_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'casos': resultados,
+    }
+
+
+def comparar(actual, base, tolerancia=0.2):
+    """
+    Compara dos documentos de resultados caso por caso. Devuelve filas
+    {'nombre', 'p50_base', 'p50', 'variacion', 'consultas_base', 'consultas', 'estado'}
+    con estado OK, MEJORA, REGRESION, NUEVO o ERROR (status >= 400).
+    """
+    filas = []
+    for nombre, r in actual['casos'].items():
+        b = base.get('casos', {}).get(nombre)
+        fila = {
+            'nombre': nombre, 'p50': r['p50_ms'], 'consultas': r['consultas'],
+            'p50_base': None, 'consultas_base': None, 'variacion': None,
+        }
+        if r['status'] >= 400:
+            fila['estado'] = 'ERROR'
+        elif b is None:
+            fila['estado'] = 'NUEVO'
+        else:
+            fila.update(p50_base=b['p50_ms'], consultas_base=b['consultas'])
+            fila['variacion'] = (r['p50_ms'] - b['p50_ms']) / b['p50_ms'] if b['p50_ms'] else None
+            mas_lento = r['p50_ms'] > b['p50_ms'] * (1 + tolerancia) and r['p50_ms'] - b['p50_ms'] > MARGEN_MS
+            mas_rapido = r['p50_ms'] < b['p50_ms'] * (1 - tolerancia) and b['p50_ms'] - r['p50_ms'] > MARGEN_MS
+            if mas_lento or r['consultas'] > b['consultas']:
+                fila['estado'] = 'REGRESION'
+            elif mas_rapido or r['consultas'] < b['consultas']:
+                fila['estado'] = 'MEJORA'
+            else:
+                fila['estado'] = 'OK'
+        filas.append(fila)
+    return filas
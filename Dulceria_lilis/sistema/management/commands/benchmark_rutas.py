@@ -0,0 +1,117 @@
+# sistema/management/commands/benchmark_rutas.py
+"""
+Benchmark de las rutas principales (ver sistema/benchmark.py): listado de
+movimientos con cada combinación de filtros y pp (incluido pp=2000), listados
+de productos y proveedores, dashboard, endpoints AJAX, exportaciones XLSX,
+registro de un movimiento y la API. Guarda p50/p95, consultas y memoria pico
+en JSON y, con --base, compara contra una corrida anterior (falla si hay
+regresiones). Usar en una base de pruebas generada con generar_datos_prueba --masivo.
+Ejecutar:
+python manage.py benchmark_rutas --guardar-base benchmarks/base.json
+python manage.py benchmark_rutas --base benchmarks/base.json --salida benchmarks/actual.json
+python manage.py benchmark_rutas --filtro movimientos.lista --repeticiones 20
+"""
+import json
+import os
+import time as reloj
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from sistema import benchmark
+from usuarios.models import Usuario
+
+
+def _escribir(ruta, datos):
+    carpeta = os.path.dirname(ruta)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
+
+
+class Command(BaseCommand):
+    help = 'Mide latencia (p50/p95), consultas y memoria de las rutas principales y compara con una base'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=10)
+        parser.add_argument('--filtro', type=str, default=None, help='Solo los casos cuyo nombre contiene este texto.')
+        parser.add_argument('--usuario', type=str, default=None, help='Usuario (por defecto el primer superusuario).')
+        parser.add_argument('--salida', type=str, default='benchmark_resultados.json')
+        parser.add_argument('--base', type=str, default=None, help='JSON de una corrida anterior para comparar.')
+        parser.add_argument('--guardar-base', type=str, default=None, help='Guarda además los resultados como base.')
+        parser.add_argument('--sin-memoria', action='store_true',
+                            help='No mide la memoria pico (tracemalloc hace mucho más lentas las exportaciones).')
+        parser.add_argument('--tolerancia', type=float, default=0.2,
+                            help='Aumento relativo de la p50 permitido antes de marcar regresión (0.2 = 20%%).')
+
+    def handle(self, *args, **options):
+        if options['usuario']:
+            usuario = Usuario.objects.filter(username=options['usuario']).first()
+        else:
+            usuario = Usuario.objects.filter(is_superuser=True, is_active=True).order_by('id').first()
+        if usuario is None:
+            raise CommandError('No hay un usuario para el benchmark (use --usuario).')
+
+        base = None
+        if options['base']:
+            try:
+                with open(options['base'], encoding='utf-8') as f:
+                    base = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"No se pudo leer la base {options['base']}: {e}")
+
+        def avance(nombre, r):
+            memoria = f"{r['memoria_pico_kb']:,d}" if r['memoria_pico_kb'] is not None else '-'
+            self.stdout.write(
+                f"  {nombre:<52} p50 {r['p50_ms']:9.1f} ms  p95 {r['p95_ms']:9.1f} ms  "
+                f"{r['consultas']:4d} consultas  {memoria:>8} KB  [{r['status']}]"
+            )
+
+        inicio = reloj.perf_counter()
+        # El cliente de pruebas usa el host "testserver"
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            try:
+                resultados = benchmark.ejecutar_suite(
+                    usuario, repeticiones=max(1, options['repeticiones']), filtro=options['filtro'],
+                    memoria=not options['sin_memoria'], avance=avance,
+                )
+            except ValueError as e:
+                raise CommandError(str(e))
+        if not resultados['casos']:
+            raise CommandError('Ningún caso coincide con el filtro.')
+
+        _escribir(options['salida'], resultados)
+        if options['guardar_base']:
+            _escribir(options['guardar_base'], resultados)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(resultados['casos'])} casos en {reloj.perf_counter() - inicio:.1f}s → {options['salida']}"
+        ))
+
+        errores = [n for n, r in resultados['casos'].items() if r['status'] >= 400]
+        if base is None:
+            if errores:
+                raise CommandError(f"Casos con error HTTP: {', '.join(errores)}")
+            return
+
+        if base.get('datos') != resultados['datos']:
+            self.stdout.write(self.style.WARNING(
+                f"Los datos difieren de la base ({base.get('datos')} vs {resultados['datos']}): la comparación es aproximada."
+            ))
+        filas = benchmark.comparar(resultados, base, options['tolerancia'])
+        self.stdout.write(f"\n  {'caso':<52} {'base p50':>10} {'p50':>10} {'var.':>8} {'consultas':>11}  estado")
+        for f in filas:
+            variacion = f"{f['variacion']:+.0%}" if f['variacion'] is not None else '-'
+            p50_base = f"{f['p50_base']:.1f}" if f['p50_base'] is not None else '-'
+            consultas = f"{f['consultas_base'] if f['consultas_base'] is not None else '-'}→{f['consultas']}"
+            estilo = {
+                'REGRESION': self.style.ERROR, 'ERROR': self.style.ERROR, 'MEJORA': self.style.SUCCESS,
+            }.get(f['estado'], str)
+            self.stdout.write(estilo(
+                f"  {f['nombre']:<52} {p50_base:>10} {f['p50']:>10.1f} {variacion:>8} {consultas:>11}  {f['estado']}"
+            ))
+
+        malos = [f['nombre'] for f in filas if f['estado'] in ('REGRESION', 'ERROR')]
+        if malos:
+            raise CommandError(f"{len(malos)} caso(s) con regresión o error: {', '.join(malos)}")
@@ -25,4 +25,19 @@ class RegistroActividad(models.Model):
         ordering = ['-fecha']
 
     def __str__(self):
-        return f"{self.fecha.strftime('%d/%m/%Y %H:%M')} - {self.usuario or 'Sistema'} - {self.descripcion[:60]}"
\ No newline at end of file
+        return f"{self.fecha.strftime('%d/%m/%Y %H:%M')} - {self.usuario or 'Sistema'} - {self.descripcion[:60]}"
+
+
+class RegistroEliminacion(models.Model):
+    """Tombstone: registra eliminaciones para la sincronización incremental (api/changes)."""
+    modelo = models.CharField(max_length=50)
+    objeto_id = models.PositiveBigIntegerField()
+    fecha = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Registro de Eliminación"
+        verbose_name_plural = "Registros de Eliminación"
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.modelo} #{self.objeto_id} eliminado"
@@ -89,9 +89,14 @@ AXES_COOLOFF_MESSAGE = "Cuenta temporalmente bloqueada por intentos fallidos. In
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 }
+API_TOKEN_CACHE_TTL = 60  # segundos que se cachea (usuario, token) en la API; máximo retraso de una revocación sin señales
+REPOSICION_CACHE_TTL = 15 * 60  # segundos que se cachea el reporte de reposición
+CIERRE_SALDO_INTERVALO_HORAS = 24  # cada cuánto generar_cierre_saldo crea una foto de stock
+RESERVA_STOCK_MINUTOS = 30  # duración por defecto de una reserva de stock (picking)
+INDICE_CODIGOS_REVISION_SEGUNDOS = 2  # cada cuánto se refresca el índice de códigos de escaneo
 ROOT_URLCONF = 'sistema.urls'
 
 TEMPLATES = [
@@ -2,13 +2,13 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from sistema.middleware import get_current_user
-from sistema.models import RegistroActividad
+from sistema.models import RegistroActividad, RegistroEliminacion
 
 # Modelos que quieres auditar
 from usuarios.models import Usuario
 from productos.models import Producto
 from proveedores.models import Proveedor
-from inventario.models import MovimientoInventario
+from inventario.models import MovimientoInventario, Lote
 
 
 # ===== SOLUCIÓN AL RECURSIÓN: bandera para evitar bucle infinito =====
@@ -78,4 +78,24 @@ def auditar_eliminacion(sender, instance, **kwargs):
             descripcion=f"{sender.__name__} eliminado: {texto}",
             modelo=sender.__name__,
         )
-    ], ignore_conflicts=True)
\ No newline at end of file
+    ], ignore_conflicts=True)
+
+
+# ===== TOMBSTONES para la sincronización incremental (api/changes) =====
+MODELOS_SINCRONIZABLES = {
+    Producto: 'producto',
+    Proveedor: 'proveedor',
+    Lote: 'lote',
+}
+
+
+@receiver(post_delete)
+def registrar_eliminacion(sender, instance, **kwargs):
+    modelo = MODELOS_SINCRONIZABLES.get(sender)
+    if modelo is None:
+        return
+
+    # bulk_create: no dispara post_save (evita auditar el propio tombstone)
+    RegistroEliminacion.objects.bulk_create([
+        RegistroEliminacion(modelo=modelo, objeto_id=instance.pk)
+    ])
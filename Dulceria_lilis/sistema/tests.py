@@ -0,0 +1,66 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from inventario.models import MovimientoInventario
+from sistema.benchmark import comparar, ejecutar_suite
+from utils.pruebas import PresupuestoConsultasMixin, crear_datos_semilla
+
+XHR = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+
+class PresupuestoDashboardTests(PresupuestoConsultasMixin, TestCase):
+    """Consultas y filas máximas del dashboard y su gráfico AJAX sobre los datos semilla."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.datos['admin'])
+
+    def test_dashboard(self):
+        with self.assertPresupuesto(consultas=11, filas=14):
+            respuesta = self.client.get(reverse('dashboard'))
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_dashboard_grafico_ajax(self):
+        with self.assertPresupuesto(consultas=6, filas=6):
+            respuesta = self.client.get(reverse('dashboard'), **XHR)
+        self.assertEqual(respuesta.status_code, 200)
+
+
+class BenchmarkRutasTests(TestCase):
+    """Suite de benchmarks: todos los casos responden sin error y la comparación con la base."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+
+    def test_suite_sobre_los_datos_semilla(self):
+        movimientos = MovimientoInventario.objects.count()
+        resultado = ejecutar_suite(self.datos['admin'], repeticiones=1, memoria=False)
+        errores = {nombre: r['status'] for nombre, r in resultado['casos'].items() if r['status'] >= 400}
+        self.assertEqual(errores, {})
+        self.assertEqual(resultado['casos']['movimientos.registrar']['status'], 302)
+        # El caso que escribe se revierte
+        self.assertEqual(MovimientoInventario.objects.count(), movimientos)
+        self.assertEqual(resultado['datos']['movimientos'], movimientos)
+
+    def test_comparar(self):
+        def caso(p50, consultas=5, status=200):
+            return {'p50_ms': p50, 'consultas': consultas, 'status': status}
+
+        base = {'casos': {
+            'igual': caso(100), 'ruido': caso(1), 'lento': caso(100), 'consultas': caso(100),
+            'rapido': caso(100), 'error': caso(100),
+        }}
+        actual = {'casos': {
+            'igual': caso(110), 'ruido': caso(2.5), 'lento': caso(130), 'consultas': caso(100, consultas=6),
+            'rapido': caso(70), 'error': caso(100, status=500), 'nuevo': caso(10),
+        }}
+        estados = {f['nombre']: f['estado'] for f in comparar(actual, base, tolerancia=0.2)}
+        self.assertEqual(estados, {
+            'igual': 'OK', 'ruido': 'OK', 'lento': 'REGRESION', 'consultas': 'REGRESION',
+            'rapido': 'MEJORA', 'error': 'ERROR', 'nuevo': 'NUEVO',
+        })
@@ -1,14 +1,20 @@
+from datetime import timedelta
+
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.shortcuts import render, redirect
 from django.contrib import messages
+from django.utils import timezone
 
 from productos.models import Producto
 from proveedores.models import Proveedor
 from inventario.models import MovimientoInventario
+from inventario.resumen import serie_por_tipo
 from usuarios.models import Usuario  # Modelo de usuario personalizado
 from sistema.models import RegistroActividad  # Modelo de actividad
 
+DIAS_TENDENCIA = 30
+
 
 @login_required
 def dashboard(request):
@@ -41,6 +47,12 @@ def dashboard(request):
             'data_categorias': data_categorias
         })
 
+    # Tendencia de movimientos de los últimos 30 días (desde el resumen diario)
+    tendencia = None
+    if request.user.has_perm('sistema.ver_grafica'):
+        hoy = timezone.localdate()
+        tendencia = serie_por_tipo(hoy - timedelta(days=DIAS_TENDENCIA - 1), hoy)
+
     # Contexto para render
     contexto = {
         'categorias': categorias,
@@ -51,6 +63,7 @@ def dashboard(request):
         'total_inventario': total_inventario,
         'visitas': visitas,
         'logs_recientes': logs_recientes,  # Para la tabla "Actividad reciente"
+        'tendencia': tendencia,
     }
 
     return render(request, 'dashboard.html', contexto)
@@ -1,3 +1,53 @@
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from usuarios.models import Usuario
+from utils.pruebas import PresupuestoConsultasMixin, crear_datos_semilla
+
+
+class PresupuestoUsuariosTests(PresupuestoConsultasMixin, TestCase):
+    """Consultas y filas máximas de las vistas de usuarios sobre los datos semilla."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos_semilla()
+        cls.otros = [
+            Usuario.objects.create_user(username=f'operador{i}', email=f'operador{i}@lilis.cl', password='clave-segura-123')
+            for i in range(12)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.datos['admin'])
+
+    def get(self, url, datos=None):
+        respuesta = self.client.get(url, datos)
+        self.assertLess(respuesta.status_code, 400)
+        return respuesta
+
+    def test_login(self):
+        self.client.logout()
+        with self.assertPresupuesto(consultas=0, filas=0):
+            self.get(reverse('usuarios:login'))
+
+    def test_perfil(self):
+        with self.assertPresupuesto(consultas=2, filas=2):
+            self.get(reverse('usuarios:perfil'))
+
+    def test_perfil_editar(self):
+        with self.assertPresupuesto(consultas=2, filas=2):
+            self.get(reverse('usuarios:perfil_editar'))
+
+    def test_lista(self):
+        with self.assertPresupuesto(consultas=3, filas=15):
+            self.get(reverse('usuarios:lista'))
+
+    def test_crear_formulario_invalido(self):
+        # El alta solo acepta POST; si no valida, vuelve a mostrar el listado con los errores
+        with self.assertPresupuesto(consultas=3, filas=15):
+            respuesta = self.client.post(reverse('usuarios:crear'), {'username': ''})
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_editar(self):
+        with self.assertPresupuesto(consultas=3, filas=3):
+            self.get(reverse('usuarios:editar', args=[self.otros[0].pk]))
@@ -0,0 +1,126 @@
+# utils/bulk.py
+from django.db import connection, connections, models, router
+from django.utils import timezone
+
+
+def en_bloques(valores):
+    """Divide un IN (...) solo si el motor limita los parámetros (SQLite)."""
+    valores = list(valores)
+    paso = connection.features.max_query_params or len(valores) or 1
+    for i in range(0, len(valores), paso):
+        yield valores[i:i + paso]
+
+
+def bulk_update_valores(model, objs, campos, using=None):
+    """
+    Equivalente a QuerySet.bulk_update(objs, campos) para lotes grandes.
+
+    bulk_update() arma un CASE WHEN por objeto y campo (costo en Python O(objs × campos));
+    aquí se ejecuta un UPDATE ... WHERE id = %s parametrizado con executemany(),
+    preparando cada valor con get_db_prep_save() igual que el ORM.
+    Si el modelo tiene `updated_at` se marca también (como SincronizableQuerySet.update()).
+    No dispara señales. Debe llamarse dentro de una transacción.
+    """
+    if not objs or not campos:
+        return 0
+
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    opts = model._meta
+
+    fields = [opts.get_field(c) for c in campos if c != 'updated_at']
+    sets = [f"{qn(f.column)} = %s" for f in fields]
+
+    marca = None
+    if any(f.name == 'updated_at' for f in opts.concrete_fields):
+        ahora = timezone.now()
+        marca = opts.get_field('updated_at').get_db_prep_save(ahora, connection)
+        sets.append(f"{qn(opts.get_field('updated_at').column)} = %s")
+        for obj in objs:
+            obj.updated_at = ahora
+
+    sql = f"UPDATE {qn(opts.db_table)} SET {', '.join(sets)} WHERE {qn(opts.pk.column)} = %s"
+    params = []
+    for obj in objs:
+        fila = [f.get_db_prep_save(getattr(obj, f.attname), connection) for f in fields]
+        if marca is not None:
+            fila.append(marca)
+        fila.append(obj.pk)
+        params.append(fila)
+
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+    return len(params)
+
+
+def insertar_filas(model, campos, filas, using=None):
+    """
+    INSERT de tuplas ya armadas (en el orden de `campos`) con executemany(), sin
+    instanciar modelos. Para cargas sintéticas o masivas de millones de filas.
+
+    A diferencia de bulk_create() no pasa por pre_save(): los valores dados a campos
+    auto_now/auto_now_add se respetan (p. ej. fechas históricas) y los campos omitidos
+    deben admitir NULL. Decimales, fechas y horas pasan por los adaptadores del backend
+    (connection.ops.adapt_*), como en get_db_prep_save(); enteros, textos y booleanos van tal cual. No dispara señales.
+    Debe llamarse dentro de una transacción. Devuelve la cantidad de filas.
+    """
+    if not filas:
+        return 0
+
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    opts = model._meta
+
+    fields = [opts.get_field(c) for c in campos]
+    ops = connection.ops
+    # Adaptadores del backend (lo que hace get_db_prep_save(), sin validar cada valor de nuevo)
+    preparar = []
+    for i, f in enumerate(fields):
+        if isinstance(f, models.DecimalField):
+            preparar.append((i, lambda v, f=f: ops.adapt_decimalfield_value(v, f.max_digits, f.decimal_places)))
+        elif isinstance(f, models.DateTimeField):
+            preparar.append((i, ops.adapt_datetimefield_value))
+        elif isinstance(f, models.DateField):
+            preparar.append((i, ops.adapt_datefield_value))
+        elif isinstance(f, models.TimeField):
+            preparar.append((i, ops.adapt_timefield_value))
+    if preparar:
+        params = []
+        for fila in filas:
+            fila = list(fila)
+            for i, adaptar in preparar:
+                if fila[i] is not None:
+                    fila[i] = adaptar(fila[i])
+            params.append(fila)
+    else:
+        params = filas
+
+    columnas = ', '.join(qn(f.column) for f in fields)
+    marcas = ', '.join(['%s'] * len(fields))
+    sql = f"INSERT INTO {qn(opts.db_table)} ({columnas}) VALUES ({marcas})"
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+    return len(params)
+
+
+def reiniciar_secuencias(*modelos, using='default'):
+    """Ajusta las secuencias de id tras insertar ids explícitos (PostgreSQL; en SQLite y MySQL no hace nada)."""
+    from django.core.management.color import no_style
+
+    connection = connections[using]
+    sentencias = connection.ops.sequence_reset_sql(no_style(), modelos)
+    if sentencias:
+        with connection.cursor() as cursor:
+            for sql in sentencias:
+                cursor.execute(sql)
+
+
+def borrar_filas(queryset):
+    """
+    DELETE directo del filtro del queryset, sin cargar objetos ni disparar señales
+    (la auditoría global de post_delete cargaría fila por fila).
+    Solo para tablas derivadas sin relaciones que apunten a ellas.
+    """
+    return queryset._raw_delete(queryset.db)
@@ -0,0 +1,99 @@
+# utils/importacion.py
+"""
+Lectura en streaming de planillas XLSX/CSV para las importaciones masivas
+(productos.importacion, proveedores.importacion).
+
+leer_archivo() entrega una fila a la vez: openpyxl en modo read_only o
+csv.reader sobre el archivo, sin cargarlo entero en memoria. La primera fila
+es el encabezado; sus títulos se normalizan (minúsculas, sin tildes, '_' en vez
+de espacios) y se buscan entre los alias de cada campo.
+"""
+import csv
+import io
+import itertools
+import unicodedata
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from openpyxl import load_workbook
+
+
+def normalizar_encabezado(valor):
+    texto = unicodedata.normalize('NFKD', str(valor or '').strip().lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return '_'.join(texto.split())
+
+
+def mapear_columnas(encabezado, columnas, obligatorias):
+    """
+    [(posición, campo)] de las columnas reconocidas del encabezado.
+    columnas: {campo: alias normalizados}; obligatorias: {campo: título para el mensaje}.
+    """
+    alias = {a: campo for campo, nombres in columnas.items() for a in nombres}
+    posiciones, usados = [], set()
+    for i, valor in enumerate(encabezado):
+        campo = alias.get(normalizar_encabezado(valor))
+        if campo and campo not in usados:
+            posiciones.append((i, campo))
+            usados.add(campo)
+    faltantes = [titulo for campo, titulo in obligatorias.items() if campo not in usados]
+    if faltantes:
+        raise ValidationError(f"Faltan columnas en la primera fila del archivo: {', '.join(faltantes)}.")
+    return posiciones
+
+
+def texto_celda(valor):
+    """Celda -> texto de formulario ('' si está vacía)."""
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        return valor.date().isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, float) and valor.is_integer():
+        # Excel guarda 7801234567890 o 12 como float
+        return str(int(valor))
+    return str(valor).strip()
+
+
+def _filas_xlsx(archivo):
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        yield from libro.worksheets[0].iter_rows(values_only=True)
+    finally:
+        libro.close()
+
+
+def _filas_csv(archivo):
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    primera = texto.readline()
+    # Excel en español guarda CSV con ';'
+    separador = ';' if primera.count(';') > primera.count(',') else ','
+    yield from csv.reader(itertools.chain([primera], texto), delimiter=separador)
+
+
+def leer_archivo(archivo, nombre, columnas, obligatorias):
+    """
+    (número de fila en el archivo, {campo: texto}) de cada fila con datos.
+    Solo trae las columnas reconocidas; las filas vacías se saltan.
+    """
+    if nombre.lower().endswith('.xlsx'):
+        filas = _filas_xlsx(archivo)
+    elif nombre.lower().endswith('.csv'):
+        filas = _filas_csv(archivo)
+    else:
+        raise ValidationError("Formato no soportado: use XLSX o CSV.")
+
+    try:
+        posiciones = mapear_columnas(next(filas, None) or [], columnas, obligatorias)
+        for numero, fila in enumerate(filas, 2):
+            if not any(v not in (None, '') for v in fila):
+                continue
+            yield numero, {
+                campo: texto_celda(fila[i] if i < len(fila) else None)
+                for i, campo in posiciones
+            }
+    except UnicodeDecodeError:
+        raise ValidationError("El CSV debe estar en UTF-8.")
+    finally:
+        filas.close()
@@ -0,0 +1,277 @@
+# utils/pruebas.py
+"""
+Apoyo para las pruebas de presupuesto de consultas (tests.py de cada app).
+
+Cada vista, endpoint AJAX y acción de la API declara cuántas consultas SQL y
+cuántas filas puede leer como máximo, y se ejecuta contra un conjunto de datos
+con semilla fija (crear_datos_semilla). Una N+1 (una consulta por fila listada)
+o un listado que carga una tabla completa supera el presupuesto y la prueba
+falla mostrando cada consulta con las filas que leyó y desde dónde se llamó:
+
+    class MisPruebas(PresupuestoConsultasMixin, TestCase):
+        def test_lista(self):
+            with self.assertPresupuesto(consultas=8, filas=40):
+                self.client.get(reverse('productos:lista'))
+
+Las filas se cuentan envolviendo el cursor del driver (fetchone/fetchmany/
+fetchall/iteración), así valen tanto para el ORM como para SQL crudo.
+
+Con PRESUPUESTO_MEDIR=1 las pruebas no fallan: imprimen lo medido por cada
+bloque, para recalibrar los presupuestos después de un cambio intencional.
+"""
+import os
+import random
+import sys
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connections
+
+RAIZ = str(settings.BASE_DIR)
+MAX_ORIGENES = 4
+MAX_SQL = 400
+IGNORADOS = {__file__, os.path.join(RAIZ, 'manage.py')}
+
+
+class _CursorContado:
+    """Cursor del driver que suma las filas leídas a la consulta en curso."""
+
+    def __init__(self, cursor, registro):
+        self._cursor = cursor
+        self._registro = registro
+
+    def fetchone(self):
+        fila = self._cursor.fetchone()
+        if fila is not None:
+            self._registro['filas'] += 1
+        return fila
+
+    def fetchmany(self, *args, **kwargs):
+        filas = self._cursor.fetchmany(*args, **kwargs)
+        self._registro['filas'] += len(filas)
+        return filas
+
+    def fetchall(self):
+        filas = self._cursor.fetchall()
+        self._registro['filas'] += len(filas)
+        return filas
+
+    def __iter__(self):
+        for fila in self._cursor:
+            self._registro['filas'] += 1
+            yield fila
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+
+def _origenes():
+    """
+    Últimos marcos del proyecto (sin librerías ni este módulo) que llevaron a la
+    consulta y, si viene de una plantilla, la etiqueta que la disparó.
+    """
+    marcos, plantilla = [], None
+    frame = sys._getframe(2)
+    while frame is not None:
+        codigo = frame.f_code
+        if codigo.co_filename.startswith(RAIZ) and codigo.co_filename not in IGNORADOS \
+                and 'site-packages' not in codigo.co_filename:
+            marcos.append(f"{os.path.relpath(codigo.co_filename, RAIZ)}:{frame.f_lineno} en {codigo.co_name}")
+        elif plantilla is None and codigo.co_name == 'render_annotated':
+            nodo = frame.f_locals.get('self')
+            origen, token = getattr(nodo, 'origin', None), getattr(nodo, 'token', None)
+            if origen is not None and token is not None:
+                etiqueta = token.contents[:60]
+                etiqueta = f"{{{{ {etiqueta} }}}}" if token.token_type.name == 'VAR' else f"{{% {etiqueta} %}}"
+                plantilla = f"{os.path.relpath(origen.name, RAIZ)}:{token.lineno} {etiqueta}"
+        frame = frame.f_back
+    origenes = marcos[:MAX_ORIGENES]
+    if plantilla:
+        origenes.insert(0, f"plantilla {plantilla}")
+    return origenes
+
+
+class RegistroConsultas:
+    """execute_wrapper que anota cada consulta: sql, filas leídas y origen en el proyecto."""
+
+    def __init__(self):
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        registro = {'sql': sql, 'filas': 0, 'origenes': _origenes()}
+        self.consultas.append(registro)
+        cursor = context['cursor']
+        if isinstance(cursor.cursor, _CursorContado):
+            cursor.cursor._registro = registro
+        else:
+            cursor.cursor = _CursorContado(cursor.cursor, registro)
+        return execute(sql, params, many, context)
+
+    @property
+    def filas(self):
+        return sum(c['filas'] for c in self.consultas)
+
+    def informe(self):
+        """Cada consulta con sus filas y orígenes; las repetidas se marcan (señal de N+1)."""
+        repeticiones = {}
+        for c in self.consultas:
+            repeticiones[c['sql']] = repeticiones.get(c['sql'], 0) + 1
+        lineas = []
+        for i, c in enumerate(self.consultas, 1):
+            sql = c['sql'] if len(c['sql']) <= MAX_SQL else c['sql'][:MAX_SQL] + ' ...'
+            repetida = f" (repetida {repeticiones[c['sql']]} veces)" if repeticiones[c['sql']] > 1 else ''
+            lineas.append(f"{i:>3}. [{c['filas']} filas]{repetida} {sql}")
+            lineas.extend(f"        {o}" for o in c['origenes'] or ['(fuera del proyecto)'])
+        return "\n".join(lineas)
+
+
+@contextmanager
+def registrar_consultas(using='default'):
+    registro = RegistroConsultas()
+    with connections[using].execute_wrapper(registro):
+        yield registro
+
+
+class PresupuestoConsultasMixin:
+    """
+    Mixin para TestCase: assertPresupuesto(consultas, filas) y un estado limpio por
+    prueba (caché y ContentType vacíos), para que los conteos no dependan del orden.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        ContentType.objects.clear_cache()
+
+    @contextmanager
+    def assertPresupuesto(self, consultas, filas=None, using='default'):
+        with registrar_consultas(using) as registro:
+            yield registro
+
+        usadas, leidas = len(registro.consultas), registro.filas
+        if os.environ.get('PRESUPUESTO_MEDIR'):
+            print(f"\n[presupuesto] {self.id()}: consultas={usadas}, filas={leidas}")
+            return
+        excesos = []
+        if usadas > consultas:
+            excesos.append(f"{usadas} consultas (máximo {consultas})")
+        if filas is not None and leidas > filas:
+            excesos.append(f"{leidas} filas leídas (máximo {filas})")
+        if excesos:
+            self.fail(f"Presupuesto excedido: {', '.join(excesos)}.\n{registro.informe()}")
+
+
+# ------------------------------------------------------------
+# Conjunto de datos con semilla fija
+# ------------------------------------------------------------
+def _rut(cuerpo):
+    suma, factor = 0, 2
+    for digito in reversed(str(cuerpo)):
+        suma += int(digito) * factor
+        factor = 2 if factor == 7 else factor + 1
+    dv = 11 - suma % 11
+    return f"{cuerpo}-{'0' if dv == 11 else 'K' if dv == 10 else dv}"
+
+
+def crear_datos_semilla(semilla=7, productos=30, proveedores=6):
+    """
+    Datos pequeños pero con varias filas por listado (más que cualquier presupuesto
+    sin N+1): 2 bodegas, `proveedores` proveedores, `productos` productos (un tercio
+    con control por lote), 2 proveedores por producto, documentos de INGRESO por
+    bodega, una SALIDA, una TRANSFERENCIA, movimientos sueltos, un conteo abierto,
+    una reserva, el resumen diario y una valorización. Todo pasa por los mismos
+    servicios que la aplicación, así el stock y los lotes quedan consistentes.
+    Devuelve un dict con los objetos que usan las pruebas.
+    """
+    from django.utils import timezone
+
+    from inventario.conteos import abrir_conteo
+    from inventario.documentos import registrar_documento, resolver_lineas
+    from inventario.models import Bodega, DocumentoMovimiento, Lote, MovimientoInventario
+    from inventario.reservas import reservar
+    from inventario.resumen import reconstruir
+    from inventario.valorizacion import valorizar
+    from productos.models import Producto
+    from proveedores.models import ProductoProveedor, Proveedor
+    from usuarios.models import Usuario
+
+    rng = random.Random(semilla)
+    admin = Usuario.objects.create_superuser(username='admin', email='admin@lilis.cl', password='clave-segura-123')
+
+    bodegas = [
+        Bodega.objects.create(codigo='BOD-A', nombre='Bodega Central'),
+        Bodega.objects.create(codigo='BOD-B', nombre='Bodega Sur'),
+    ]
+    provs = Proveedor.objects.bulk_create([
+        Proveedor(
+            rut_nif=_rut(76_000_000 + i), razon_social=f"Proveedor {chr(65 + i)}",
+            email=f"proveedor{i}@lilis.cl", condiciones_pago='TRANSFERENCIA',
+        )
+        for i in range(proveedores)
+    ])
+    sabores = ['Nuez', 'Manjar', 'Coco', 'Limon', 'Menta', 'Frambuesa']
+    prods = Producto.objects.bulk_create([
+        Producto(
+            sku=f"SKU{i:04d}", ean_upc=f"78000000{i:04d}0", nombre=f"Alfajor {sabores[i % len(sabores)]}",
+            categoria='ALFAJORES' if i % 2 else 'TORTAS', marca='Lilis',
+            costo_estandar=Decimal(rng.randint(300, 3000)), precio_venta=Decimal(rng.randint(3100, 6000)),
+            stock_minimo=Decimal(rng.randint(5, 40)), control_por_lote=i % 3 == 0,
+            perishable=i % 3 == 0,
+        )
+        for i in range(productos)
+    ])
+    ProductoProveedor.objects.bulk_create([
+        ProductoProveedor(
+            producto=p, proveedor=provs[(i + k) % len(provs)], costo=p.costo_estandar * Decimal('0.8'),
+            lead_time_dias=rng.randint(2, 15), preferente=k == 0,
+        )
+        for i, p in enumerate(prods) for k in range(2)
+    ])
+
+    def documento(tipo, filas, **encabezado):
+        lineas, errores = resolver_lineas(filas, tipo)
+        assert not errores, errores
+        doc = DocumentoMovimiento(tipo=tipo, usuario=admin, **encabezado)
+        registrar_documento(doc, lineas)
+        return doc
+
+    vence = timezone.localdate() + timedelta(days=120)
+    ingresos = [
+        documento('INGRESO', [
+            {'producto_id': p.pk, 'cantidad': rng.randint(40, 90), 'fecha_vencimiento': vence}
+            for p in prods
+        ], proveedor=provs[j], bodega_destino=b, documento_referencia=f"FAC-{j + 1}")
+        for j, b in enumerate(bodegas)
+    ]
+    lotes = {l.producto_id: l for l in Lote.objects.filter(bodega=bodegas[0]).order_by('id')}
+    salida = documento('SALIDA', [
+        {'producto_id': p.pk, 'lote_id': lotes[p.pk].pk if p.control_por_lote else None, 'cantidad': rng.randint(1, 10)}
+        for p in prods[:12]
+    ], bodega_origen=bodegas[0], documento_referencia='GUIA-1')
+    transferencia = documento('TRANSFERENCIA', [
+        {'producto_id': p.pk, 'cantidad': rng.randint(1, 5)} for p in prods if not p.control_por_lote
+    ][:8], bodega_origen=bodegas[0], bodega_destino=bodegas[1])
+
+    sin_lote = [p for p in prods if not p.control_por_lote and not p.perishable]
+    for p in sin_lote[:10]:
+        MovimientoInventario(
+            tipo='AJUSTE', producto=p, bodega_destino=bodegas[1], cantidad=Decimal(rng.randint(1, 3)),
+            usuario=admin, observacion='Ajuste de prueba',
+        ).save()
+
+    conteo = abrir_conteo(bodega=bodegas[0], usuario=admin)
+    lote_reserva = Lote.objects.filter(cantidad_disponible__gt=5).order_by('id').first()
+    reservar([{'lote_id': lote_reserva.pk, 'cantidad': Decimal(2)}], 'PED-1', usuario=admin)
+    reconstruir()
+    valorizar(timezone.localdate())
+
+    return {
+        'admin': admin, 'bodegas': bodegas, 'proveedores': provs, 'productos': prods,
+        'ingresos': ingresos, 'salida': salida, 'transferencia': transferencia,
+        'conteo': conteo, 'lote': lote_reserva, 'sin_lote': sin_lote,
+        'movimiento': MovimientoInventario.objects.order_by('id').first(),
+    }
@@ -0,0 +1,17 @@
+# utils/sincronizacion.py
+from django.db import models
+from django.utils import timezone
+
+
+class SincronizableQuerySet(models.QuerySet):
+    """
+    QuerySet para modelos con `updated_at` (auto_now).
+
+    auto_now solo se aplica en save() y bulk_create(). Aquí también se marca en
+    update() y, por lo tanto, en bulk_update(), que actualiza por lotes con update().
+    Así la sincronización incremental (api/changes) ve también los cambios masivos.
+    """
+
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)